@@ -0,0 +1,346 @@
+"""
+Extraction benchmark
+Runs the reference invoice corpus through the OCR/regex pipeline and reports
+per-stage latency, throughput and field-level accuracy against golden outputs.
+
+Corpus layout (benchmarks/corpus/):
+    <invoice_type>/<case>.txt           OCR text; the directory is the expected template
+    <invoice_type>/<case>.golden.json   expected output for that case
+
+Golden files hold the correct values read off the invoice, not a snapshot of
+what the pipeline currently produces, so accuracy below 100% is real
+extraction error (misrouted templates, truncated GSTINs, HSN codes read as
+quantities, ...). For a new case, --update-golden seeds the golden file from
+the current output; correct it by hand before committing.
+
+Stages timed per case:
+    classify      predict_invoice_type(text)
+    extract       extract_fields(text, <expected type>)
+    bill_info     OcrRegexExtractor().extract_bill_info(text, use_llm_fallback=False),
+                  which picks its own template (top-k selection when unsure)
+
+Usage (from backend/):
+    python -m benchmarks.extraction                          # report
+    python -m benchmarks.extraction --iterations 50 -v       # more samples, show mismatches
+    python -m benchmarks.extraction --save-baseline base.json
+    python -m benchmarks.extraction --baseline base.json --max-slowdown 0.15
+    python -m benchmarks.extraction --update-golden          # seed goldens for new cases
+
+With --baseline the run exits non-zero when any stage's p50 or p90 is more
+than --max-slowdown slower than the baseline, or accuracy drops below it.
+Baselines are machine specific, so record one on the same host first.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Dict, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+STAGES = ["classify", "extract", "bill_info"]
+# Slowdowns below this many ms are timer noise on sub-millisecond stages
+MIN_SLOWDOWN_MS = 0.05
+
+# What a golden file pins down. Everything else in the pipeline output is free
+# to change; these are the values the scan UI and asset creation rely on.
+GOLDEN_FIELDS = ["vendor_name", "gstin", "invoice_number", "invoice_date", "cgst", "sgst", "igst", "grand_total"]
+GOLDEN_ITEM_FIELDS = ["description", "quantity", "total"]
+GOLDEN_ASSET_FIELDS = ["name", "category", "device_type", "brand", "quantity", "total_price"]
+GOLDEN_MAX_ASSETS = 25
+
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+# ------------------------------
+# Corpus
+# ------------------------------
+def load_corpus(corpus_dir: str = CORPUS_DIR, only: Optional[List[str]] = None) -> List[Dict]:
+    """Every ``<type>/<case>.txt`` in the corpus with its golden output (if recorded)."""
+    cases = []
+    for invoice_type in sorted(os.listdir(corpus_dir)):
+        type_dir = os.path.join(corpus_dir, invoice_type)
+        if not os.path.isdir(type_dir) or (only and invoice_type not in only):
+            continue
+        for filename in sorted(os.listdir(type_dir)):
+            if not filename.endswith(".txt"):
+                continue
+            path = os.path.join(type_dir, filename)
+            golden_path = path[:-4] + ".golden.json"
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+            golden = None
+            if os.path.exists(golden_path):
+                with open(golden_path, "r", encoding="utf-8") as f:
+                    golden = json.load(f)
+            cases.append({
+                "name": f"{invoice_type}/{filename[:-4]}",
+                "invoice_type": invoice_type,
+                "text": text,
+                "golden": golden,
+                "golden_path": golden_path,
+            })
+    return cases
+
+
+def summarize(predicted: str, fields: Dict, bill_info) -> Dict:
+    """The comparable part of one pipeline run (the shape of a golden file)."""
+    return {
+        "invoice_type": predicted,
+        "fields": {
+            **{name: fields.get(name) for name in GOLDEN_FIELDS if name in fields},
+            "items": [{k: item.get(k) for k in GOLDEN_ITEM_FIELDS} for item in fields.get("items", [])],
+        },
+        "bill_info": {
+            "bill_number": bill_info.bill_number,
+            "vendor_name": bill_info.vendor_name,
+            "vendor_gstin": bill_info.vendor_gstin,
+            "bill_date": bill_info.bill_date,
+            "total_amount": bill_info.total_amount,
+            "tax_amount": bill_info.tax_amount,
+            "asset_count": len(bill_info.assets),
+            "assets": [
+                {k: getattr(asset, k) for k in GOLDEN_ASSET_FIELDS}
+                for asset in bill_info.assets[:GOLDEN_MAX_ASSETS]
+            ],
+        },
+    }
+
+
+def _flatten(prefix: str, value, out: Dict[str, str]):
+    """Flatten nested output into ``path -> comparable string`` pairs."""
+    if isinstance(value, dict):
+        for key in sorted(value):
+            _flatten(f"{prefix}.{key}" if prefix else key, value[key], out)
+    elif isinstance(value, list) and value and isinstance(value[0], dict):
+        out[f"{prefix}.#"] = str(len(value))
+        for i, item in enumerate(value):
+            _flatten(f"{prefix}[{i}]", item, out)
+    else:
+        out[prefix] = json.dumps(value, ensure_ascii=False, sort_keys=True, default=str)
+
+
+# ------------------------------
+# Runner
+# ------------------------------
+def _percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def run_case(case: Dict, extractor, iterations: int, timings: Dict[str, List[float]]) -> tuple:
+    """
+    Time every stage ``iterations`` times; returns the output of the last run
+    and the template the bridge extracted it with.
+    """
+    from classifier import predict_invoice_type
+    from regex_extractor import extract_fields
+
+    text = case["text"]
+    output, template = {}, None
+    for _ in range(iterations):
+        started = time.perf_counter()
+        predicted = predict_invoice_type(text)
+        timings["classify"].append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        fields = extract_fields(text, case["invoice_type"])
+        timings["extract"].append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        bill_info, _ = extractor.extract_bill_info(text, use_llm_fallback=False)
+        timings["bill_info"].append((time.perf_counter() - started) * 1000)
+
+        output = summarize(predicted, fields, bill_info)
+        template = getattr(bill_info, "invoice_type", None)
+    return output, template
+
+
+def score(output: Dict, golden: Dict) -> Dict:
+    """Field-level comparison of one case: matched / total and the mismatching paths."""
+    expected, actual = {}, {}
+    _flatten("", golden, expected)
+    _flatten("", output, actual)
+    mismatches = [
+        (path, value, actual.get(path, "<missing>"))
+        for path, value in expected.items()
+        if actual.get(path) != value
+    ]
+    return {"total": len(expected), "matched": len(expected) - len(mismatches), "mismatches": mismatches}
+
+
+def run(cases: List[Dict], iterations: int, warmup: int) -> Dict:
+    from ocr_bridge import OcrRegexExtractor
+
+    extractor = OcrRegexExtractor()
+    extractor.warm_up()
+    for case in cases:
+        for _ in range(warmup):
+            run_case(case, extractor, 1, {stage: [] for stage in STAGES})
+
+    timings = {stage: [] for stage in STAGES}
+    results = []
+    started = time.perf_counter()
+    for case in cases:
+        output, template = run_case(case, extractor, iterations, timings)
+        result = {"case": case, "output": output, "template": template}
+        if case["golden"] is not None:
+            result["score"] = score(output, case["golden"])
+        results.append(result)
+    wall = time.perf_counter() - started
+
+    stages = {}
+    for stage, samples in timings.items():
+        total_s = sum(samples) / 1000
+        stages[stage] = {
+            "p50_ms": _percentile(samples, 50),
+            "p90_ms": _percentile(samples, 90),
+            "p99_ms": _percentile(samples, 99),
+            "max_ms": max(samples) if samples else 0.0,
+            "mean_ms": statistics.fmean(samples) if samples else 0.0,
+            "docs_per_s": len(samples) / total_s if total_s else 0.0,
+        }
+
+    scored = [r["score"] for r in results if "score" in r]
+    matched = sum(s["matched"] for s in scored)
+    total = sum(s["total"] for s in scored)
+    classified = sum(1 for r in results if r["output"]["invoice_type"] == r["case"]["invoice_type"])
+    selected = sum(1 for r in results if r["template"] == r["case"]["invoice_type"])
+    return {
+        "cases": len(cases),
+        "iterations": iterations,
+        "wall_s": wall,
+        "stages": stages,
+        "field_accuracy": matched / total if total else None,
+        "classifier_accuracy": classified / len(cases) if cases else None,
+        "template_accuracy": selected / len(cases) if cases else None,
+        "results": results,
+    }
+
+
+# ------------------------------
+# Reporting
+# ------------------------------
+def print_report(report: Dict, verbose: bool = False):
+    print(f"\n=== extraction benchmark: {report['cases']} case(s) x {report['iterations']} iteration(s), "
+          f"{report['wall_s']:.2f}s wall ===")
+    print(f"\n  {'stage':<10} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9} {'mean':>9} {'docs/s':>9}")
+    for stage, s in report["stages"].items():
+        print(f"  {stage:<10} {s['p50_ms']:8.2f}ms {s['p90_ms']:8.2f}ms {s['p99_ms']:8.2f}ms "
+              f"{s['max_ms']:8.2f}ms {s['mean_ms']:8.2f}ms {s['docs_per_s']:9.1f}")
+
+    print("\n  case                                        type ok   template    fields")
+    for result in report["results"]:
+        case, output = result["case"], result["output"]
+        type_ok = "yes" if output["invoice_type"] == case["invoice_type"] else f"no ({output['invoice_type']})"
+        if "score" in result:
+            fields = f"{result['score']['matched']}/{result['score']['total']}"
+        else:
+            fields = "no golden"
+        template = "yes" if result["template"] == case["invoice_type"] else f"no ({result['template']})"
+        print(f"  {case['name']:<43} {type_ok:<7} {template:<11} {fields}")
+        if verbose and "score" in result:
+            for path, expected, actual in result["score"]["mismatches"]:
+                print(f"      {path}: expected {expected}, got {actual}")
+
+    if report["field_accuracy"] is not None:
+        print(f"\n  field accuracy:      {report['field_accuracy'] * 100:.2f}%")
+    print(f"  classifier accuracy: {report['classifier_accuracy'] * 100:.2f}%")
+    print(f"  template accuracy:   {report['template_accuracy'] * 100:.2f}%")
+
+
+def write_golden(report: Dict) -> int:
+    """Write golden files for cases that don't have one yet."""
+    written = 0
+    for result in report["results"]:
+        if result["case"]["golden"] is not None:
+            continue
+        written += 1
+        with open(result["case"]["golden_path"], "w", encoding="utf-8") as f:
+            json.dump(result["output"], f, indent=2, ensure_ascii=False, sort_keys=True)
+            f.write("\n")
+    print(f"\nWrote {written} golden file(s) — correct them against the invoice text before committing")
+    return written
+
+
+def summary(report: Dict) -> Dict:
+    """The part of a report stored as a regression baseline."""
+    return {
+        "cases": report["cases"],
+        "stages": {stage: {k: round(v, 4) for k, v in s.items()} for stage, s in report["stages"].items()},
+        "field_accuracy": report["field_accuracy"],
+        "classifier_accuracy": report["classifier_accuracy"],
+    }
+
+
+def compare(report: Dict, baseline: Dict, max_slowdown: float) -> List[str]:
+    """Regressions of ``report`` against a saved baseline (empty list = pass)."""
+    failures = []
+    for stage, base in baseline["stages"].items():
+        current = report["stages"].get(stage)
+        if current is None:
+            continue
+        for metric in ("p50_ms", "p90_ms"):
+            limit = base[metric] * (1 + max_slowdown)
+            if current[metric] > limit and current[metric] - base[metric] > MIN_SLOWDOWN_MS:
+                failures.append(
+                    f"{stage} {metric[:3]} {current[metric]:.3f}ms > {limit:.3f}ms "
+                    f"(baseline {base[metric]:.3f}ms +{max_slowdown * 100:.0f}%)"
+                )
+    for metric in ("field_accuracy", "classifier_accuracy"):
+        if baseline.get(metric) is not None and report[metric] is not None and report[metric] < baseline[metric]:
+            failures.append(f"{metric} {report[metric]:.4f} < baseline {baseline[metric]:.4f}")
+    return failures
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Latency and accuracy of the OCR/regex extraction pipeline")
+    parser.add_argument("types", nargs="*", help="only run these invoice types (corpus directories)")
+    parser.add_argument("--corpus", default=CORPUS_DIR, help="corpus directory")
+    parser.add_argument("--iterations", type=int, default=20, help="timed runs per case")
+    parser.add_argument("--warmup", type=int, default=2, help="untimed runs per case first")
+    parser.add_argument("-v", "--verbose", action="store_true", help="list mismatching fields")
+    parser.add_argument("--update-golden", action="store_true", help="write golden files for cases without one")
+    parser.add_argument("--save-baseline", metavar="PATH", help="write stage timings + accuracy as a baseline")
+    parser.add_argument("--baseline", metavar="PATH", help="fail on regressions against this baseline")
+    parser.add_argument("--max-slowdown", type=float, default=0.20, help="allowed p50/p90 slowdown (0.20 = 20%%)")
+    args = parser.parse_args(argv)
+
+    cases = load_corpus(args.corpus, args.types or None)
+    if not cases:
+        print(f"No corpus cases found in {args.corpus}")
+        return 2
+
+    report = run(cases, max(1, args.iterations), max(0, args.warmup))
+    print_report(report, args.verbose)
+
+    if args.update_golden:
+        write_golden(report)
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(summary(report), f, indent=2)
+        print(f"\nBaseline written to {args.save_baseline}")
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        failures = compare(report, baseline, args.max_slowdown)
+        if failures:
+            print("\nREGRESSION")
+            for failure in failures:
+                print(f"  {failure}")
+            return 1
+        print(f"\nNo regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
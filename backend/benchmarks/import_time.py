@@ -0,0 +1,116 @@
+"""
+Import-time benchmark
+Measures how long it takes to import the backend's entry modules in a fresh
+interpreter and which dependencies dominate that cost.
+
+Each target is imported in its own subprocess with ``python -X importtime``
+so nothing is shared through sys.modules, and the per-module self/cumulative
+times are parsed from the interpreter's stderr report.
+
+Usage (from backend/):
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time app ocr_bridge --top 25 --repeat 3
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_TARGETS = ["app", "ocr_bridge", "services.ocr_service"]
+
+
+def _parse_importtime(stderr: str) -> Dict[str, Tuple[int, int]]:
+    """module -> (self_us, cumulative_us) from ``-X importtime`` output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        try:
+            self_us, cumulative_us = int(parts[0]), int(parts[1])
+        except ValueError:
+            continue  # header row
+        name = parts[2].strip()
+        # A module imported from several places keeps its largest cost
+        prev = modules.get(name)
+        if prev is None or cumulative_us > prev[1]:
+            modules[name] = (self_us, cumulative_us)
+    return modules
+
+
+def measure(target: str) -> Tuple[float, Dict[str, Tuple[int, int]]]:
+    """Import ``target`` in a fresh interpreter; returns (wall seconds, per-module costs)."""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1", PYTHONWARNINGS="ignore")
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    wall = time.perf_counter() - started
+    if proc.returncode != 0:
+        tail = proc.stderr.strip().splitlines()[-1:] or ["unknown error"]
+        raise RuntimeError(f"import {target} failed: {tail[0]}")
+    return wall, _parse_importtime(proc.stderr)
+
+
+def _top_level(modules: Dict[str, Tuple[int, int]]) -> List[Tuple[str, int]]:
+    """Cumulative cost per top-level package (e.g. all of sklearn.* as 'sklearn')."""
+    totals = {}
+    for name, (_, cumulative_us) in modules.items():
+        root = name.split(".")[0]
+        totals[root] = max(totals.get(root, 0), cumulative_us)
+    return sorted(totals.items(), key=lambda kv: kv[1], reverse=True)
+
+
+def report(target: str, top: int, repeat: int) -> None:
+    walls = []
+    modules = {}
+    for _ in range(max(1, repeat)):
+        wall, modules = measure(target)
+        walls.append(wall)
+
+    total_us = modules.get(target, (0, 0))[1]
+    print(f"\n=== import {target} ===")
+    print(f"wall (process incl. interpreter start): "
+          f"median {statistics.median(walls):.3f}s  min {min(walls):.3f}s  over {len(walls)} run(s)")
+    print(f"import cumulative: {total_us / 1e6:.3f}s  modules loaded: {len(modules)}")
+
+    print(f"\n  top {top} packages by cumulative cost")
+    for name, cumulative_us in _top_level(modules)[:top]:
+        print(f"    {cumulative_us / 1000:9.1f} ms  {name}")
+
+    print(f"\n  top {top} modules by self cost")
+    by_self = sorted(modules.items(), key=lambda kv: kv[1][0], reverse=True)
+    for name, (self_us, cumulative_us) in by_self[:top]:
+        print(f"    {self_us / 1000:9.1f} ms  (cum {cumulative_us / 1000:8.1f} ms)  {name}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Per-module import cost of backend entry points")
+    parser.add_argument("targets", nargs="*", default=DEFAULT_TARGETS, help="modules to import")
+    parser.add_argument("--top", type=int, default=15, help="rows to show per table")
+    parser.add_argument("--repeat", type=int, default=1, help="fresh-process runs per target")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for target in args.targets:
+        try:
+            report(target, args.top, args.repeat)
+        except RuntimeError as e:
+            print(f"\n=== import {target} ===\n  {e}")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
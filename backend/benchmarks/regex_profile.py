@@ -0,0 +1,271 @@
+"""
+Regex template profiler
+Runs OCR texts through every template in "ocr regex new/regex_templates" and
+ranks the patterns by execution cost, using the per-pattern accounting in
+regex_extractor (calls, match rate, cumulative / mean / worst time).
+
+Every text is run against every template by default, not just the one it was
+written for: misclassified layouts are where patterns backtrack the longest.
+
+With --isolate each template runs in a child process under a watchdog. A
+pattern that runs longer than --budget-ms is killed (re can't be interrupted
+in-process) and recorded as aborted together with the template, field and text.
+
+Usage (from backend/):
+    python -m benchmarks.regex_profile                       # corpus x all templates
+    python -m benchmarks.regex_profile --isolate --budget-ms 200
+    python -m benchmarks.regex_profile scans/*.txt --templates bill_1 one_tech --top 30
+    python -m benchmarks.regex_profile --sort worst_ms --json regex_profile.json
+"""
+
+import argparse
+import glob
+import io
+import json
+import multiprocessing
+import os
+import sys
+import time
+from contextlib import redirect_stdout
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+# A child gets this long to import regex_extractor before the first pattern
+CHILD_STARTUP_S = 15.0
+
+for _path in (BACKEND_DIR, os.path.join(BACKEND_DIR, "ocr regex new")):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+
+def _extractor():
+    import regex_extractor
+    return regex_extractor
+
+
+def load_texts(paths: List[str]) -> List[Tuple[str, str]]:
+    """(name, text) for every .txt file in the given files/directories."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "**", "*.txt"), recursive=True)))
+        else:
+            files.extend(sorted(glob.glob(path)))
+    texts = []
+    for path in files:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            texts.append((os.path.relpath(path), f.read()))
+    return texts
+
+
+def list_templates() -> List[str]:
+    rx = _extractor()
+    return sorted(
+        name[:-5] for name in os.listdir(rx.TEMPLATES_DIR)
+        if name.endswith(".json") and name[:-5] != rx.FALLBACK_TEMPLATE
+    )
+
+
+# ------------------------------
+# Accounting merge
+# ------------------------------
+def _merge(totals: Dict[tuple, Dict], rows: List[Dict]):
+    for row in rows:
+        key = (row["template"], row["field"], row["index"])
+        current = totals.get(key)
+        if current is None:
+            totals[key] = dict(row, aborted=row.get("aborted", 0))
+            continue
+        for counter in ("calls", "matches", "skipped", "total_ms", "overruns", "aborted"):
+            current[counter] = current.get(counter, 0) + row.get(counter, 0)
+        if row["worst_ms"] > current["worst_ms"]:
+            current["worst_ms"] = row["worst_ms"]
+            current["worst_text_len"] = row["worst_text_len"]
+
+
+def _finish(totals: Dict[tuple, Dict]) -> List[Dict]:
+    rows = list(totals.values())
+    for row in rows:
+        row["match_rate"] = row["matches"] / row["calls"] if row["calls"] else 0.0
+        row["mean_ms"] = row["total_ms"] / row["calls"] if row["calls"] else 0.0
+    return rows
+
+
+# ------------------------------
+# Runners
+# ------------------------------
+def profile_in_process(texts, templates, repeat: int) -> Tuple[List[Dict], List[Dict]]:
+    rx = _extractor()
+    rx.reset_pattern_stats()
+    with redirect_stdout(io.StringIO()):   # fallback chatter
+        for _ in range(repeat):
+            for _, text in texts:
+                for template in templates:
+                    rx.extract_fields(text, template)
+    totals = {}
+    _merge(totals, rx.pattern_stats())
+    return _finish(totals), []
+
+
+def _isolated_worker(conn, tasks, start: int, repeat: int):
+    """Child: run tasks[start:], reporting each pattern before it runs."""
+    rx = _extractor()
+    rx.REGEX_QUARANTINE_AFTER = 0   # the parent's watchdog decides
+    run = rx._Pattern.run
+
+    def reporting_run(pattern, mode, text):
+        stats = pattern.stats
+        conn.send(("pattern", (stats.template, stats.field, stats.index, stats.pattern)))
+        return run(pattern, mode, text)
+
+    rx._Pattern.run = reporting_run
+    for task_index in range(start, len(tasks)):
+        _, text, template = tasks[task_index]
+        rx.reset_pattern_stats()
+        with redirect_stdout(io.StringIO()):
+            for _ in range(repeat):
+                rx.extract_fields(text, template)
+        conn.send(("task", task_index, rx.pattern_stats()))
+    conn.send(("done", None))
+    conn.close()
+
+
+def profile_isolated(texts, templates, repeat: int, budget_ms: float) -> Tuple[List[Dict], List[Dict]]:
+    tasks = [(name, text, template) for name, text in texts for template in templates]
+    totals, aborted = {}, []
+    start = 0
+    while start < len(tasks):
+        parent_conn, child_conn = multiprocessing.Pipe(duplex=False)
+        proc = multiprocessing.Process(
+            target=_isolated_worker, args=(child_conn, tasks, start, repeat), daemon=True,
+        )
+        proc.start()
+        child_conn.close()
+        current, wait = None, CHILD_STARTUP_S
+        next_start = len(tasks)
+        while True:
+            if not parent_conn.poll(wait):
+                task_index = start
+                name, _, template = tasks[task_index]
+                proc.kill()
+                proc.join()
+                if current is not None:
+                    tpl, field, index, pattern = current
+                    aborted.append({"template": tpl, "field": field, "index": index, "pattern": pattern,
+                                    "text": name, "routed_as": template, "budget_ms": budget_ms})
+                    _merge(totals, [{
+                        "template": tpl, "field": field, "index": index, "pattern": pattern,
+                        "calls": 1, "matches": 0, "skipped": 0, "total_ms": budget_ms,
+                        "worst_ms": budget_ms, "worst_text_len": len(tasks[task_index][1]),
+                        "overruns": 1, "aborted": 1, "quarantined": False,
+                    }])
+                print(f"[watchdog] killed {template} on {name}: "
+                      f"{current[0]}.{current[1]}[{current[2]}] > {budget_ms:.0f} ms" if current else
+                      f"[watchdog] child for {template} on {name} did not start")
+                next_start = task_index + 1
+                break
+            try:
+                message = parent_conn.recv()
+            except EOFError:
+                # child exited without reporting (crash): skip the task it was on
+                proc.join(timeout=1)
+                next_start = start + 1 if proc.exitcode else len(tasks)
+                break
+            kind = message[0]
+            if kind == "pattern":
+                current, wait = message[1], budget_ms / 1000
+            elif kind == "task":
+                _merge(totals, message[2])
+                start = message[1] + 1
+                current, wait = None, budget_ms / 1000
+            else:
+                next_start = len(tasks)
+                break
+        parent_conn.close()
+        proc.join(timeout=5)
+        start = max(start, next_start)
+    return _finish(totals), aborted
+
+
+# ------------------------------
+# Report
+# ------------------------------
+def print_report(rows: List[Dict], aborted: List[Dict], sort_by: str, top: int, wall: float, runs: int):
+    rows = sorted(rows, key=lambda row: row[sort_by], reverse=True)
+    total_ms = sum(row["total_ms"] for row in rows)
+    print(f"\n=== regex profile: {runs} extraction(s), {len(rows)} pattern(s), "
+          f"{total_ms:.1f} ms in patterns, {wall:.2f}s wall ===")
+
+    print(f"\n  top {top} patterns by {sort_by}")
+    print(f"  {'total':>9} {'mean':>8} {'worst':>8} {'calls':>6} {'match':>6} {'skip':>6} {'over':>5}  pattern")
+    for row in rows[:top]:
+        flags = ""
+        if row.get("aborted"):
+            flags += f"  ABORTED x{row['aborted']}"
+        if row.get("quarantined"):
+            flags += "  QUARANTINED"
+        source = row["pattern"] if len(row["pattern"]) <= 70 else row["pattern"][:67] + "..."
+        print(f"  {row['total_ms']:8.2f}ms {row['mean_ms']:7.3f}ms {row['worst_ms']:7.2f}ms "
+              f"{row['calls']:6d} {row['match_rate'] * 100:5.0f}% {row['skipped']:6d} {row['overruns']:5d}  "
+              f"{row['template']}.{row['field']}[{row['index']}]{flags}")
+        print(f"  {'':>57}{source}")
+
+    per_template = {}
+    for row in rows:
+        entry = per_template.setdefault(row["template"], {"total_ms": 0.0, "patterns": 0, "calls": 0, "skipped": 0})
+        entry["total_ms"] += row["total_ms"]
+        entry["patterns"] += 1
+        entry["calls"] += row["calls"]
+        entry["skipped"] += row["skipped"]
+    print("\n  per template")
+    for name, entry in sorted(per_template.items(), key=lambda kv: kv[1]["total_ms"], reverse=True):
+        considered = entry["calls"] + entry["skipped"]
+        skipped = entry["skipped"] / considered * 100 if considered else 0.0
+        print(f"  {entry['total_ms']:9.2f}ms  {entry['patterns']:3d} patterns  {skipped:5.1f}% skipped  {name}")
+
+    if aborted:
+        print(f"\n  aborted by watchdog ({len(aborted)})")
+        for entry in aborted:
+            print(f"    {entry['template']}.{entry['field']}[{entry['index']}] on {entry['text']} "
+                  f"(routed as {entry['routed_as']}) > {entry['budget_ms']:.0f} ms")
+
+
+def main(argv=None) -> int:
+    rx = _extractor()
+    parser = argparse.ArgumentParser(description="Rank regex template patterns by execution cost")
+    parser.add_argument("paths", nargs="*", default=[CORPUS_DIR], help="text files or directories (default: corpus)")
+    parser.add_argument("--templates", nargs="+", help="templates to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per text/template pair")
+    parser.add_argument("--isolate", action="store_true", help="run in child processes under the watchdog")
+    parser.add_argument("--budget-ms", type=float, default=rx.REGEX_PATTERN_BUDGET_MS, help="per-pattern watchdog budget")
+    parser.add_argument("--sort", default="total_ms", choices=["total_ms", "mean_ms", "worst_ms", "calls", "overruns"])
+    parser.add_argument("--top", type=int, default=20, help="patterns to list")
+    parser.add_argument("--json", metavar="PATH", help="also write the full ranking as JSON")
+    args = parser.parse_args(argv)
+
+    texts = load_texts(args.paths)
+    if not texts:
+        print(f"No .txt files found in {', '.join(args.paths)}")
+        return 2
+    templates = args.templates or list_templates()
+    repeat = max(1, args.repeat)
+
+    started = time.perf_counter()
+    if args.isolate:
+        rows, aborted = profile_isolated(texts, templates, repeat, args.budget_ms)
+    else:
+        rows, aborted = profile_in_process(texts, templates, repeat)
+    wall = time.perf_counter() - started
+
+    print_report(rows, aborted, args.sort, args.top, wall, len(texts) * len(templates) * repeat)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"patterns": sorted(rows, key=lambda r: r[args.sort], reverse=True), "aborted": aborted},
+                      f, indent=2, ensure_ascii=False)
+        print(f"\nFull ranking written to {args.json}")
+    return 1 if aborted else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
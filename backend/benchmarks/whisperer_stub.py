@@ -0,0 +1,252 @@
+"""
+LLM Whisperer stub server
+A local stand-in for the LLM Whisperer v2 API that replays recorded OCR
+responses with configurable delays, so the client (services/llm_whisperer.py)
+and the /scan hedging can be load-tested offline.
+
+Endpoints (under /api/v2, "unstract-key" header required):
+    POST /whisper            202 {"whisper_hash": ...} after --submit-delay
+    GET  /whisper-status     "processing" until the document's processing
+                             delay has passed, then "processed" (or "failed")
+    GET  /whisper-retrieve   {"result_text": <recording>, "confidence_metadata": []}
+
+Recordings are the .txt files under --recordings (default: the extraction
+corpus). A file named <sha256 of the upload>.txt is replayed for that exact
+upload; any other upload gets a recording picked by its hash. Processing
+delays are log-normal with median --delay and p90 --delay-p90 (fixed when
+--delay-p90 is not given).
+
+Usage (from backend/):
+    python -m benchmarks.whisperer_stub serve --port 8765 --delay 4 --delay-p90 12
+        LLM_WHISPERER_API_URL=http://127.0.0.1:8765/api/v2 python app.py
+    python -m benchmarks.whisperer_stub load --documents 40 --concurrency 8 --delay 1 --delay-p90 3
+    python -m benchmarks.whisperer_stub load --documents 10 --delay 5 --timeout 3   # timeout behaviour
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+API_PREFIX = "/api/v2"
+
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+# ------------------------------
+# Stub
+# ------------------------------
+class StubState:
+    """Recordings, delay model and the documents submitted so far."""
+
+    def __init__(self, recordings_dir: str, delay: float, delay_p90: Optional[float],
+                 submit_delay: float, fail_rate: float, seed: Optional[int] = None):
+        paths = sorted(glob.glob(os.path.join(recordings_dir, "**", "*.txt"), recursive=True))
+        if not paths:
+            raise SystemExit(f"No .txt recordings found in {recordings_dir}")
+        self.by_name = {os.path.splitext(os.path.basename(p))[0]: p for p in paths}
+        self.paths = paths
+        self.delay = delay
+        # Log-normal: median = exp(mu), p90 = exp(mu + 1.2816 sigma)
+        self.sigma = math.log(delay_p90 / delay) / 1.2816 if delay_p90 and delay > 0 and delay_p90 > delay else 0.0
+        self.submit_delay = submit_delay
+        self.fail_rate = fail_rate
+        self.random = random.Random(seed)
+        self.documents: Dict[str, Dict] = {}
+        self.lock = threading.Lock()
+        self.counts = {"submitted": 0, "status": 0, "retrieved": 0, "failed": 0}
+
+    def _recording(self, upload: bytes) -> str:
+        digest = hashlib.sha256(upload).hexdigest()
+        path = self.by_name.get(digest) or self.paths[int(digest[:8], 16) % len(self.paths)]
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            return f.read()
+
+    def submit(self, upload: bytes) -> str:
+        whisper_hash = uuid.uuid4().hex
+        with self.lock:
+            processing = self.delay * math.exp(self.sigma * self.random.gauss(0, 1)) if self.sigma else self.delay
+            failed = self.random.random() < self.fail_rate
+            self.counts["submitted"] += 1
+        self.documents[whisper_hash] = {
+            "ready_at": time.monotonic() + processing,
+            "failed": failed,
+            "text": self._recording(upload),
+        }
+        return whisper_hash
+
+    def count(self, key: str):
+        with self.lock:
+            self.counts[key] += 1
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    state: StubState = None
+    protocol_version = "HTTP/1.1"   # keep-alive, so the client's pooled connections are exercised
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _reply(self, status: int, payload: Dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _authorized(self) -> bool:
+        if self.headers.get("unstract-key"):
+            return True
+        self._reply(401, {"message": "Missing unstract-key header"})
+        return False
+
+    def do_POST(self):
+        upload = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if not self._authorized():
+            return
+        if urlparse(self.path).path != f"{API_PREFIX}/whisper":
+            return self._reply(404, {"message": "Not found"})
+        if self.state.submit_delay:
+            time.sleep(self.state.submit_delay)
+        whisper_hash = self.state.submit(upload)
+        self._reply(202, {"message": "Whisper Job Accepted", "status": "processing", "whisper_hash": whisper_hash})
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        url = urlparse(self.path)
+        whisper_hash = (parse_qs(url.query).get("whisper_hash") or [""])[0]
+        document = self.state.documents.get(whisper_hash)
+        if document is None:
+            return self._reply(400, {"message": f"Unknown whisper_hash {whisper_hash}"})
+
+        ready = time.monotonic() >= document["ready_at"]
+        if url.path == f"{API_PREFIX}/whisper-status":
+            self.state.count("status")
+            if ready and document["failed"]:
+                self.state.count("failed")
+                return self._reply(200, {"status": "failed", "message": "Stub: simulated processing failure"})
+            return self._reply(200, {"status": "processed" if ready else "processing"})
+        if url.path == f"{API_PREFIX}/whisper-retrieve":
+            if not ready or document["failed"]:
+                return self._reply(400, {"message": "Whisper job not processed"})
+            self.state.count("retrieved")
+            return self._reply(200, {"result_text": document["text"], "confidence_metadata": []})
+        self._reply(404, {"message": "Not found"})
+
+
+def start_stub(state: StubState, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Start the stub on a background thread; port 0 picks a free port."""
+    handler = type("BoundStubHandler", (StubHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="whisperer-stub", daemon=True).start()
+    return server
+
+
+# ------------------------------
+# Load test
+# ------------------------------
+def _percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def run_load(state: StubState, documents: int, concurrency: int, timeout: float) -> int:
+    from services.llm_whisperer import LLMWhispererClient
+
+    server = start_stub(state)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}{API_PREFIX}"
+    client = LLMWhispererClient("stub-key", base_url, concurrency=concurrency, timeout=timeout)
+    uploads = [f"stub document {i}".encode() for i in range(documents)]
+
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+
+    def one(upload: bytes):
+        started = time.perf_counter()
+        try:
+            client.whisper(upload)
+            return time.perf_counter() - started, None
+        except Exception as e:
+            return time.perf_counter() - started, type(e).__name__
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for latency, error in pool.map(one, uploads):
+            if error:
+                errors[error] = errors.get(error, 0) + 1
+            else:
+                latencies.append(latency)
+    wall = time.perf_counter() - started
+    server.shutdown()
+
+    print(f"documents      {documents} (concurrency {concurrency}, client timeout {timeout:.0f}s)")
+    print(f"wall           {wall:.2f}s  ({documents / wall:.2f} docs/s)")
+    if latencies:
+        print(f"latency        p50 {_percentile(latencies, 50):.2f}s  p90 {_percentile(latencies, 90):.2f}s  "
+              f"max {max(latencies):.2f}s")
+    print(f"status polls   {client.stats['polls']} ({client.stats['polls'] / max(1, documents):.1f} per document)")
+    print(f"succeeded      {len(latencies)}")
+    for error, n in sorted(errors.items()):
+        print(f"failed         {n} x {error}")
+    return 0 if not errors else 1
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Offline LLM Whisperer stub server and client load test")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (("serve", "run the stub server in the foreground"),
+                            ("load", "start the stub and push documents through the client")):
+        command = sub.add_parser(name, help=help_text)
+        command.add_argument("--recordings", default=CORPUS_DIR, help="directory of recorded .txt responses")
+        command.add_argument("--delay", type=float, default=2.0, help="median processing delay (s)")
+        command.add_argument("--delay-p90", type=float, help="p90 processing delay (s); fixed delay when omitted")
+        command.add_argument("--submit-delay", type=float, default=0.05, help="latency of the upload request (s)")
+        command.add_argument("--fail-rate", type=float, default=0.0, help="fraction of documents that fail")
+        command.add_argument("--seed", type=int, help="random seed for delays and failures")
+    sub.choices["serve"].add_argument("--host", default="127.0.0.1")
+    sub.choices["serve"].add_argument("--port", type=int, default=8765)
+    sub.choices["load"].add_argument("--documents", type=int, default=20)
+    sub.choices["load"].add_argument("--concurrency", type=int, default=4)
+    sub.choices["load"].add_argument("--timeout", type=float, default=90.0, help="client processing timeout (s)")
+    args = parser.parse_args(argv)
+
+    state = StubState(args.recordings, args.delay, args.delay_p90, args.submit_delay, args.fail_rate, args.seed)
+    if args.command == "load":
+        return run_load(state, args.documents, args.concurrency, args.timeout)
+
+    server = start_stub(state, args.host, args.port)
+    print(f"LLM Whisperer stub on http://{args.host}:{server.server_address[1]}{API_PREFIX} "
+          f"({len(state.paths)} recordings, delay {args.delay}s"
+          + (f", p90 {args.delay_p90}s" if args.delay_p90 else "") + ")")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,33 @@
 import os
+import time
 import psycopg2
 from psycopg2.extras import RealDictCursor
 from dotenv import load_dotenv
 
+from utils.metrics import record_query
+
 # Load .env variables
 load_dotenv()
 
 
+class TimedRealDictCursor(RealDictCursor):
+    """RealDictCursor that reports each statement's duration to the request metrics"""
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            record_query(query, time.perf_counter() - started)
+
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            record_query(query, time.perf_counter() - started)
+
+
 class Database:
     def __init__(self):
         self.host = os.getenv('DB_HOST') or 'localhost'
@@ -22,7 +43,7 @@ class Database:
             'port': self.port,
             'database': self.database,
             'user': self.user,
-            'cursor_factory': RealDictCursor,
+            'cursor_factory': TimedRealDictCursor,
         }
         if self.password:
             connection_kwargs['password'] = self.password
@@ -1,7 +1,9 @@
 import re
 import json
 import os
+import time
 import requests
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 from dataclasses import dataclass
@@ -97,6 +99,11 @@ class EnhancedInvoiceExtractor:
         # REDUCED chunk from 8000 to 4000 - faster processing
         self.local_llm_chunk_chars = int(os.getenv("LOCAL_LLM_CHUNK_CHARS", "4000"))
         self.local_llm_max_item_lines = int(os.getenv("LOCAL_LLM_MAX_ITEM_LINES", "500"))  # More item lines
+        # Pages are sent concurrently - match this to the llama.cpp server's --parallel slots
+        self.local_llm_parallel_slots = max(1, int(os.getenv("LOCAL_LLM_PARALLEL_SLOTS", "2")))
+        # Per-page deadline (s) and overall budget (s) for page-wise extraction
+        self.local_llm_page_deadline = int(os.getenv("LOCAL_LLM_PAGE_DEADLINE", "60"))
+        self.local_llm_total_budget = int(os.getenv("LOCAL_LLM_TOTAL_BUDGET", "120"))
         # AI mode disabled by default - rule-based is faster and more reliable
         self.ai_only_mode = os.getenv("AI_ONLY_MODE", "false").lower() in ("1", "true", "yes")
         # SKIP AI completely if enabled - use only fast rule-based extraction
@@ -1066,25 +1073,16 @@ class EnhancedInvoiceExtractor:
         
         print(f"DEBUG: Split into {len(pages)} pages")
         
-        # Track total extraction time
-        import time
-        extraction_start = time.time()
-        max_total_time = 120  # 2 minutes max for entire extraction
+        # Pages are independent (stateless LLM calls), so run them concurrently
+        page_outputs = self._extract_pages_concurrently(pages)
+        if page_outputs is None:
+            print(f"WARNING: Total extraction time exceeded {self.local_llm_total_budget}s, "
+                  f"falling back to rule-based extraction")
+            return self.extract_bill_info(raw_text)
         
+        # Keep page order for deterministic aggregation
         page_results = []
-        for page_num, page_text in enumerate(pages, start=1):
-            # Check if we've exceeded total time budget
-            elapsed_total = time.time() - extraction_start
-            if elapsed_total > max_total_time:
-                print(f"WARNING: Total extraction time exceeded {max_total_time}s, "
-                      f"falling back to rule-based extraction")
-                return self.extract_bill_info(raw_text)
-            
-            print(f"DEBUG: Processing page {page_num}/{len(pages)}")
-            
-            # Extract page via LLM
-            page_json = self._extract_page_via_llm(page_text, page_num, len(pages))
-            
+        for page_num, page_json in enumerate(page_outputs, start=1):
             if page_json:
                 page_results.append(page_json)
                 print(f"DEBUG: Page {page_num} extracted successfully")
@@ -1111,6 +1109,60 @@ class EnhancedInvoiceExtractor:
         
         return bill_info, raw_text
     
+    def _extract_pages_concurrently(self, pages: List[str]) -> Optional[List[Optional[dict]]]:
+        """
+        Run _extract_page_via_llm for every page on a bounded worker pool.
+        
+        - At most local_llm_parallel_slots requests are in flight at once
+        - A page still running after local_llm_page_deadline seconds is
+          abandoned (treated as a failed page); its LLM requests are given
+          the same deadline, so the worker is released instead of waiting
+          out the full local_llm_timeout per attempt
+        - Returns results in page order, or None if the total budget ran out
+        """
+        total_pages = len(pages)
+        results: List[Optional[dict]] = [None] * total_pages
+        started_at: Dict[int, float] = {}
+
+        def run_page(index: int, page_text: str) -> Optional[dict]:
+            started_at[index] = time.time()
+            deadline = min(started_at[index] + self.local_llm_page_deadline, budget_end)
+            print(f"DEBUG: Processing page {index + 1}/{total_pages}")
+            return self._extract_page_via_llm(page_text, index + 1, total_pages, deadline=deadline)
+
+        budget_end = time.time() + self.local_llm_total_budget
+        workers = min(self.local_llm_parallel_slots, total_pages)
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="llm-page")
+        futures = {executor.submit(run_page, i, text): i for i, text in enumerate(pages)}
+        pending = set(futures)
+
+        try:
+            while pending:
+                remaining = budget_end - time.time()
+                if remaining <= 0:
+                    return None
+
+                done, pending = wait(pending, timeout=min(1.0, remaining), return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = futures[future]
+                    try:
+                        results[index] = future.result()
+                    except Exception as e:
+                        print(f"DEBUG: Page {index + 1} - extraction raised: {e}")
+
+                now = time.time()
+                for future in list(pending):
+                    index = futures[future]
+                    page_started = started_at.get(index)
+                    if page_started and now - page_started > self.local_llm_page_deadline:
+                        print(f"WARNING: Page {index + 1} exceeded {self.local_llm_page_deadline}s deadline, skipping")
+                        pending.discard(future)
+        finally:
+            # Don't wait for abandoned pages; drop anything not yet started
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return results
+    
     def _is_batch_only_page(self, page_text: str) -> bool:
         """
         STEP 0: PAGE TYPE CLASSIFICATION
@@ -1189,13 +1241,14 @@ RULES:
             "stop": ["</s>", "<|im_end|>", "```"]
         }
     
-    def _extract_page_via_llm(self, page_text: str, page_num: int, total_pages: int) -> Optional[dict]:
+    def _extract_page_via_llm(self, page_text: str, page_num: int, total_pages: int,
+                              deadline: Optional[float] = None) -> Optional[dict]:
         """
         Extract structured data from a single page using LLM.
         Returns strict JSON matching schema or None.
         OPTIMIZED: Tracks time and fails fast if LLM is too slow.
+        ``deadline`` (time.time() value) bounds the page's LLM requests.
         """
-        import time
         start_time = time.time()
         
         # Send reduced page text (truncated to smaller context for speed)
@@ -1213,7 +1266,7 @@ RULES:
         if is_batch_only:
             # STEP 4: BATCH_ONLY_PAGE - Extract ONLY serials, NO items
             prompt = self._build_batch_only_prompt(chunk, page_num)
-            response_text = self._call_local_llm(prompt)
+            response_text = self._call_local_llm(prompt, deadline=deadline)
             
             if response_text:
                 parsed = self._extract_json_from_text(response_text)
@@ -1234,7 +1287,7 @@ RULES:
         
         # Call LLM API with timeout tracking
         try:
-            response_text = self._call_local_llm(prompt)
+            response_text = self._call_local_llm(prompt, deadline=deadline)
             elapsed = time.time() - start_time
             print(f"DEBUG: Page {page_num} - LLM took {elapsed:.1f}s")
             
@@ -1978,14 +2031,23 @@ PAGE TEXT:
 
         return "\n".join(item_lines)
 
-    def _call_local_llm(self, payload: Dict) -> str:
+    def _call_local_llm(self, payload: Dict, deadline: Optional[float] = None) -> str:
         """
         Call local LLM API (llama.cpp server).
         Accepts payload with 'messages' array (new format) or 'system'/'user' (legacy).
         OPTIMIZED: Uses aggressive timeouts to prevent slow processing.
+        With a ``deadline`` (time.time() value) no attempt starts after it and
+        each read times out at it; dropping the connection also makes
+        llama.cpp stop generating for the abandoned request.
         """
-        # Connection timeout: 5s, Read timeout: reduced to 30s (was 180s)
-        timeout = (5, self.local_llm_timeout)
+        def request_timeout():
+            # Connection timeout: 5s, Read timeout: reduced to 30s (was 180s)
+            if deadline is None:
+                return (5, self.local_llm_timeout)
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return None
+            return (min(5, remaining), min(self.local_llm_timeout, remaining))
         
         # Convert to messages format if needed
         if "messages" in payload:
@@ -2014,6 +2076,10 @@ PAGE TEXT:
                     "max_tokens": max_tokens,
                     "stop": stop
                 }
+                timeout = request_timeout()
+                if timeout is None:
+                    print("Local LLM deadline passed, giving up on this request")
+                    return ""
                 chat_response = requests.post(chat_url, json=chat_payload, timeout=timeout)
                 if chat_response.ok:
                     data = chat_response.json()
@@ -2037,6 +2103,10 @@ PAGE TEXT:
                     "n_predict": max_tokens,
                     "stop": stop
                 }
+                timeout = request_timeout()
+                if timeout is None:
+                    print("Local LLM deadline passed, giving up on this request")
+                    return ""
                 completion_response = requests.post(completion_url, json=completion_payload, timeout=timeout)
                 if completion_response.ok:
                     data = completion_response.json()
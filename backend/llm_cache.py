@@ -0,0 +1,185 @@
+"""
+LLM Response Cache
+Persistent prompt → response cache for the local LLM fallback.
+
+Rescanning the same bill builds exactly the same prompt (same trimmed OCR
+text, same missing-field list), so the model's answer can be reused instead
+of paying for another generation.
+
+Design:
+  - SQLite file on disk, so cached answers survive restarts and are shared
+    by every worker on the host
+  - Key = sha256 over model id + system prompt + user prompt + generation
+    parameters (max_tokens, temperature)
+  - TTL expiry on read, LRU eviction (by last access) once the entry cap
+    is exceeded
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "llm_cache.sqlite3")
+CACHE_PATH = os.getenv("LLM_CACHE_PATH", DEFAULT_CACHE_PATH)
+CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+
+
+def make_cache_key(model: str, system_prompt: str, prompt: str, params: Dict) -> str:
+    """Stable hash of everything that influences the model's answer."""
+    payload = json.dumps(
+        {"model": model, "system": system_prompt, "prompt": prompt, "params": params},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """SQLite-backed prompt/response cache with TTL and LRU eviction."""
+
+    def __init__(self, path: str = CACHE_PATH,
+                 ttl_seconds: int = CACHE_TTL_SECONDS,
+                 max_entries: int = CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = None
+        self.hits = 0
+        self.misses = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_responses (
+                    cache_key   TEXT PRIMARY KEY,
+                    model       TEXT NOT NULL,
+                    response    TEXT NOT NULL,
+                    created_at  REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_llm_responses_last_access ON llm_responses (last_access)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for ``key`` or None (missing or expired)."""
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connection()
+                row = conn.execute(
+                    "SELECT response, created_at FROM llm_responses WHERE cache_key = ?",
+                    (key,),
+                ).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                response, created_at = row
+                if self.ttl_seconds and now - created_at > self.ttl_seconds:
+                    conn.execute("DELETE FROM llm_responses WHERE cache_key = ?", (key,))
+                    conn.commit()
+                    self.misses += 1
+                    return None
+                conn.execute(
+                    "UPDATE llm_responses SET last_access = ? WHERE cache_key = ?",
+                    (now, key),
+                )
+                conn.commit()
+                self.hits += 1
+                return response
+        except sqlite3.Error as e:
+            print(f"[LLM-Cache] Read failed (ignored): {e}")
+            return None
+
+    def put(self, key: str, model: str, response: str) -> None:
+        """Store a response and evict least-recently-used rows past the cap."""
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connection()
+                conn.execute(
+                    """
+                    INSERT OR REPLACE INTO llm_responses (cache_key, model, response, created_at, last_access)
+                    VALUES (?, ?, ?, ?, ?)
+                    """,
+                    (key, model, response, now, now),
+                )
+                if self.max_entries:
+                    conn.execute(
+                        """
+                        DELETE FROM llm_responses WHERE cache_key IN (
+                            SELECT cache_key FROM llm_responses
+                            ORDER BY last_access DESC
+                            LIMIT -1 OFFSET ?
+                        )
+                        """,
+                        (self.max_entries,),
+                    )
+                conn.commit()
+        except sqlite3.Error as e:
+            print(f"[LLM-Cache] Write failed (ignored): {e}")
+
+    def delete(self, key: str) -> None:
+        """Drop one entry (e.g. a stored response that turned out to be unusable)."""
+        try:
+            with self._lock:
+                conn = self._connection()
+                conn.execute("DELETE FROM llm_responses WHERE cache_key = ?", (key,))
+                conn.commit()
+        except sqlite3.Error as e:
+            print(f"[LLM-Cache] Delete failed (ignored): {e}")
+
+    def purge_expired(self) -> int:
+        """Delete every expired row; returns how many were removed."""
+        if not self.ttl_seconds:
+            return 0
+        try:
+            with self._lock:
+                conn = self._connection()
+                cur = conn.execute(
+                    "DELETE FROM llm_responses WHERE created_at < ?",
+                    (time.time() - self.ttl_seconds,),
+                )
+                conn.commit()
+                return cur.rowcount
+        except sqlite3.Error as e:
+            print(f"[LLM-Cache] Purge failed (ignored): {e}")
+            return 0
+
+    def stats(self) -> Dict:
+        try:
+            with self._lock:
+                entries = self._connection().execute(
+                    "SELECT COUNT(*) FROM llm_responses"
+                ).fetchone()[0]
+        except sqlite3.Error:
+            entries = None
+        return {
+            "enabled": CACHE_ENABLED,
+            "path": self.path,
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+_response_cache = LLMResponseCache()
+
+
+def get_response_cache() -> Optional[LLMResponseCache]:
+    """Shared cache instance, or None when caching is disabled via LLM_CACHE_ENABLED."""
+    return _response_cache if CACHE_ENABLED else None
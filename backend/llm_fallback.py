@@ -13,10 +13,17 @@ Design principles:
 
 import json
 import re
+import threading
+import time
+from collections import deque
 import requests
 from typing import Dict, List, Optional
 
+from llm_cache import get_response_cache, make_cache_key
+from utils import tracing
+
 LLM_BASE_URL = "http://localhost:8080"
+DEFAULT_MODEL_NAME = "qwen2.5-3b-instruct"
 
 # Fields we consider "key" — if enough are missing, we invoke the LLM
 KEY_FIELDS = [
@@ -27,27 +34,141 @@ KEY_FIELDS = [
 # Maximum characters of OCR text to send (keeps prompt small for 3B model)
 MAX_TEXT_CHARS = 1500
 
-# Cache the detected model name so we only query once
-_cached_model_name = None
+SYSTEM_PROMPT = "You are a precise invoice data extractor. Return only valid JSON, no explanations."
+TEMPERATURE = 0.1
+
+# Background health monitor settings — probe interval while the server is up,
+# and the ceiling the interval backs off to while it is down
+HEALTH_CHECK_INTERVAL = 30
+HEALTH_CHECK_MAX_BACKOFF = 300
+HEALTH_CHECK_TIMEOUT = 3
+HEALTH_LATENCY_SAMPLES = 20
+
+
+class LLMHealthMonitor:
+    """
+    Probes the local LLM server from a daemon thread and publishes the last
+    known state (availability, model id, probe latency) from memory.
+
+    Callers never block on the network: until the first probe completes the
+    availability is reported as unknown (None).
+    """
+
+    def __init__(self, base_url: str = LLM_BASE_URL,
+                 interval: float = HEALTH_CHECK_INTERVAL,
+                 max_backoff: float = HEALTH_CHECK_MAX_BACKOFF):
+        self.base_url = base_url
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._available = None
+        self._model_name = None
+        self._last_checked = None
+        self._last_error = None
+        self._consecutive_failures = 0
+        self._latencies_ms = deque(maxlen=HEALTH_LATENCY_SAMPLES)
+
+    def start(self):
+        """Start the probe thread once (safe to call repeatedly)."""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="llm-health-monitor", daemon=True
+            )
+            self._thread.start()
+
+    def refresh(self):
+        """Ask the probe thread to re-check now instead of waiting out its interval."""
+        self._wake.set()
+
+    def _next_delay(self) -> float:
+        if not self._consecutive_failures:
+            return self.interval
+        # Exponential backoff while the server is down
+        return min(self.interval * (2 ** (self._consecutive_failures - 1)), self.max_backoff)
+
+    def _run(self):
+        while True:
+            self._probe()
+            self._wake.wait(self._next_delay())
+            self._wake.clear()
+
+    def _probe(self):
+        started = time.perf_counter()
+        available, model_name, error = False, None, None
+        try:
+            resp = requests.get(f"{self.base_url}/v1/models", timeout=HEALTH_CHECK_TIMEOUT)
+            if resp.status_code == 200:
+                available = True
+                models = resp.json().get("data", [])
+                if models:
+                    model_name = models[0].get("id")
+            else:
+                error = f"HTTP {resp.status_code}"
+        except Exception as e:
+            error = str(e)
+        latency_ms = (time.perf_counter() - started) * 1000
+
+        with self._lock:
+            was_available = self._available
+            self._available = available
+            self._last_checked = time.time()
+            self._last_error = error
+            if available:
+                self._consecutive_failures = 0
+                self._latencies_ms.append(latency_ms)
+                if model_name:
+                    self._model_name = model_name
+            else:
+                self._consecutive_failures += 1
+
+        if available and was_available is not True:
+            print(f"[LLM-Fallback] LLM server is up — model: {model_name or DEFAULT_MODEL_NAME}")
+        elif not available and was_available is not False:
+            print(f"[LLM-Fallback] LLM server unreachable ({error}) — backing off health checks")
+
+    @property
+    def available(self) -> Optional[bool]:
+        with self._lock:
+            return self._available
+
+    @property
+    def model_name(self) -> Optional[str]:
+        with self._lock:
+            return self._model_name
+
+    def snapshot(self) -> Dict:
+        """Return the last published health state as a plain dict."""
+        with self._lock:
+            latencies = list(self._latencies_ms)
+            return {
+                "available": bool(self._available),
+                "checked": self._last_checked is not None,
+                "model": self._model_name or DEFAULT_MODEL_NAME,
+                "last_checked": self._last_checked,
+                "last_error": self._last_error,
+                "consecutive_failures": self._consecutive_failures,
+                "latency_ms": round(latencies[-1], 1) if latencies else None,
+                "avg_latency_ms": round(sum(latencies) / len(latencies), 1) if latencies else None,
+                "next_check_in_s": self._next_delay(),
+            }
+
+
+_health_monitor = LLMHealthMonitor()
+
+
+def get_health_monitor() -> LLMHealthMonitor:
+    """Return the shared health monitor, starting its probe thread on first use."""
+    _health_monitor.start()
+    return _health_monitor
 
 
 def _get_model_name() -> str:
-    """Auto-detect the model name from the local server."""
-    global _cached_model_name
-    if _cached_model_name:
-        return _cached_model_name
-    try:
-        resp = requests.get(f"{LLM_BASE_URL}/v1/models", timeout=5)
-        if resp.status_code == 200:
-            data = resp.json()
-            models = data.get("data", [])
-            if models:
-                _cached_model_name = models[0].get("id", "qwen2.5-3b-instruct")
-                print(f"[LLM-Fallback] Detected model: {_cached_model_name}")
-                return _cached_model_name
-    except Exception:
-        pass
-    return "qwen2.5-3b-instruct"
+    """Model name published by the health monitor (never probes inline)."""
+    return get_health_monitor().model_name or DEFAULT_MODEL_NAME
 
 
 def _is_field_empty(value) -> bool:
@@ -132,28 +253,58 @@ JSON:"""
     return prompt
 
 
-def _call_llm(prompt: str, max_tokens: int = 500) -> Optional[str]:
+def _call_llm(prompt: str, max_tokens: int = 500) -> Optional[object]:
     """
     Call the local Qwen 2.5 3B model via OpenAI-compatible API.
-    Returns the raw text response or None on failure.
+    Returns the JSON parsed from its response, or None on failure.
+
+    Only responses that parse are cached, so a truncated or malformed
+    answer is retried on the next scan instead of being replayed for the
+    whole cache TTL.
     """
+    model = _get_model_name()
+    params = {"max_tokens": max_tokens, "temperature": TEMPERATURE}
+
+    # Identical prompt + model + params → reuse the stored answer
+    cache = get_response_cache()
+    cache_key = make_cache_key(model, SYSTEM_PROMPT, prompt, params) if cache else None
+    if cache:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            parsed = _parse_json_response(cached)
+            if parsed is not None:
+                print(f"[LLM-Fallback] Cache hit ({len(cached)} chars)")
+                tracing.count("llm_cache_hits")
+                return parsed
+            # Stored before responses were validated — ask again
+            cache.delete(cache_key)
+
+    # Skip straight away when the monitor already knows the server is down,
+    # instead of paying the connect/timeout cost on every scan
+    monitor = get_health_monitor()
+    if monitor.available is False:
+        print("[LLM-Fallback] LLM server marked unavailable by health monitor — skipping")
+        # Re-probe now (non-blocking) so a recovered server is noticed on the
+        # next scan instead of after the monitor's backoff
+        monitor.refresh()
+        return None
+    tracing.count("llm_calls")
     try:
         response = requests.post(
             f"{LLM_BASE_URL}/v1/chat/completions",
             json={
-                "model": _get_model_name(),
+                "model": model,
                 "messages": [
                     {
                         "role": "system",
-                        "content": "You are a precise invoice data extractor. Return only valid JSON, no explanations."
+                        "content": SYSTEM_PROMPT
                     },
                     {
                         "role": "user",
                         "content": prompt
                     }
                 ],
-                "max_tokens": max_tokens,
-                "temperature": 0.1,
+                **params,
             },
             timeout=30,
         )
@@ -161,9 +312,9 @@ def _call_llm(prompt: str, max_tokens: int = 500) -> Optional[str]:
         data = response.json()
         content = data["choices"][0]["message"]["content"].strip()
         print(f"[LLM-Fallback] Got response ({len(content)} chars): {content[:200]}")
-        return content
     except requests.exceptions.ConnectionError:
         print("[LLM-Fallback] Cannot connect to local LLM on port 8080 — skipping")
+        get_health_monitor().refresh()
         return None
     except requests.exceptions.Timeout:
         print("[LLM-Fallback] LLM request timed out — skipping")
@@ -172,6 +323,11 @@ def _call_llm(prompt: str, max_tokens: int = 500) -> Optional[str]:
         print(f"[LLM-Fallback] LLM call failed: {e}")
         return None
 
+    parsed = _parse_json_response(content)
+    if cache and parsed is not None:
+        cache.put(cache_key, model, content)
+    return parsed
+
 
 def _parse_json_response(raw_response: str) -> Optional[dict]:
     """
@@ -251,8 +407,7 @@ def fill_missing_fields(regex_results: Dict, raw_text: str) -> Dict:
     prompt = _build_prompt(all_missing, trimmed_text)
 
     # Call LLM
-    raw_response = _call_llm(prompt, max_tokens=400)
-    parsed = _parse_json_response(raw_response)
+    parsed = _call_llm(prompt, max_tokens=400)
 
     if not parsed or not isinstance(parsed, dict):
         print("[LLM-Fallback] No usable response from LLM")
@@ -301,8 +456,7 @@ def _try_llm_items(regex_results: Dict, raw_text: str) -> Dict:
     trimmed_text = _trim_text(raw_text, max_chars=1800)
     prompt = _build_items_prompt(trimmed_text)
 
-    raw_response = _call_llm(prompt, max_tokens=600)
-    parsed = _parse_json_response(raw_response)
+    parsed = _call_llm(prompt, max_tokens=600)
 
     if not parsed:
         return {"fields": regex_results, "llm_enhanced": False}
@@ -342,9 +496,13 @@ def _try_llm_items(regex_results: Dict, raw_text: str) -> Dict:
 
 
 def is_llm_available() -> bool:
-    """Quick health check — is the local LLM server reachable?"""
-    try:
-        resp = requests.get(f"{LLM_BASE_URL}/v1/models", timeout=3)
-        return resp.status_code == 200
-    except Exception:
-        return False
+    """Is the local LLM server reachable? Answered from the health monitor's last probe."""
+    return bool(get_health_monitor().available)
+
+
+def get_llm_status() -> Dict:
+    """Availability, model id and recent probe latency, read from memory."""
+    status = get_health_monitor().snapshot()
+    cache = get_response_cache()
+    status["cache"] = cache.stats() if cache else {"enabled": False}
+    return status
@@ -0,0 +1,31 @@
+-- =========================================
+-- CLASSIFIER FEEDBACK
+-- Correct invoice layout for scans the
+-- classifier got wrong, recorded when staff
+-- fix a bill (POST /scan/feedback).  The
+-- nightly classifier_retrain job trains on
+-- these rows on top of invoices.csv.
+-- =========================================
+
+CREATE TABLE IF NOT EXISTS public.classifier_feedback (
+    feedback_id    SERIAL       PRIMARY KEY,
+    raw_text       TEXT         NOT NULL,
+    text_sha256    CHAR(64)     NOT NULL,
+    predicted_type VARCHAR(64),
+    correct_type   VARCHAR(64)  NOT NULL,
+    bill_number    VARCHAR(255),
+    user_id        INTEGER      NOT NULL REFERENCES users(id),
+    recorded_at    TIMESTAMP    NOT NULL DEFAULT now()
+);
+
+-- Tables created before feedback required sign-in: anonymous corrections
+-- are untrusted training data, drop them before enforcing NOT NULL
+DELETE FROM public.classifier_feedback WHERE user_id IS NULL;
+ALTER TABLE public.classifier_feedback ALTER COLUMN user_id SET NOT NULL;
+
+-- A re-corrected scan replaces its earlier label (and recorded_at)
+CREATE UNIQUE INDEX IF NOT EXISTS idx_classifier_feedback_text
+    ON public.classifier_feedback (text_sha256);
+
+GRANT ALL ON TABLE public.classifier_feedback TO assetiq_user;
+GRANT ALL ON SEQUENCE public.classifier_feedback_feedback_id_seq TO assetiq_user;
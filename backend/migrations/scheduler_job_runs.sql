@@ -0,0 +1,25 @@
+-- =========================================
+-- SCHEDULER JOB RUNS
+-- One row per execution of a periodic job
+-- by the standalone scheduler process
+-- (python -m scheduler).  Runs that could
+-- not take the job's advisory lock are
+-- recorded as 'skipped'.
+-- =========================================
+
+CREATE TABLE IF NOT EXISTS public.scheduler_job_runs (
+    run_id      SERIAL       PRIMARY KEY,
+    job_id      VARCHAR(64)  NOT NULL,
+    status      VARCHAR(16)  NOT NULL,
+    started_at  TIMESTAMP    NOT NULL DEFAULT now(),
+    finished_at TIMESTAMP,
+    duration_ms INTEGER,
+    host        VARCHAR(255),
+    error       TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_scheduler_job_runs_job_started
+    ON public.scheduler_job_runs (job_id, started_at DESC);
+
+GRANT ALL ON TABLE public.scheduler_job_runs TO assetiq_user;
+GRANT ALL ON SEQUENCE public.scheduler_job_runs_run_id_seq TO assetiq_user;
@@ -0,0 +1,21 @@
+-- =========================================
+-- WARRANTY NOTIFICATION LEDGER
+-- One row per device that has already been
+-- alerted for entering the 90-day warranty
+-- expiry window.  Replaces the old
+-- warranty_notified_ids.json file so the
+-- ledger is shared by every app process.
+-- Rows are deleted once the warranty has
+-- expired (so a final alert can be sent).
+-- =========================================
+
+CREATE TABLE IF NOT EXISTS public.warranty_notifications (
+    device_id       INTEGER   PRIMARY KEY REFERENCES public.devices(device_id) ON DELETE CASCADE,
+    warranty_expiry DATE      NOT NULL,
+    notified_at     TIMESTAMP NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_warranty_notifications_expiry
+    ON public.warranty_notifications (warranty_expiry);
+
+GRANT ALL ON TABLE public.warranty_notifications TO assetiq_user;
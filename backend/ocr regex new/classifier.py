@@ -1,29 +1,55 @@
 """
 Invoice Type Classifier Module
 Uses TF-IDF + Logistic Regression to classify invoice layout type.
+
+Predictions come from the compact NumPy export of the trained pipeline
+(compact_classifier.py) when it matches the pickle, so the request path
+never imports scikit-learn; otherwise the pickled pipeline is used.
+
+Retrained models (services/classifier_service.py) are written to their own
+directory under training_data/models/ and promoted by atomically replacing
+the CURRENT pointer file; every process notices the new pointer within
+CLASSIFIER_RELOAD_INTERVAL seconds and swaps the loaded model in place.
+Without a CURRENT pointer the bundled training_data/classifier_model.* is used.
 """
 
+import json
 import os
 import pickle
-
-import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
-from sklearn.pipeline import Pipeline
+import shutil
+import threading
+import time
+from datetime import datetime
 
 # Paths
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 TRAINING_DATA_PATH = os.path.join(BASE_DIR, "training_data", "invoices.csv")
 MODEL_PATH = os.path.join(BASE_DIR, "training_data", "classifier_model.pkl")
+COMPACT_MODEL_PATH = os.path.join(BASE_DIR, "training_data", "classifier_model.npz")
+MODELS_DIR = os.path.join(BASE_DIR, "training_data", "models")
+CURRENT_POINTER = os.path.join(MODELS_DIR, "CURRENT")
+MODEL_FILE = "classifier_model.pkl"
+COMPACT_MODEL_FILE = "classifier_model.npz"
+METRICS_FILE = "metrics.json"
 
+# How often (seconds) a process checks CURRENT for a newly promoted model
+CLASSIFIER_RELOAD_INTERVAL = float(os.getenv("CLASSIFIER_RELOAD_INTERVAL", "60"))
+# Versions kept on disk besides the current one
+CLASSIFIER_KEEP_VERSIONS = int(os.getenv("CLASSIFIER_KEEP_VERSIONS", "5"))
+
+# Loaded model (CompactClassifier or sklearn pipeline), shared by every prediction in this process
+_model = None
+_model_version = None
+_model_lock = threading.Lock()
+_next_reload_check = 0.0
 
-def train_model():
-    """
-    Train a TF-IDF + Logistic Regression classifier on the invoices dataset.
-    Saves the trained pipeline to disk and returns it.
-    """
-    df = pd.read_csv(TRAINING_DATA_PATH)
-    df = df.dropna(subset=["text", "label"])
+
+def build_pipeline(texts, labels, sample_weight=None):
+    """Fit the TF-IDF + Logistic Regression pipeline on the given texts."""
+    # sklearn is heavy; only pay for it when training
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import Pipeline
 
     pipeline = Pipeline([
         ("tfidf", TfidfVectorizer(
@@ -37,22 +63,180 @@ def train_model():
         )),
     ])
 
-    pipeline.fit(df["text"], df["label"])
+    fit_params = {"clf__sample_weight": sample_weight} if sample_weight is not None else {}
+    pipeline.fit(list(texts), list(labels), **fit_params)
+    return pipeline
+
+
+def train_model():
+    """
+    Train a TF-IDF + Logistic Regression classifier on the invoices dataset.
+    Saves the trained pipeline and its compact export to disk and returns it.
+    """
+    import pandas as pd
+
+    df = pd.read_csv(TRAINING_DATA_PATH)
+    df = df.dropna(subset=["text", "label"])
+
+    pipeline = build_pipeline(df["text"], df["label"])
 
     with open(MODEL_PATH, "wb") as f:
         pickle.dump(pipeline, f)
 
+    from compact_classifier import export_compact
+    export_compact(pipeline, COMPACT_MODEL_PATH, MODEL_PATH)
+
     return pipeline
 
 
-def _load_model():
-    """Load the trained model from disk, training first if not found."""
-    if not os.path.exists(MODEL_PATH):
+# ------------------------------
+# Model versions
+# ------------------------------
+def version_dir(version):
+    return os.path.join(MODELS_DIR, version)
+
+
+def current_version():
+    """Name of the promoted model version, or None for the bundled model."""
+    try:
+        with open(CURRENT_POINTER, "r", encoding="utf-8") as f:
+            version = f.read().strip()
+    except OSError:
+        return None
+    if not version or not os.path.exists(os.path.join(version_dir(version), MODEL_FILE)):
+        return None
+    return version
+
+
+def read_metrics(version):
+    """metrics.json of a saved version ({} when missing or unreadable)."""
+    if not version:
+        return {}
+    try:
+        with open(os.path.join(version_dir(version), METRICS_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_version(pipeline, metrics):
+    """
+    Write a trained pipeline, its compact export and metrics.json to a new
+    version directory (built under a temporary name, then renamed into
+    place) and return the version name. Does not promote it.
+    """
+    from compact_classifier import export_compact
+
+    os.makedirs(MODELS_DIR, exist_ok=True)
+    version = datetime.now().strftime("v%Y%m%d-%H%M%S")
+    while os.path.exists(version_dir(version)):
+        version += "a"
+    staging = version_dir(f".{version}.tmp")
+    os.makedirs(staging)
+    try:
+        model_path = os.path.join(staging, MODEL_FILE)
+        with open(model_path, "wb") as f:
+            pickle.dump(pipeline, f)
+        export_compact(pipeline, os.path.join(staging, COMPACT_MODEL_FILE), model_path)
+        with open(os.path.join(staging, METRICS_FILE), "w", encoding="utf-8") as f:
+            json.dump({**metrics, "version": version}, f, indent=2, sort_keys=True)
+        os.rename(staging, version_dir(version))
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return version
+
+
+def promote_version(version):
+    """Point CURRENT at ``version`` atomically and prune old versions."""
+    if not os.path.exists(os.path.join(version_dir(version), MODEL_FILE)):
+        raise FileNotFoundError(f"No saved classifier version {version}")
+    tmp_path = f"{CURRENT_POINTER}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(version + "\n")
+    os.replace(tmp_path, CURRENT_POINTER)
+    _prune_versions(keep=version)
+
+
+def saved_versions():
+    """Saved version names, oldest first (promoted or not)."""
+    if not os.path.isdir(MODELS_DIR):
+        return []
+    return sorted(name for name in os.listdir(MODELS_DIR)
+                  if name.startswith("v") and os.path.isdir(version_dir(name)))
+
+
+def _prune_versions(keep):
+    versions = [name for name in saved_versions() if name != keep]
+    for name in versions[:max(0, len(versions) - CLASSIFIER_KEEP_VERSIONS)]:
+        shutil.rmtree(version_dir(name), ignore_errors=True)
+
+
+def load_version(version=None):
+    """
+    Load a trained model from disk: the compact export when it was made
+    from the matching pickle, else the pickle itself. Without a version the
+    bundled model is used, training it first if it doesn't exist.
+    """
+    from compact_classifier import load_compact
+    if version:
+        model_path = os.path.join(version_dir(version), MODEL_FILE)
+        compact_path = os.path.join(version_dir(version), COMPACT_MODEL_FILE)
+    else:
+        model_path, compact_path = MODEL_PATH, COMPACT_MODEL_PATH
+    compact = load_compact(compact_path, model_path)
+    if compact is not None:
+        return compact
+    if not os.path.exists(model_path):
         return train_model()
-    with open(MODEL_PATH, "rb") as f:
+    with open(model_path, "rb") as f:
         return pickle.load(f)
 
 
+def load_model():
+    """
+    Return the cached model, loading it on first use and swapping in a newly
+    promoted version when CURRENT changes (checked every
+    CLASSIFIER_RELOAD_INTERVAL seconds).
+    """
+    global _model, _model_version, _next_reload_check
+    now = time.monotonic()
+    if _model is not None and now < _next_reload_check:
+        return _model
+    with _model_lock:
+        if _model is None or now >= _next_reload_check:
+            _next_reload_check = now + CLASSIFIER_RELOAD_INTERVAL
+            version = current_version()
+            if _model is None or version != _model_version:
+                try:
+                    model = load_version(version)
+                except Exception as e:
+                    if version is None:
+                        raise
+                    print(f"[!] Could not load classifier version {version}: {e}")
+                    if _model is not None:
+                        return _model
+                    model, version = load_version(None), None
+                if _model is not None:
+                    print(f"[*] Classifier swapped to {version or 'bundled model'}")
+                # In-flight predictions keep the model object they already hold
+                _model, _model_version = model, version
+    return _model
+
+
+def loaded_version():
+    """Version of the model this process is predicting with (None for the bundled model)."""
+    return _model_version
+
+
+def evaluate(model, texts, labels):
+    """Accuracy of ``model`` on labelled texts (None when there are none)."""
+    if not texts:
+        return None
+    predictions = model.predict(list(texts))
+    return sum(1 for predicted, label in zip(predictions, labels) if predicted == label) / len(texts)
+
+
 def predict_invoice_type(text):
     """
     Predict the invoice layout type for the given OCR text.
@@ -61,6 +245,37 @@ def predict_invoice_type(text):
         str - one of: corporate_gst, eway_bill, gst_einvoice,
               thermal_bill, retail_bill
     """
-    model = _load_model()
+    model = load_model()
     prediction = model.predict([text])[0]
     return prediction
+
+
+def predict_invoice_types(text, k=3):
+    """
+    Rank invoice layout types for the given OCR text by classifier probability.
+
+    Returns:
+        list of (invoice_type, probability), most likely first, at most k long
+    """
+    model = load_model()
+    probabilities = _predict_proba(model, text)
+    ranked = sorted(zip(model.classes_, probabilities), key=lambda pair: pair[1], reverse=True)
+    return [(str(label), float(probability)) for label, probability in ranked[:k]]
+
+
+def _predict_proba(model, text):
+    from compact_classifier import CompactClassifier
+    if isinstance(model, CompactClassifier):
+        return model.predict_proba([text])[0]
+    features = model[:-1].transform([text])
+    clf = model[-1]
+    try:
+        return clf.predict_proba(features)[0]
+    except AttributeError:
+        # A pickle from another scikit-learn version can lack attributes
+        # predict_proba reads (LogisticRegression.multi_class); multinomial
+        # probabilities are the softmax of the decision function
+        import numpy as np
+        scores = clf.decision_function(features)[0]
+        exp = np.exp(scores - scores.max())
+        return exp / exp.sum()
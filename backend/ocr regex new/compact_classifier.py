@@ -0,0 +1,317 @@
+"""
+Compact Classifier Module
+Exports the trained TF-IDF + Logistic Regression pipeline to a flat NumPy
+artifact (training_data/classifier_model.npz) and predicts from it without
+scikit-learn or pandas.
+
+The artifact holds the vocabulary as sorted 64-bit term hashes with their
+column numbers, the idf weights, a dense (features x classes) coefficient
+matrix, the intercepts, class labels and the stop-word list. It is written
+uncompressed so every array is memory-mapped in place at load: workers start
+without unpickling anything and share the weights through the page cache.
+
+Usage (from backend/):
+    python "ocr regex new/compact_classifier.py" export
+    python "ocr regex new/compact_classifier.py" verify                  # corpus + training data
+    python "ocr regex new/compact_classifier.py" verify scans/*.txt
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+import struct
+import sys
+import zipfile
+from collections import Counter
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.path.join(BASE_DIR, "training_data", "classifier_model.pkl")
+COMPACT_MODEL_PATH = os.path.join(BASE_DIR, "training_data", "classifier_model.npz")
+CORPUS_DIR = os.path.join(os.path.dirname(BASE_DIR), "benchmarks", "corpus")
+FORMAT_VERSION = 1
+
+# Zip local file header: signature ... file name length, extra field length
+_LOCAL_HEADER = struct.Struct("<4s22xHH")
+
+
+def term_hash(term):
+    """Stable 64-bit hash of a vocabulary term (Python's hash() is salted per process)."""
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# ------------------------------
+# Export
+# ------------------------------
+def _check_supported(vectorizer):
+    """The predictor reimplements exactly this TfidfVectorizer configuration."""
+    params = vectorizer.get_params()
+    expected = {
+        "analyzer": "word", "lowercase": True, "preprocessor": None, "tokenizer": None,
+        "strip_accents": None, "binary": False, "use_idf": True, "sublinear_tf": False, "norm": "l2",
+    }
+    unsupported = {k: params[k] for k, v in expected.items() if params.get(k) != v}
+    if unsupported:
+        raise ValueError(f"Unsupported TfidfVectorizer settings for the compact classifier: {unsupported}")
+
+
+def export_compact(pipeline, path=COMPACT_MODEL_PATH, source_path=MODEL_PATH):
+    """
+    Write ``pipeline`` (TfidfVectorizer -> LogisticRegression) as a compact
+    artifact. ``source_path`` is the pickle it was exported from; its hash is
+    stored so a retrained pickle is never paired with stale weights.
+    """
+    vectorizer, clf = pipeline[0], pipeline[-1]
+    _check_supported(vectorizer)
+
+    terms = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get)
+    hashes = np.array([term_hash(term) for term in terms], dtype=np.uint64)
+    if len(np.unique(hashes)) != len(hashes):
+        raise ValueError("Vocabulary hash collision; the compact classifier can't represent this vocabulary")
+    order = np.argsort(hashes)
+
+    coef = np.asarray(clf.coef_, dtype=np.float64)
+    intercept = np.asarray(clf.intercept_, dtype=np.float64)
+    if coef.shape[0] == 1:
+        # Binary logistic regression: one row scores classes_[1] against classes_[0]
+        coef = np.vstack([-coef, coef]) / 2
+        intercept = np.concatenate([-intercept, intercept]) / 2
+
+    meta = {
+        "format_version": FORMAT_VERSION,
+        "token_pattern": vectorizer.token_pattern,
+        "ngram_range": list(vectorizer.ngram_range),
+        "source_sha256": file_sha256(source_path) if source_path and os.path.exists(source_path) else None,
+    }
+    stop_words = sorted(vectorizer.get_stop_words() or ())
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        # np.savez stores members uncompressed, which is what makes them mappable
+        np.savez(
+            f,
+            vocab_hashes=hashes[order],
+            vocab_columns=order.astype(np.int32),
+            idf=np.asarray(vectorizer.idf_, dtype=np.float64),
+            coef=np.ascontiguousarray(coef.T),
+            intercept=intercept,
+            classes=np.asarray([str(c) for c in clf.classes_]),
+            stop_words=np.asarray(stop_words or [""]),
+            meta=np.asarray(json.dumps(meta)),
+        )
+    os.replace(tmp_path, path)
+    return path
+
+
+# ------------------------------
+# Load
+# ------------------------------
+def _mmap_npz(path):
+    """
+    Memory-map every member of an uncompressed .npz (np.load only maps plain
+    .npy files and would read the whole archive).
+    """
+    arrays = {}
+    with zipfile.ZipFile(path) as archive:
+        members = archive.infolist()
+    with open(path, "rb") as f:
+        for info in members:
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"{path}: member {info.filename} is compressed and can't be memory-mapped")
+            f.seek(info.header_offset)
+            signature, name_length, extra_length = _LOCAL_HEADER.unpack(f.read(_LOCAL_HEADER.size))
+            if signature != b"PK\x03\x04":
+                raise ValueError(f"{path}: bad zip header for {info.filename}")
+            f.seek(name_length + extra_length, os.SEEK_CUR)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            if dtype.hasobject:
+                raise ValueError(f"{path}: member {info.filename} holds Python objects")
+            arrays[info.filename[:-4]] = np.memmap(
+                path, dtype=dtype, mode="r", offset=f.tell(), shape=shape,
+                order="F" if fortran_order else "C",
+            )
+    return arrays
+
+
+class CompactClassifier:
+    """
+    NumPy-only stand-in for the sklearn pipeline: same tokenization, TF-IDF
+    weighting and linear scores, so predict() returns identical labels.
+    """
+
+    def __init__(self, arrays):
+        meta = json.loads(str(arrays["meta"][()]))
+        if meta.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported compact classifier format {meta.get('format_version')}")
+        self.source_sha256 = meta.get("source_sha256")
+        self.classes_ = np.asarray(arrays["classes"])
+        self._vocab_hashes = arrays["vocab_hashes"]
+        self._vocab_columns = arrays["vocab_columns"]
+        self._idf = arrays["idf"]
+        self._coef = arrays["coef"]
+        self._intercept = arrays["intercept"]
+        self._stop_words = frozenset(str(w) for w in arrays["stop_words"] if w)
+        self._token_re = re.compile(meta["token_pattern"])
+        self._min_n, self._max_n = meta["ngram_range"]
+
+    @classmethod
+    def load(cls, path=COMPACT_MODEL_PATH):
+        return cls(_mmap_npz(path))
+
+    def _terms(self, text):
+        """Word n-grams exactly as TfidfVectorizer's 'word' analyzer builds them."""
+        tokens = [t for t in self._token_re.findall(text.lower()) if t not in self._stop_words]
+        if self._max_n == 1:
+            return tokens
+        terms = list(tokens) if self._min_n == 1 else []
+        for n in range(max(self._min_n, 2), self._max_n + 1):
+            terms.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return terms
+
+    def _features(self, text):
+        """(columns, tf-idf weights) of the text's in-vocabulary terms, l2-normalised."""
+        counts = Counter(self._terms(text))
+        if not counts:
+            return np.empty(0, dtype=np.int32), np.empty(0)
+        hashes = np.fromiter((term_hash(term) for term in counts), dtype=np.uint64, count=len(counts))
+        tf = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        slots = np.searchsorted(self._vocab_hashes, hashes)
+        slots[slots == len(self._vocab_hashes)] = 0
+        known = self._vocab_hashes[slots] == hashes
+        columns = self._vocab_columns[slots[known]]
+        weights = tf[known] * self._idf[columns]
+        norm = np.sqrt(np.dot(weights, weights))
+        if norm:
+            weights /= norm
+        return columns, weights
+
+    def decision_function(self, texts):
+        scores = np.empty((len(texts), len(self.classes_)))
+        for row, text in enumerate(texts):
+            columns, weights = self._features(text)
+            scores[row] = weights @ self._coef[columns] + self._intercept
+        return scores
+
+    def predict_proba(self, texts):
+        scores = self.decision_function(texts)
+        exp = np.exp(scores - scores.max(axis=1, keepdims=True))
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def predict(self, texts):
+        return self.classes_[np.argmax(self.decision_function(texts), axis=1)]
+
+
+def load_compact(path=COMPACT_MODEL_PATH, source_path=MODEL_PATH):
+    """
+    The compact classifier, or None when there is no artifact or it was
+    exported from a different pickle than the one at ``source_path``.
+    """
+    if not os.path.exists(path):
+        return None
+    model = CompactClassifier.load(path)
+    if source_path and os.path.exists(source_path) and model.source_sha256 != file_sha256(source_path):
+        print(f"[!] {os.path.basename(path)} is stale (exported from another model); "
+              f"re-run: python \"ocr regex new/compact_classifier.py\" export")
+        return None
+    return model
+
+
+# ------------------------------
+# CLI
+# ------------------------------
+def _load_pipeline():
+    import pickle
+    with open(MODEL_PATH, "rb") as f:
+        return pickle.load(f)
+
+
+def _load_texts(paths):
+    """(name, text) for every .txt file in the given files/directories."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "**", "*.txt"), recursive=True)))
+        else:
+            files.extend(sorted(glob.glob(path)))
+    texts = []
+    for path in files:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            texts.append((os.path.relpath(path), f.read()))
+    return texts
+
+
+def _training_texts():
+    """(name, text) rows of training_data/invoices.csv, when it is present."""
+    training_csv = os.path.join(BASE_DIR, "training_data", "invoices.csv")
+    if not os.path.exists(training_csv):
+        return []
+    import csv
+    with open(training_csv, newline="", encoding="utf-8") as f:
+        return [(f"invoices.csv:{line}", row["text"])
+                for line, row in enumerate(csv.DictReader(f), start=2) if row.get("text")]
+
+
+def verify(pipeline, model, texts):
+    """Compare labels and scores of the two models; returns the mismatching texts."""
+    mismatches = []
+    worst = 0.0
+    for name, text in texts:
+        expected = pipeline[-1].decision_function(pipeline[:-1].transform([text]))[0]
+        actual = model.decision_function([text])[0]
+        if expected.ndim == 0:   # binary: sklearn returns the classes_[1] margin only
+            expected = np.array([-expected, expected]) / 2
+        worst = max(worst, float(np.max(np.abs(expected - actual))))
+        if np.argmax(expected) != np.argmax(actual):
+            mismatches.append((name, pipeline.classes_[np.argmax(expected)], model.classes_[np.argmax(actual)]))
+    print(f"[*] Verified {len(texts)} text(s): {len(mismatches)} label mismatch(es), "
+          f"max score difference {worst:.2e}")
+    for name, expected, actual in mismatches:
+        print(f"[!]   {name}: sklearn {expected}, compact {actual}")
+    return mismatches
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Export / verify the compact NumPy invoice classifier")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("export", help=f"write {os.path.relpath(COMPACT_MODEL_PATH)} from the pickled pipeline")
+    check = sub.add_parser("verify", help="check the compact model predicts the same labels as the pipeline")
+    check.add_argument("paths", nargs="*", help=f"text files or directories (default: {os.path.relpath(CORPUS_DIR)} "
+                                               "and training_data/invoices.csv)")
+    args = parser.parse_args(argv)
+
+    pipeline = _load_pipeline()
+    if args.command == "export":
+        path = export_compact(pipeline)
+        print(f"[*] Wrote {path} ({os.path.getsize(path) / 1024:.0f} KiB)")
+        return 0
+
+    model = load_compact()
+    if model is None:
+        print(f"[!] No up-to-date compact classifier at {COMPACT_MODEL_PATH}; run export first")
+        return 2
+    texts = _load_texts(args.paths) if args.paths else _load_texts([CORPUS_DIR]) + _training_texts()
+    if not texts:
+        print("[!] Nothing to verify")
+        return 2
+    return 1 if verify(pipeline, model, texts) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
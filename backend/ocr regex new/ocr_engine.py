@@ -1,30 +1,45 @@
 """
 OCR Engine Module
 Uses LLMWhisperer API to extract text from invoices.
-Supports multipage PDFs and image files.
+Supports multipage PDFs (pages are sent concurrently) and image files.
 """
 
 import os
-import time
+import sys
 import tempfile
+import threading
+from concurrent.futures import CancelledError
+
 import requests
 from dotenv import load_dotenv
 
+# The LLMWhisperer client is shared with the backend (backend/services/llm_whisperer.py)
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _BACKEND_DIR not in sys.path:
+    sys.path.insert(0, _BACKEND_DIR)
+
+from services.llm_whisperer import (  # noqa: E402
+    DEFAULT_BASE_URL,
+    LLMWhispererError,
+    LLMWhispererTimeout,
+    get_whisperer_client,
+    normalize_base_url,
+)
+from services.ocr_pool import OcrCancelled  # noqa: E402
+
 # Load .env file from the project root
 load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env"))
 
 # LLMWhisperer API configuration (v2 us-central endpoint)
-LLMWHISPERER_BASE_URL = os.getenv(
-    "LLMWHISPERER_API_URL",
-    "https://llmwhisperer-api.us-central.unstract.com/api/v2",
-).rstrip("/whisper").rstrip("/")  # normalise to base URL
+LLMWHISPERER_BASE_URL = normalize_base_url(os.getenv("LLMWHISPERER_API_URL", DEFAULT_BASE_URL))
 
 LLMWHISPERER_API_KEY = os.getenv("LLMWHISPERER_API_KEY", "")
 
 
 def _local_ocr_fallback(file_path):
     """
-    Fallback OCR using pdfplumber (for text PDFs) or pytesseract (for images/scans).
+    Fallback OCR using pdfplumber (for text PDFs) or tesseract (for images/scans,
+    through the shared OCR pool).
     Returns a list of page text strings.
     """
     ext = os.path.splitext(file_path)[1].lower()
@@ -52,139 +67,85 @@ def _local_ocr_fallback(file_path):
 
 
 def _tesseract_pdf(pdf_path):
-    """Convert each PDF page to image and run pytesseract."""
+    """
+    OCR every page of a scanned PDF on the shared tesseract pool
+    (backend/services/ocr_pool.py): pages are rasterized a few at a time,
+    preprocessed and recognized in parallel by warm workers.
+    """
     try:
-        import pdfplumber
-        from PIL import Image
-        import pytesseract
-        text_pages = []
-        with pdfplumber.open(pdf_path) as pdf:
-            for i, page in enumerate(pdf.pages):
-                img = page.to_image(resolution=200).original
-                text = pytesseract.image_to_string(img)
-                text_pages.append(text)
-                print(f"[OCR] tesseract page {i+1}: {len(text)} chars")
+        from services.ocr_pool import get_ocr_pool
+        from services.pdf_raster import OCR_RASTER_DPI, iter_pdf_pages
+        with open(pdf_path, "rb") as f:
+            content = f.read()
+        text_pages = get_ocr_pool().ocr_pages(iter_pdf_pages(content), dpi=OCR_RASTER_DPI, source=content)
+        for i, text in enumerate(text_pages):
+            print(f"[OCR] tesseract page {i+1}: {len(text)} chars")
         return text_pages
     except Exception as e:
         raise RuntimeError(f"Tesseract PDF OCR failed: {e}")
 
 
 def _tesseract_image(file_path):
-    """Run pytesseract on a single image file."""
+    """Run tesseract on a single image file (shared pool, preprocessed)."""
     try:
         from PIL import Image
-        import pytesseract
+        from services.ocr_pool import get_ocr_pool
+        with open(file_path, "rb") as f:
+            content = f.read()
         img = Image.open(file_path)
-        text = pytesseract.image_to_string(img)
+        text = get_ocr_pool().ocr_image(img, source=content)
         print(f"[OCR] tesseract image: {len(text)} chars")
         return [text]
     except ImportError:
         raise ImportError(
-            "Pillow and pytesseract not installed. "
-            "Run: pip install Pillow pytesseract  (and install Tesseract OCR)"
+            "Pillow, OpenCV and pytesseract (or tesserocr) not installed. "
+            "Run: pip install Pillow opencv-python pytesseract  (and install Tesseract OCR)"
         )
 
 
 def _call_llmwhisperer(file_path):
     """
     Send a file to LLMWhisperer v2 API and return extracted text.
-    Handles async 202 + polling. Falls back to local OCR on connection errors.
+    Falls back to local OCR when the API is unreachable or fails the document.
     """
-    headers = {
-        "unstract-key": LLMWHISPERER_API_KEY,
-    }
-    params = {
-        "mode": "table",                   # best for invoices with tabular data
-        "output_mode": "layout_preserving", # preserves layout for better extraction
-        "page_seperator": "<<<",            # page separator in output
-    }
+    return _call_llmwhisperer_many([file_path])[0]
 
-    whisper_url = f"{LLMWHISPERER_BASE_URL}/whisper"
-    print(f"[OCR] Sending to LLMWhisperer: {whisper_url}")
 
-    try:
-        with open(file_path, "rb") as f:
-            response = requests.post(
-                whisper_url,
-                headers=headers,
-                params=params,
-                data=f.read(),
-                timeout=120,
-            )
-
-        print(f"[OCR] Response status: {response.status_code}")
-        print(f"[OCR] Response body: {response.text[:300]}")
-
-        # Async — poll until done
-        if response.status_code == 202:
-            whisper_hash = response.json().get("whisper_hash")
-            if not whisper_hash:
-                raise RuntimeError("202 response missing whisper_hash")
-            print(f"[OCR] Async mode, polling with hash: {whisper_hash}")
-            return _poll_llmwhisperer(whisper_hash, headers)
-
-        # Synchronous success
-        if response.status_code == 200:
-            data = response.json()
-            return data.get("extracted_text", "") or data.get("result_text", "")
-
-        raise RuntimeError(
-            f"LLMWhisperer API error {response.status_code}: {response.text}"
-        )
-
-    except requests.exceptions.ConnectionError as e:
-        print(f"[OCR] API unreachable ({e}), using local fallback")
-        pages = _local_ocr_fallback(file_path)
-        return " ".join(pages)
-
-
-def _poll_llmwhisperer(whisper_hash, headers, max_attempts=15, interval=2):
+def _call_llmwhisperer_many(file_paths):
     """
-    Poll LLMWhisperer v2 status, then retrieve extracted text.
-    Mirrors the working implementation from the reference project.
+    Send several files (e.g. the pages of a split PDF) to LLMWhisperer
+    concurrently and return their texts in order. A file the API fails falls
+    back to local OCR on its own; texts already retrieved are kept. When the
+    API is unreachable (connection refused on upload, or polling ran out of
+    time) the remaining files stop polling and fall back too.
     """
-    status_url = f"{LLMWHISPERER_BASE_URL}/whisper-status"
-    retrieve_url = f"{LLMWHISPERER_BASE_URL}/whisper-retrieve"
-    params = {"whisper_hash": whisper_hash}
-
-    for attempt in range(max_attempts):
-        resp = requests.get(status_url, headers=headers, params=params, timeout=30)
-        resp.raise_for_status()
-        result = resp.json()
-        status = result.get("status", "")
-        print(f"[OCR] Poll {attempt+1}/{max_attempts} — status: {status}")
-
-        if status == "processed":
-            retrieve_resp = requests.get(
-                retrieve_url, headers=headers, params=params, timeout=60
-            )
-            retrieve_resp.raise_for_status()
-            text = retrieve_resp.text
-
-            # Response can be JSON with result_text, or plain text
-            if text.startswith("{") and "result_text" in text:
-                try:
-                    json_data = retrieve_resp.json()
-                    text = json_data.get("result_text") or json_data.get("extracted_text", "")
-                except Exception:
-                    import re as _re
-                    m = _re.search(r'"result_text"\s*:\s*"(.*?)"(?=\s*[,}])', text, _re.DOTALL)
-                    if m:
-                        text = m.group(1).replace("\\n", "\n").replace("\\t", "\t")
-
-            print(f"[OCR] Retrieved {len(text)} chars")
-            return text
-
-        if status == "failed":
-            raise RuntimeError(f"LLMWhisperer processing failed: {result}")
-
-        if status == "processing":
-            time.sleep(interval)
-            continue
-
-        raise RuntimeError(f"Unknown status from LLMWhisperer: {status}")
-
-    raise RuntimeError(f"LLMWhisperer timed out after {max_attempts} attempts")
+    client = get_whisperer_client(LLMWHISPERER_API_KEY, LLMWHISPERER_BASE_URL)
+    print(f"[OCR] Sending {len(file_paths)} file(s) to LLMWhisperer: {client.base_url}/whisper")
+    documents = []
+    for file_path in file_paths:
+        with open(file_path, "rb") as f:
+            documents.append(f.read())
+    cancel = threading.Event()
+    futures = [client.whisper_async(document, cancel) for document in documents]
+    texts = []
+    for file_path, future in zip(file_paths, futures):
+        name = os.path.basename(file_path)
+        try:
+            text = future.result()
+            print(f"[OCR] Retrieved {len(text)} chars for {name}")
+        except (OcrCancelled, CancelledError):
+            text = " ".join(_local_ocr_fallback(file_path))
+        except (requests.exceptions.ConnectionError, LLMWhispererTimeout) as e:
+            print(f"[OCR] LLMWhisperer unavailable ({e}), using local fallback for the remaining files")
+            cancel.set()
+            for pending in futures:
+                pending.cancel()
+            text = " ".join(_local_ocr_fallback(file_path))
+        except LLMWhispererError as e:
+            print(f"[OCR] LLMWhisperer failed {name} ({e}), using local fallback")
+            text = " ".join(_local_ocr_fallback(file_path))
+        texts.append(text)
+    return texts
 
 
 def _split_pdf_pages(pdf_path):
@@ -247,9 +208,7 @@ def extract_text_pages(file_path):
             print(f"[OCR] Multipage PDF: {num_pages} pages")
             tmp_paths = _split_pdf_pages(file_path)
             try:
-                for tmp_path in tmp_paths:
-                    text = _call_llmwhisperer(tmp_path)
-                    page_texts.append(text)
+                page_texts.extend(_call_llmwhisperer_many(tmp_paths))
             finally:
                 for tmp_path in tmp_paths:
                     os.unlink(tmp_path)
@@ -267,120 +226,3 @@ def extract_text_pages(file_path):
         "page_texts": page_texts,
         "combined_text": combined_text,
     }
-
-
-
-def _local_ocr_fallback(file_path):
-    """
-    Fallback OCR using pdfplumber (for PDFs) or pytesseract (for images).
-    Used automatically when the LLMWhisperer API is unreachable.
-    """
-    ext = os.path.splitext(file_path)[1].lower()
-
-    if ext == ".pdf":
-        try:
-            import pdfplumber
-            text_pages = []
-            with pdfplumber.open(file_path) as pdf:
-                for page in pdf.pages:
-                    text_pages.append(page.extract_text() or "")
-            return text_pages
-        except ImportError:
-            raise ImportError("pdfplumber not installed. Run: pip install pdfplumber")
-    else:
-        try:
-            from PIL import Image
-            import pytesseract
-            img = Image.open(file_path)
-            text = pytesseract.image_to_string(img)
-            return [text]
-        except ImportError:
-            raise ImportError(
-                "Pillow and pytesseract not installed. "
-                "Run: pip install Pillow pytesseract  (and install Tesseract OCR)"
-            )
-
-
-def _split_pdf_pages(pdf_path):
-    """
-    Split a multipage PDF into individual single-page PDFs.
-    Returns a list of temporary file paths (one per page).
-    """
-    try:
-        import PyPDF2
-    except ImportError:
-        raise ImportError("PyPDF2 is required for multipage PDF support. "
-                          "Install it with: pip install PyPDF2")
-
-    page_paths = []
-    with open(pdf_path, "rb") as f:
-        reader = PyPDF2.PdfReader(f)
-        for i, page in enumerate(reader.pages):
-            writer = PyPDF2.PdfWriter()
-            writer.add_page(page)
-            tmp = tempfile.NamedTemporaryFile(
-                delete=False, suffix=f"_page_{i + 1}.pdf"
-            )
-            writer.write(tmp)
-            tmp.close()
-            page_paths.append(tmp.name)
-    return page_paths
-
-
-def extract_text_pages(file_path):
-    """
-    Extract text from a PDF or image invoice.
-
-    For multipage PDFs:
-        - Splits into individual pages
-        - Sends each page to LLMWhisperer
-        - Returns per-page text list and combined text
-
-    For images / single-page PDFs:
-        - Sends directly
-        - Returns a single-element list and combined text
-
-    Returns:
-        dict with keys:
-            page_texts  - list[str], one entry per page
-            combined_text - str, all pages joined
-    """
-    ext = os.path.splitext(file_path)[1].lower()
-    page_texts = []
-
-    if ext == ".pdf":
-        # Check if multipage
-        try:
-            import PyPDF2
-            with open(file_path, "rb") as f:
-                reader = PyPDF2.PdfReader(f)
-                num_pages = len(reader.pages)
-        except ImportError:
-            # Fallback: treat entire PDF as single page
-            num_pages = 1
-
-        if num_pages > 1:
-            # Split and OCR each page
-            tmp_paths = _split_pdf_pages(file_path)
-            try:
-                for tmp_path in tmp_paths:
-                    text = _call_llmwhisperer(tmp_path)
-                    page_texts.append(text)
-            finally:
-                for tmp_path in tmp_paths:
-                    os.unlink(tmp_path)
-        else:
-            # Single page PDF
-            text = _call_llmwhisperer(file_path)
-            page_texts.append(text)
-    else:
-        # Image file (jpg, png, etc.)
-        text = _call_llmwhisperer(file_path)
-        page_texts.append(text)
-
-    combined_text = " ".join(page_texts)
-
-    return {
-        "page_texts": page_texts,
-        "combined_text": combined_text,
-    }
@@ -6,14 +6,67 @@ Supports:
  - Multiple pattern alternatives per field (array of patterns, tries each until match)
  - List fields via "_multi" suffix (returns all matches using findall)
  - Post-processing to clean extracted values (addresses, whitespace, etc.)
+ - Line items from pipe-delimited tables via table_tokenizer; the items_multi
+   regexes only run for layouts without a table
+
+Templates are compiled once into a TemplateScanner. Every pattern is reduced to
+the literal text it cannot match without (e.g. "GSTIN", "Invoice|Bill"); the
+OCR text is case-folded once, checked for those literals, and only patterns
+whose literals are present are run. Field priority and results are
+unchanged — a skipped pattern could not have matched anyway.
 """
 
 import json
 import os
 import re
+import threading
+import time
+from contextlib import nullcontext
+from re import _parser as sre_parse
+
+from table_tokenizer import tokenize_tables
+
+# Stage tracing is provided by the backend when running inside the app
+try:
+    from utils.tracing import count as _trace_count
+    from utils.tracing import span as _trace_span
+except ImportError:
+    def _trace_span(name, **attrs):
+        return nullcontext()
+
+    def _trace_count(key, n=1):
+        pass
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 TEMPLATES_DIR = os.path.join(BASE_DIR, "regex_templates")
+FALLBACK_TEMPLATE = "_universal_fallback"
+
+# Regex flags per field kind (same as the original per-call re.search/findall)
+SINGLE_FLAGS = re.IGNORECASE | re.MULTILINE | re.DOTALL
+MULTI_FLAGS = re.IGNORECASE | re.MULTILINE
+# Shorter literals ("No", "Rs") occur in almost every bill and prune nothing
+MIN_ANCHOR_LENGTH = 3
+
+# Per-pattern time budget, in CPU time of the calling thread (wall time would
+# also count waiting for the GIL behind concurrent page/template threads).
+# re can't be interrupted mid-match, so a pattern that overruns is recorded,
+# and after REGEX_QUARANTINE_AFTER overruns it is skipped for
+# REGEX_QUARANTINE_SECONDS, then re-admitted with a clean slate (0 = never
+# skip). reset_pattern_stats() lifts every quarantine at once. Hard aborts
+# live in the offline profiler (python -m benchmarks.regex_profile), which
+# runs patterns in a child process.
+REGEX_PATTERN_BUDGET_MS = float(os.getenv("REGEX_PATTERN_BUDGET_MS", "250"))
+REGEX_QUARANTINE_AFTER = int(os.getenv("REGEX_QUARANTINE_AFTER", "3"))
+REGEX_QUARANTINE_SECONDS = float(os.getenv("REGEX_QUARANTINE_SECONDS", "600"))
+
+# Non-ASCII characters that re.IGNORECASE matches against ASCII letters
+_IGNORECASE_ASCII = str.maketrans({"\u0130": "i", "\u0131": "i", "\u017f": "s", "\u212a": "k"})
+
+# Summary rows, not actual line items
+_SKIP_DESCRIPTIONS = {
+    'sub total', 'subtotal', 'total', 'grand total', 'net total',
+    'discount', 'tax', 'round off', 'rounding', 'balance',
+}
 
 
 def load_template(invoice_type):
@@ -65,255 +118,403 @@ def _clean_value(field_name, value):
     return value
 
 
-def extract_fields(text, invoice_type):
+# ---------------------------------------------------------------------------
+# Compiled templates
+# ---------------------------------------------------------------------------
+
+def _required_literals(seq):
     """
-    Apply the regex template for the given invoice type to the OCR text.
+    Literal requirements of a parsed pattern: a list of sets, where the text
+    must contain at least one string of every set (case-insensitive).
+    Conservative — anything optional, negated or non-literal is ignored.
+    """
+    requirements = []
+    run = []
 
-    Template format:
-    - field_name: "pattern" or ["pattern1", "pattern2", ...]
-      → Tries each pattern in order, returns first match.
-    - field_name_multi: "pattern" or ["pattern1", ...]
-      → Uses findall on all patterns, returns deduplicated list of all matches.
+    def flush():
+        if len(run) >= MIN_ANCHOR_LENGTH:
+            requirements.append(frozenset(["".join(run).casefold()]))
+        run.clear()
 
-    Returns:
-        dict of extracted field values (field_name -> matched value or None/list)
-    """
-    template = load_template(invoice_type)
-    results = {}
+    for op, av in seq:
+        if op is sre_parse.LITERAL and 32 <= av < 127:
+            run.append(chr(av))
+            continue
+        flush()
+        if op is sre_parse.SUBPATTERN:
+            requirements.extend(_required_literals(av[-1]))
+        elif op is sre_parse.ATOMIC_GROUP:
+            requirements.extend(_required_literals(av))
+        elif op is sre_parse.ASSERT:
+            requirements.extend(_required_literals(av[1]))
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT, sre_parse.POSSESSIVE_REPEAT) and av[0] >= 1:
+            requirements.extend(_required_literals(av[2]))
+        elif op is sre_parse.BRANCH:
+            # Any one alternative will do, so each must contribute a literal
+            options = set()
+            for alternative in av[1]:
+                alt_requirements = _required_literals(alternative)
+                if not alt_requirements:
+                    options = None
+                    break
+                options |= max(alt_requirements, key=lambda r: min(map(len, r)))
+            if options:
+                requirements.append(frozenset(options))
+    flush()
+    return requirements
 
-    for field_name, patterns in template.items():
-        # Skip item config keys — handled separately below
-        if field_name in ("items_multi", "item_groups"):
+
+# ---------------------------------------------------------------------------
+# Per-pattern accounting
+# ---------------------------------------------------------------------------
+
+class PatternStats:
+    """
+    Execution counters for one template pattern. Updated without a lock, so
+    counts can be slightly off under concurrent scans — fine for profiling.
+    """
+    __slots__ = ("template", "field", "index", "pattern", "calls", "matches", "skipped",
+                 "total_ns", "worst_ns", "worst_text_len", "overruns", "strikes", "quarantined_until")
+
+    def __init__(self, template, field, index, pattern):
+        self.template = template
+        self.field = field
+        self.index = index
+        self.pattern = pattern
+        self.calls = 0
+        self.matches = 0
+        self.skipped = 0            # anchors absent or quarantined
+        self.total_ns = 0
+        self.worst_ns = 0
+        self.worst_text_len = 0
+        self.overruns = 0
+        self.strikes = 0            # overruns since the last quarantine
+        self.quarantined_until = 0.0    # time.monotonic(); 0 = not quarantined
+
+    @property
+    def quarantined(self):
+        return bool(self.quarantined_until) and time.monotonic() < self.quarantined_until
+
+    def quarantine(self):
+        self.strikes = 0
+        self.quarantined_until = time.monotonic() + REGEX_QUARANTINE_SECONDS
+
+    def as_dict(self):
+        return {
+            "template": self.template,
+            "field": self.field,
+            "index": self.index,
+            "pattern": self.pattern,
+            "calls": self.calls,
+            "matches": self.matches,
+            "match_rate": self.matches / self.calls if self.calls else 0.0,
+            "skipped": self.skipped,
+            "total_ms": self.total_ns / 1e6,
+            "mean_ms": self.total_ns / self.calls / 1e6 if self.calls else 0.0,
+            "worst_ms": self.worst_ns / 1e6,
+            "worst_text_len": self.worst_text_len,
+            "overruns": self.overruns,
+            "quarantined": self.quarantined,
+        }
+
+
+# (template, field, index, pattern source) -> PatternStats
+_pattern_stats = {}
+_pattern_stats_lock = threading.Lock()
+
+
+def _stats_for(template, field, index, pattern):
+    key = (template, field, index, pattern)
+    stats = _pattern_stats.get(key)
+    if stats is None:
+        with _pattern_stats_lock:
+            stats = _pattern_stats.setdefault(key, PatternStats(template, field, index, pattern))
+    return stats
+
+
+def pattern_stats(template=None, sort_by="total_ms", limit=None):
+    """Accounting for every pattern run so far, most expensive first."""
+    rows = [
+        stats.as_dict() for stats in list(_pattern_stats.values())
+        if template is None or stats.template == template
+    ]
+    rows.sort(key=lambda row: row[sort_by], reverse=True)
+    return rows[:limit] if limit else rows
+
+
+def reset_pattern_stats():
+    """Clear all counters (and lift every quarantine)."""
+    with _pattern_stats_lock:
+        _pattern_stats.clear()
+    _scanners.clear()
+
+
+class _Pattern:
+    __slots__ = ("regex", "requirements", "stats")
+
+    def __init__(self, regex, requirements, stats):
+        self.regex = regex
+        self.requirements = requirements
+        self.stats = stats
+
+    def possible(self, present):
+        stats = self.stats
+        if stats.quarantined_until:
+            if stats.quarantined:
+                stats.skipped += 1
+                # Surfaced per scan: a quarantined pattern may have matched
+                _trace_count("regex_quarantined_skips")
+                return False
+            stats.quarantined_until = 0.0
+            print(f"[!] Regex budget: {stats.template}.{stats.field}[{stats.index}] re-admitted")
+        if not all(not present.isdisjoint(options) for options in self.requirements):
+            stats.skipped += 1
+            return False
+        return True
+
+    def run(self, mode, text):
+        """search / findall / finditer (materialized) under the time budget."""
+        started = time.perf_counter_ns()
+        cpu_started = time.thread_time_ns()
+        if mode == "search":
+            result = self.regex.search(text)
+        elif mode == "findall":
+            result = self.regex.findall(text)
+        else:
+            result = list(self.regex.finditer(text))
+        cpu = time.thread_time_ns() - cpu_started
+        elapsed = time.perf_counter_ns() - started
+
+        stats = self.stats
+        stats.calls += 1
+        stats.total_ns += elapsed
+        if result:
+            stats.matches += 1
+        if elapsed > stats.worst_ns:
+            stats.worst_ns = elapsed
+            stats.worst_text_len = len(text)
+        if cpu > REGEX_PATTERN_BUDGET_MS * 1e6:
+            stats.overruns += 1
+            stats.strikes += 1
+            print(f"[!] Regex budget: {stats.template}.{stats.field}[{stats.index}] took "
+                  f"{cpu / 1e6:.0f} ms CPU on {len(text)} chars (budget {REGEX_PATTERN_BUDGET_MS:.0f} ms)")
+            if REGEX_QUARANTINE_AFTER and stats.strikes >= REGEX_QUARANTINE_AFTER:
+                stats.quarantine()
+                print(f"[!] Regex budget: {stats.template}.{stats.field}[{stats.index}] quarantined "
+                      f"for {REGEX_QUARANTINE_SECONDS:.0f}s after {REGEX_QUARANTINE_AFTER} overruns")
+        return result
+
+
+def _compile_patterns(patterns, flags, template="", field=""):
+    """Compile a field's pattern list in priority order; invalid patterns are dropped."""
+    if isinstance(patterns, str):
+        patterns = [patterns]
+    compiled = []
+    for index, pattern in enumerate(patterns or []):
+        try:
+            regex = re.compile(pattern, flags)
+            requirements = _required_literals(sre_parse.parse(pattern, flags))
+        except re.error:
             continue
+        compiled.append(_Pattern(regex, requirements, _stats_for(template, field, index, pattern)))
+    return compiled
 
-        # Normalize to list of patterns
-        if isinstance(patterns, str):
-            patterns = [patterns]
 
-        # Determine if this is a multi-match (list) field
-        is_multi = field_name.endswith("_multi")
-        clean_name = field_name[:-6] if is_multi else field_name
+class TemplateScanner:
+    """
+    One template compiled for repeated use: per-field pattern lists, the
+    line-item patterns and the literal anchors they require.
+    """
 
-        if is_multi:
-            # Collect all matches across all patterns
-            all_matches = []
-            for pattern in patterns:
-                try:
-                    matches = re.findall(pattern, text, re.IGNORECASE | re.MULTILINE)
-                    all_matches.extend(matches)
-                except re.error:
-                    continue
-            # Deduplicate while preserving order
-            seen = set()
-            unique = []
-            for m in all_matches:
+    def __init__(self, template, fallback=None, name=""):
+        self.name = name
+        self.fields = []    # (clean_name, is_multi, [_Pattern])
+        for field_name, patterns in template.items():
+            if field_name in ("items_multi", "item_groups"):
+                continue
+            is_multi = field_name.endswith("_multi")
+            clean_name = field_name[:-6] if is_multi else field_name
+            flags = MULTI_FLAGS if is_multi else SINGLE_FLAGS
+            self.fields.append((clean_name, is_multi, _compile_patterns(patterns, flags, name, field_name)))
+        self.item_groups = template.get("item_groups", {})
+        self.items = _compile_patterns(template.get("items_multi", []), MULTI_FLAGS, name, "items_multi")
+        self.fallback = fallback
+
+        anchors = set()
+        for pattern in self._all_patterns():
+            for options in pattern.requirements:
+                anchors |= options
+        self.anchors = tuple(sorted(anchors))
+
+    def _all_patterns(self):
+        sections = [self] + ([self.fallback] if self.fallback else [])
+        for section in sections:
+            for _, _, patterns in section.fields:
+                yield from patterns
+            yield from section.items
+
+    def anchors_in(self, text):
+        """
+        Every anchor literal that occurs in ``text``. The text is case-folded
+        once and each distinct anchor is a C-level substring search; a combined
+        re alternation is an order of magnitude slower (re backtracks through
+        each alternative at every position).
+        """
+        folded = text.translate(_IGNORECASE_ASCII).lower()
+        return {anchor for anchor in self.anchors if anchor in folded}
+
+    @staticmethod
+    def first_match(patterns, text, present):
+        for pattern in patterns:
+            if not pattern.possible(present):
+                continue
+            match = pattern.run("search", text)
+            if match:
+                return match.group(1).strip() if match.lastindex else match.group(0).strip()
+        return None
+
+    @staticmethod
+    def all_matches(patterns, text, present):
+        """findall across every pattern, deduplicated in order."""
+        seen = set()
+        unique = []
+        for pattern in patterns:
+            if not pattern.possible(present):
+                continue
+            for m in pattern.run("findall", text):
                 if m not in seen:
                     seen.add(m)
                     unique.append(m)
-            results[clean_name] = unique
-        else:
-            # Try each pattern until one matches
-            value = None
-            for pattern in patterns:
-                try:
-                    match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE | re.DOTALL)
-                except re.error:
-                    continue
-                if match:
-                    value = match.group(1).strip() if match.lastindex else match.group(0).strip()
-                    break
-            results[clean_name] = _clean_value(clean_name, value)
-
-    # --- Line-item extraction via items_multi + item_groups ----------------
-    items_pats = template.get("items_multi", [])
-    item_groups = template.get("item_groups", {})
-    if isinstance(items_pats, str):
-        items_pats = [items_pats]
-    items = []
-    # Words that indicate summary rows, not actual line items
-    _SKIP_DESCRIPTIONS = {
-        'sub total', 'subtotal', 'total', 'grand total', 'net total',
-        'discount', 'tax', 'round off', 'rounding', 'balance',
-    }
-    if items_pats and item_groups:
-        for pat in items_pats:
-            try:
-                for m in re.finditer(pat, text, re.IGNORECASE | re.MULTILINE):
-                    item = {}
-                    for col, grp in item_groups.items():
-                        try:
-                            val = m.group(int(grp))
-                            item[col] = val.strip() if val else ""
-                        except (IndexError, AttributeError):
-                            item[col] = ""
-                    # Skip summary/total rows
-                    desc = item.get("description", "").strip().lower()
-                    if desc in _SKIP_DESCRIPTIONS:
-                        continue
-                    if any(item.values()):
-                        items.append(item)
-            except re.error:
+        return unique
+
+    @staticmethod
+    def item_rows(patterns, item_groups, text, present, skip_summary_rows=True):
+        items = []
+        for pattern in patterns:
+            if not pattern.possible(present):
                 continue
-    results["items"] = items
+            for m in pattern.run("finditer", text):
+                item = {}
+                for col, grp in item_groups.items():
+                    try:
+                        val = m.group(int(grp))
+                        item[col] = val.strip() if val else ""
+                    except (IndexError, AttributeError):
+                        item[col] = ""
+                if skip_summary_rows and item.get("description", "").strip().lower() in _SKIP_DESCRIPTIONS:
+                    continue
+                if any(item.values()):
+                    items.append(item)
+        return items
 
-    # --- Fallback: re-extract items if template found too few ----------------
-    results = _try_items_fallback(text, results)
 
-    # --- Universal fallback: fill blanks from _universal_fallback.json -----
-    results = _apply_fallback(text, results)
+_scanners = {}
+_scanners_lock = threading.Lock()
 
-    return results
+
+def _template_mtime(invoice_type):
+    try:
+        return os.path.getmtime(os.path.join(TEMPLATES_DIR, f"{invoice_type}.json"))
+    except OSError:
+        return None
 
 
-def _try_items_fallback(text, results):
+def get_scanner(invoice_type):
     """
-    When the specific template's items_multi matched very few rows but the raw
-    text clearly contains a pipe-delimited table with more rows, re-extract
-    using progressively more lenient patterns.
+    Compiled scanner for an invoice type (with the universal fallback attached).
+    Rebuilt when either template file changes on disk.
     """
-    existing_items = results.get("items", [])
-
-    # Count how many pipe-delimited data rows exist in the text
-    # (rows that start/contain | and have at least a number — skip header/separator)
-    table_row_pattern = re.compile(
-        r'^\s*\|[^+\-]{5,}\|', re.MULTILINE
-    )
-    table_rows = table_row_pattern.findall(text)
-    # Filter out header rows (rows containing column names like "Items", "Quantity", etc.)
-    data_rows = [
-        r for r in table_rows
-        if re.search(r'\d', r) and not re.search(r'Items\s*\|.*Quantity', r, re.IGNORECASE)
-    ]
+    key = (_template_mtime(invoice_type), _template_mtime(FALLBACK_TEMPLATE))
+    cached = _scanners.get(invoice_type)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    with _scanners_lock:
+        fallback = None
+        if key[1] is not None:
+            fallback = TemplateScanner(load_template(FALLBACK_TEMPLATE), name=FALLBACK_TEMPLATE)
+        scanner = TemplateScanner(load_template(invoice_type), fallback, invoice_type)
+        _scanners[invoice_type] = (key, scanner)
+    return scanner
 
-    if len(existing_items) >= len(data_rows):
-        return results  # template caught them all
 
-    print(f"[*] Items fallback: template found {len(existing_items)} items but text has ~{len(data_rows)} table rows — re-extracting")
-
-    # Lenient patterns for pipe-delimited tables, ordered from stricter to looser
-    fallback_patterns = [
-        # Pattern 1: pipes with optional Rs./Rs prefix, 5 columns
-        r'\|\s*([^|\n]{2,}?)\s*\|\s*(\d+)\s*(?:KG|NOS|PCS|UNIT|SET|BOX|EA|DOZ|MTR|LTR|GM)?\s*\|\s*(?:Rs\.?\s*)?([0-9,.]+)\s*\|\s*(?:Rs\.?\s*)?([0-9,.]+).*?\|\s*(?:Rs\.?\s*)?([0-9,.]+)',
-        # Pattern 2: pipes with 4 numeric columns (no tax column)
-        r'\|\s*([^|\n]{2,}?)\s*\|\s*(\d+)\s*(?:KG|NOS|PCS|UNIT|SET|BOX|EA|DOZ|MTR|LTR|GM)?\s*\|\s*(?:Rs\.?\s*)?([0-9,.]+)\s*\|\s*(?:Rs\.?\s*)?([0-9,.]+)\s*\|',
-    ]
+def extract_fields(text, invoice_type):
+    """
+    Apply the regex template for the given invoice type to the OCR text.
 
-    for pat in fallback_patterns:
-        items = []
-        try:
-            for m in re.finditer(pat, text, re.IGNORECASE | re.MULTILINE):
-                desc = m.group(1).strip()
-                # Skip separator lines or header-like content
-                if re.match(r'^[\-+= ]+$', desc):
-                    continue
-                if desc.lower() in ('items', 'item', 'description', 'product', 'particular', 'particulars'):
-                    continue
+    Template format:
+    - field_name: "pattern" or ["pattern1", "pattern2", ...]
+      → Tries each pattern in order, returns first match.
+    - field_name_multi: "pattern" or ["pattern1", ...]
+      → Uses findall on all patterns, returns deduplicated list of all matches.
 
-                item = {"description": desc, "quantity": m.group(2).strip()}
-                item["rate"] = m.group(3).strip() if m.lastindex >= 3 else ""
-                if m.lastindex >= 5:
-                    item["tax"] = m.group(4).strip()
-                    item["total"] = m.group(5).strip()
-                elif m.lastindex >= 4:
-                    item["total"] = m.group(4).strip()
+    Returns:
+        dict of extracted field values (field_name -> matched value or None/list)
+    """
+    scanner = get_scanner(invoice_type)
+    present = scanner.anchors_in(text)
+    results = {}
 
-                if any(item.values()):
-                    items.append(item)
-        except re.error:
-            continue
+    for clean_name, is_multi, patterns in scanner.fields:
+        if is_multi:
+            results[clean_name] = scanner.all_matches(patterns, text, present)
+        else:
+            results[clean_name] = _clean_value(clean_name, scanner.first_match(patterns, text, present))
+
+    # --- Line items: pipe tables are tokenized once; items_multi regexes
+    # only run for layouts without a usable table --------------------------
+    with _trace_span("tokenize_tables"):
+        table_items = tokenize_tables(text) if "|" in text else []
+    if table_items:
+        results["items"] = table_items
+    elif scanner.items and scanner.item_groups:
+        results["items"] = scanner.item_rows(scanner.items, scanner.item_groups, text, present)
+    else:
+        results["items"] = []
 
-        if len(items) > len(existing_items):
-            print(f"[*] Items fallback pattern matched {len(items)} items (was {len(existing_items)})")
-            results["items"] = items
-            return results
+    # --- Universal fallback: fill blanks from _universal_fallback.json -----
+    with _trace_span("apply_fallback"):
+        results = _apply_fallback(text, results, scanner.fallback, present)
 
     return results
 
 
-def _apply_fallback(text, results):
+def _apply_fallback(text, results, fallback=None, present=None):
     """
     If key fields are mostly empty after specific-template extraction,
     try the universal fallback template and fill in any blank fields.
     Does NOT overwrite values already extracted by the specific template.
     """
-    fallback_path = os.path.join(TEMPLATES_DIR, "_universal_fallback.json")
-    if not os.path.exists(fallback_path):
-        return results
-
     # Check if we actually need the fallback — skip if most key fields present
     key_fields = ["vendor_name", "invoice_number", "grand_total", "invoice_date", "gstin"]
     filled = sum(1 for k in key_fields if results.get(k))
     if filled >= 3:
         return results
 
-    print("[*] Specific template matched few fields — trying universal fallback")
-
-    with open(fallback_path, "r", encoding="utf-8") as f:
-        fallback = json.load(f)
-
-    for field_name, patterns in fallback.items():
-        if field_name in ("items_multi", "item_groups"):
-            continue
-        if isinstance(patterns, str):
-            patterns = [patterns]
+    if fallback is None:
+        return results
+    if present is None:
+        present = fallback.anchors_in(text)
 
-        is_multi = field_name.endswith("_multi")
-        clean_name = field_name[:-6] if is_multi else field_name
+    print("[*] Specific template matched few fields — trying universal fallback")
 
+    for clean_name, is_multi, patterns in fallback.fields:
         # Skip if already has a value from the specific template
         existing = results.get(clean_name)
         if existing and existing not in (None, "", []):
             continue
 
         if is_multi:
-            all_matches = []
-            for pattern in patterns:
-                try:
-                    matches = re.findall(pattern, text, re.IGNORECASE | re.MULTILINE)
-                    all_matches.extend(matches)
-                except re.error:
-                    continue
-            seen = set()
-            unique = []
-            for m in all_matches:
-                if m not in seen:
-                    seen.add(m)
-                    unique.append(m)
+            unique = fallback.all_matches(patterns, text, present)
             if unique:
                 results[clean_name] = unique
         else:
-            for pattern in patterns:
-                try:
-                    match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE | re.DOTALL)
-                except re.error:
-                    continue
-                if match:
-                    val = match.group(1).strip() if match.lastindex else match.group(0).strip()
-                    results[clean_name] = _clean_value(clean_name, val)
-                    break
+            val = fallback.first_match(patterns, text, present)
+            if val is not None:
+                results[clean_name] = _clean_value(clean_name, val)
 
     # Fill items from fallback only if specific template found none
-    if not results.get("items"):
-        fb_items_pats = fallback.get("items_multi", [])
-        fb_item_groups = fallback.get("item_groups", {})
-        if isinstance(fb_items_pats, str):
-            fb_items_pats = [fb_items_pats]
-        items = []
-        if fb_items_pats and fb_item_groups:
-            for pat in fb_items_pats:
-                try:
-                    for m in re.finditer(pat, text, re.IGNORECASE | re.MULTILINE):
-                        item = {}
-                        for col, grp in fb_item_groups.items():
-                            try:
-                                val = m.group(int(grp))
-                                item[col] = val.strip() if val else ""
-                            except (IndexError, AttributeError):
-                                item[col] = ""
-                        if any(item.values()):
-                            items.append(item)
-                except re.error:
-                    continue
+    if not results.get("items") and fallback.items and fallback.item_groups:
+        items = fallback.item_rows(fallback.items, fallback.item_groups, text, present, skip_summary_rows=False)
         if items:
             results["items"] = items
 
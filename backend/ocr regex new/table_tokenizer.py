@@ -0,0 +1,198 @@
+"""
+Table Tokenizer Module
+Splits pipe-delimited OCR layout text (LLM Whisperer's table output) into
+table blocks, rows and cells in a single pass over the lines, maps header
+columns (description / HSN / qty / rate / amount / taxable value) and emits
+line items directly — no regex rescans of the full text. Tables without an
+amount column (e-way bills) give items a null total and their taxable value,
+like the template regexes did; ocr_bridge prices such items by it.
+
+Rows without a usable header are mapped by content: the description is the
+most alphabetic cell, an HSN code is a 4-8 digit cell right after it, the
+quantity is the first whole number and the amount the last number on the row.
+"""
+
+import re
+
+# Header cell → column role, as one alternation searched per cell; the
+# earliest keyword in the cell wins ("Taxable Amt" is taxable, not amount),
+# and at the same position the earlier role ("Item Code" is a code column,
+# never read, so it can't take the description's place)
+HEADER_ROLES = [
+    ("hsn_code", ("hsn", "sac")),
+    ("taxable", ("taxable",)),
+    ("item_code", ("item code", "product code", "part no", "code")),
+    ("description", ("description", "item", "product", "particular", "goods", "material")),
+    ("quantity", ("qty", "quantity")),
+    ("rate", ("rate", "price", "mrp")),
+    ("total", ("amount", "amt", "total", "value")),
+]
+_HEADER_RE = re.compile("|".join(
+    f"(?P<{role}>{'|'.join(keywords)})" for role, keywords in HEADER_ROLES
+))
+
+# First words of summary / tax rows that sit inside item tables
+SUMMARY_PREFIXES = (
+    "total", "sub total", "subtotal", "grand total", "net total", "net amount", "tot.",
+    "cgst", "sgst", "igst", "utgst", "cess", "gst", "tax", "taxable", "discount",
+    "round", "rounding", "balance", "received", "due", "amount", "less",
+)
+
+_SEPARATOR_RE = re.compile(r"^[\s|+\-=:_.]*$")
+_NUMBER_RE = re.compile(
+    r"^(?:Rs\.?|INR|₹)?\s*([0-9][0-9,]*(?:\.[0-9]+)?)\s*"
+    r"(?:Pcs|Pc|Nos|No|EA|KG|UNIT|Units|SET|BOX|DOZ|MTR|LTR|GM)?\.?$",
+    re.IGNORECASE,
+)
+_HSN_RE = re.compile(r"^[0-9]{4,8}$")
+_DIGIT_RE = re.compile(r"[0-9]")
+# Cheap pre-check before _NUMBER_RE (cells are already stripped)
+_NUMBER_START = frozenset("0123456789RrIi₹")
+
+
+def split_table_blocks(text):
+    """
+    Group consecutive pipe-delimited lines into blocks of rows (lists of
+    stripped cells). Separator lines (+----+, |----|) are dropped; any other
+    line ends the current block.
+    """
+    blocks = []
+    current = []
+    for line in text.splitlines():
+        if "|" not in line:
+            if current:
+                blocks.append(current)
+                current = []
+            continue
+        if _SEPARATOR_RE.match(line):
+            continue
+        cells = [cell.strip() for cell in line.split("|")]
+        # Border pipes leave empty first/last cells
+        if cells and not cells[0]:
+            cells = cells[1:]
+        if cells and not cells[-1]:
+            cells = cells[:-1]
+        if len(cells) >= 2:
+            current.append(cells)
+    if current:
+        blocks.append(current)
+    return blocks
+
+
+def parse_number(cell):
+    """Numeric text of a cell ("Rs. 1,250.00" -> "1,250.00"), or None."""
+    if not cell or cell[0] not in _NUMBER_START or "%" in cell:
+        return None
+    m = _NUMBER_RE.match(cell)
+    return m.group(1) if m else None
+
+
+def detect_header(cells):
+    """
+    Column roles for a header row ({role: column index}), or None when the
+    row isn't a header (needs a description or qty column plus one more role).
+    """
+    columns = {}
+    for index, cell in enumerate(cells):
+        m = _HEADER_RE.search(cell.lower())
+        if m and m.lastgroup not in columns:
+            columns[m.lastgroup] = index
+    if len(columns) < 2 or not ("description" in columns or "quantity" in columns):
+        return None
+    return columns
+
+
+def _letters(cell):
+    return sum(map(str.isalpha, cell))
+
+
+def _is_summary(description):
+    label = description.strip().lower()
+    return not label or label.startswith(SUMMARY_PREFIXES)
+
+
+def _item_from_header(cells, columns):
+    def cell(role):
+        index = columns.get(role)
+        return cells[index] if index is not None and index < len(cells) else ""
+
+    description = cell("description")
+    quantity = parse_number(cell("quantity"))
+    total = parse_number(cell("total"))
+    taxable = parse_number(cell("taxable"))
+    if _is_summary(description) or _letters(description) < 2 or not (quantity or total or taxable):
+        return None
+    hsn = cell("hsn_code")
+    item = {
+        "description": description,
+        "hsn_code": hsn if _HSN_RE.match(hsn) else "",
+        "quantity": quantity or "1",
+        "rate": parse_number(cell("rate")) or "",
+        "total": (total or "") if "total" in columns else None,
+    }
+    if "taxable" in columns:
+        item["taxable_value"] = taxable or ""
+    return item
+
+
+def _item_from_content(cells):
+    """Map a header-less row by cell content; None for non-item rows."""
+    numbers = [parse_number(cell) for cell in cells]
+    text_cells = [i for i, n in enumerate(numbers) if n is None]
+    # Needs a quantity and an amount besides the description
+    if len(cells) - len(text_cells) < 2 or not text_cells:
+        return None
+    desc_index = max(text_cells, key=lambda i: _letters(cells[i]))
+    description = cells[desc_index]
+    if _letters(description) < 3 or _is_summary(description):
+        return None
+
+    rest = cells[desc_index + 1:]
+    numbers = [n for n in numbers[desc_index + 1:] if n]
+    hsn = ""
+    # An HSN code is a bare 4-8 digit cell right after the description,
+    # followed by at least a quantity and an amount
+    if rest and len(numbers) >= 3 and _HSN_RE.match(rest[0]):
+        hsn = rest[0]
+        numbers = numbers[1:]
+    if len(numbers) < 2:
+        return None
+
+    quantity_index = next((i for i, n in enumerate(numbers[:-1]) if "." not in n), None)
+    if quantity_index is None:
+        return None
+    rate_candidates = numbers[quantity_index + 1:-1]
+    return {
+        "description": description,
+        "hsn_code": hsn,
+        "quantity": numbers[quantity_index],
+        "rate": rate_candidates[0] if rate_candidates else "",
+        "total": numbers[-1],
+    }
+
+
+def tokenize_tables(text):
+    """
+    Tokenize every pipe table in ``text`` and return its line items, in order
+    (dicts with description, hsn_code, quantity, rate and total, plus
+    taxable_value for tables with a taxable column).
+    """
+    items = []
+    header = None
+    for block in split_table_blocks(text):
+        for cells in block:
+            # Headers never hold digits and item rows always do
+            if not any(map(_DIGIT_RE.search, cells)):
+                columns = detect_header(cells)
+                if columns:
+                    header = (columns, len(cells))
+                continue
+            # A header applies to later blocks with the same column count
+            # (rows split by wrapped descriptions or serial-number lines)
+            if header and len(cells) == header[1]:
+                item = _item_from_header(cells, header[0])
+            else:
+                item = _item_from_content(cells)
+            if item:
+                items.append(item)
+    return items
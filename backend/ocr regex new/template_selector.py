@@ -0,0 +1,135 @@
+"""
+Template Selector Module
+Picks the regex template for an invoice when the classifier isn't sure.
+
+Below TEMPLATE_MIN_CONFIDENCE the top TEMPLATE_TOP_K templates are all run
+over the text (on worker threads, each with its precompiled TemplateScanner)
+and the output with the best completeness/consistency score wins: key fields
+found, a well-formed GSTIN and date, sane quantities, and line items that add
+up to the grand total. The classifier probability only breaks ties.
+"""
+
+import contextvars
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from regex_extractor import extract_fields
+
+# Top-class probability at which the classifier's pick is used as is
+TEMPLATE_MIN_CONFIDENCE = float(os.getenv("TEMPLATE_MIN_CONFIDENCE", "0.5"))
+TEMPLATE_TOP_K = int(os.getenv("TEMPLATE_TOP_K", "4"))
+TEMPLATE_SELECT_WORKERS = int(os.getenv("TEMPLATE_SELECT_WORKERS", "4"))
+
+# Fields whose absence sends the bill to the LLM fallback (llm_fallback.KEY_FIELDS)
+KEY_FIELDS = ("vendor_name", "invoice_number", "invoice_date", "grand_total", "gstin")
+TAX_FIELDS = ("cgst", "sgst", "igst")
+# A line quantity above this is an HSN code or amount read into the wrong column
+MAX_QUANTITY = 10000
+
+_GSTIN_RE = re.compile(r"^[0-9]{2}[A-Z]{5}[0-9]{4}[A-Z][A-Z0-9]Z[A-Z0-9]$")
+_DATE_RE = re.compile(r"^[0-9]{1,2}[\-/. ](?:[0-9]{1,2}|[A-Za-z]{3,9})[\-/. ,]+[0-9]{2,4}$")
+_AMOUNT_RE = re.compile(r"[0-9][0-9,]*(?:\.[0-9]+)?")
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _executor():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=TEMPLATE_SELECT_WORKERS, thread_name_prefix="template-select")
+        return _pool
+
+
+def _amount(value):
+    """Float value of an extracted amount ("Rs. 1,44,000.00" -> 144000.0), or None."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    m = _AMOUNT_RE.search(str(value))
+    if not m:
+        return None
+    try:
+        return float(m.group(0).replace(",", ""))
+    except ValueError:
+        return None
+
+
+def _present(value):
+    if isinstance(value, str):
+        return bool(value.strip())
+    return bool(value)
+
+
+def score_fields(fields):
+    """
+    Completeness + consistency score of one template's output; higher is
+    better. Key fields count 2 each (a missing one is what sends a bill to the
+    LLM), malformed values and impossible quantities cost points, and items
+    reconciling with grand_total earn 2.
+    """
+    score = 2.0 * sum(1 for name in KEY_FIELDS if _present(fields.get(name)))
+
+    gstin = fields.get("gstin")
+    if _present(gstin):
+        score += 1 if _GSTIN_RE.match(str(gstin).replace(" ", "").upper()) else -1
+    date = fields.get("invoice_date")
+    if _present(date):
+        score += 0.5 if _DATE_RE.match(str(date).strip()) else -0.5
+
+    items = fields.get("items") or []
+    if not items:
+        return score
+    score += 1
+    quantities = [_amount(item.get("quantity")) for item in items]
+    score -= min(2, sum(1 for q in quantities if not q or q > MAX_QUANTITY))
+
+    grand_total = _amount(fields.get("grand_total"))
+    totals = [_amount(item.get("total") or item.get("taxable_value")) for item in items]
+    if not grand_total or not all(totals):
+        return score
+    items_total = sum(totals)
+    tolerance = max(1.0, grand_total * 0.01)
+    taxes = sum(_amount(fields.get(name)) or 0.0 for name in TAX_FIELDS)
+    if abs(items_total - grand_total) <= tolerance or abs(items_total + taxes - grand_total) <= tolerance:
+        score += 2
+    elif items_total < grand_total:
+        score += 0.5   # plausible: taxes or charges listed outside the table
+    else:
+        score -= 1
+    return score
+
+
+def select_template(text, candidates):
+    """
+    Extract fields with the best of the classifier's ranked candidates.
+
+    Args:
+        candidates - [(invoice_type, probability), ...], most likely first
+
+    Returns:
+        (invoice_type, fields, scores) - scores maps each template tried to
+        its score; empty when the top candidate was confident enough
+    """
+    top_type, top_probability = candidates[0]
+    if top_probability >= TEMPLATE_MIN_CONFIDENCE or len(candidates) == 1 or TEMPLATE_TOP_K <= 1:
+        return top_type, extract_fields(text, top_type), {}
+
+    tried = [invoice_type for invoice_type, _ in candidates[:TEMPLATE_TOP_K]]
+    if TEMPLATE_SELECT_WORKERS > 1:
+        # copy_context: each run's regex spans and counters land in the caller's request trace
+        contexts = [contextvars.copy_context() for _ in tried]
+        outputs = list(_executor().map(
+            lambda context, invoice_type: context.run(extract_fields, text, invoice_type), contexts, tried
+        ))
+    else:
+        outputs = [extract_fields(text, invoice_type) for invoice_type in tried]
+
+    scores = {invoice_type: score_fields(fields) for invoice_type, fields in zip(tried, outputs)}
+    # Ties go to the more probable template (tried is in probability order)
+    best = max(range(len(tried)), key=lambda i: (scores[tried[i]], -i))
+    return tried[best], outputs[best], scores
@@ -4,17 +4,16 @@ Maps the new regex-based extraction pipeline (ocr regex new/) to the
 BillInfo / ExtractedAsset format expected by app.py and the frontend.
 
 Flow:
-  raw_text ──► classifier.predict_invoice_type()
-           ──► regex_extractor.extract_fields()
+  raw_text ──► classifier.predict_invoice_types()       (top-k with probabilities)
+           ──► template_selector.select_template()      (best-scoring regex_extractor output)
            ──► map to BillInfo + ExtractedAsset
 """
 
 import os
 import sys
 import re
-import qrcode
-import base64
-from io import BytesIO
+import logging
+from functools import lru_cache
 from datetime import datetime, timedelta
 from dataclasses import dataclass
 from typing import List, Dict, Optional
@@ -24,8 +23,12 @@ _OCR_REGEX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ocr r
 if _OCR_REGEX_DIR not in sys.path:
     sys.path.insert(0, _OCR_REGEX_DIR)
 
-from classifier import predict_invoice_type
-from regex_extractor import extract_fields
+from classifier import predict_invoice_types, load_model
+from template_selector import TEMPLATE_TOP_K, select_template
+
+from utils import tracing
+
+logger = logging.getLogger("assetiq.ocr_bridge")
 
 # LLM fallback for when regex misses fields
 try:
@@ -128,6 +131,94 @@ KNOWN_BRANDS = [
 ]
 
 
+# ── Precomputed keyword matchers ─────────────────────────────────────────
+# One compiled alternation per keyword map instead of a substring scan per
+# keyword per line item; results are memoized per normalized description
+# (bulk backfills classify the same few thousand descriptions over and over).
+
+KEYWORD_CACHE_SIZE = 8192
+
+
+def _normalize_description(text: str) -> str:
+    return " ".join((text or "").lower().split())
+
+
+def _keyword_pattern(keyword: str) -> str:
+    # Keywords must start at a word boundary. Short ones (pc, ac, tv, led, hp...)
+    # must also end at one (plural allowed) so they don't fire inside other
+    # words; longer ones may be a prefix ("laser" in "LaserJet").
+    pattern = re.escape(keyword.lower())
+    if len(keyword) <= 3:
+        pattern += r"(?:e?s)?\b"
+    return pattern
+
+
+class KeywordMatcher:
+    """
+    Match every keyword of an ordered ``label -> [keywords]`` map in one pass.
+    ``match(text)`` returns the earliest label (map order) with any keyword in
+    the text, the same priority the old per-label scan had.
+    """
+
+    def __init__(self, keyword_map: Dict[str, List[str]], default: str = ""):
+        self.default = default
+        rank_of = {}
+        self._labels = list(keyword_map)
+        for rank, keywords in enumerate(keyword_map.values()):
+            for keyword in keywords:
+                rank_of.setdefault(keyword.lower(), rank)
+
+        # A long keyword can contain a higher-priority one ("led tv" contains
+        # "led"); the single left-to-right scan only sees the longest, so fold
+        # the contained keyword's rank into it up front.
+        compiled = {kw: re.compile(r"\b" + _keyword_pattern(kw)) for kw in rank_of}
+        self._rank = {
+            kw: min(rank_of[other] for other, pat in compiled.items() if pat.search(kw))
+            for kw in rank_of
+        }
+        alternation = "|".join(
+            _keyword_pattern(kw) for kw in sorted(rank_of, key=len, reverse=True)
+        )
+        self._pattern = re.compile(r"\b(?:" + alternation + ")") if rank_of else None
+        self._keywords_by_prefix = sorted(rank_of, key=len, reverse=True)
+        self.match = lru_cache(maxsize=KEYWORD_CACHE_SIZE)(self._match)
+
+    def _match(self, normalized: str) -> str:
+        if self._pattern is None:
+            return self.default
+        best = None
+        for m in self._pattern.finditer(normalized):
+            found = m.group(0)
+            rank = self._rank.get(found)
+            if rank is None:
+                # matched a plural form of a short keyword
+                rank = next(self._rank[kw] for kw in self._keywords_by_prefix if found.startswith(kw))
+            if best is None or rank < best:
+                best = rank
+                if best == 0:
+                    break
+        return self._labels[best] if best is not None else self.default
+
+
+_CATEGORY_MATCHER = KeywordMatcher(CATEGORY_KEYWORDS, default="other")
+_DEVICE_TYPE_MATCHER = KeywordMatcher(DEVICE_TYPE_KEYWORDS)
+_BRAND_MATCHER = KeywordMatcher({brand: [brand] for brand in KNOWN_BRANDS})
+# Model = text following the brand name
+_BRAND_MODEL_PATTERNS = {
+    brand: re.compile(r"\b" + re.escape(brand) + r"\s+([A-Za-z0-9][\w\-. ]{1,40})", re.IGNORECASE)
+    for brand in KNOWN_BRANDS
+}
+
+
+@lru_cache(maxsize=KEYWORD_CACHE_SIZE)
+def _brand_and_model(description: str) -> tuple:
+    brand = _BRAND_MATCHER.match(_normalize_description(description))
+    if not brand:
+        return '', ''
+    m = _BRAND_MODEL_PATTERNS[brand].search(description)
+    return brand, m.group(1).strip() if m else ''
+
+
 # HSN code prefix → generic product description (for fallback when items regex misses)
 HSN_DESCRIPTIONS = {
     '8471': 'Computer / Laptop',
@@ -155,6 +246,10 @@ class OcrRegexExtractor:
     Uses classifier + regex templates from 'ocr regex new/' folder.
     """
 
+    def warm_up(self) -> None:
+        """Load the classifier (memory-mapped weights, or sklearn as a fallback) now instead of on the first scan."""
+        load_model()
+
     def extract_bill_info(self, raw_text_or_bytes, use_llm_fallback: bool = True) -> tuple:
         """
         Main entry point — mirrors EnhancedInvoiceExtractor.extract_bill_info().
@@ -164,30 +259,43 @@ class OcrRegexExtractor:
         """
         raw_text = raw_text_or_bytes.decode('utf-8') if isinstance(raw_text_or_bytes, bytes) else raw_text_or_bytes
 
-        # 1. Classify invoice type
-        invoice_type = predict_invoice_type(raw_text)
-        print(f"[OCR-Bridge] Classifier predicted invoice type: {invoice_type}")
-
-        # 2. Extract fields via regex templates
-        fields = extract_fields(raw_text, invoice_type)
-        print(f"[OCR-Bridge] Extracted fields: { {k: v for k, v in fields.items() if k != 'items'} }")
-        print(f"[OCR-Bridge] Extracted {len(fields.get('items', []))} line items")
+        # 1. Rank invoice types
+        with tracing.span("predict_invoice_type"):
+            candidates = predict_invoice_types(raw_text, k=TEMPLATE_TOP_K)
+        logger.info("Classifier candidates: %s", ", ".join(f"{t} ({p:.2f})" for t, p in candidates))
+
+        # 2. Extract fields via regex templates — the top candidate, or the
+        #    best-scoring of the top-k when the classifier isn't confident
+        with tracing.span("extract_fields"):
+            invoice_type, fields, scores = select_template(raw_text, candidates)
+        if scores:
+            logger.info("Template scores: %s -> %s", scores, invoice_type)
+        trace = tracing.current_trace()
+        if trace:
+            trace.set("invoice_type", invoice_type)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Extracted fields: %s", {k: v for k, v in fields.items() if k != 'items'})
+        logger.info("Extracted %d line items", len(fields.get('items', [])))
 
         # 3. LLM fallback — fill gaps that regex missed
         llm_enhanced = False
         if use_llm_fallback and _LLM_AVAILABLE:
             try:
-                result = fill_missing_fields(fields, raw_text)
+                with tracing.span("fill_missing_fields"):
+                    result = fill_missing_fields(fields, raw_text)
                 fields = result["fields"]
                 llm_enhanced = result["llm_enhanced"]
                 if llm_enhanced:
-                    print("[OCR-Bridge] LLM fallback filled missing fields")
+                    logger.info("LLM fallback filled missing fields")
             except Exception as e:
-                print(f"[OCR-Bridge] LLM fallback error (non-fatal): {e}")
+                logger.warning("LLM fallback error (non-fatal): %s", e)
 
         # 4. Map to BillInfo
-        bill_info = self._map_to_bill_info(fields, raw_text)
+        with tracing.span("map_to_bill_info"):
+            bill_info = self._map_to_bill_info(fields, raw_text)
+        tracing.count("items", len(fields.get('items', [])))
         bill_info.llm_enhanced = llm_enhanced
+        bill_info.invoice_type = invoice_type
         return bill_info, raw_text
 
     # Alias so app.py can also call extract_bill_info_ai
@@ -281,7 +389,7 @@ class OcrRegexExtractor:
             category = self._classify_category(description)
             device_type = self._detect_device_type(description)
             brand, model = self._extract_brand_model(description)
-            print(f"[OCR-Bridge] No line items found — creating {len(batch_numbers)} assets from batch/serial numbers")
+            logger.info("No line items found — creating %d assets from batch/serial numbers", len(batch_numbers))
             for serial in batch_numbers:
                 assets.append(ExtractedAsset(
                     name=description,
@@ -312,7 +420,8 @@ class OcrRegexExtractor:
                 quantity = 1
 
             rate = self._to_float(item.get('rate') or item.get('price_per_unit') or item.get('unit_price', '0'))
-            total = self._to_float(item.get('total', '0'))
+            # Layouts without an amount column (e-way bills) only carry the taxable value
+            total = self._to_float(item.get('total') or item.get('taxable_value') or '0')
             hsn = item.get('hsn_code', '') or ''
 
             # If total is 0 but rate and quantity exist, compute
@@ -329,7 +438,7 @@ class OcrRegexExtractor:
             # Expand: if qty > 1 and we have batch/serial numbers, create
             # one asset per unit with its own serial number.
             if quantity > 1 and batch_numbers:
-                print(f"[OCR-Bridge] Expanding item '{description}' qty={quantity} into individual assets")
+                logger.debug("Expanding item '%s' qty=%d into individual assets", description, quantity)
                 for _ in range(quantity):
                     serial = batch_numbers[batch_idx] if batch_idx < len(batch_numbers) else ''
                     batch_idx += 1
@@ -380,35 +489,13 @@ class OcrRegexExtractor:
     # ── Classification helpers ───────────────────────────────────────────
 
     def _classify_category(self, description: str) -> str:
-        desc_lower = description.lower()
-        for category, keywords in CATEGORY_KEYWORDS.items():
-            if any(kw in desc_lower for kw in keywords):
-                return category
-        return 'other'
+        return _CATEGORY_MATCHER.match(_normalize_description(description))
 
     def _detect_device_type(self, description: str) -> str:
-        desc_lower = description.lower()
-        for device_type, keywords in DEVICE_TYPE_KEYWORDS.items():
-            if any(kw in desc_lower for kw in keywords):
-                return device_type
-        return ''
+        return _DEVICE_TYPE_MATCHER.match(_normalize_description(description))
 
     def _extract_brand_model(self, description: str) -> tuple:
-        brand = ''
-        model = ''
-        for known_brand in KNOWN_BRANDS:
-            if known_brand.lower() in description.lower():
-                brand = known_brand
-                # Try to extract model after brand name
-                pattern = re.compile(
-                    re.escape(known_brand) + r'\s+([A-Za-z0-9][\w\-. ]{1,40})',
-                    re.IGNORECASE,
-                )
-                m = pattern.search(description)
-                if m:
-                    model = m.group(1).strip()
-                break
-        return brand, model
+        return _brand_and_model(description)
 
     # ── Text-level extraction helpers ────────────────────────────────────
 
@@ -474,23 +561,12 @@ class OcrRegexExtractor:
         except (ValueError, TypeError):
             return default
 
-    # ── QR code (same as enhanced_extractor) ─────────────────────────────
+    # ── QR code (rendered + cached by services.qr_service) ───────────────
 
     def generate_qr_code(self, data: str) -> str:
         try:
-            qr = qrcode.QRCode(
-                version=1,
-                error_correction=qrcode.constants.ERROR_CORRECT_L,
-                box_size=10,
-                border=4,
-            )
-            qr.add_data(data)
-            qr.make(fit=True)
-            img = qr.make_image(fill_color="black", back_color="white")
-            buffered = BytesIO()
-            img.save(buffered, format="PNG")
-            img_str = base64.b64encode(buffered.getvalue()).decode()
-            return f"data:image/png;base64,{img_str}"
+            from services.qr_service import get_qr_renderer
+            return get_qr_renderer().data_uri(data)
         except Exception as e:
-            print(f"Error generating QR code: {e}")
+            logger.error("Error generating QR code: %s", e)
             return ""
@@ -0,0 +1,355 @@
+"""
+Auth Routes
+Signup with emailed verification codes, login, profile management and
+HOD lab-incharge assignment.
+"""
+
+import json
+import traceback
+from datetime import datetime, timedelta
+
+import jwt
+from flask import Blueprint, jsonify, request
+
+from config.database import db
+from models.user import User
+from services.auth_service import (
+    SIGNUP_CODE_COOLDOWN_SECONDS,
+    SIGNUP_CODE_TTL_MINUTES,
+    generate_verification_code,
+    get_current_user,
+    hash_verification_code,
+    send_signup_verification_email,
+    verify_signup_code,
+)
+from utils.jwt_utils import JWT_EXPIRATION_HOURS, JWT_SECRET_KEY
+
+auth_bp = Blueprint("auth", __name__)
+
+
+# -----------------------------
+# Authentication Routes
+# -----------------------------
+@auth_bp.route("/request_signup_code", methods=["POST"])
+def request_signup_code():
+    data = request.get_json() or {}
+    email = (data.get("email") or "").strip().lower()
+    if not email:
+        return jsonify({"error": "Email is required"}), 400
+    if not email.endswith("@apsit.edu.in"):
+        return jsonify({"error": "Only @apsit.edu.in email addresses are allowed"}), 400
+
+    if User.find_by_email(email):
+        return jsonify({"error": "User with this email already exists"}), 400
+
+    conn = db.get_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            """
+            SELECT created_at
+            FROM email_verification_codes
+            WHERE email = %s
+            ORDER BY created_at DESC
+            LIMIT 1
+            """,
+            (email,)
+        )
+        row = cursor.fetchone()
+        if row:
+            last_created = row["created_at"]
+            seconds_since = (datetime.utcnow() - last_created).total_seconds()
+            if seconds_since < SIGNUP_CODE_COOLDOWN_SECONDS:
+                wait_seconds = int(SIGNUP_CODE_COOLDOWN_SECONDS - seconds_since)
+                return jsonify({"error": f"Please wait {wait_seconds}s before requesting another code"}), 429
+
+        code = generate_verification_code()
+        code_hash = hash_verification_code(code)
+        expires_at = datetime.utcnow() + timedelta(minutes=SIGNUP_CODE_TTL_MINUTES)
+
+        cursor.execute(
+            """
+            INSERT INTO email_verification_codes (email, code_hash, expires_at)
+            VALUES (%s, %s, %s)
+            """,
+            (email, code_hash, expires_at)
+        )
+        conn.commit()
+
+        sent = send_signup_verification_email(email, code)
+        if not sent:
+            return jsonify({"error": "Failed to send verification email"}), 500
+
+        return jsonify({
+            "success": True,
+            "message": "Verification code sent",
+            "expiresInMinutes": SIGNUP_CODE_TTL_MINUTES
+        })
+    except Exception as e:
+        conn.rollback()
+        print(f"Error sending signup code: {e}")
+        traceback.print_exc()
+        return jsonify({"error": "Failed to send verification code"}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+
+@auth_bp.route("/signup", methods=["POST"])
+def register():
+    data = request.get_json()
+    required_fields = ["firstName", "lastName", "email", "password", "role"]
+    if not all(field in data for field in required_fields):
+        return jsonify({"error": "Missing required fields"}), 400
+
+    email = (data.get("email") or "").strip().lower()
+    if not email.endswith("@apsit.edu.in"):
+        return jsonify({"error": "Only @apsit.edu.in email addresses are allowed for registration"}), 400
+
+    verification_code = (data.get("verificationCode") or "").strip()
+    if not verification_code:
+        return jsonify({"error": "Verification code is required"}), 400
+
+    verified, verification_error = verify_signup_code(email, verification_code)
+    if not verified:
+        return jsonify({"error": verification_error or "Invalid verification code"}), 400
+
+    assigned_lab = None
+    if data["role"] == "Lab Incharge":
+        assigned_lab = data.get("accessScope", {}).get("lab")
+
+    user = User.create_user(
+        first_name=data["firstName"],
+        last_name=data["lastName"],
+        email=email,
+        password=data["password"],
+        role=data["role"],
+        assigned_lab=assigned_lab,
+        email_verified=True,
+        email_verified_at=datetime.utcnow()
+    )
+    if isinstance(user, dict) and "error" in user:
+        return jsonify(user), 400
+
+    token = jwt.encode({
+        "user_id": user.id,
+        "exp": datetime.utcnow() + timedelta(hours=JWT_EXPIRATION_HOURS)
+    }, JWT_SECRET_KEY, algorithm="HS256")
+    return jsonify({"message": "User registered successfully", "token": token})
+
+
+@auth_bp.route("/login", methods=["POST"])
+def login():
+    data = request.get_json()
+    if "email" not in data or "password" not in data:
+        return jsonify({"error": "Email and password required"}), 400
+    user = User.find_by_email(data["email"])
+    if not user or not User.verify_password(data["password"], user.password_hash):
+        return jsonify({"error": "Invalid credentials"}), 401
+    if not getattr(user, "email_verified", False):
+        return jsonify({"error": "Email address not verified"}), 403
+    user.update_last_login()
+    token = jwt.encode({
+        "user_id": user.id,
+        "role": user.role,
+        "exp": datetime.utcnow() + timedelta(hours=JWT_EXPIRATION_HOURS)
+    }, JWT_SECRET_KEY, algorithm="HS256")
+    return jsonify({
+        "message": "Login successful", 
+        "token": token,
+        "user": {
+            "id": user.id,
+            "firstName": user.first_name,
+            "lastName": user.last_name,
+            "email": user.email,
+            "role": user.role,
+            "assignedLab": user.assigned_lab
+        }
+    })
+
+
+@auth_bp.route("/user/profile", methods=["GET"])
+def get_user_profile():
+    """Get current user profile"""
+    user = get_current_user()
+    if not user:
+        return jsonify({"error": "Unauthorized"}), 401
+    
+    return jsonify({
+        "id": user.id,
+        "firstName": user.first_name,
+        "lastName": user.last_name,
+        "email": user.email,
+        "role": user.role,
+        "assignedLab": user.assigned_lab,
+        "accessScope": user.access_scope if hasattr(user, 'access_scope') else {}
+    })
+
+
+@auth_bp.route("/user/update", methods=["PUT"])
+def update_user_profile():
+    """Update current user profile"""
+    user = get_current_user()
+    if not user:
+        return jsonify({"error": "Unauthorized"}), 401
+    
+    data = request.get_json()
+    
+    try:
+        # Update basic info
+        if "firstName" in data:
+            user.first_name = data["firstName"]
+        if "lastName" in data:
+            user.lastName = data["lastName"]
+        if "email" in data:
+            # Check if email is already taken by another user
+            existing = User.find_by_email(data["email"])
+            if existing and existing.id != user.id:
+                return jsonify({"error": "Email already in use"}), 400
+            user.email = data["email"]
+        
+        # Update role and lab (only if provided)
+        if "role" in data:
+            user.role = data["role"]
+        if "assignedLab" in data:
+            user.assigned_lab = data["assignedLab"]
+        
+        # Handle password change
+        if "newPassword" in data and data["newPassword"]:
+            if "currentPassword" not in data:
+                return jsonify({"error": "Current password required"}), 400
+            if not User.verify_password(data["currentPassword"], user.password_hash):
+                return jsonify({"error": "Current password is incorrect"}), 401
+            user.password_hash = User.hash_password(data["newPassword"])
+        
+        # Save to database
+        cursor = db.cursor()
+        cursor.execute("""
+            UPDATE users 
+            SET first_name = %s, last_name = %s, email = %s, 
+                role = %s, assigned_lab = %s, password_hash = %s,
+                updated_at = NOW()
+            WHERE id = %s
+        """, (user.first_name, user.last_name, user.email, 
+              user.role, user.assigned_lab, user.password_hash, user.id))
+        db.commit()
+        cursor.close()
+        
+        return jsonify({"message": "Profile updated successfully"})
+        
+    except Exception as e:
+        print(f"Error updating profile: {e}")
+        return jsonify({"error": "Failed to update profile"}), 500
+
+
+@auth_bp.route("/verify_token", methods=["GET"])
+def verify_token():
+    """Verify if token is valid and return user info"""
+    user = get_current_user()
+    if not user:
+        return jsonify({"error": "Invalid or expired token"}), 401
+    
+    return jsonify({
+        "valid": True,
+        "user": {
+            "id": user.id,
+            "firstName": user.first_name,
+            "lastName": user.last_name,
+            "email": user.email,
+            "role": user.role,
+            "assignedLab": user.assigned_lab
+        }
+    })
+
+
+# -----------------------------
+# HOD: Assign Lab Incharge
+# -----------------------------
+@auth_bp.route("/get_lab_incharges", methods=["GET"])
+def get_lab_incharges():
+    """Return all users with role Lab Incharge (HOD only)."""
+    current_user = get_current_user()
+    if not current_user or current_user.role != "HOD":
+        return jsonify({"error": "Unauthorized"}), 403
+
+    conn = db.get_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT id, first_name, last_name, email, role, assigned_lab
+            FROM users
+            WHERE role = %s
+            ORDER BY first_name, last_name
+            """,
+            ("Lab Incharge",)
+        )
+        users = cursor.fetchall()
+        return jsonify({"success": True, "users": users})
+    except Exception as e:
+        print(f"Error fetching lab incharges: {e}")
+        return jsonify({"error": "Failed to fetch lab incharges"}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+
+@auth_bp.route("/assign_lab_incharge", methods=["POST"])
+def assign_lab_incharge():
+    """Assign a lab to a Lab Incharge user (HOD only)."""
+    current_user = get_current_user()
+    if not current_user or current_user.role != "HOD":
+        return jsonify({"error": "Unauthorized"}), 403
+
+    data = request.get_json() or {}
+    user_id = data.get("userId")
+    lab_id = data.get("labId")
+
+    if not user_id or not lab_id:
+        return jsonify({"error": "userId and labId are required"}), 400
+
+    conn = db.get_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    try:
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT lab_id FROM labs WHERE lab_id = %s", (lab_id,))
+        if not cursor.fetchone():
+            return jsonify({"error": "Lab not found"}), 404
+
+        cursor.execute("SELECT id, role FROM users WHERE id = %s", (user_id,))
+        user_row = cursor.fetchone()
+        if not user_row:
+            return jsonify({"error": "User not found"}), 404
+        if user_row.get("role") != "Lab Incharge":
+            return jsonify({"error": "User is not a Lab Incharge"}), 400
+
+        access_scope = {"type": "single", "lab": lab_id}
+        cursor.execute(
+            """
+            UPDATE users
+            SET assigned_lab = %s, access_scope = %s
+            WHERE id = %s
+            RETURNING id, first_name, last_name, email, role, assigned_lab
+            """,
+            (lab_id, json.dumps(access_scope), user_id)
+        )
+        updated_user = cursor.fetchone()
+        conn.commit()
+
+        return jsonify({"success": True, "user": updated_user})
+    except Exception as e:
+        conn.rollback()
+        print(f"Error assigning lab incharge: {e}")
+        return jsonify({"error": "Failed to assign lab"}), 500
+    finally:
+        cursor.close()
+        conn.close()
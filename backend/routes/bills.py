@@ -0,0 +1,1321 @@
+"""
+Bill Routes
+Bill scanning (OCR + regex extraction), uploaded bill files, manual entry,
+bill/device saving and device inventory lookups.
+
+Importing this blueprint pulls in the OCR pipeline, so CRUD-only worker
+pools can leave it out (see ENABLED_BLUEPRINTS in app.py).
+"""
+
+import json
+import os
+import traceback
+from datetime import datetime
+
+from flask import Blueprint, Response, jsonify, request, send_from_directory
+
+from config.database import db
+from services.auth_service import get_current_user
+from services.bill_service import (
+    UPLOAD_DIR,
+    get_extractor,
+    remove_bill_file,
+    store_bill_file,
+)
+from services.classifier_service import classifier_status, invoice_types, record_feedback
+from services.ocr_hedge import OCR_MODE, OcrFailed, extract_scan_text, hedge_stats
+from services.ocr_pool import get_ocr_pool
+from services.qr_service import FORMATS, QRParams, get_qr_renderer, qr_images
+from utils import tracing
+from utils.logging_config import get_logger
+
+# LLM fallback availability check (served from the background health monitor)
+try:
+    from llm_fallback import get_llm_status
+except ImportError:
+    def get_llm_status():
+        return {"available": False, "model": "qwen2.5-3b-instruct"}
+
+bills_bp = Blueprint("bills", __name__)
+logger = get_logger("assetiq.bills")
+
+
+@bills_bp.route("/llm-status", methods=["GET"])
+def llm_status():
+    """Report the local LLM server's last known health (never probes inline)."""
+    status = get_llm_status()
+    return jsonify({**status, "port": 8080})
+
+
+@bills_bp.route("/scan/traces", methods=["GET"])
+def scan_traces():
+    """Recent /scan stage timings kept in memory (newest first, auth required)."""
+    current_user = get_current_user()
+    if not current_user:
+        return jsonify({"error": "Unauthorized"}), 401
+
+    limit = request.args.get("limit", type=int)
+    return jsonify({"traces": tracing.recent_traces(limit)})
+
+
+@bills_bp.route("/scan/regex-stats", methods=["GET"])
+def scan_regex_stats():
+    """Per-pattern regex cost since startup, most expensive first (?template=&sort=&limit=)."""
+    get_extractor()  # puts the template engine on sys.path
+    from regex_extractor import pattern_stats
+
+    sort_by = request.args.get("sort", "total_ms")
+    if sort_by not in ("total_ms", "mean_ms", "worst_ms", "calls", "overruns"):
+        return jsonify({"error": f"Unknown sort key: {sort_by}"}), 400
+    limit = request.args.get("limit", default=50, type=int)
+    return jsonify({
+        "patterns": pattern_stats(template=request.args.get("template"), sort_by=sort_by, limit=limit),
+    })
+
+
+@bills_bp.route("/scan/ocr-stats", methods=["GET"])
+def scan_ocr_stats():
+    """Local tesseract pool and cache usage, plus the Whisperer latency behind the hedge delay."""
+    return jsonify({**get_ocr_pool().stats(), "hedge": hedge_stats()})
+
+
+@bills_bp.route("/scan/feedback", methods=["POST"])
+def scan_feedback():
+    """
+    Record the correct invoice layout for a scan the classifier got wrong
+    (JSON: raw_text, correct_type, optional predicted_type / bill_number).
+    The nightly classifier_retrain job learns from these, so only signed-in
+    users can submit them.
+    """
+    current_user = get_current_user()
+    if not current_user:
+        return jsonify({"error": "Unauthorized"}), 401
+
+    data = request.get_json(silent=True) or {}
+    try:
+        feedback_id = record_feedback(
+            data.get("raw_text") or "",
+            data.get("correct_type") or "",
+            current_user.id,
+            predicted_type=data.get("predicted_type"),
+            bill_number=data.get("bill_number"),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e), "invoice_types": invoice_types()}), 400
+    except Exception as e:
+        logger.exception("Could not record classifier feedback: %s", e)
+        return jsonify({"error": str(e)}), 500
+    return jsonify({"success": True, "feedback_id": feedback_id})
+
+
+@bills_bp.route("/scan/classifier", methods=["GET"])
+def scan_classifier():
+    """Classifier version in use, the promoted version's holdout metrics and the known layouts."""
+    return jsonify({**classifier_status(), "invoice_types": invoice_types()})
+
+
+# ============================================
+# UPDATED SCAN ROUTE
+# ============================================
+@bills_bp.route("/scan", methods=["POST"])
+@tracing.traced("scan")
+def enhanced_ocr_scan():
+    """Enhanced OCR scanning with LLM Whisperer API.
+
+    Pass ``include_timings=true`` (form field or query arg) to get a
+    per-stage ``timings`` block in the response.
+    """
+    try:
+        if "file" not in request.files:
+            return jsonify({"error": "No file uploaded"}), 400
+            
+        file = request.files["file"]
+        filename_lower = file.filename.lower()
+        allowed_extensions = ('.pdf', '.png', '.jpg', '.jpeg')
+        
+        if not filename_lower.endswith(allowed_extensions):
+            return jsonify({"error": "Only PDF, PNG, JPG, and JPEG files are supported"}), 400
+        
+        # Get custom asset ID prefix if provided
+        asset_id_prefix = request.form.get("asset_id_prefix", "").strip()
+        logger.debug("Custom asset ID prefix: '%s'", asset_id_prefix)
+        
+        # Get current user (optional for demo)
+        try:
+            current_user = get_current_user()
+            user_id = current_user.id if current_user else None
+        except:
+            user_id = None
+        
+        # Read file content
+        with tracing.span("upload_read"):
+            file_content = file.read()
+        tracing.count("upload_bytes", len(file_content))
+        
+        # Determine file type
+        is_pdf = filename_lower.endswith('.pdf')
+        
+        # STEP 1: Extract text with LLM Whisperer, raced against local OCR
+        # once it runs slower than usual (see services/ocr_hedge.py)
+        logger.info("Extracting text from %s (OCR mode: %s)", "PDF" if is_pdf else "image", OCR_MODE)
+        try:
+            raw_text, ocr_engine = extract_scan_text(file_content, is_pdf)
+        except OcrFailed as ocr_failed:
+            return jsonify({
+                "error": "Both LLM Whisperer and OCR failed",
+                "llm_whisperer_error": ocr_failed.remote_error,
+                "ocr_error": ocr_failed.local_error,
+                "details": f"Could not extract text from {'PDF' if is_pdf else 'image file'} using any method"
+            }), 500
+        logger.info("Extracted %d characters via %s", len(raw_text), ocr_engine)
+        trace = tracing.current_trace()
+        if trace:
+            trace.set("ocr_engine", ocr_engine)
+        
+        if not raw_text or len(raw_text.strip()) == 0:
+            return jsonify({"error": "No text could be extracted from the PDF"}), 400
+
+        tracing.count("characters", len(raw_text))
+        tracing.count("pages", max(raw_text.count("<<<"), raw_text.count("--- Page "), 1))
+        
+        # STEP 2: Parse extracted text using classifier + regex templates
+        logger.info("Parsing bill information via OCR regex pipeline")
+        logger.debug("Raw text preview (first 1000 chars): %s", raw_text[:1000])
+
+        # Check if user wants LLM fallback (default: yes if available)
+        use_llm = request.form.get("use_llm", "true").lower() != "false"
+
+        try:
+            bill_info, _ = get_extractor().extract_bill_info(raw_text, use_llm_fallback=use_llm)
+        except Exception as parse_error:
+            logger.exception("Parse error: %s", parse_error)
+            return jsonify({
+                "error": f"Parsing Error: {str(parse_error)}",
+                "raw_text": raw_text,
+                "details": "Could not parse the extracted text"
+            }), 500
+        
+        # Validate extraction
+        if not bill_info.bill_number and not bill_info.vendor_name:
+            return jsonify({
+                "error": "Could not extract essential bill information",
+                "raw_text": raw_text,
+                "hint": "The invoice format may not be recognized. Please check the raw text."
+            }), 400
+        
+        logger.info("Extracted bill %s from %s: %d assets, total %s",
+                    bill_info.bill_number, bill_info.vendor_name, len(bill_info.assets), bill_info.total_amount)
+        logger.debug("Bill date: %s, Due date: %s, Tax amount: %s",
+                     bill_info.bill_date, bill_info.due_date, bill_info.tax_amount)
+        
+        # Debug: Log first asset if available
+        if bill_info.assets:
+            first_asset = bill_info.assets[0]
+            logger.debug("First asset - Name: %s, Category: %s, Quantity: %s",
+                         first_asset.name[:50], first_asset.category, first_asset.quantity)
+        
+        # Display-only bill object (no database save during scan)
+        bill_id = f"preview-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        
+        # Build asset records for display only - one for each individual unit
+        created_assets = []
+        qr_payloads = []
+        asset_counter = 1  # Start from 1 for sequential numbering
+        with tracing.span("qr_generation"):
+            for extracted_asset in bill_info.assets:
+                # Get serial numbers (batch numbers) for this item
+                serial_numbers = []
+                if extracted_asset.serial_number:
+                    serial_numbers = [s.strip() for s in extracted_asset.serial_number.split(',') if s.strip()]
+            
+                # Create individual assets - one for each quantity
+                quantity = extracted_asset.quantity
+                logger.debug("Building %d individual assets for display: %s", quantity, extracted_asset.name)
+            
+                for unit_idx in range(quantity):
+                    try:
+                        # Generate unique asset ID for each unit (display only)
+                        if asset_id_prefix:
+                            asset_id = f"{asset_id_prefix}{asset_counter}"
+                        else:
+                            asset_id = f"{extracted_asset.category[:3].upper()}{datetime.now().strftime('%Y%m%d%H%M%S')}{asset_counter}"
+                    
+                        asset_counter += 1
+                    
+                        # Get the specific serial number for this unit (if available)
+                        unit_serial_number = serial_numbers[unit_idx] if unit_idx < len(serial_numbers) else ''
+                    
+                        # QR code with invoice number + vendor name + device code (rendered in one batch below)
+                        qr_payloads.append(f"{bill_info.bill_number}|{bill_info.vendor_name}|{asset_id}")
+                    
+                        created_assets.append({
+                            "asset_id": asset_id,
+                            "name": extracted_asset.name,
+                            "category": extracted_asset.category,
+                            "quantity": 1,
+                            "unit_price": extracted_asset.unit_price,
+                            "total_price": extracted_asset.unit_price,
+                            "qr_code": "",
+                            "brand": extracted_asset.brand,
+                            "model": extracted_asset.model,
+                            "serial_number": unit_serial_number,
+                            "warranty_period": extracted_asset.warranty_period,
+                            "device_type": extracted_asset.device_type
+                        })
+                    
+                        logger.debug("Built asset %d/%d: %s - %s (S/N: %s)",
+                                     unit_idx + 1, quantity, asset_id, extracted_asset.name, unit_serial_number)
+                    
+                    except Exception as e:
+                        logger.exception("Error building asset unit %d/%d: %s", unit_idx + 1, quantity, e)
+                        continue
+
+            # "inline" (default) embeds data-URIs; "url" returns links to cached /qr/<key>.<fmt> files;
+            # "lazy" returns the same links but renders each image only when it is requested
+            qr_mode = request.form.get("qr_mode") or request.args.get("qr_mode") or "inline"
+            qr_format = (request.form.get("qr_format") or request.args.get("qr_format") or "png").lower()
+            try:
+                qr_codes = qr_images(qr_payloads, qr_mode, QRParams(fmt=qr_format))
+                for asset, qr_code in zip(created_assets, qr_codes):
+                    asset["qr_code"] = qr_code
+            except Exception as e:
+                logger.exception("Error generating QR codes: %s", e)
+            for asset, qr_data in zip(created_assets, qr_payloads):
+                asset["qr_data"] = qr_data
+        
+        tracing.count("assets", len(created_assets))
+        logger.info("Total assets built for display: %d", len(created_assets))
+        
+        include_timings = (request.form.get("include_timings") or request.args.get("include_timings") or "").lower() in ("1", "true", "yes")
+        trace = tracing.current_trace()
+        
+        return jsonify({
+            "success": True,
+            "message": f"Successfully processed bill and created {len(created_assets)} assets",
+            "llm_enhanced": getattr(bill_info, 'llm_enhanced', False),
+            "invoice_type": getattr(bill_info, 'invoice_type', None),
+            "ocr_engine": ocr_engine,
+            # Patterns skipped while quarantined by the regex budget; fields
+            # they would have filled may be missing from this result
+            "regex_quarantined_skips": trace.counts.get("regex_quarantined_skips", 0) if trace else 0,
+            "bill_info": {
+                "id": bill_id,
+                "bill_number": bill_info.bill_number,
+                "vendor_name": bill_info.vendor_name,
+                "vendor_gstin": bill_info.vendor_gstin,
+                "vendor_address": bill_info.vendor_address,
+                "vendor_phone": bill_info.vendor_phone,
+                "vendor_email": bill_info.vendor_email,
+                "bill_date": bill_info.bill_date,
+                "due_date": bill_info.due_date,
+                "total_amount": bill_info.total_amount,
+                "tax_amount": bill_info.tax_amount,
+                "discount": bill_info.discount,
+                "warranty_info": bill_info.warranty_info
+            },
+            "assets": created_assets,
+            "raw_text": raw_text,
+            **({"timings": trace.to_dict()} if include_timings and trace else {})
+        })
+        
+    except Exception as e:
+        logger.exception("Error in scan endpoint: %s", e)
+        return jsonify({
+            "error": str(e), 
+            "trace": traceback.format_exc()
+        }), 500
+
+
+@bills_bp.route("/upload_bill_file", methods=["POST"])
+def upload_bill_file():
+    """Upload a bill PDF/image and return its stored path"""
+    try:
+        current_user = get_current_user()
+        if not current_user:
+            return jsonify({"error": "Unauthorized"}), 401
+
+        if "file" not in request.files:
+            return jsonify({"error": "No file uploaded"}), 400
+
+        upload = request.files["file"]
+        invoice_number = request.form.get("invoiceNumber", "")
+        vendor_name = request.form.get("vendorName", "")
+
+        stored_path = store_bill_file(upload, invoice_number, vendor_name)
+        return jsonify({"success": True, "path": stored_path})
+    except Exception as e:
+        print(f"Error uploading bill file: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+
+@bills_bp.route("/delete_bill_file", methods=["POST"])
+def delete_bill_file():
+    """Delete a previously uploaded bill file"""
+    try:
+        current_user = get_current_user()
+        if not current_user:
+            return jsonify({"error": "Unauthorized"}), 401
+
+        data = request.get_json() or {}
+        file_path = (data.get("path") or "").strip()
+        if not file_path:
+            return jsonify({"error": "No file path provided"}), 400
+
+        remove_bill_file(file_path)
+        return jsonify({"success": True})
+    except Exception as e:
+        print(f"Error deleting bill file: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+
+@bills_bp.route("/uploads/<path:filename>", methods=["GET"])
+def serve_bill_file(filename: str):
+    """Serve a stored bill file from uploads directory (auth required)"""
+    current_user = get_current_user()
+    if not current_user:
+        return jsonify({"error": "Unauthorized"}), 401
+
+    safe_name = os.path.basename(filename)
+    if not safe_name:
+        return jsonify({"error": "Invalid filename"}), 400
+
+    return send_from_directory(UPLOAD_DIR, safe_name, as_attachment=False)
+
+
+@bills_bp.route("/save", methods=["POST"])
+def save_ocr_result():
+    """Legacy save endpoint - kept for backward compatibility"""
+    try:
+        data = request.get_json()
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        
+        # Save raw text if provided
+        raw_text = data.get("raw_text", "")
+        if raw_text:
+            with open(f"ocr_raw_{timestamp}.txt", "w", encoding="utf-8") as f:
+                f.write(raw_text)
+        
+        # Save extracted info if provided
+        extracted_info = data.get("extracted_info", {})
+        if extracted_info:
+            with open(f"bill_info_{timestamp}.json", "w", encoding="utf-8") as f:
+                json.dump(extracted_info, f, indent=2, ensure_ascii=False)
+        
+        return jsonify({
+            "message": "OCR result saved successfully",
+            "files_saved": [f"ocr_raw_{timestamp}.txt", f"bill_info_{timestamp}.json"]
+        })
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# -----------------------------
+# Generate QR Codes Endpoint
+# -----------------------------
+@bills_bp.route("/generate_qr", methods=["POST"])
+def generate_qr():
+    """
+    Generate QR code images from a list of data strings.
+    Expects: { "items": [ { "data": "qr_string", "index": 0 }, ... ],
+               "qr_mode": "inline" | "url", "qr_format": "png" | "svg" }
+    Returns: { "qr_codes": [ { "index": 0, "qr_code": "data:image/png;base64,..." }, ... ] }
+    """
+    try:
+        data = request.get_json()
+        items = data.get("items", [])
+
+        if not items:
+            return jsonify({"error": "No items provided"}), 400
+
+        params = QRParams(border=5, error_correction="M", fmt=(data.get("qr_format") or "png").lower())
+        qr_codes = qr_images([item.get("data", "") for item in items], data.get("qr_mode", "inline"), params)
+        results = [
+            {"index": item.get("index", 0), "qr_code": qr_code}
+            for item, qr_code in zip(items, qr_codes)
+        ]
+
+        return jsonify({"qr_codes": results})
+    except Exception as e:
+        print(f"Error generating QR codes: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+
+@bills_bp.route("/qr/<key>.<fmt>", methods=["GET"])
+def serve_qr(key, fmt):
+    """
+    QR image referenced by qr_mode=url / qr_mode=lazy responses. Lazy keys are
+    rendered on the first request. Content-addressed, so it never changes.
+    """
+    if fmt not in FORMATS:
+        return jsonify({"error": f"Unknown QR format: {fmt}"}), 404
+    if request.if_none_match.contains(key):
+        response = Response(status=304)
+    else:
+        data = get_qr_renderer().load(key, fmt)
+        if data is None:
+            return jsonify({"error": "QR code not found"}), 404
+        response = Response(data, mimetype=FORMATS[fmt])
+    response.set_etag(key)
+    response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
+
+
+# -----------------------------
+# Manual Entry Endpoint
+# -----------------------------
+@bills_bp.route("/manual_entry", methods=["POST"])
+def manual_entry():
+    """
+    Create assets from manual entry form data (display only, no database)
+    """
+    try:
+        data = request.get_json()
+        devices = data.get("devices", [])
+        grand_total = data.get("grandTotal", 0)
+        stock_entry = data.get("stockEntry", "")
+        tax_amount = data.get("taxAmount", 0)
+        gstin = data.get("gstin", "")
+
+        if not devices:
+            return jsonify({"error": "No devices provided"}), 400
+
+        # Create a bill ID for display
+        bill_id = f"MANUAL-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+        
+        # Get vendor name from first device
+        vendor_name = devices[0].get("vendorName", "Manual Entry")
+        invoice_no = devices[0].get("invoiceNo", bill_id)
+        
+        # Calculate totals
+        total_amount = sum(device.get("totalAmount", 0) for device in devices)
+        
+        # Create assets from devices (for display only)
+        assets_created = 0
+        created_assets = []
+        qr_payloads = []
+        prefix_counters = {}  # per-prefix counter so each prefix starts at 1
+        
+        for device in devices:
+            device_type = device.get("deviceType", "")
+            dept = device.get("dept", "")
+            material_desc = device.get("materialDescription", "")
+            model_no = device.get("modelNo", "")
+            brand = device.get("brand", "")
+            identity_number = device.get("identityNumber", "")
+            quantity = device.get("quantity", 1)
+            amount_per_pcs = device.get("amountPerPcs", 0)
+
+            # Use identityNumber (prefix code) from user or generate default
+            if identity_number:
+                asset_id_base = identity_number
+            else:
+                # Fallback to auto-generated prefix
+                dept_prefix = ''.join([c for c in dept.upper() if c.isalnum()])[:5]
+                asset_id_base = f"{dept_prefix}/{device_type.upper()[:3]}"
+            
+            # Create multiple assets if quantity > 1
+            for i in range(quantity):
+                if asset_id_base not in prefix_counters:
+                    prefix_counters[asset_id_base] = 1
+                asset_counter = prefix_counters[asset_id_base]
+                prefix_counters[asset_id_base] += 1
+                asset_id = f"{asset_id_base}/{asset_counter}"
+                
+                # QR code with invoice number + device code (rendered in one batch below)
+                device_invoice = device.get("invoiceNo", invoice_no)
+                qr_payloads.append(f"{device_invoice}|{asset_id}")
+                
+                # Add to created assets list
+                created_assets.append({
+                    "asset_id": asset_id,
+                    "name": material_desc,
+                    "category": device_type,
+                    "quantity": 1,
+                    "unit_price": amount_per_pcs,
+                    "total_price": amount_per_pcs,
+                    "qr_code": "",
+                    "brand": brand,
+                    "model": model_no,
+                    "device_type": device_type
+                })
+                
+                assets_created += 1
+
+        qr_codes = qr_images(
+            qr_payloads,
+            data.get("qr_mode", "inline"),
+            QRParams(border=5, error_correction="M", fmt=(data.get("qr_format") or "png").lower()),
+        )
+        for asset, qr_code in zip(created_assets, qr_codes):
+            asset["qr_code"] = qr_code
+
+        # Return response similar to scan endpoint (for display only)
+        return jsonify({
+            "success": True,
+            "message": f"Generated {assets_created} assets for preview",
+            "bill_info": {
+                "id": bill_id,
+                "bill_number": invoice_no,
+                "vendor_name": vendor_name,
+                "vendor_gstin": gstin,
+                "vendor_address": "",
+                "vendor_phone": "",
+                "vendor_email": "",
+                "bill_date": datetime.now().strftime("%Y-%m-%d"),
+                "due_date": "",
+                "total_amount": grand_total if grand_total > 0 else total_amount,
+                "tax_amount": tax_amount,
+                "discount": 0,
+                "warranty_info": ""
+            },
+            "assets": created_assets,
+            "raw_text": f"Manual Entry - Stock: {stock_entry}"
+        })
+
+    except Exception as e:
+        print(f"Error in manual entry: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+
+# -----------------------------
+# Save Bill Endpoint
+# -----------------------------
+@bills_bp.route("/save_bill", methods=["POST"])
+def save_bill():
+    """
+    Save bill information to database with duplicate checking
+    """
+    try:
+        data = request.get_json()
+        
+        # Extract bill information
+        invoice_number = data.get("invoiceNumber", "").strip()
+        vendor_name = data.get("vendorName", "").strip()
+        bill_date = data.get("billDate", "").strip()
+        gstin = data.get("gstin", "").strip()
+        stock_entry = data.get("stockEntry", "").strip()
+        tax_amount = data.get("taxAmount", 0)
+        total_amount = data.get("totalAmount", 0)
+        overwrite = data.get("overwrite", False)
+        bill_file_path = (data.get("billFilePath") or "").strip()
+        
+        # Validate required fields
+        if not invoice_number or not vendor_name:
+            return jsonify({"error": "Invoice Number and Vendor Name are required"}), 400
+        
+        # Convert DD/MM/YYYY to YYYY-MM-DD for database
+        db_bill_date = None
+        if bill_date:
+            try:
+                # Parse DD/MM/YYYY format
+                day, month, year = bill_date.split('/')
+                db_bill_date = f"{year}-{month}-{day}"
+            except:
+                return jsonify({"error": "Invalid date format. Use DD/MM/YYYY"}), 400
+        
+        # Get database connection
+        conn = db.get_connection()
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+        
+        # Check for existing bill with same vendor_name and invoice_number
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT bill_id, path FROM bills WHERE vendor_name = %s AND invoice_number = %s",
+            (vendor_name, invoice_number)
+        )
+        existing_bill = cursor.fetchone()
+        
+        if existing_bill and not overwrite:
+            cursor.close()
+            conn.close()
+            return jsonify({
+                "duplicate": True,
+                "message": "A bill with this vendor name and invoice number already exists."
+            }), 409
+        
+        if existing_bill and overwrite:
+            # Update existing bill
+            existing_path = existing_bill.get("path") if existing_bill else None
+            if bill_file_path and existing_path and bill_file_path != existing_path:
+                remove_bill_file(existing_path)
+
+            cursor.execute(
+                """
+                UPDATE bills 
+                SET gstin = %s, stock_entry = %s, tax_amount = %s, 
+                    total_amount = %s, bill_date = %s, path = %s
+                WHERE bill_id = %s
+                """,
+                (
+                    gstin,
+                    stock_entry,
+                    tax_amount,
+                    total_amount,
+                    db_bill_date,
+                    bill_file_path or existing_path,
+                    existing_bill['bill_id']
+                )
+            )
+            conn.commit()
+            cursor.close()
+            conn.close()
+            return jsonify({
+                "success": True,
+                "message": "Bill updated successfully",
+                "bill_id": existing_bill['bill_id']
+            })
+        else:
+            # Insert new bill
+            cursor.execute(
+                """
+                INSERT INTO bills 
+                (invoice_number, vendor_name, gstin, stock_entry, tax_amount, total_amount, bill_date, path)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                RETURNING bill_id
+                """,
+                (invoice_number, vendor_name, gstin, stock_entry, tax_amount, total_amount, db_bill_date, bill_file_path)
+            )
+            result = cursor.fetchone()
+            bill_id = result['bill_id']
+            conn.commit()
+            cursor.close()
+            conn.close()
+            return jsonify({
+                "success": True,
+                "message": "Bill saved successfully",
+                "bill_id": bill_id
+            })
+    
+    except Exception as e:
+        print(f"Error saving bill: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+
+# -----------------------------
+# Save Devices Endpoint
+# -----------------------------
+@bills_bp.route("/save_devices", methods=["POST"])
+def save_devices():
+    """
+    Save device information to database after bill is saved
+    If devices fail to save, rollback the bill
+    """
+    try:
+        data = request.get_json()
+        
+        # Extract information
+        invoice_number = data.get("invoiceNumber", "").strip()
+        vendor_name = data.get("vendorName", "").strip()
+        devices = data.get("devices", [])
+        order_no = data.get("orderNo", "").strip()
+        order_date = data.get("orderDate", "").strip()
+        central_store_no = data.get("centralStoreNo", "").strip()
+        central_store_date = data.get("centralStoreDate", "").strip()
+        remarks = data.get("remarks", "").strip()
+
+        # Convert DD/MM/YYYY to YYYY-MM-DD for database
+        db_order_date = None
+        if order_date:
+            try:
+                parts = order_date.split('/')
+                if len(parts) == 3:
+                    db_order_date = f"{parts[2]}-{parts[1]}-{parts[0]}"
+            except:
+                db_order_date = None
+
+        db_central_store_date = None
+        if central_store_date:
+            try:
+                parts = central_store_date.split('/')
+                if len(parts) == 3:
+                    db_central_store_date = f"{parts[2]}-{parts[1]}-{parts[0]}"
+            except:
+                db_central_store_date = None
+        
+        if not invoice_number or not vendor_name:
+            return jsonify({"error": "Invoice Number and Vendor Name are required"}), 400
+        
+        if not devices:
+            return jsonify({"error": "No devices to save"}), 400
+        
+        # Get database connection
+        conn = db.get_connection()
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+        
+        cursor = conn.cursor()
+        
+        # NOTE: Schema migrations removed from runtime (assumed already applied).
+        
+        # Fetch bill_id and bill_date from bills table
+        cursor.execute(
+            "SELECT bill_id, bill_date FROM bills WHERE vendor_name = %s AND invoice_number = %s",
+            (vendor_name, invoice_number)
+        )
+        bill_record = cursor.fetchone()
+        
+        if not bill_record:
+            cursor.close()
+            conn.close()
+            return jsonify({"error": "Bill not found. Please save bill information first."}), 404
+        
+        bill_id = bill_record['bill_id']
+        bill_date = bill_record['bill_date']
+        
+        # Delete existing devices with same bill_id and invoice_number
+        # This handles the unique constraint and allows users to update their entries
+        cursor.execute(
+            "DELETE FROM devices WHERE bill_id = %s AND invoice_number = %s",
+            (bill_id, invoice_number)
+        )
+        deleted_count = cursor.rowcount
+        if deleted_count > 0:
+            logger.info("Deleted %d existing devices for bill_id=%s, invoice=%s", deleted_count, bill_id, invoice_number)
+        
+        # Device type mapping (from your image)
+        device_type_map = {
+            "Laptop": 1,
+            "PC": 2,
+            "AC": 3,
+            "Smart Board": 4,
+            "Projector": 5,
+            "Printer": 6,
+            "Scanner": 7,
+            "UPS": 8,
+            "Router": 9,
+            "Switch": 10,
+            "Server": 11,
+            "Monitor": 12,
+            "Keyboard": 13,
+            "Mouse": 14,
+            "Webcam": 15,
+            "Headset": 16,
+            "Other": 17
+        }
+        
+        devices_saved = 0
+        asset_counter = 1
+
+        # Build prefix_counters from DB so numbering continues across bills
+        prefix_codes = set()
+        for device in devices:
+            id_num = device.get("identityNumber", "")
+            if id_num:
+                prefix_codes.add(id_num)
+
+        prefix_counters = {}
+        for prefix in prefix_codes:
+            cursor.execute(
+                "SELECT asset_code FROM devices WHERE asset_code LIKE %s",
+                (prefix + "/%",)
+            )
+            existing = cursor.fetchall()
+            max_counter = 0
+            for row in existing:
+                code = row['asset_code']
+                # The counter is the last segment after the prefix
+                suffix = code[len(prefix)+1:]  # strip "prefix/"
+                try:
+                    num = int(suffix)
+                    if num > max_counter:
+                        max_counter = num
+                except (ValueError, IndexError):
+                    pass
+            prefix_counters[prefix] = max_counter + 1
+
+        # Save each device individually
+        for device in devices:
+            logger.debug("Processing device: %s", device)
+            
+            device_type = device.get("deviceType", "")
+            custom_device_type = device.get("customDeviceType", "")
+            dept = device.get("dept", "")
+            material_desc = device.get("materialDescription", "")
+            model_no = device.get("modelNo", "")
+            brand = device.get("brand", "")
+            warranty = device.get("warranty", "0")
+            quantity = device.get("quantity", 1)
+            unit_price = device.get("amountPerPcs", 0)
+            identity_number = device.get("identityNumber", "")
+            qr_value = device.get("qrValue", "")
+            
+            logger.debug("Device type='%s' dept='%s' brand='%s' quantity=%s", device_type, dept, brand, quantity)
+            
+            # Get type_id from mapping
+            type_id = device_type_map.get(device_type, 17)  # Default to 17 (Other)
+            
+            # Parse warranty years (extract numeric value)
+            warranty_years = 0
+            try:
+                # Extract numbers from warranty string (e.g., "2 years" -> 2)
+                import re
+                warranty_match = re.search(r'\d+', str(warranty))
+                if warranty_match:
+                    warranty_years = int(warranty_match.group())
+            except:
+                warranty_years = 0
+            
+            # Create individual device entries based on quantity
+            for i in range(quantity):
+                # Generate asset_code using identity number prefix
+                if identity_number:
+                    # Use per-prefix counter so each prefix starts from 1
+                    if identity_number not in prefix_counters:
+                        prefix_counters[identity_number] = 1
+                    counter = prefix_counters[identity_number]
+                    generated_asset_code = f"{identity_number}/{counter}"
+                    prefix_counters[identity_number] += 1
+                else:
+                    # Fallback: Generate asset code from DEPT/DEVICETYPE/COUNTER
+                    dept_prefix = dept.upper()  # Keep full department name
+                    device_prefix = device_type.upper()[:2]
+                    generated_asset_code = f"{dept_prefix}/{device_prefix}/{asset_counter}"
+                
+                # Generate QR value if not provided
+                if not qr_value:
+                    generated_qr_value = f"{invoice_number}|{vendor_name}|{generated_asset_code}"
+                else:
+                    generated_qr_value = qr_value
+                
+                # Insert device into database
+                logger.debug(
+                    "Inserting device: asset_code='%s', type_id=%s, brand='%s', model='%s', spec='%s', price=%s, "
+                    "date=%s, bill_id=%s, dept='%s', warranty=%s, invoice='%s', qr='%s'",
+                    generated_asset_code, type_id, brand, model_no, material_desc, unit_price,
+                    bill_date, bill_id, dept, warranty_years, invoice_number, generated_qr_value,
+                )
+                
+                cursor.execute(
+                    """
+                    INSERT INTO devices 
+                    (asset_code, type_id, brand, model, specification, unit_price, purchase_date, 
+                     bill_id, dept, warranty_years, is_active, invoice_number, qr_value,
+                     order_no, order_date, central_store_no, central_store_date, remarks)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    """,
+                    (generated_asset_code, type_id, brand, model_no, material_desc, unit_price, 
+                     bill_date, bill_id, dept, warranty_years, False, invoice_number, generated_qr_value,
+                     order_no, db_order_date, central_store_no, db_central_store_date, remarks)
+                )
+                
+                logger.debug("Inserted device with asset_code: %s, dept: '%s'", generated_asset_code, dept)
+                
+                devices_saved += 1
+                asset_counter += 1
+        
+        conn.commit()
+        cursor.close()
+        conn.close()
+        
+        return jsonify({
+            "success": True,
+            "message": f"Successfully saved {devices_saved} devices",
+            "devices_saved": devices_saved
+        })
+    
+    except Exception as e:
+        logger.exception("Error saving devices: %s", e)
+        
+        # ROLLBACK: Delete the bill if devices failed to save
+        try:
+            if 'bill_id' in locals() and 'invoice_number' in locals() and 'vendor_name' in locals():
+                rollback_conn = db.get_connection()
+                if rollback_conn:
+                    rollback_cursor = rollback_conn.cursor()
+                    rollback_cursor.execute(
+                        "DELETE FROM bills WHERE bill_id = %s AND invoice_number = %s AND vendor_name = %s",
+                        (bill_id, invoice_number, vendor_name)
+                    )
+                    rollback_conn.commit()
+                    rollback_cursor.close()
+                    rollback_conn.close()
+                    logger.warning("Rolled back bill_id=%s due to device save failure", bill_id)
+        except Exception as rollback_error:
+            logger.error("Rollback failed: %s", rollback_error)
+        
+        return jsonify({"error": str(e)}), 500
+
+
+# -----------------------------
+# Search Devices Endpoint
+# -----------------------------
+@bills_bp.route("/search_devices", methods=["GET"])
+def search_devices():
+    """
+    Search for unassigned devices by type_id and group them by brand, model, specification
+    """
+    try:
+        type_id = request.args.get("type_id")
+        
+        if not type_id:
+            return jsonify({"error": "type_id is required"}), 400
+        
+        # Device type mapping (same as in save_devices endpoint)
+        device_type_map = {
+            1: "Laptop",
+            2: "PC",
+            3: "AC",
+            4: "Smart Board",
+            5: "Projector",
+            6: "Printer",
+            7: "Scanner",
+            8: "UPS",
+            9: "Router",
+            10: "Switch",
+            11: "Server",
+            12: "Monitor",
+            13: "Keyboard",
+            14: "Mouse",
+            15: "Webcam",
+            16: "Headset",
+            17: "Other"
+        }
+        
+        device_type_name = device_type_map.get(int(type_id), "Unknown")
+        
+        # Get database connection
+        conn = db.get_connection()
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+        
+        cursor = conn.cursor()
+        
+        # Query to group devices by bill_id, brand, model, specification
+        # Only get devices that are truly free (no assigned_code AND not pooled to any lab)
+        query = """
+            SELECT 
+                type_id,
+                bill_id,
+                brand,
+                model,
+                specification,
+                unit_price,
+                purchase_date,
+                invoice_number,
+                COUNT(*) as quantity
+            FROM devices
+            WHERE type_id = %s 
+                AND (assigned_code IS NULL OR assigned_code = '')
+                AND lab_id IS NULL
+            GROUP BY type_id, bill_id, brand, model, specification, unit_price, purchase_date, invoice_number
+            ORDER BY brand, model
+        """
+        
+        cursor.execute(query, (type_id,))
+        results = cursor.fetchall()
+        
+        # Format results
+        grouped_devices = []
+        for row in results:
+            grouped_devices.append({
+                "type": device_type_name,
+                "typeId": row['type_id'],
+                "billId": row['bill_id'],
+                "brand": row['brand'],
+                "model": row['model'],
+                "specification": row['specification'],
+                "unitPrice": float(row['unit_price']) if row['unit_price'] else None,
+                "purchaseDate": row['purchase_date'].strftime("%Y-%m-%d") if row['purchase_date'] else None,
+                "invoiceNumber": row['invoice_number'],
+                "quantity": row['quantity']
+            })
+        
+        cursor.close()
+        conn.close()
+        
+        return jsonify({
+            "success": True,
+            "devices": grouped_devices,
+            "total_groups": len(grouped_devices)
+        })
+    
+    except Exception as e:
+        print(f"Error searching devices: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+
+# -----------------------------
+# Update Device Type
+# -----------------------------
+@bills_bp.route("/update_device_type", methods=["POST"])
+def update_device_type():
+    """
+    Update the type_id of a device.
+    Expects JSON: { deviceId, newTypeId }
+    """
+    try:
+        data = request.get_json(force=True)
+        device_id = data.get("deviceId")
+        new_type_id = data.get("newTypeId")
+
+        if not device_id or new_type_id is None:
+            return jsonify({"success": False, "error": "deviceId and newTypeId are required"}), 400
+
+        new_type_id = int(new_type_id)
+        if new_type_id < 1 or new_type_id > 17:
+            return jsonify({"success": False, "error": "Invalid type_id"}), 400
+
+        conn = db.get_connection()
+        if not conn:
+            return jsonify({"success": False, "error": "Database connection failed"}), 500
+
+        cursor = conn.cursor()
+
+        # Verify device exists
+        cursor.execute("SELECT device_id, type_id FROM devices WHERE device_id = %s", (device_id,))
+        device_row = cursor.fetchone()
+        if not device_row:
+            cursor.close()
+            conn.close()
+            return jsonify({"success": False, "error": "Device not found"}), 404
+
+        old_type_id = device_row['type_id']
+
+        # Update type_id
+        cursor.execute("UPDATE devices SET type_id = %s WHERE device_id = %s", (new_type_id, device_id))
+        conn.commit()
+
+        # Get new type name
+        cursor.execute("SELECT name FROM equipment_types WHERE type_id = %s", (new_type_id,))
+        type_row = cursor.fetchone()
+        new_type_name = type_row['name'] if type_row else 'Unknown'
+
+        cursor.close()
+        conn.close()
+
+        print(f"Device {device_id} type changed from {old_type_id} to {new_type_id} ({new_type_name})")
+
+        return jsonify({
+            "success": True,
+            "message": f"Device type updated to {new_type_name}",
+            "deviceId": device_id,
+            "oldTypeId": old_type_id,
+            "newTypeId": new_type_id,
+            "newTypeName": new_type_name
+        })
+
+    except Exception as e:
+        print(f"Error updating device type: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+# -----------------------------
+# Get All Devices Endpoint
+# -----------------------------
+@bills_bp.route("/get_all_devices", methods=["GET"])
+def get_all_devices():
+    """
+    Fetch all devices from the database with their details including lab assignments
+    """
+    try:
+        conn = db.get_connection()
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+        
+        cursor = conn.cursor()
+        
+        # Query to get all devices with equipment type name and lab name
+        include_inactive = (request.args.get("include_inactive") in ["1", "true", "True", "yes", "YES"])
+        active_filter = "" if include_inactive else "WHERE d.is_active = TRUE"
+
+        query = f"""
+            SELECT 
+                d.device_id,
+                d.asset_code as asset_id,
+                d.assigned_code,
+                d.lab_id,
+                l.lab_name,
+                d.type_id,
+                et.name as type_name,
+                d.brand,
+                d.model,
+                d.specification,
+                d.invoice_number,
+                d.bill_id,
+                d.purchase_date,
+                d.unit_price,
+                d.is_active,
+                d.warranty_years,
+                CASE 
+                    WHEN d.purchase_date IS NOT NULL AND d.warranty_years > 0 
+                    THEN d.purchase_date + (d.warranty_years || ' years')::interval
+                    ELSE NULL
+                END as warranty_expiry,
+                d.qr_value
+            FROM devices d
+            LEFT JOIN equipment_types et ON d.type_id = et.type_id
+            LEFT JOIN labs l ON d.lab_id = l.lab_id
+            {active_filter}
+            ORDER BY et.name, d.brand, d.model, d.device_id
+        """
+        
+        cursor.execute(query)
+        devices = cursor.fetchall()
+        
+        cursor.close()
+        conn.close()
+        
+        return jsonify({
+            "success": True,
+            "devices": devices,
+            "total": len(devices)
+        })
+    
+    except Exception as e:
+        print(f"Error fetching all devices: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+
+# -----------------------------
+# Get Bill Details by Bill ID
+# -----------------------------
+@bills_bp.route("/get_bill/<int:bill_id>", methods=["GET"])
+def get_bill(bill_id):
+    """
+    Get bill details by bill_id
+    """
+    try:
+        print(f"Fetching bill details for bill_id: {bill_id}")
+        conn = db.get_connection()
+        if not conn:
+            print("Database connection failed")
+            return jsonify({"success": False, "error": "Database connection failed"}), 500
+        
+        cursor = conn.cursor()
+        
+        # Fetch bill details
+        cursor.execute(
+            """SELECT bill_id, invoice_number, vendor_name, gstin, 
+                      bill_date, total_amount, tax_amount, stock_entry
+               FROM bills 
+               WHERE bill_id = %s""",
+            (bill_id,)
+        )
+        bill = cursor.fetchone()
+        
+        if not bill:
+            print(f"Bill not found for bill_id: {bill_id}")
+            cursor.close()
+            conn.close()
+            return jsonify({"success": False, "error": "Bill not found"}), 404
+        
+        print(f"Bill found: {bill['invoice_number']}")
+        
+        # Fetch devices associated with this bill
+        cursor.execute(
+            """SELECT asset_code, type_id, brand, model, specification,
+                      unit_price, purchase_date, assigned_code, lab_id,
+                      warranty_years, is_active, invoice_number, dept, qr_value
+               FROM devices
+               WHERE bill_id = %s""",
+            (bill_id,)
+        )
+        devices = cursor.fetchall()
+        print(f"Found {len(devices)} devices for this bill")
+        
+        cursor.close()
+        conn.close()
+        
+        return jsonify({
+            "success": True,
+            "bill": {
+                "billId": bill['bill_id'],
+                "invoiceNumber": bill['invoice_number'],
+                "vendorName": bill['vendor_name'],
+                "vendorGstin": bill['gstin'],
+                "billDate": bill['bill_date'].strftime("%Y-%m-%d") if bill['bill_date'] else None,
+                "totalAmount": float(bill['total_amount']) if bill['total_amount'] else 0,
+                "taxAmount": float(bill['tax_amount']) if bill['tax_amount'] else 0,
+                "stockEntry": bill['stock_entry']
+            },
+            "devices": [
+                {
+                    "assetCode": device['asset_code'],
+                    "typeId": device['type_id'],
+                    "brand": device['brand'],
+                    "model": device['model'],
+                    "specification": device['specification'],
+                    "unitPrice": float(device['unit_price']) if device['unit_price'] else 0,
+                    "purchaseDate": device['purchase_date'].strftime("%Y-%m-%d") if device['purchase_date'] else None,
+                    "assignedCode": device['assigned_code'],
+                    "labId": device['lab_id'],
+                    "warrantyYears": device['warranty_years'],
+                    "isActive": device['is_active'],
+                    "invoiceNumber": device['invoice_number'],
+                    "dept": device['dept'],
+                    "qrValue": device['qr_value']
+                }
+                for device in devices
+            ]
+        })
+    
+    except Exception as e:
+        print(f"Error fetching bill: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+# -----------------------------
+# Get All Bills
+# -----------------------------
+@bills_bp.route("/get_all_bills", methods=["GET"])
+def get_all_bills():
+    """Get all bills from the database"""
+    try:
+        conn = db.get_connection()
+        if not conn:
+            return jsonify({"success": False, "error": "Database connection failed"}), 500
+        
+        cursor = conn.cursor()
+        
+        # Get all bills with device count
+        query = """
+            SELECT 
+                b.*,
+                COUNT(d.device_id) as items_count
+            FROM bills b
+            LEFT JOIN devices d ON b.bill_id = d.bill_id
+            GROUP BY b.bill_id
+            ORDER BY b.bill_date DESC
+        """
+        
+        cursor.execute(query)
+        bills = cursor.fetchall()
+        cursor.close()
+        conn.close()
+        
+        # Format the response
+        formatted_bills = []
+        for bill in bills:
+            formatted_bills.append({
+                "id": bill['bill_id'],
+                "billNo": bill['invoice_number'],
+                "supplier": bill['vendor_name'],
+                "date": bill['bill_date'].strftime("%Y-%m-%d") if bill['bill_date'] else None,
+                "amount": float(bill['total_amount']) if bill['total_amount'] else 0,
+                "taxAmount": float(bill['tax_amount']) if bill['tax_amount'] else 0,
+                "gstin": bill['gstin'],
+                "stockEntry": bill['stock_entry'],
+                "items": bill['items_count'],
+                "path": bill.get("path")
+            })
+        
+        return jsonify({
+            "success": True,
+            "bills": formatted_bills
+        })
+    
+    except Exception as e:
+        print(f"Error fetching bills: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"success": False, "error": str(e)}), 500
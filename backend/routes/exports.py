@@ -0,0 +1,891 @@
+"""
+Export Routes
+PDF / Excel exports (lab station list, transfer history) and the dead stock register.
+"""
+
+import csv
+import json
+import os
+import traceback
+from datetime import datetime
+from io import BytesIO, StringIO
+
+from flask import Blueprint, jsonify, send_file
+
+from config.database import db
+from services.transfer_service import resolve_transfer_dest_cell
+
+exports_bp = Blueprint("exports", __name__)
+
+# header.png lives in backend/, one level above this package
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# -----------------------------
+# Export Lab Station List to PDF
+# -----------------------------
+@exports_bp.route("/export_lab_station_pdf/<lab_id>", methods=["GET"])
+def export_lab_station_pdf(lab_id):
+    """
+    Generate PDF with lab station details including header image
+    """
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image as RLImage
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import inch
+    from reportlab.lib.enums import TA_CENTER
+    try:
+        conn = db.get_connection()
+        cursor = conn.cursor()
+        
+        # Get lab info
+        cursor.execute(
+            """SELECT lab_id, lab_name FROM labs WHERE lab_id = %s""",
+            (lab_id,)
+        )
+        lab = cursor.fetchone()
+        
+        if not lab:
+            return jsonify({"success": False, "error": "Lab not found"}), 404
+        
+        # Get all stations with their devices
+        cursor.execute(
+            """SELECT 
+                ls.station_id,
+                ls.assigned_code,
+                lgc.row_number,
+                lgc.column_number,
+                lgc.os_windows,
+                lgc.os_linux,
+                lgc.os_other,
+                lsd.device_id,
+                lsd.device_type,
+                lsd.brand,
+                lsd.model,
+                lsd.specification,
+                lsd.invoice_number,
+                lsd.is_linked,
+                lsd.linked_group_id,
+                d.asset_code,
+                d.unit_price,
+                d.warranty_years,
+                d.purchase_date,
+                d.is_active,
+                d.assigned_code AS device_assigned_code
+            FROM lab_stations ls
+            LEFT JOIN lab_grid_cells lgc ON ls.station_id = lgc.station_id
+            LEFT JOIN lab_station_devices lsd ON ls.station_id = lsd.station_id
+            LEFT JOIN devices d ON lsd.device_id = d.device_id
+            WHERE ls.lab_id = %s
+            ORDER BY ls.assigned_code, lsd.device_type""",
+            (lab_id,)
+        )
+        results = cursor.fetchall()
+        
+        # Get all device IDs for issue lookup
+        device_ids = [row['device_id'] for row in results if row['device_id']]
+        
+        # Fetch issues for all devices
+        issues_map = {}
+        if device_ids:
+            cursor.execute(
+                """SELECT di.issue_id, di.device_id, di.issue_title, di.description,
+                          LOWER(di.status) AS status, di.reported_at,
+                          COALESCE(di.severity, 'medium') AS severity,
+                          COALESCE(di.reported_by, 'System') AS reported_by
+                   FROM device_issues di
+                   WHERE di.device_id = ANY(%s)
+                     AND LOWER(di.status) != 'resolved'
+                   ORDER BY di.reported_at DESC""",
+                (device_ids,)
+            )
+            issues = cursor.fetchall()
+            for issue in issues:
+                dev_id = issue['device_id']
+                if dev_id not in issues_map:
+                    issues_map[dev_id] = []
+                issues_map[dev_id].append({
+                    'issueId': issue['issue_id'],
+                    'title': issue['issue_title'],
+                    'description': issue['description'],
+                    'severity': issue['severity'],
+                    'status': issue['status'],
+                    'reportedAt': issue['reported_at'].isoformat() if issue['reported_at'] else None,
+                    'reportedBy': issue['reported_by'],
+                })
+        
+        # Group by station
+        stations_map = {}
+        for row in results:
+            station_id = row['station_id']
+            assigned_code = row['assigned_code']
+            
+            if station_id not in stations_map:
+                # Build OS list
+                os_list = []
+                if row['os_windows']:
+                    os_list.append('Windows')
+                if row['os_linux']:
+                    os_list.append('Linux')
+                if row['os_other']:
+                    os_list.append('Other')
+                
+                stations_map[station_id] = {
+                    'stationId': station_id,
+                    'assignedCode': assigned_code,
+                    'row': row['row_number'],
+                    'column': row['column_number'],
+                    'os': ', '.join(os_list) if os_list else 'N/A',
+                    'devices': []
+                }
+            
+            # Add device if exists
+            if row['device_id']:
+                device_id = row['device_id']
+                device_data = {
+                    'deviceId': device_id,
+                    'type': row['device_type'],
+                    'brand': row['brand'],
+                    'model': row['model'],
+                    'specification': row['specification'],
+                    'assetCode': row['asset_code'],
+                    'unitPrice': float(row['unit_price']) if row['unit_price'] else 0,
+                    'warrantyYears': row['warranty_years'],
+                    'purchaseDate': row['purchase_date'].strftime('%Y-%m-%d') if row['purchase_date'] else None,
+                    'invoiceNumber': row['invoice_number'],
+                    'isLinked': row['is_linked'],
+                    'linkedGroupId': row['linked_group_id'],
+                    'isActive': row['is_active'],
+                    'issues': issues_map.get(device_id, [])
+                }
+                stations_map[station_id]['devices'].append(device_data)
+        
+        # Convert to list
+        stations_list = list(stations_map.values())
+        
+        cursor.close()
+        conn.close()
+        
+        # Generate PDF
+        pdf_buffer = BytesIO()
+        doc = SimpleDocTemplate(pdf_buffer, pagesize=A4, topMargin=0.5*inch)
+        elements = []
+        styles = getSampleStyleSheet()
+        cell_style = ParagraphStyle(
+            'TransferCell',
+            parent=styles['Normal'],
+            fontSize=7,
+            leading=9
+        )
+        cell_style = ParagraphStyle(
+            'TransferCell',
+            parent=styles['Normal'],
+            fontSize=7,
+            leading=9
+        )
+        
+        # Add header image if exists
+        header_path = os.path.join(BACKEND_DIR, 'header.png')
+        if os.path.exists(header_path):
+            img = RLImage(header_path, width=7*inch, height=1*inch)
+            elements.append(img)
+            elements.append(Spacer(1, 0.3*inch))
+        
+        # Add title
+        title_style = ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=18,
+            textColor=colors.HexColor('#1a1a1a'),
+            spaceAfter=20,
+            alignment=TA_CENTER
+        )
+        title = Paragraph(f"<b>{lab['lab_name']} - Station Details</b>", title_style)
+        elements.append(title)
+        elements.append(Spacer(1, 0.2*inch))
+        
+        # Create table data — skip empty stations
+        for station in stations_list:
+            if not station['devices'] or len(station['devices']) == 0:
+                continue
+
+            # Station header
+            station_header = Paragraph(
+                f"<b>Station: {station['assignedCode']}</b> | OS: {station['os']}",
+                styles['Heading3']
+            )
+            elements.append(station_header)
+            elements.append(Spacer(1, 0.1*inch))
+            
+            # Device table with more columns
+            table_data = [['Device', 'Brand/Model', 'Prefix Code', 'Asset Code', 'Spec', 'Price', 'Warranty']]
+            
+            for device in station['devices']:
+                table_data.append([
+                    device['type'],
+                    f"{device['brand']} {device['model']}",
+                    device.get('assetCode') or 'N/A',
+                    device.get('assetCode') or 'N/A',
+                    (device['specification'] or 'N/A')[:30],
+                    f"Rs.{device['unitPrice']:.0f}" if device.get('unitPrice') else 'N/A',
+                    f"{device['warrantyYears']}y" if device.get('warrantyYears') else 'N/A'
+                ])
+            
+            device_table = Table(table_data, colWidths=[0.9*inch, 1.5*inch, 1.1*inch, 1.1*inch, 1.0*inch, 0.7*inch, 0.5*inch])
+            device_table.setStyle(TableStyle([
+                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('FONTSIZE', (0, 0), (-1, 0), 8),
+                ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
+                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+                ('GRID', (0, 0), (-1, -1), 1, colors.black),
+                ('FONTSIZE', (0, 1), (-1, -1), 7),
+                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ]))
+            elements.append(device_table)
+            elements.append(Spacer(1, 0.3*inch))
+        
+        # Build PDF
+        doc.build(elements)
+        pdf_buffer.seek(0)
+        
+        # Return PDF file
+        return send_file(
+            pdf_buffer,
+            mimetype='application/pdf',
+            as_attachment=True,
+            download_name=f"{lab['lab_name']}_station_details.pdf"
+        )
+    
+    except Exception as e:
+        print(f"Error generating PDF: {str(e)}")
+        traceback.print_exc()
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+
+# -----------------------------
+# Get Dead Stock Register Data
+# -----------------------------
+@exports_bp.route("/get_deadstock_register", methods=["GET"])
+def get_deadstock_register():
+    """Get dead stock register data grouped by lab stations with linked devices"""
+    try:
+        conn = db.get_connection()
+        if not conn:
+            return jsonify({"success": False, "error": "Database connection failed"}), 500
+        
+        cursor = conn.cursor()
+        
+        # Get all stations with their devices and lab information
+        query = """
+            SELECT 
+                ls.station_id,
+                ls.assigned_code,
+                ls.lab_id,
+                l.lab_name,
+                lsd.device_id,
+                lsd.device_type,
+                lsd.brand,
+                lsd.model,
+                lsd.specification,
+                lsd.invoice_number,
+                lsd.bill_id,
+                lsd.is_linked,
+                lsd.linked_group_id,
+                d.asset_code,
+                d.assigned_code AS device_assigned_code,
+                d.unit_price,
+                d.warranty_years,
+                d.purchase_date,
+                d.dept,
+                b.vendor_name,
+                b.gstin,
+                b.bill_date,
+                b.stock_entry
+            FROM lab_stations ls
+            JOIN labs l ON ls.lab_id = l.lab_id
+            LEFT JOIN lab_station_devices lsd ON ls.station_id = lsd.station_id
+            LEFT JOIN devices d ON lsd.device_id = d.device_id
+            LEFT JOIN bills b ON lsd.bill_id = b.bill_id
+            WHERE lsd.device_id IS NOT NULL
+            ORDER BY l.lab_name, ls.assigned_code, lsd.device_type
+        """
+        
+        cursor.execute(query)
+        results = cursor.fetchall()
+        
+        deadstock_entries = []
+        sr_no = 1
+
+        for row in results:
+            if not row['device_id']:
+                continue
+
+            device_type = row['device_type'] or "Unknown"
+            desc_parts = [device_type]
+            if row['brand']:
+                desc_parts.append(row['brand'])
+            if row['model']:
+                desc_parts.append(row['model'])
+            item_description = " ".join(desc_parts)
+
+            unit_price = float(row['unit_price']) if row['unit_price'] else 0
+            purchase_date = row['purchase_date'].strftime("%d/%m/%Y") if row['purchase_date'] else ""
+
+            deadstock_entries.append({
+                "srNo": str(sr_no),
+                "labName": row['lab_name'],
+                "status": "Active",
+                "stationCode": row['assigned_code'],
+                "itemDescription": item_description,
+                "deviceCount": 1,
+                "devices": [],
+                "supplierInfo": row['vendor_name'] or "",
+                "orderNo": row['gstin'] or "",
+                "billNo": row['invoice_number'] or "",
+                "billDate": row['bill_date'].strftime("%d/%m/%Y") if row['bill_date'] else "",
+                "centralStore": row['stock_entry'] or "",
+                "quantity": "01",
+                "ratePerUnit": f"{unit_price:.2f}/-",
+                "cost": f"{unit_price:.2f}/-",
+                "dateOfDelivery": purchase_date,
+                "dateOfInstallation": purchase_date,
+                "identityNo": row['asset_code'] or "",
+                "assignedCode": row['device_assigned_code'] or "",
+                "remark": row['dept'] or "",
+                "signOfLabInCharge": "",
+                "warrantyYears": row['warranty_years'] or 0,
+                "deviceType": device_type,
+                "brand": row['brand'] or "",
+                "model": row['model'] or "",
+                "specification": row['specification'] or "",
+                "assetCode": row['asset_code'] or "",
+                "unitPrice": unit_price
+            })
+            sr_no += 1
+
+        # Also include unassigned devices (not in any station and not pooled)
+        unassigned_query = """
+            SELECT
+                d.device_id,
+                d.type_id,
+                et.name AS device_type,
+                d.brand,
+                d.model,
+                d.specification,
+                d.unit_price,
+                d.warranty_years,
+                d.purchase_date,
+                d.dept,
+                d.asset_code,
+            d.assigned_code,
+                d.bill_id,
+                d.invoice_number,
+                b.vendor_name,
+                b.gstin,
+                b.bill_date,
+                b.stock_entry
+            FROM devices d
+            LEFT JOIN bills b ON d.bill_id = b.bill_id
+            LEFT JOIN equipment_types et ON d.type_id = et.type_id
+            LEFT JOIN lab_station_devices lsd ON d.device_id = lsd.device_id
+            WHERE lsd.device_id IS NULL
+              AND (d.assigned_code IS NULL OR d.assigned_code = '')
+              AND d.lab_id IS NULL
+                            AND NOT EXISTS (
+                                    SELECT 1 FROM scrapped_devices sd WHERE sd.device_id = d.device_id
+                            )
+            ORDER BY b.bill_date DESC, d.device_id
+        """
+
+        cursor.execute(unassigned_query)
+        unassigned_rows = cursor.fetchall()
+
+        scrapped_query = """
+            SELECT
+                sd.device_id,
+                sd.device_type,
+                sd.brand,
+                sd.model,
+                sd.specification,
+                sd.asset_code,
+                sd.station_code,
+                sd.lab_name,
+                sd.cost,
+                sd.scrapped_at,
+                d.warranty_years,
+                d.purchase_date,
+                d.dept,
+                d.assigned_code,
+                b.vendor_name,
+                b.gstin,
+                b.bill_date,
+                b.stock_entry,
+                COALESCE(b.invoice_number, d.invoice_number) AS invoice_number
+            FROM scrapped_devices sd
+            LEFT JOIN devices d ON sd.device_id = d.device_id
+            LEFT JOIN bills b ON d.bill_id = b.bill_id
+            ORDER BY sd.scrapped_at DESC NULLS LAST, sd.device_id
+        """
+
+        cursor.execute(scrapped_query)
+        scrapped_rows = cursor.fetchall()
+        cursor.close()
+        conn.close()
+
+        for row in unassigned_rows:
+            device_type = row['device_type'] or "Unknown"
+            desc_parts = [device_type]
+            if row['brand']:
+                desc_parts.append(row['brand'])
+            if row['model']:
+                desc_parts.append(row['model'])
+            item_description = " ".join(desc_parts)
+
+            unit_price = float(row['unit_price']) if row['unit_price'] else 0
+            purchase_date = row['purchase_date'].strftime("%d/%m/%Y") if row['purchase_date'] else ""
+
+            deadstock_entries.append({
+                "srNo": str(sr_no),
+                "labName": "Unassigned",
+                "status": "Unassigned",
+                "stationCode": "UNASSIGNED",
+                "itemDescription": item_description,
+                "deviceCount": 1,
+                "devices": [],
+                "supplierInfo": row['vendor_name'] or "",
+                "orderNo": row['gstin'] or "",
+                "billNo": row['invoice_number'] or "",
+                "billDate": row['bill_date'].strftime("%d/%m/%Y") if row['bill_date'] else "",
+                "centralStore": row['stock_entry'] or "",
+                "quantity": "01",
+                "ratePerUnit": f"{unit_price:.2f}/-",
+                "cost": f"{unit_price:.2f}/-",
+                "dateOfDelivery": purchase_date,
+                "dateOfInstallation": purchase_date,
+                "identityNo": row['asset_code'] or "",
+                "assignedCode": row['assigned_code'] or "",
+                "remark": row['dept'] or "",
+                "signOfLabInCharge": "",
+                "warrantyYears": row['warranty_years'] or 0,
+                "deviceType": device_type,
+                "brand": row['brand'] or "",
+                "model": row['model'] or "",
+                "specification": row['specification'] or "",
+                "assetCode": row['asset_code'] or "",
+                "unitPrice": unit_price
+            })
+            sr_no += 1
+
+        for row in scrapped_rows:
+            device_type = row['device_type'] or "Unknown"
+            desc_parts = [device_type]
+            if row['brand']:
+                desc_parts.append(row['brand'])
+            if row['model']:
+                desc_parts.append(row['model'])
+            item_description = " ".join(desc_parts)
+
+            cost_value = float(row['cost']) if row.get('cost') is not None else 0
+            purchase_date = row['purchase_date'].strftime("%d/%m/%Y") if row.get('purchase_date') else ""
+
+            deadstock_entries.append({
+                "srNo": str(sr_no),
+                "labName": row.get('lab_name') or "Unknown",
+                "status": "Scrapped",
+                "stationCode": row.get('station_code') or "SCRAPPED",
+                "itemDescription": item_description,
+                "deviceCount": 1,
+                "devices": [],
+                "supplierInfo": row.get('vendor_name') or "",
+                "orderNo": row.get('gstin') or "",
+                "billNo": row.get('invoice_number') or "",
+                "billDate": row.get('bill_date').strftime("%d/%m/%Y") if row.get('bill_date') else "",
+                "centralStore": row.get('stock_entry') or "",
+                "quantity": "01",
+                "ratePerUnit": f"{cost_value:.2f}/-",
+                "cost": f"{cost_value:.2f}/-",
+                "dateOfDelivery": purchase_date,
+                "dateOfInstallation": purchase_date,
+                "identityNo": row.get('asset_code') or "",
+                "assignedCode": row.get('assigned_code') or "",
+                "remark": row.get('dept') or "",
+                "signOfLabInCharge": "",
+                "warrantyYears": row.get('warranty_years') or 0,
+                "deviceType": device_type,
+                "brand": row.get('brand') or "",
+                "model": row.get('model') or "",
+                "specification": row.get('specification') or "",
+                "assetCode": row.get('asset_code') or "",
+                "unitPrice": cost_value,
+            })
+            sr_no += 1
+        
+        return jsonify({
+            "success": True,
+            "deadstock": deadstock_entries
+        })
+    
+    except Exception as e:
+        print(f"Error fetching deadstock register: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@exports_bp.route('/export_transfer_history_excel', methods=['GET'])
+def export_transfer_history_excel():
+    """Export transfer history to CSV (Excel compatible)."""
+    try:
+        conn = db.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            SELECT 1
+            FROM information_schema.columns
+            WHERE table_name = 'transfer_requests' AND column_name = 'device_dest_map'
+        """)
+        has_device_dest_map = cursor.fetchone() is not None
+
+        if has_device_dest_map:
+            cursor.execute("""
+                SELECT
+                    tr.transfer_id,
+                    tr.from_lab_id,
+                    l1.lab_name as from_lab_name,
+                    tr.to_lab_id,
+                    l2.lab_name as to_lab_name,
+                    tr.device_ids,
+                    tr.remark,
+                    tr.status,
+                    tr.requested_by,
+                    tr.requested_at,
+                    tr.approved_by,
+                    tr.approved_at,
+                    tr.transfer_type,
+                    tr.station_ids,
+                    tr.dest_cell_id,
+                    tr.device_dest_map
+                FROM transfer_requests tr
+                LEFT JOIN labs l1 ON tr.from_lab_id = l1.lab_id
+                LEFT JOIN labs l2 ON tr.to_lab_id = l2.lab_id
+                WHERE tr.status <> 'pending'
+                ORDER BY COALESCE(tr.approved_at, tr.requested_at) DESC
+            """)
+        else:
+            cursor.execute("""
+                SELECT
+                    tr.transfer_id,
+                    tr.from_lab_id,
+                    l1.lab_name as from_lab_name,
+                    tr.to_lab_id,
+                    l2.lab_name as to_lab_name,
+                    tr.device_ids,
+                    tr.remark,
+                    tr.status,
+                    tr.requested_by,
+                    tr.requested_at,
+                    tr.approved_by,
+                    tr.approved_at,
+                    tr.transfer_type,
+                    tr.station_ids,
+                    tr.dest_cell_id
+                FROM transfer_requests tr
+                LEFT JOIN labs l1 ON tr.from_lab_id = l1.lab_id
+                LEFT JOIN labs l2 ON tr.to_lab_id = l2.lab_id
+                WHERE tr.status <> 'pending'
+                ORDER BY COALESCE(tr.approved_at, tr.requested_at) DESC
+            """)
+
+        rows = cursor.fetchall()
+        header = [
+            "Transfer ID", "Status", "From Lab", "To Lab", "Requested By", "Requested At",
+            "Approved By", "Approved At", "Transfer Type", "Device Type", "Brand", "Model",
+            "Asset Code", "Assigned Code", "Station Code", "Dest Cell", "Dest Position", "Remark"
+        ]
+        csv_text = StringIO()
+        csv_text.write("\ufeff")
+        writer = csv.writer(csv_text, quoting=csv.QUOTE_ALL)
+        writer.writerow(header)
+
+        for row in rows:
+            device_ids = json.loads(row['device_ids']) if isinstance(row['device_ids'], str) else row['device_ids']
+
+            cursor.execute("""
+                SELECT
+                    d.device_id,
+                    et.name as type_name,
+                    d.brand,
+                    d.model,
+                    d.asset_code as asset_id,
+                    d.assigned_code,
+                    ls.assigned_code as station_code
+                FROM devices d
+                LEFT JOIN equipment_types et ON d.type_id = et.type_id
+                LEFT JOIN lab_station_devices lsd ON d.device_id = lsd.device_id
+                LEFT JOIN lab_stations ls ON lsd.station_id = ls.station_id
+                WHERE d.device_id = ANY(%s)
+            """, (device_ids,))
+            devices = cursor.fetchall()
+
+            device_dest_map_raw = row.get('device_dest_map')
+            device_dest_map = json.loads(device_dest_map_raw) if isinstance(device_dest_map_raw, str) and device_dest_map_raw else (device_dest_map_raw or {})
+            if not device_dest_map and row.get('dest_cell_id'):
+                device_dest_map = {str(did): int(row['dest_cell_id']) for did in device_ids}
+
+            for dev in devices:
+                dest_cell_id = device_dest_map.get(str(dev['device_id']))
+                drow, dcol, dlabel = resolve_transfer_dest_cell(cursor, row['to_lab_id'], dest_cell_id) if dest_cell_id else (None, None, None)
+                pos = f"R{drow},C{dcol}" if drow is not None and dcol is not None else ""
+                dest_label = dlabel or ""
+
+                line = [
+                    str(row['transfer_id']),
+                    row['status'] or "",
+                    row['from_lab_name'] or row['from_lab_id'] or "",
+                    row['to_lab_name'] or row['to_lab_id'] or "",
+                    row['requested_by'] or "",
+                    row['requested_at'].isoformat() if row['requested_at'] else "",
+                    row['approved_by'] or "",
+                    row['approved_at'].isoformat() if row['approved_at'] else "",
+                    row.get('transfer_type', 'individual') or "",
+                    dev['type_name'] or "",
+                    dev['brand'] or "",
+                    dev['model'] or "",
+                    dev['asset_id'] or "",
+                    dev['assigned_code'] or "",
+                    dev['station_code'] or "",
+                    str(dest_cell_id) if dest_cell_id else "",
+                    pos or dest_label,
+                    (row['remark'] or "").replace("\n", " ").replace("\r", " ")
+                ]
+                writer.writerow(line)
+
+        output = BytesIO()
+        output.write(csv_text.getvalue().encode('utf-8'))
+        output.seek(0)
+
+        cursor.close()
+        conn.close()
+
+        return send_file(
+            output,
+            mimetype='text/csv',
+            as_attachment=True,
+            download_name='transfer_history.csv'
+        )
+
+    except Exception as e:
+        print(f"Error exporting transfer history CSV: {str(e)}")
+        traceback.print_exc()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@exports_bp.route('/export_transfer_history_pdf', methods=['GET'])
+def export_transfer_history_pdf():
+    """Export transfer history to PDF."""
+    from PIL import Image
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image as RLImage
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import inch
+    try:
+        conn = db.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            SELECT 1
+            FROM information_schema.columns
+            WHERE table_name = 'transfer_requests' AND column_name = 'device_dest_map'
+        """)
+        has_device_dest_map = cursor.fetchone() is not None
+
+        if has_device_dest_map:
+            cursor.execute("""
+                SELECT
+                    tr.transfer_id,
+                    tr.from_lab_id,
+                    l1.lab_name as from_lab_name,
+                    tr.to_lab_id,
+                    l2.lab_name as to_lab_name,
+                    tr.device_ids,
+                    tr.remark,
+                    tr.status,
+                    tr.requested_by,
+                    tr.requested_at,
+                    tr.approved_by,
+                    tr.approved_at,
+                    tr.transfer_type,
+                    tr.station_ids,
+                    tr.dest_cell_id,
+                    tr.device_dest_map
+                FROM transfer_requests tr
+                LEFT JOIN labs l1 ON tr.from_lab_id = l1.lab_id
+                LEFT JOIN labs l2 ON tr.to_lab_id = l2.lab_id
+                WHERE tr.status <> 'pending'
+                ORDER BY COALESCE(tr.approved_at, tr.requested_at) DESC
+            """)
+        else:
+            cursor.execute("""
+                SELECT
+                    tr.transfer_id,
+                    tr.from_lab_id,
+                    l1.lab_name as from_lab_name,
+                    tr.to_lab_id,
+                    l2.lab_name as to_lab_name,
+                    tr.device_ids,
+                    tr.remark,
+                    tr.status,
+                    tr.requested_by,
+                    tr.requested_at,
+                    tr.approved_by,
+                    tr.approved_at,
+                    tr.transfer_type,
+                    tr.station_ids,
+                    tr.dest_cell_id
+                FROM transfer_requests tr
+                LEFT JOIN labs l1 ON tr.from_lab_id = l1.lab_id
+                LEFT JOIN labs l2 ON tr.to_lab_id = l2.lab_id
+                WHERE tr.status <> 'pending'
+                ORDER BY COALESCE(tr.approved_at, tr.requested_at) DESC
+            """)
+
+        rows = cursor.fetchall()
+
+        buffer = BytesIO()
+        doc = SimpleDocTemplate(
+            buffer,
+            pagesize=landscape(A4),
+            topMargin=0.45 * inch,
+            bottomMargin=0.45 * inch,
+            leftMargin=0.55 * inch,
+            rightMargin=0.55 * inch,
+        )
+        styles = getSampleStyleSheet()
+        cell_style = ParagraphStyle(
+            'TransferCell',
+            parent=styles['Normal'],
+            fontSize=9,
+            leading=12,
+            wordWrap='CJK'
+        )
+        elems = []
+
+        header_candidates = [
+            os.path.abspath(os.path.join(BACKEND_DIR, '..', 'frontend', 'public', 'header.png')),
+            os.path.join(BACKEND_DIR, 'header.png')
+        ]
+        for header_path in header_candidates:
+            if os.path.exists(header_path):
+                header_img = Image.open(header_path)
+                img_w, img_h = header_img.size
+                target_w = doc.width
+                target_h = (img_h / img_w) * target_w
+                max_header_h = 1.1 * inch
+                if target_h > max_header_h:
+                    scale = max_header_h / target_h
+                    target_w = target_w * scale
+                    target_h = max_header_h
+                elems.append(RLImage(header_path, width=target_w, height=target_h))
+                elems.append(Spacer(1, 0.18 * inch))
+                break
+
+        elems.append(Paragraph("Transfer History", styles['Title']))
+        elems.append(Paragraph(f"Generated on: {datetime.now().strftime('%Y-%m-%d')}", styles['Normal']))
+        elems.append(Spacer(1, 0.18 * inch))
+
+        table_data = [[
+            "Transfer", "From", "To", "Status", "Requested", "Approved",
+            "Device", "Asset Code", "Destination"
+        ]]
+
+        for row in rows:
+            device_ids = json.loads(row['device_ids']) if isinstance(row['device_ids'], str) else row['device_ids']
+            cursor.execute("""
+                SELECT
+                    d.device_id,
+                    et.name as type_name,
+                    d.brand,
+                    d.model,
+                    d.asset_code as asset_id,
+                    d.assigned_code
+                FROM devices d
+                LEFT JOIN equipment_types et ON d.type_id = et.type_id
+                WHERE d.device_id = ANY(%s)
+            """, (device_ids,))
+            devices = cursor.fetchall()
+
+            device_dest_map_raw = row.get('device_dest_map')
+            device_dest_map = json.loads(device_dest_map_raw) if isinstance(device_dest_map_raw, str) and device_dest_map_raw else (device_dest_map_raw or {})
+            if not device_dest_map and row.get('dest_cell_id'):
+                device_dest_map = {str(did): int(row['dest_cell_id']) for did in device_ids}
+
+            for dev in devices:
+                dest_cell_id = device_dest_map.get(str(dev['device_id']))
+                drow, dcol, dlabel = resolve_transfer_dest_cell(cursor, row['to_lab_id'], dest_cell_id) if dest_cell_id else (None, None, None)
+                pos = f"R{drow},C{dcol}" if drow is not None and dcol is not None else ""
+                dest_text = f"{dlabel or 'Cell'} {pos}" if dest_cell_id else ""
+
+                device_text = f"{dev['type_name']} {dev['brand'] or ''} {dev['model'] or ''}"
+                table_data.append([
+                    Paragraph(f"#{row['transfer_id']}", cell_style),
+                    Paragraph(row['from_lab_name'] or row['from_lab_id'] or "", cell_style),
+                    Paragraph(row['to_lab_name'] or row['to_lab_id'] or "", cell_style),
+                    Paragraph(row['status'], cell_style),
+                    Paragraph(row['requested_at'].strftime('%Y-%m-%d') if row['requested_at'] else '', cell_style),
+                    Paragraph(row['approved_at'].strftime('%Y-%m-%d') if row['approved_at'] else '', cell_style),
+                    Paragraph(device_text.strip(), cell_style),
+                    Paragraph(dev['asset_id'] or "", cell_style),
+                    Paragraph(dest_text.strip(), cell_style)
+                ])
+
+        table = Table(
+            table_data,
+            repeatRows=1,
+            colWidths=[
+                0.75 * inch, 1.3 * inch, 1.3 * inch, 0.75 * inch, 0.9 * inch,
+                0.9 * inch, 1.9 * inch, 1.05 * inch, 1.55 * inch
+            ]
+        )
+        table.hAlign = 'CENTER'
+        table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4B5563')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('ALIGN', (3, 1), (5, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 10),
+            ('FONTSIZE', (0, 1), (-1, -1), 9),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.whitesmoke, colors.lightgrey]),
+            ('GRID', (0, 0), (-1, -1), 0.25, colors.grey),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('LEFTPADDING', (0, 0), (-1, -1), 5),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 5),
+            ('TOPPADDING', (0, 0), (-1, -1), 6),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+        ]))
+
+        elems.append(table)
+        doc.build(elems)
+
+        buffer.seek(0)
+        cursor.close()
+        conn.close()
+
+        return send_file(
+            buffer,
+            mimetype='application/pdf',
+            as_attachment=True,
+            download_name='transfer_history.pdf'
+        )
+
+    except Exception as e:
+        print(f"Error exporting transfer history PDF: {str(e)}")
+        traceback.print_exc()
+        return jsonify({'success': False, 'error': str(e)}), 500
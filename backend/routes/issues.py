@@ -0,0 +1,1424 @@
+"""
+Issue Routes
+Device issues, student complaints, issue analytics and proactive maintenance.
+"""
+
+import json
+import traceback
+from datetime import datetime, timedelta
+
+import requests
+from flask import Blueprint, jsonify, request
+
+from config.database import db
+from services.auth_service import (
+    STUDENT_COMPLAINT_CODE_COOLDOWN_SECONDS,
+    STUDENT_COMPLAINT_CODE_TTL_MINUTES,
+    generate_verification_code,
+    hash_verification_code,
+    send_student_complaint_verification_email,
+    verify_student_complaint_code,
+)
+from services.notification_service import send_notification_to_lab_incharge
+
+issues_bp = Blueprint("issues", __name__)
+
+
+# -----------------------------
+# Raise Device Issue
+# -----------------------------
+@issues_bp.route("/raise_issue", methods=["POST"])
+def raise_issue():
+    """
+    Create a device issue, log history, and optionally deactivate the device.
+    Expects JSON: { deviceId, title, description, severity, deactivate }
+    """
+    try:
+        data = request.get_json(force=True)
+        device_id = data.get("deviceId")
+        title = (data.get("title") or "").strip()
+        description = (data.get("description") or "").strip()
+        severity = (data.get("severity") or "medium").lower()
+        deactivate = bool(data.get("deactivate"))
+        reported_by = (data.get("reportedBy") or "System").strip()
+
+        if not device_id:
+            return jsonify({"success": False, "error": "deviceId is required"}), 400
+        if not title:
+            return jsonify({"success": False, "error": "title is required"}), 400
+
+        conn = db.get_connection()
+        cursor = conn.cursor()
+
+        # Validate device
+        cursor.execute(
+            """
+                 SELECT d.device_id, d.is_active, d.lab_id, d.assigned_code, d.asset_code,
+                   COALESCE(et.name, 'Unknown') AS type_name
+            FROM devices d
+            LEFT JOIN equipment_types et ON d.type_id = et.type_id
+            WHERE d.device_id = %s
+            """,
+            (device_id,)
+        )
+        device_row = cursor.fetchone()
+        if not device_row:
+            cursor.close()
+            conn.close()
+            return jsonify({"success": False, "error": "Device not found"}), 404
+
+        # Ensure issue_id sequence is in sync (handles manual inserts / migrations)
+        cursor.execute(
+            """
+            SELECT setval(
+                pg_get_serial_sequence('device_issues', 'issue_id'),
+                COALESCE((SELECT MAX(issue_id) FROM device_issues), 0) + 1,
+                false
+            )
+            """
+        )
+
+        # Insert issue with severity and reported_by
+        cursor.execute(
+            """INSERT INTO device_issues (device_id, issue_title, description, status, severity, reported_by)
+                   VALUES (%s, %s, %s, %s, %s, %s)
+                   RETURNING issue_id, reported_at""",
+            (device_id, title, description, "open", severity, reported_by)
+        )
+        issue_row = cursor.fetchone()
+        issue_id = issue_row['issue_id']
+        reported_at = issue_row['reported_at']
+
+        # Ensure history_id sequence is in sync (handles manual inserts / migrations)
+        cursor.execute(
+            """
+            SELECT setval(
+                pg_get_serial_sequence('device_issue_history', 'history_id'),
+                COALESCE((SELECT MAX(history_id) FROM device_issue_history), 0) + 1,
+                false
+            )
+            """
+        )
+
+        # History log
+        cursor.execute(
+            """INSERT INTO device_issue_history (issue_id, action, old_status, new_status, note, changed_by)
+                   VALUES (%s, %s, %s, %s, %s, %s)""",
+            (issue_id, "created", None, "open", f"severity={severity}", reported_by)
+        )
+
+        # Optionally deactivate device
+        if deactivate:
+            cursor.execute(
+                "UPDATE devices SET is_active = FALSE WHERE device_id = %s",
+                (device_id,)
+            )
+
+        conn.commit()
+        cursor.close()
+        conn.close()
+
+        # ── Auto notification: fire in background, never blocks response ──
+        sev_color = {
+            "critical": "#ef4444", "high": "#f97316",
+            "medium": "#eab308", "low": "#22c55e"
+        }.get(severity, "#6b7280")
+        lab_number = device_row.get("lab_id") or "Unassigned"
+        assigned_code = device_row.get("assigned_code") or "—"
+        device_type = device_row.get("type_name") or "Unknown"
+        asset_code = device_row.get("asset_code") or f"#{device_id}"
+
+        _issue_html = f"""
+        <html><body style="font-family:-apple-system,BlinkMacSystemFont,'Segoe UI',Roboto,sans-serif;background:#f3f4f6;padding:20px;">
+          <div style="max-width:620px;margin:0 auto;background:white;border-radius:12px;overflow:hidden;box-shadow:0 4px 6px rgba(0,0,0,0.1);">
+            <div style="background:linear-gradient(135deg,#ef4444,#b91c1c);padding:20px 28px;">
+              <h1 style="color:white;margin:0;font-size:18px;">🚨 New Issue Raised</h1>
+              <p style="color:rgba(255,255,255,0.85);margin:4px 0 0;font-size:13px;">AssetIQ — Immediate Attention Required</p>
+            </div>
+            <div style="padding:20px 28px;">
+              <table style="width:100%;font-size:14px;border-collapse:collapse;">
+                <tr><td style="padding:8px 0;color:#6b7280;width:130px;">Issue Title</td><td style="padding:8px 0;font-weight:600;color:#111;">{title}</td></tr>
+                <tr><td style="padding:8px 0;color:#6b7280;">Asset Code</td><td style="padding:8px 0;color:#374151;">{asset_code}</td></tr>
+                                <tr><td style="padding:8px 0;color:#6b7280;">Lab Number</td><td style="padding:8px 0;color:#374151;">{lab_number}</td></tr>
+                                <tr><td style="padding:8px 0;color:#6b7280;">Device Type</td><td style="padding:8px 0;color:#374151;">{device_type}</td></tr>
+                                <tr><td style="padding:8px 0;color:#6b7280;">Assigned Code</td><td style="padding:8px 0;color:#374151;">{assigned_code}</td></tr>
+                <tr><td style="padding:8px 0;color:#6b7280;">Severity</td>
+                    <td style="padding:8px 0;"><span style="background:{sev_color};color:white;padding:2px 10px;border-radius:8px;font-size:12px;font-weight:600;">{severity.upper()}</span></td></tr>
+                <tr><td style="padding:8px 0;color:#6b7280;">Reported By</td><td style="padding:8px 0;color:#374151;">{reported_by}</td></tr>
+                <tr><td style="padding:8px 0;color:#6b7280;">Description</td><td style="padding:8px 0;color:#374151;">{description or 'No description provided.'}</td></tr>
+              </table>
+            </div>
+            <div style="background:#f9fafb;padding:12px 28px;text-align:center;">
+              <p style="color:#9ca3af;font-size:11px;margin:0;">AssetIQ Automatic Issue Notifier • {datetime.now().strftime('%B %d, %Y at %I:%M %p')}</p>
+            </div>
+          </div>
+        </body></html>"""
+        send_notification_to_lab_incharge(
+            subject=f"🚨 New Issue: {title} [Severity: {severity.upper()}]",
+            html_body=_issue_html,
+            lab_id=device_row.get("lab_id")
+        )
+
+        return jsonify({
+            "success": True,
+            "issue": {
+                "id": issue_id,
+                "deviceId": device_id,
+                "title": title,
+                "description": description,
+                "severity": severity,
+                "status": "open",
+                "reportedDate": reported_at.isoformat() if reported_at else None,
+                "reportedBy": reported_by,
+                "deactivated": deactivate
+            }
+        })
+
+    except Exception as e:
+        print(f"Error raising issue: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+# -----------------------------
+# Public: Student Complaint Submission
+# -----------------------------
+@issues_bp.route("/public/request_student_complaint_code", methods=["POST"])
+def request_student_complaint_code():
+    data = request.get_json() or {}
+    email = (data.get("email") or "").strip().lower()
+    if not email:
+        return jsonify({"success": False, "error": "Email is required"}), 400
+    if not email.endswith("@apsit.edu.in"):
+        return jsonify({"success": False, "error": "Only @apsit.edu.in email addresses are allowed"}), 400
+
+    conn = db.get_connection()
+    if not conn:
+        return jsonify({"success": False, "error": "Database connection failed"}), 500
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            """
+            SELECT created_at
+            FROM student_email_verification_codes
+            WHERE email = %s
+            ORDER BY created_at DESC
+            LIMIT 1
+            """,
+            (email,)
+        )
+        row = cursor.fetchone()
+        if row:
+            last_created = row["created_at"]
+            seconds_since = (datetime.utcnow() - last_created).total_seconds()
+            if seconds_since < STUDENT_COMPLAINT_CODE_COOLDOWN_SECONDS:
+                wait_seconds = int(STUDENT_COMPLAINT_CODE_COOLDOWN_SECONDS - seconds_since)
+                return jsonify({"success": False, "error": f"Please wait {wait_seconds}s before requesting another code"}), 429
+
+        code = generate_verification_code()
+        code_hash = hash_verification_code(code)
+        expires_at = datetime.utcnow() + timedelta(minutes=STUDENT_COMPLAINT_CODE_TTL_MINUTES)
+
+        cursor.execute(
+            """
+            INSERT INTO student_email_verification_codes (email, code_hash, expires_at)
+            VALUES (%s, %s, %s)
+            """,
+            (email, code_hash, expires_at)
+        )
+        conn.commit()
+
+        sent = send_student_complaint_verification_email(email, code)
+        if not sent:
+            return jsonify({"success": False, "error": "Failed to send verification email"}), 500
+
+        return jsonify({
+            "success": True,
+            "message": "Verification code sent",
+            "expiresInMinutes": STUDENT_COMPLAINT_CODE_TTL_MINUTES
+        })
+    except Exception as e:
+        conn.rollback()
+        print(f"Error sending student complaint code: {e}")
+        traceback.print_exc()
+        return jsonify({"success": False, "error": "Failed to send verification code"}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+
+@issues_bp.route("/public/student_complaint", methods=["POST"])
+def public_student_complaint():
+    """
+    Students submit complaints that remain pending until approved.
+    """
+    try:
+        data = request.get_json(force=True)
+        lab_token = (data.get("labToken") or "").strip()
+        station_id = data.get("stationId")
+        device_id = data.get("deviceId")
+        student_name = (data.get("studentName") or "").strip()
+        student_email = (data.get("studentEmail") or "").strip().lower()
+        verification_code = (data.get("verificationCode") or "").strip()
+        title = (data.get("title") or "").strip()
+        description = (data.get("description") or "").strip()
+        severity = (data.get("severity") or "medium").strip().lower()
+
+        if not all([lab_token, station_id, device_id, student_name, student_email, title]):
+            return jsonify({"success": False, "error": "Missing required fields"}), 400
+        if severity not in ["low", "medium", "high", "critical"]:
+            return jsonify({"success": False, "error": "Invalid severity"}), 400
+        if not student_email.endswith("@apsit.edu.in"):
+            return jsonify({"success": False, "error": "Only @apsit.edu.in email addresses are allowed"}), 400
+        if not verification_code:
+            return jsonify({"success": False, "error": "Verification code is required"}), 400
+
+        verified, verification_error = verify_student_complaint_code(student_email, verification_code)
+        if not verified:
+            return jsonify({"success": False, "error": verification_error or "Invalid verification code"}), 400
+
+        conn = db.get_connection()
+        cursor = conn.cursor()
+
+        # Validate lab token and device ownership
+        cursor.execute(
+            """
+            SELECT l.lab_id
+            FROM labs l
+            WHERE l.lab_public_token = %s
+            """,
+            (lab_token,)
+        )
+        lab_row = cursor.fetchone()
+        if not lab_row:
+            cursor.close()
+            conn.close()
+            return jsonify({"success": False, "error": "Invalid lab token"}), 404
+
+        cursor.execute(
+            """
+            SELECT 1
+            FROM lab_stations ls
+            JOIN lab_station_devices lsd ON lsd.station_id = ls.station_id
+            WHERE ls.lab_id = %s AND ls.station_id = %s AND lsd.device_id = %s
+            """,
+            (lab_row["lab_id"], station_id, device_id)
+        )
+        mapping_ok = cursor.fetchone()
+        if not mapping_ok:
+            cursor.close()
+            conn.close()
+            return jsonify({"success": False, "error": "Device does not belong to this lab station"}), 400
+
+        cursor.execute(
+            """
+            INSERT INTO student_issue_requests
+            (lab_id, station_id, device_id, student_name, student_email, issue_title, issue_description, severity, status)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, 'pending')
+            RETURNING request_id, created_at
+            """,
+            (lab_row["lab_id"], station_id, device_id, student_name, student_email, title, description, severity)
+        )
+        created = cursor.fetchone()
+
+        conn.commit()
+        cursor.close()
+        conn.close()
+
+        return jsonify({
+            "success": True,
+            "requestId": created["request_id"],
+            "status": "pending",
+            "createdAt": created["created_at"].isoformat() if created.get("created_at") else None,
+            "message": "Complaint submitted for lab assistant approval",
+        })
+    except Exception as e:
+        print(f"Error creating student complaint: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+# -----------------------------
+# Get Pending Student Complaints
+# -----------------------------
+@issues_bp.route("/get_pending_student_complaints", methods=["GET"])
+def get_pending_student_complaints():
+    """
+    Returns complaints waiting for approval.
+    Lab assistants can optionally pass labId to view only one lab.
+    """
+    try:
+        lab_id = request.args.get("labId")
+
+        conn = db.get_connection()
+        cursor = conn.cursor()
+
+        if lab_id:
+            cursor.execute(
+                """
+                SELECT r.request_id, r.lab_id, l.lab_name, r.station_id, ls.assigned_code AS station_code,
+                       r.device_id, d.asset_code, d.assigned_code AS device_assigned_code,
+                       r.student_name, r.student_email, r.issue_title, r.issue_description,
+                       r.severity, r.status, r.created_at
+                FROM student_issue_requests r
+                LEFT JOIN labs l ON l.lab_id = r.lab_id
+                LEFT JOIN lab_stations ls ON ls.station_id = r.station_id
+                LEFT JOIN devices d ON d.device_id = r.device_id
+                WHERE r.status = 'pending' AND r.lab_id = %s
+                ORDER BY r.created_at DESC
+                """,
+                (lab_id,)
+            )
+        else:
+            cursor.execute(
+                """
+                SELECT r.request_id, r.lab_id, l.lab_name, r.station_id, ls.assigned_code AS station_code,
+                       r.device_id, d.asset_code, d.assigned_code AS device_assigned_code,
+                       r.student_name, r.student_email, r.issue_title, r.issue_description,
+                       r.severity, r.status, r.created_at
+                FROM student_issue_requests r
+                LEFT JOIN labs l ON l.lab_id = r.lab_id
+                LEFT JOIN lab_stations ls ON ls.station_id = r.station_id
+                LEFT JOIN devices d ON d.device_id = r.device_id
+                WHERE r.status = 'pending'
+                ORDER BY r.created_at DESC
+                """
+            )
+
+        rows = cursor.fetchall()
+        cursor.close()
+        conn.close()
+
+        complaints = []
+        for row in rows:
+            complaints.append({
+                "requestId": row["request_id"],
+                "labId": row["lab_id"],
+                "labName": row["lab_name"],
+                "stationId": row["station_id"],
+                "stationCode": row["station_code"],
+                "deviceId": row["device_id"],
+                "assetCode": row["asset_code"],
+                "deviceAssignedCode": row["device_assigned_code"],
+                "studentName": row["student_name"],
+                "studentEmail": row["student_email"],
+                "title": row["issue_title"],
+                "description": row["issue_description"],
+                "severity": row["severity"],
+                "status": row["status"],
+                "createdAt": row["created_at"].isoformat() if row.get("created_at") else None,
+            })
+
+        return jsonify({"success": True, "complaints": complaints})
+    except Exception as e:
+        print(f"Error fetching pending student complaints: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+# -----------------------------
+# Approve Student Complaint
+# -----------------------------
+@issues_bp.route("/approve_student_complaint", methods=["POST"])
+def approve_student_complaint():
+    """
+    Approves a student complaint and creates a real device issue.
+    """
+    try:
+        data = request.get_json(force=True)
+        request_id = data.get("requestId")
+        approver_name = (data.get("approverName") or "Lab Assistant").strip()
+        deactivate = data.get("deactivate")
+
+        if not request_id:
+            return jsonify({"success": False, "error": "requestId is required"}), 400
+
+        conn = db.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            """
+            SELECT request_id, device_id, issue_title, issue_description, severity,
+                   student_name, student_email, status
+            FROM student_issue_requests
+            WHERE request_id = %s
+            """,
+            (request_id,)
+        )
+        req_row = cursor.fetchone()
+        if not req_row:
+            cursor.close()
+            conn.close()
+            return jsonify({"success": False, "error": "Complaint request not found"}), 404
+        if (req_row.get("status") or "").lower() != "pending":
+            cursor.close()
+            conn.close()
+            return jsonify({"success": False, "error": "Complaint is not pending"}), 400
+
+        severity = (req_row.get("severity") or "medium").lower()
+        if deactivate is None:
+            deactivate = severity in ["high", "critical"]
+
+        reported_by = f"Student: {req_row.get('student_name')} <{req_row.get('student_email')}>"
+
+        cursor.execute(
+            """
+            INSERT INTO device_issues (device_id, issue_title, description, status, severity, reported_by)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            RETURNING issue_id, reported_at
+            """,
+            (
+                req_row["device_id"],
+                req_row["issue_title"],
+                req_row.get("issue_description") or "",
+                "open",
+                severity,
+                reported_by,
+            )
+        )
+        issue_row = cursor.fetchone()
+
+        cursor.execute(
+            """
+            INSERT INTO device_issue_history (issue_id, action, old_status, new_status, note, changed_by)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            """,
+            (
+                issue_row["issue_id"],
+                "created",
+                None,
+                "open",
+                f"Approved student complaint request #{request_id}",
+                approver_name,
+            )
+        )
+
+        if deactivate:
+            cursor.execute("UPDATE devices SET is_active = FALSE WHERE device_id = %s", (req_row["device_id"],))
+
+        cursor.execute(
+            """
+            UPDATE student_issue_requests
+            SET status = 'approved', approved_by = %s, approved_at = NOW(), approved_issue_id = %s
+            WHERE request_id = %s
+            """,
+            (approver_name, issue_row["issue_id"], request_id)
+        )
+
+        conn.commit()
+        cursor.close()
+        conn.close()
+
+        return jsonify({
+            "success": True,
+            "issue": {
+                "id": issue_row["issue_id"],
+                "deviceId": req_row["device_id"],
+                "title": req_row["issue_title"],
+                "status": "open",
+                "severity": severity,
+                "reportedBy": reported_by,
+                "reportedDate": issue_row["reported_at"].isoformat() if issue_row.get("reported_at") else None,
+            },
+        })
+    except Exception as e:
+        print(f"Error approving student complaint: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+# -----------------------------
+# Reject Student Complaint
+# -----------------------------
+@issues_bp.route("/reject_student_complaint", methods=["POST"])
+def reject_student_complaint():
+    try:
+        data = request.get_json(force=True)
+        request_id = data.get("requestId")
+        approver_name = (data.get("approverName") or "Lab Assistant").strip()
+        note = (data.get("note") or "Rejected by lab assistant").strip()
+
+        if not request_id:
+            return jsonify({"success": False, "error": "requestId is required"}), 400
+
+        conn = db.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            """
+            UPDATE student_issue_requests
+            SET status = 'rejected', approved_by = %s, approved_at = NOW(), rejection_note = %s
+            WHERE request_id = %s AND status = 'pending'
+            RETURNING request_id
+            """,
+            (approver_name, note, request_id)
+        )
+        row = cursor.fetchone()
+        if not row:
+            cursor.close()
+            conn.close()
+            return jsonify({"success": False, "error": "Pending complaint not found"}), 404
+
+        conn.commit()
+        cursor.close()
+        conn.close()
+
+        return jsonify({"success": True, "message": "Complaint rejected"})
+    except Exception as e:
+        print(f"Error rejecting student complaint: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+# -----------------------------
+# Update Issue Status
+# -----------------------------
+@issues_bp.route("/update_issue_status", methods=["POST"])
+def update_issue_status():
+    """
+    Update the status of a device issue.
+    Expects JSON: { issueId, status }
+    """
+    try:
+        data = request.get_json(force=True)
+        issue_id = data.get("issueId")
+        new_status = (data.get("status") or "").strip().lower()
+        changed_by = (data.get("changedBy") or "").strip() or None
+
+        if not issue_id:
+            return jsonify({"success": False, "error": "issueId is required"}), 400
+        
+        if new_status not in ["open", "in-progress", "resolved"]:
+            return jsonify({"success": False, "error": "Invalid status. Must be: open, in-progress, or resolved"}), 400
+
+        conn = db.get_connection()
+        cursor = conn.cursor()
+
+        # Fetch issue + device details for notification
+        cursor.execute("""
+            SELECT di.issue_id, di.issue_title, di.severity, di.status, di.device_id,
+                   d.asset_code, d.assigned_code, d.brand, d.model,
+                     d.lab_id,
+                   COALESCE(et.name, 'Unknown') AS type_name,
+                   COALESCE(l.lab_name, 'Unassigned') AS lab_name
+            FROM device_issues di
+            JOIN devices d ON di.device_id = d.device_id
+            LEFT JOIN equipment_types et ON d.type_id = et.type_id
+            LEFT JOIN labs l ON d.lab_id = l.lab_id
+            WHERE di.issue_id = %s
+        """, (issue_id,))
+        issue_row = cursor.fetchone()
+        if not issue_row:
+            cursor.close()
+            conn.close()
+            return jsonify({"success": False, "error": "Issue not found"}), 404
+
+        old_status = issue_row.get('status', 'open')
+
+        # Update status (+ resolved_at timestamp when resolving)
+        if new_status == "resolved":
+            cursor.execute(
+                "UPDATE device_issues SET status = %s, resolved_at = NOW() WHERE issue_id = %s",
+                (new_status, issue_id)
+            )
+        else:
+            cursor.execute(
+                "UPDATE device_issues SET status = %s, resolved_at = NULL WHERE issue_id = %s",
+                (new_status, issue_id)
+            )
+
+        # Ensure history_id sequence is in sync (handles manual inserts / migrations)
+        cursor.execute(
+            """
+            SELECT setval(
+                pg_get_serial_sequence('device_issue_history', 'history_id'),
+                COALESCE((SELECT MAX(history_id) FROM device_issue_history), 0) + 1,
+                false
+            )
+            """
+        )
+
+        # Log history with who changed it
+        cursor.execute(
+            """INSERT INTO device_issue_history (issue_id, action, old_status, new_status, note, changed_by)
+                   VALUES (%s, %s, %s, %s, %s, %s)""",
+            (issue_id, "status_updated", old_status, new_status,
+             f"Status changed from {old_status} to {new_status}", changed_by)
+        )
+
+        conn.commit()
+        cursor.close()
+        conn.close()
+
+        # ── Auto notification ──
+        issue_title_str = issue_row.get('issue_title', f'Issue #{issue_id}')
+        asset_label = issue_row.get('asset_code') or issue_row.get('assigned_code') or f"#{issue_row.get('device_id', '?')}"
+        device_label = f"{issue_row.get('type_name', '')} — {issue_row.get('brand', '')} {issue_row.get('model', '')}".strip(" —")
+        lab_label = issue_row.get('lab_name', 'Unknown')
+        sev_str = issue_row.get('severity', 'unknown')
+        sev_color = {"critical": "#ef4444", "high": "#f97316", "medium": "#eab308", "low": "#22c55e"}.get(sev_str, "#6b7280")
+
+        if new_status == "resolved":
+            _icon, _header_color, _subject_prefix = "✅", "linear-gradient(135deg,#22c55e,#15803d)", "✅ Issue Resolved"
+        elif new_status == "in-progress":
+            _icon, _header_color, _subject_prefix = "🔄", "linear-gradient(135deg,#f59e0b,#d97706)", "🔄 Issue In Progress"
+        else:
+            _icon, _header_color, _subject_prefix = "📋", "linear-gradient(135deg,#6366f1,#4338ca)", "📋 Issue Reopened"
+
+        _status_html = f"""
+        <html><body style="font-family:-apple-system,BlinkMacSystemFont,'Segoe UI',Roboto,sans-serif;background:#f3f4f6;padding:20px;">
+          <div style="max-width:620px;margin:0 auto;background:white;border-radius:12px;overflow:hidden;box-shadow:0 4px 6px rgba(0,0,0,0.1);">
+            <div style="background:{_header_color};padding:20px 28px;">
+              <h1 style="color:white;margin:0;font-size:18px;">{_icon} Issue Status Updated</h1>
+              <p style="color:rgba(255,255,255,0.85);margin:4px 0 0;font-size:13px;">AssetIQ — {issue_title_str}</p>
+            </div>
+            <div style="padding:20px 28px;">
+              <table style="width:100%;font-size:14px;border-collapse:collapse;">
+                <tr><td style="padding:8px 0;color:#6b7280;width:130px;">Issue</td><td style="padding:8px 0;font-weight:600;color:#111;">{issue_title_str}</td></tr>
+                <tr><td style="padding:8px 0;color:#6b7280;">Asset</td><td style="padding:8px 0;color:#374151;">{asset_label} — {device_label}</td></tr>
+                <tr><td style="padding:8px 0;color:#6b7280;">Lab</td><td style="padding:8px 0;color:#374151;">{lab_label}</td></tr>
+                <tr><td style="padding:8px 0;color:#6b7280;">Severity</td>
+                    <td style="padding:8px 0;"><span style="background:{sev_color};color:white;padding:2px 10px;border-radius:8px;font-size:12px;font-weight:600;">{sev_str.upper()}</span></td></tr>
+                <tr><td style="padding:8px 0;color:#6b7280;">Status</td>
+                    <td style="padding:8px 0;color:#374151;">
+                      <span style="text-decoration:line-through;color:#9ca3af;">{old_status}</span>
+                      &nbsp;→&nbsp;
+                      <strong>{new_status}</strong>
+                    </td></tr>
+                <tr><td style="padding:8px 0;color:#6b7280;">Changed By</td><td style="padding:8px 0;color:#374151;">{changed_by or 'System'}</td></tr>
+              </table>
+            </div>
+            <div style="background:#f9fafb;padding:12px 28px;text-align:center;">
+              <p style="color:#9ca3af;font-size:11px;margin:0;">AssetIQ Automatic Issue Notifier • {datetime.now().strftime('%B %d, %Y at %I:%M %p')}</p>
+            </div>
+          </div>
+        </body></html>"""
+        send_notification_to_lab_incharge(
+            subject=f"{_subject_prefix}: {issue_title_str} [{asset_label}]",
+            html_body=_status_html,
+            lab_id=issue_row.get("lab_id")
+        )
+
+        return jsonify({
+            "success": True,
+            "message": f"Issue status updated to {new_status}",
+            "issueId": issue_id,
+            "oldStatus": old_status,
+            "newStatus": new_status
+        })
+
+    except Exception as e:
+        print(f"Error updating issue status: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+# -----------------------------
+# Reactivate Device
+# -----------------------------
+@issues_bp.route("/reactivate_device", methods=["POST"])
+def reactivate_device():
+    """
+    Reactivate a device by setting is_active to TRUE.
+    Expects JSON: { deviceId }
+    """
+    try:
+        data = request.get_json(force=True)
+        device_id = data.get("deviceId")
+
+        if not device_id:
+            return jsonify({"success": False, "error": "deviceId is required"}), 400
+
+        conn = db.get_connection()
+        cursor = conn.cursor()
+
+        # Check if device exists
+        cursor.execute(
+            "SELECT device_id, is_active FROM devices WHERE device_id = %s",
+            (device_id,)
+        )
+        device_row = cursor.fetchone()
+        if not device_row:
+            cursor.close()
+            conn.close()
+            return jsonify({"success": False, "error": "Device not found"}), 404
+
+        # Reactivate device
+        cursor.execute(
+            "UPDATE devices SET is_active = TRUE WHERE device_id = %s",
+            (device_id,)
+        )
+
+        conn.commit()
+        cursor.close()
+        conn.close()
+
+        return jsonify({
+            "success": True,
+            "message": "Device reactivated successfully",
+            "deviceId": device_id
+        })
+
+    except Exception as e:
+        print(f"Error reactivating device: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+# -----------------------------
+# Get Open Issues Count
+# -----------------------------
+@issues_bp.route("/get_open_issues_count", methods=["GET"])
+def get_open_issues_count():
+    """
+    Get count of devices with open issues (status = 'open')
+    """
+    try:
+        conn = db.get_connection()
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+        
+        cursor = conn.cursor()
+        
+        # Count distinct devices with open issues
+        cursor.execute("""
+            SELECT COUNT(DISTINCT device_id) as open_issues_count
+            FROM device_issues
+            WHERE LOWER(status) = 'open'
+        """)
+        
+        result = cursor.fetchone()
+        count = result['open_issues_count'] if result else 0
+        
+        cursor.close()
+        conn.close()
+        
+        return jsonify({
+            "success": True,
+            "count": count
+        })
+    
+    except Exception as e:
+        print(f"Error fetching open issues count: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+
+# -----------------------------
+# Get Inactive Devices Count (excluding devices with only resolved issues)
+# -----------------------------
+@issues_bp.route("/get_inactive_devices_count", methods=["GET"])
+def get_inactive_devices_count():
+    """
+    Get count of inactive devices that are assigned to labs and have open issues
+    Only counts devices that are actually deployed, not unassigned inventory
+    """
+    try:
+        conn = db.get_connection()
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+        
+        cursor = conn.cursor()
+        
+        # Count devices that are:
+        # 1. Assigned to a lab (not in unassigned inventory)
+        # 2. AND have is_active = FALSE
+        # 3. AND have at least one non-resolved issue
+        cursor.execute("""
+            SELECT COUNT(DISTINCT d.device_id) as inactive_count
+            FROM devices d
+            WHERE d.is_active = FALSE
+            AND d.assigned_code IS NOT NULL
+            AND d.assigned_code != ''
+            AND EXISTS (
+                SELECT 1 FROM device_issues di 
+                WHERE di.device_id = d.device_id 
+                AND LOWER(di.status) != 'resolved'
+            )
+        """)
+        
+        result = cursor.fetchone()
+        count = result['inactive_count'] if result else 0
+        
+        cursor.close()
+        conn.close()
+        
+        return jsonify({
+            "success": True,
+            "count": count
+        })
+    
+    except Exception as e:
+        print(f"Error fetching inactive devices count: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+
+# -----------------------------
+# Issue Trends Analytics
+# -----------------------------
+@issues_bp.route("/get_issue_trends", methods=["GET"])
+def get_issue_trends():
+    """
+    Comprehensive issue analytics for the Issue Trends report page.
+    Returns: timeline, severity breakdown, per-bill batch analysis,
+    repeat-offender devices, per-lab stats, per-device-type stats.
+    """
+    try:
+        conn = db.get_connection()
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+
+        cursor = conn.cursor()
+
+        # 1. Monthly issue timeline (last 12 months)
+        cursor.execute("""
+            SELECT TO_CHAR(reported_at, 'YYYY-MM') AS month,
+                   COUNT(*) AS total,
+                   SUM(CASE WHEN LOWER(severity) = 'critical' THEN 1 ELSE 0 END) AS critical,
+                   SUM(CASE WHEN LOWER(severity) = 'high' THEN 1 ELSE 0 END) AS high,
+                   SUM(CASE WHEN LOWER(severity) = 'medium' THEN 1 ELSE 0 END) AS medium,
+                   SUM(CASE WHEN LOWER(severity) = 'low' THEN 1 ELSE 0 END) AS low
+            FROM device_issues
+            WHERE reported_at >= NOW() - INTERVAL '12 months'
+            GROUP BY TO_CHAR(reported_at, 'YYYY-MM')
+            ORDER BY month
+        """)
+        timeline = cursor.fetchall()
+
+        # 2. Issues by severity (overall)
+        cursor.execute("""
+            SELECT COALESCE(LOWER(severity), 'unknown') AS severity,
+                   COUNT(*) AS count
+            FROM device_issues
+            GROUP BY COALESCE(LOWER(severity), 'unknown')
+        """)
+        severity_breakdown = cursor.fetchall()
+
+        # 3. Issues by status
+        cursor.execute("""
+            SELECT LOWER(status) AS status, COUNT(*) AS count
+            FROM device_issues
+            GROUP BY LOWER(status)
+        """)
+        status_breakdown = cursor.fetchall()
+
+        # 4. Problematic batches – bills whose devices raise the most issues
+        cursor.execute("""
+            SELECT b.bill_id, b.invoice_number, b.vendor_name,
+                   b.bill_date,
+                   COUNT(di.issue_id) AS issue_count,
+                   COUNT(DISTINCT di.device_id) AS affected_devices,
+                   COUNT(DISTINCT d.device_id) AS total_devices_in_bill,
+                   SUM(CASE WHEN LOWER(di.severity) IN ('critical','high') THEN 1 ELSE 0 END) AS severe_issues
+            FROM device_issues di
+            JOIN devices d ON di.device_id = d.device_id
+            JOIN bills b ON d.bill_id = b.bill_id
+            GROUP BY b.bill_id, b.invoice_number, b.vendor_name, b.bill_date
+            ORDER BY issue_count DESC
+            LIMIT 15
+        """)
+        problematic_batches = cursor.fetchall()
+
+        # 5. Repeat-offender devices (most issues)
+        cursor.execute("""
+            SELECT d.device_id, d.asset_code AS asset_id,
+                   et.name AS type_name, d.brand, d.model,
+                   l.lab_name, d.assigned_code,
+                   d.is_active,
+                   COUNT(di.issue_id) AS issue_count,
+                   SUM(CASE WHEN LOWER(di.status) = 'open' THEN 1 ELSE 0 END) AS open_issues,
+                   SUM(CASE WHEN LOWER(di.severity) IN ('critical','high') THEN 1 ELSE 0 END) AS severe_issues,
+                   MIN(di.reported_at) AS first_issue,
+                   MAX(di.reported_at) AS last_issue
+            FROM device_issues di
+            JOIN devices d ON di.device_id = d.device_id
+            LEFT JOIN equipment_types et ON d.type_id = et.type_id
+            LEFT JOIN labs l ON d.lab_id = l.lab_id
+            GROUP BY d.device_id, d.asset_code, et.name, d.brand, d.model,
+                     l.lab_name, d.assigned_code, d.is_active
+            HAVING COUNT(di.issue_id) >= 2
+            ORDER BY issue_count DESC
+            LIMIT 20
+        """)
+        repeat_offenders = cursor.fetchall()
+
+        # 6. Issues per lab
+        cursor.execute("""
+            SELECT COALESCE(l.lab_name, 'Unassigned') AS lab_name,
+                   COUNT(di.issue_id) AS issue_count,
+                   SUM(CASE WHEN LOWER(di.status) = 'open' THEN 1 ELSE 0 END) AS open_issues,
+                   SUM(CASE WHEN LOWER(di.severity) IN ('critical','high') THEN 1 ELSE 0 END) AS severe_issues
+            FROM device_issues di
+            JOIN devices d ON di.device_id = d.device_id
+            LEFT JOIN labs l ON d.lab_id = l.lab_id
+            GROUP BY COALESCE(l.lab_name, 'Unassigned')
+            ORDER BY issue_count DESC
+        """)
+        issues_by_lab = cursor.fetchall()
+
+        # 7. Issues per device type
+        cursor.execute("""
+            SELECT COALESCE(et.name, 'Unknown') AS type_name,
+                   COUNT(di.issue_id) AS issue_count,
+                   COUNT(DISTINCT di.device_id) AS affected_devices,
+                   SUM(CASE WHEN LOWER(di.status) = 'open' THEN 1 ELSE 0 END) AS open_issues
+            FROM device_issues di
+            JOIN devices d ON di.device_id = d.device_id
+            LEFT JOIN equipment_types et ON d.type_id = et.type_id
+            GROUP BY COALESCE(et.name, 'Unknown')
+            ORDER BY issue_count DESC
+        """)
+        issues_by_type = cursor.fetchall()
+
+        # 8. Most common issue titles
+        cursor.execute("""
+            SELECT issue_title, COUNT(*) AS count,
+                   ROUND(AVG(CASE
+                       WHEN LOWER(severity) = 'critical' THEN 4
+                       WHEN LOWER(severity) = 'high' THEN 3
+                       WHEN LOWER(severity) = 'medium' THEN 2
+                       WHEN LOWER(severity) = 'low' THEN 1
+                       ELSE 2 END), 1) AS avg_severity_score
+            FROM device_issues
+            GROUP BY issue_title
+            ORDER BY count DESC
+            LIMIT 10
+        """)
+        common_issues = cursor.fetchall()
+
+        # 9. Average resolution time (for resolved issues with resolved_at)
+        cursor.execute("""
+            SELECT COALESCE(et.name, 'Unknown') AS type_name,
+                   ROUND(AVG(EXTRACT(EPOCH FROM (di.resolved_at - di.reported_at)) / 3600)::numeric, 1) AS avg_hours
+            FROM device_issues di
+            JOIN devices d ON di.device_id = d.device_id
+            LEFT JOIN equipment_types et ON d.type_id = et.type_id
+            WHERE di.resolved_at IS NOT NULL
+            GROUP BY COALESCE(et.name, 'Unknown')
+            ORDER BY avg_hours DESC
+        """)
+        avg_resolution = cursor.fetchall()
+
+        # 10. Summary stats
+        cursor.execute("""
+            SELECT COUNT(*) AS total_issues,
+                   SUM(CASE WHEN LOWER(status) = 'open' THEN 1 ELSE 0 END) AS open_issues,
+                   SUM(CASE WHEN LOWER(status) = 'in-progress' THEN 1 ELSE 0 END) AS in_progress,
+                   SUM(CASE WHEN LOWER(status) = 'resolved' THEN 1 ELSE 0 END) AS resolved,
+                   COUNT(DISTINCT device_id) AS affected_devices
+            FROM device_issues
+        """)
+        summary = cursor.fetchone()
+
+        cursor.close()
+        conn.close()
+
+        # Serialize dates for JSON
+        for b in problematic_batches:
+            if b.get('bill_date'):
+                b['bill_date'] = b['bill_date'].strftime('%Y-%m-%d') if hasattr(b['bill_date'], 'strftime') else str(b['bill_date'])
+        for r in repeat_offenders:
+            if r.get('first_issue'):
+                r['first_issue'] = r['first_issue'].isoformat() if hasattr(r['first_issue'], 'isoformat') else str(r['first_issue'])
+            if r.get('last_issue'):
+                r['last_issue'] = r['last_issue'].isoformat() if hasattr(r['last_issue'], 'isoformat') else str(r['last_issue'])
+
+        return jsonify({
+            "success": True,
+            "timeline": timeline,
+            "severity_breakdown": severity_breakdown,
+            "status_breakdown": status_breakdown,
+            "problematic_batches": problematic_batches,
+            "repeat_offenders": repeat_offenders,
+            "issues_by_lab": issues_by_lab,
+            "issues_by_type": issues_by_type,
+            "common_issues": common_issues,
+            "avg_resolution": avg_resolution,
+            "summary": summary
+        })
+
+    except Exception as e:
+        print(f"Error fetching issue trends: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+
+# -----------------------------
+# AI Issue Insights
+# -----------------------------
+@issues_bp.route("/get_issue_insights", methods=["POST"])
+def get_issue_insights():
+    """
+    Send issue analytics data to local LLM for AI-powered insights.
+    """
+    try:
+        data = request.get_json(force=True)
+        analytics = data.get("analytics", {})
+
+        prompt = f"""You are an IT asset management analyst. Analyze the following issue data and provide actionable insights.
+
+ISSUE SUMMARY:
+- Total issues: {analytics.get('total_issues', 0)}
+- Open: {analytics.get('open_issues', 0)}
+- In Progress: {analytics.get('in_progress', 0)}
+- Resolved: {analytics.get('resolved', 0)}
+- Affected devices: {analytics.get('affected_devices', 0)}
+
+PROBLEMATIC BATCHES (bills with most issues):
+{json.dumps(analytics.get('problematic_batches', [])[:5], indent=2, default=str)}
+
+REPEAT OFFENDER DEVICES (devices with recurring issues):
+{json.dumps(analytics.get('repeat_offenders', [])[:5], indent=2, default=str)}
+
+ISSUES BY DEVICE TYPE:
+{json.dumps(analytics.get('issues_by_type', []), indent=2, default=str)}
+
+COMMON ISSUE TYPES:
+{json.dumps(analytics.get('common_issues', [])[:5], indent=2, default=str)}
+
+Based on this data, provide:
+1. KEY FINDINGS: 2-3 critical observations
+2. BATCH ALERTS: Which purchase batches need attention and why
+3. DEVICE ALERTS: Which specific devices should be replaced or need urgent maintenance
+4. RECOMMENDATIONS: 3-4 actionable steps to reduce future issues
+5. PATTERNS: Any concerning patterns you notice
+
+Be concise and specific. Use device IDs and invoice numbers when referencing items."""
+
+        try:
+            resp = requests.post(
+                "http://localhost:8080/v1/chat/completions",
+                json={
+                    "model": "local-model",
+                    "messages": [{"role": "user", "content": prompt}],
+                    "temperature": 0.3
+                },
+                timeout=120
+            )
+            if resp.status_code == 200:
+                result = resp.json()
+                insight_text = result.get("choices", [{}])[0].get("message", {}).get("content", "")
+                return jsonify({"success": True, "insights": insight_text})
+            else:
+                return jsonify({"success": False, "error": f"LLM returned status {resp.status_code}"}), 502
+        except requests.exceptions.ConnectionError:
+            return jsonify({"success": False, "error": "Local AI model not available at port 8080"}), 503
+        except requests.exceptions.Timeout:
+            return jsonify({"success": False, "error": "AI model request timed out"}), 504
+
+    except Exception as e:
+        print(f"Error getting AI insights: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+
+# =============================================
+# PROACTIVE MAINTENANCE ENDPOINTS
+# =============================================
+@issues_bp.route("/get_proactive_maintenance", methods=["GET"])
+def get_proactive_maintenance():
+    """
+    Comprehensive proactive maintenance analytics.
+    Returns: health scores, warranty alerts, risk heatmap,
+    maintenance timeline, at-risk assets, and summary stats.
+    """
+    try:
+        conn = db.get_connection()
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+
+        cursor = conn.cursor()
+
+        # 1. Asset health scores — compute for every active device
+        cursor.execute("""
+            SELECT d.device_id, d.asset_code, d.brand, d.model,
+                   d.assigned_code, d.is_active,
+                   COALESCE(et.name, 'Unknown') AS type_name,
+                   COALESCE(l.lab_name, 'Unassigned') AS lab_name,
+                   b.bill_date, b.vendor_name, b.invoice_number,
+                   CASE WHEN d.purchase_date IS NOT NULL AND d.warranty_years IS NOT NULL AND d.warranty_years > 0
+                        THEN d.purchase_date + (d.warranty_years * INTERVAL '1 year')
+                        ELSE NULL END AS warranty_expiry_date,
+                   COUNT(di.issue_id) AS issue_count,
+                   SUM(CASE WHEN LOWER(di.status) = 'open' THEN 1 ELSE 0 END) AS open_issues,
+                   SUM(CASE WHEN LOWER(di.severity) IN ('critical','high') THEN 1 ELSE 0 END) AS severe_issues,
+                   MAX(di.reported_at) AS last_issue_date,
+                   MIN(di.reported_at) AS first_issue_date
+            FROM devices d
+            LEFT JOIN equipment_types et ON d.type_id = et.type_id
+            LEFT JOIN labs l ON d.lab_id = l.lab_id
+            LEFT JOIN bills b ON d.bill_id = b.bill_id
+            LEFT JOIN device_issues di ON d.device_id = di.device_id
+            WHERE d.is_active = TRUE
+            GROUP BY d.device_id, d.asset_code, d.brand, d.model,
+                     d.assigned_code, d.is_active, et.name, l.lab_name,
+                     b.bill_date, b.vendor_name, b.invoice_number,
+                     d.purchase_date, d.warranty_years
+            ORDER BY issue_count DESC
+        """)
+        raw_devices = cursor.fetchall()
+
+        # Compute health scores
+        asset_health = []
+        high_risk_assets = []
+        for dev in raw_devices:
+            score = 100
+            issue_count = dev.get('issue_count', 0) or 0
+            open_issues = dev.get('open_issues', 0) or 0
+            severe_issues = dev.get('severe_issues', 0) or 0
+
+            # Deduct for issues — balanced so 2-3 issues surfaces the device, but 1 minor issue doesn't
+            score -= min(issue_count * 6, 30)    # max -30: 5+ issues fully penalised
+            score -= min(open_issues * 8, 20)    # max -20: 2-3 open issues is enough to flag
+            score -= min(severe_issues * 10, 25) # max -25: 2-3 severe issues is critical
+
+            # Deduct for recency of issues
+            last_issue = dev.get('last_issue_date')
+            if last_issue:
+                if hasattr(last_issue, 'timestamp'):
+                    days_since = (datetime.now() - last_issue).days
+                else:
+                    days_since = (datetime.now() - datetime.fromisoformat(str(last_issue))).days
+                if days_since < 7:
+                    score -= 10
+                elif days_since < 30:
+                    score -= 5
+                elif days_since < 90:
+                    score -= 2
+
+            # Deduct for warranty status
+            warranty_expiry = dev.get('warranty_expiry_date')
+            warranty_status = 'unknown'
+            days_until_expiry = None
+            if warranty_expiry:
+                if hasattr(warranty_expiry, 'date'):
+                    exp_date = warranty_expiry.date()
+                else:
+                    exp_date = datetime.fromisoformat(str(warranty_expiry)).date()
+                days_until_expiry = (exp_date - datetime.now().date()).days
+                if days_until_expiry < 0:
+                    warranty_status = 'expired'
+                    score -= 10
+                elif days_until_expiry <= 30:
+                    warranty_status = 'expiring_soon'
+                    score -= 5
+                elif days_until_expiry <= 90:
+                    warranty_status = 'expiring'
+                else:
+                    warranty_status = 'active'
+
+            score = max(score, 0)
+
+            risk_level = 'critical' if score <= 25 else ('high' if score <= 50 else ('medium' if score <= 75 else 'healthy'))
+
+            entry = {
+                'device_id': dev['device_id'],
+                'asset_code': dev.get('asset_code', ''),
+                'brand': dev.get('brand', ''),
+                'model': dev.get('model', ''),
+                'assigned_code': dev.get('assigned_code', ''),
+                'type_name': dev.get('type_name', 'Unknown'),
+                'lab_name': dev.get('lab_name', 'Unassigned'),
+                'vendor_name': dev.get('vendor_name', ''),
+                'invoice_number': dev.get('invoice_number', ''),
+                'issue_count': issue_count,
+                'open_issues': open_issues,
+                'severe_issues': severe_issues,
+                'health_score': score,
+                'risk_level': risk_level,
+                'warranty_status': warranty_status,
+                'days_until_expiry': days_until_expiry,
+                'last_issue_date': dev['last_issue_date'].isoformat() if dev.get('last_issue_date') and hasattr(dev['last_issue_date'], 'isoformat') else str(dev.get('last_issue_date', '')),
+                'first_issue_date': dev['first_issue_date'].isoformat() if dev.get('first_issue_date') and hasattr(dev['first_issue_date'], 'isoformat') else str(dev.get('first_issue_date', '')),
+            }
+            asset_health.append(entry)
+            if score <= 75:
+                high_risk_assets.append(entry)
+
+        # 2. Health distribution
+        health_distribution = [
+            {'range': 'Critical (0-25)', 'count': sum(1 for a in asset_health if a['health_score'] <= 25), 'color': '#ef4444'},
+            {'range': 'High Risk (26-50)', 'count': sum(1 for a in asset_health if 26 <= a['health_score'] <= 50), 'color': '#f97316'},
+            {'range': 'Medium (51-75)', 'count': sum(1 for a in asset_health if 51 <= a['health_score'] <= 75), 'color': '#eab308'},
+            {'range': 'Healthy (76-100)', 'count': sum(1 for a in asset_health if a['health_score'] >= 76), 'color': '#22c55e'},
+        ]
+
+        # 3. Warranty expiry alerts
+        warranty_alerts = {'expired': [], 'within_30': [], 'within_60': [], 'within_90': []}
+        for a in asset_health:
+            d = a.get('days_until_expiry')
+            if d is None:
+                continue
+            if d < 0:
+                warranty_alerts['expired'].append(a)
+            elif d <= 30:
+                warranty_alerts['within_30'].append(a)
+            elif d <= 60:
+                warranty_alerts['within_60'].append(a)
+            elif d <= 90:
+                warranty_alerts['within_90'].append(a)
+
+        # 4. Maintenance timeline (issues per month, last 12 months)
+        cursor.execute("""
+            SELECT TO_CHAR(reported_at, 'YYYY-MM') AS month,
+                   COUNT(*) AS total,
+                   SUM(CASE WHEN LOWER(severity) = 'critical' THEN 1 ELSE 0 END) AS critical,
+                   SUM(CASE WHEN LOWER(severity) = 'high' THEN 1 ELSE 0 END) AS high,
+                   SUM(CASE WHEN LOWER(severity) = 'medium' THEN 1 ELSE 0 END) AS medium,
+                   SUM(CASE WHEN LOWER(severity) = 'low' THEN 1 ELSE 0 END) AS low
+            FROM device_issues
+            WHERE reported_at >= NOW() - INTERVAL '12 months'
+            GROUP BY TO_CHAR(reported_at, 'YYYY-MM')
+            ORDER BY month
+        """)
+        maintenance_timeline = cursor.fetchall()
+
+        # 5. Open issues by age
+        cursor.execute("""
+            SELECT
+                SUM(CASE WHEN EXTRACT(DAY FROM NOW() - reported_at) <= 7 THEN 1 ELSE 0 END) AS week,
+                SUM(CASE WHEN EXTRACT(DAY FROM NOW() - reported_at) > 7 AND EXTRACT(DAY FROM NOW() - reported_at) <= 30 THEN 1 ELSE 0 END) AS month,
+                SUM(CASE WHEN EXTRACT(DAY FROM NOW() - reported_at) > 30 AND EXTRACT(DAY FROM NOW() - reported_at) <= 90 THEN 1 ELSE 0 END) AS quarter,
+                SUM(CASE WHEN EXTRACT(DAY FROM NOW() - reported_at) > 90 THEN 1 ELSE 0 END) AS older
+            FROM device_issues
+            WHERE LOWER(status) IN ('open', 'in-progress')
+        """)
+        issues_by_age_raw = cursor.fetchone()
+        issues_by_age = [
+            {'age': '0-7 days', 'count': issues_by_age_raw.get('week', 0) or 0},
+            {'age': '8-30 days', 'count': issues_by_age_raw.get('month', 0) or 0},
+            {'age': '31-90 days', 'count': issues_by_age_raw.get('quarter', 0) or 0},
+            {'age': '90+ days', 'count': issues_by_age_raw.get('older', 0) or 0},
+        ]
+
+        # 6. Lab risk heatmap
+        cursor.execute("""
+            SELECT COALESCE(l.lab_name, 'Unassigned') AS lab_name,
+                   COUNT(DISTINCT d.device_id) AS total_devices,
+                   COUNT(di.issue_id) AS total_issues,
+                   SUM(CASE WHEN LOWER(di.status) = 'open' THEN 1 ELSE 0 END) AS open_issues,
+                   SUM(CASE WHEN LOWER(di.severity) IN ('critical','high') THEN 1 ELSE 0 END) AS severe_issues
+            FROM devices d
+            LEFT JOIN labs l ON d.lab_id = l.lab_id
+            LEFT JOIN device_issues di ON d.device_id = di.device_id
+            WHERE d.is_active = TRUE
+            GROUP BY COALESCE(l.lab_name, 'Unassigned')
+            ORDER BY total_issues DESC
+        """)
+        lab_risk = cursor.fetchall()
+
+        # 7. Summary stats
+        total_devices = len(asset_health)
+        needs_attention = len(high_risk_assets)
+        upcoming_warranty = len(warranty_alerts['within_30']) + len(warranty_alerts['within_60']) + len(warranty_alerts['within_90'])
+        expired_warranty = len(warranty_alerts['expired'])
+
+        cursor.execute("""
+            SELECT COUNT(*) AS critical_open
+            FROM device_issues
+            WHERE LOWER(status) = 'open' AND LOWER(severity) = 'critical'
+        """)
+        critical_open = cursor.fetchone().get('critical_open', 0) or 0
+
+        cursor.close()
+        conn.close()
+
+        summary = {
+            'total_devices': total_devices,
+            'needs_attention': needs_attention,
+            'upcoming_warranty': upcoming_warranty,
+            'expired_warranty': expired_warranty,
+            'critical_open': critical_open,
+        }
+
+        return jsonify({
+            "success": True,
+            "asset_health": asset_health,
+            "high_risk_assets": high_risk_assets,
+            "health_distribution": health_distribution,
+            "warranty_alerts": warranty_alerts,
+            "maintenance_timeline": maintenance_timeline,
+            "issues_by_age": issues_by_age,
+            "lab_risk": lab_risk,
+            "summary": summary,
+        })
+
+    except Exception as e:
+        print(f"Error fetching proactive maintenance data: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+
+@issues_bp.route("/get_maintenance_insights", methods=["POST"])
+def get_maintenance_insights():
+    """
+    Send maintenance analytics to local LLM for AI-powered proactive insights.
+    """
+    try:
+        data = request.get_json(force=True)
+        analytics = data.get("analytics", {})
+
+        prompt = f"""You are an IT asset management analyst specializing in proactive maintenance. Analyze the following data and provide a preventive maintenance strategy.
+
+ASSET HEALTH SUMMARY:
+- Total devices: {analytics.get('total_devices', 0)}
+- Devices needing attention (health score ≤ 50): {analytics.get('needs_attention', 0)}
+- Upcoming warranty expirations: {analytics.get('upcoming_warranty', 0)}
+- Expired warranties: {analytics.get('expired_warranty', 0)}
+- Open critical issues: {analytics.get('critical_open', 0)}
+
+HIGH-RISK ASSETS (health score ≤ 50):
+{json.dumps(analytics.get('high_risk_assets', [])[:8], indent=2, default=str)}
+
+WARRANTY ALERTS:
+- Expired: {len(analytics.get('warranty_expired', []))} devices
+- Expiring within 30 days: {len(analytics.get('warranty_30', []))} devices
+- Expiring within 60 days: {len(analytics.get('warranty_60', []))} devices
+
+LAB RISK DATA:
+{json.dumps(analytics.get('lab_risk', [])[:6], indent=2, default=str)}
+
+OPEN ISSUES BY AGE:
+{json.dumps(analytics.get('issues_by_age', []), indent=2, default=str)}
+
+Based on this data, provide:
+### CRITICAL ALERTS
+2-3 most urgent issues that need immediate attention.
+### MAINTENANCE SCHEDULE
+Suggest a prioritized maintenance schedule for the next 30 days.
+### RISK ASSESSMENT
+Identify which labs and device types are at highest risk.
+### COST SAVINGS
+Estimate potential savings from proactive vs reactive maintenance.
+### ACTION ITEMS
+5 specific actionable steps to improve asset health.
+
+Be concise. Use device codes and lab names when referencing items."""
+
+        try:
+            resp = requests.post(
+                "http://localhost:8080/v1/chat/completions",
+                json={
+                    "model": "local-model",
+                    "messages": [{"role": "user", "content": prompt}],
+                    "temperature": 0.3
+                },
+                timeout=120
+            )
+            if resp.status_code == 200:
+                result = resp.json()
+                insight_text = result.get("choices", [{}])[0].get("message", {}).get("content", "")
+                return jsonify({"success": True, "insights": insight_text})
+            else:
+                return jsonify({"success": False, "error": f"LLM returned status {resp.status_code}"}), 502
+        except requests.exceptions.ConnectionError:
+            return jsonify({"success": False, "error": "Local AI model not available at port 8080"}), 503
+        except requests.exceptions.Timeout:
+            return jsonify({"success": False, "error": "AI model request timed out"}), 504
+
+    except Exception as e:
+        print(f"Error getting maintenance insights: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
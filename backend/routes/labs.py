@@ -0,0 +1,2034 @@
+"""
+Lab Routes
+Lab configuration, station lists, layout editor, auto-assignment of devices
+and the public (student) lab view.
+"""
+
+import logging
+import os
+import traceback
+import uuid
+
+from flask import Blueprint, jsonify, request
+
+from config.database import db
+from utils.logging_config import get_logger
+
+FRONTEND_PUBLIC_BASE_URL = os.getenv("FRONTEND_PUBLIC_BASE_URL", "http://localhost:5173").rstrip("/")
+
+labs_bp = Blueprint("labs", __name__)
+logger = get_logger("assetiq.labs")
+
+
+# -----------------------------
+# Reserve Devices for Lab (pool by device_id)
+# -----------------------------
+@labs_bp.route("/reserve_devices_for_lab", methods=["POST"])
+def reserve_devices_for_lab():
+    """Reserve specific device rows for a lab by setting lab_id. Devices become part of the lab pool."""
+    try:
+        data = request.json
+        lab_id = data.get("labId", "").strip()
+        type_name = data.get("type", "")
+        brand = data.get("brand")
+        model = data.get("model")
+        bill_id = data.get("billId")
+        invoice_number = data.get("invoiceNumber")
+        quantity = int(data.get("quantity", 0))
+
+        if not lab_id:
+            return jsonify({"error": "labId is required"}), 400
+        if not type_name:
+            return jsonify({"error": "type is required"}), 400
+        if quantity <= 0:
+            return jsonify({"error": "quantity must be > 0"}), 400
+
+        conn = db.get_connection()
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+        cursor = conn.cursor()
+
+        try:
+            # Find N free devices matching criteria (not pooled, not assigned)
+            cursor.execute("""
+                SELECT device_id FROM devices
+                WHERE type_id = (SELECT type_id FROM equipment_types WHERE name = %s LIMIT 1)
+                  AND brand IS NOT DISTINCT FROM %s
+                  AND model IS NOT DISTINCT FROM %s
+                  AND bill_id IS NOT DISTINCT FROM %s
+                  AND invoice_number IS NOT DISTINCT FROM %s
+                  AND (assigned_code IS NULL OR assigned_code = '')
+                  AND lab_id IS NULL
+                ORDER BY device_id
+                LIMIT %s
+            """, (type_name, brand, model, bill_id, invoice_number, quantity))
+            rows = cursor.fetchall()
+
+            if len(rows) < quantity:
+                return jsonify({"error": f"Only {len(rows)} devices available, requested {quantity}"}), 400
+
+            device_ids = [r['device_id'] for r in rows]
+
+            # Mark devices as pooled for this lab
+            cursor.execute(
+                "UPDATE devices SET lab_id = %s WHERE device_id = ANY(%s)",
+                (lab_id, device_ids)
+            )
+
+            conn.commit()
+            return jsonify({
+                "success": True,
+                "message": f"{quantity} {type_name}(s) reserved for lab {lab_id}",
+                "deviceIds": device_ids
+            })
+        except Exception as db_err:
+            conn.rollback()
+            raise db_err
+        finally:
+            cursor.close()
+            conn.close()
+    except Exception as e:
+        print(f"Error reserving devices: {e}")
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+
+# -----------------------------
+# Release Devices from Lab Pool
+# -----------------------------
+@labs_bp.route("/release_devices_from_lab", methods=["POST"])
+def release_devices_from_lab():
+    """Release pooled-but-unassigned devices from a lab back to free inventory."""
+    try:
+        data = request.json
+        lab_id = data.get("labId", "").strip()
+        type_name = data.get("type", "")
+        brand = data.get("brand")
+        model = data.get("model")
+        bill_id = data.get("billId")
+        invoice_number = data.get("invoiceNumber")
+        quantity = int(data.get("quantity", 0))
+
+        if not lab_id:
+            return jsonify({"error": "labId is required"}), 400
+        if quantity <= 0:
+            return jsonify({"error": "quantity must be > 0"}), 400
+
+        conn = db.get_connection()
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+        cursor = conn.cursor()
+
+        try:
+            # Only release devices that are pooled but NOT yet assigned
+            cursor.execute("""
+                SELECT device_id FROM devices
+                WHERE lab_id = %s
+                  AND type_id = (SELECT type_id FROM equipment_types WHERE name = %s LIMIT 1)
+                  AND brand IS NOT DISTINCT FROM %s
+                  AND model IS NOT DISTINCT FROM %s
+                  AND bill_id IS NOT DISTINCT FROM %s
+                  AND invoice_number IS NOT DISTINCT FROM %s
+                  AND (assigned_code IS NULL OR assigned_code = '')
+                ORDER BY device_id
+                LIMIT %s
+            """, (lab_id, type_name, brand, model, bill_id, invoice_number, quantity))
+            rows = cursor.fetchall()
+            released_count = len(rows)
+
+            if released_count == 0:
+                return jsonify({
+                    "success": False,
+                    "error": "No unassigned devices of this type to release. Reset assignments first if they are already assigned."
+                }), 400
+
+            device_ids = [r['device_id'] for r in rows]
+            cursor.execute(
+                "UPDATE devices SET lab_id = NULL WHERE device_id = ANY(%s)",
+                (device_ids,)
+            )
+
+            conn.commit()
+            return jsonify({
+                "success": True,
+                "message": f"{released_count} device(s) released from lab {lab_id}",
+                "releasedCount": released_count,
+                "deviceIds": device_ids
+            })
+        except Exception as db_err:
+            conn.rollback()
+            raise db_err
+        finally:
+            cursor.close()
+            conn.close()
+    except Exception as e:
+        print(f"Error releasing devices: {e}")
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+
+# -----------------------------
+# Get All Labs
+# -----------------------------
+@labs_bp.route("/get_labs", methods=["GET"])
+def get_labs():
+    """
+    Get all labs from database for dropdown
+    """
+    try:
+        conn = db.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute(
+            """
+            SELECT l.lab_id, l.lab_name, l.rows, l.columns,
+                   COALESCE(
+                       string_agg(TRIM(CONCAT_WS(' ', u.first_name, u.last_name)), ', '),
+                       ''
+                   ) AS incharge_name
+            FROM labs l
+            LEFT JOIN users u
+              ON u.assigned_lab = l.lab_id
+             AND u.role = 'Lab Incharge'
+            GROUP BY l.lab_id, l.lab_name, l.rows, l.columns
+            ORDER BY l.lab_id
+            """
+        )
+        labs = cursor.fetchall()
+        
+        return jsonify({
+            "success": True,
+            "labs": labs
+        })
+    
+    except Exception as e:
+        print(f"Error fetching labs: {str(e)}")
+        traceback.print_exc()
+        return jsonify({
+            "error": str(e),
+            "success": False
+        }), 500
+
+
+# -----------------------------
+# Get Lab Configuration
+# -----------------------------
+@labs_bp.route("/get_lab/<lab_id>", methods=["GET"])
+def get_lab(lab_id):
+    """
+    Get complete lab configuration including equipment and seating arrangement
+    """
+    try:
+        conn = db.get_connection()
+        cursor = conn.cursor()
+        
+        # Get lab basic info
+        cursor.execute(
+            """SELECT lab_id, lab_name, rows, columns, layout_id
+               FROM labs 
+               WHERE lab_id = %s""",
+            (lab_id,)
+        )
+        lab = cursor.fetchone()
+        
+        if not lab:
+            return jsonify({
+                "error": "Lab not found",
+                "success": False
+            }), 404
+        
+        # Get equipment pool directly from devices table (source of truth)
+        cursor.execute(
+            """SELECT et.name AS equipment_type, d.brand, d.model, d.specification,
+                      d.invoice_number, d.bill_id,
+                      AVG(d.unit_price) AS avg_unit_price,
+                      COUNT(*) AS quantity,
+                      COUNT(CASE WHEN d.assigned_code IS NOT NULL AND d.assigned_code != ''
+                            THEN 1 END) AS quantity_assigned
+               FROM devices d
+               JOIN equipment_types et ON d.type_id = et.type_id
+               WHERE d.lab_id = %s
+               GROUP BY et.name, d.brand, d.model, d.specification,
+                        d.invoice_number, d.bill_id""",
+            (lab_id,)
+        )
+        equipment_pool = cursor.fetchall()
+        logger.debug("Equipment pool fetched: %d items", len(equipment_pool))
+        if logger.isEnabledFor(logging.DEBUG):
+            for eq in equipment_pool:
+                logger.debug("  - %s %s %s: %s units (%s assigned) @ ₹%s",
+                             eq['equipment_type'], eq['brand'], eq['model'], eq['quantity'],
+                             eq['quantity_assigned'], eq.get('avg_unit_price', 0) or 0)
+        
+        # Get grid cells to reconstruct seating arrangement
+        cursor.execute(
+            """SELECT row_number, column_number, assigned_code, 
+                      equipment_type, os_windows, os_linux, os_other, 
+                      is_empty, station_id
+               FROM lab_grid_cells
+               WHERE lab_id = %s
+               ORDER BY row_number, column_number""",
+            (lab_id,)
+        )
+        grid_cells = cursor.fetchall()
+        logger.debug("Grid cells fetched: %d cells", len(grid_cells))
+
+        # Fetch layout blueprint cells (station types) to render empty stations
+        layout_map = {}
+        layout_id = lab.get('layout_id')
+        if layout_id:
+            cursor.execute(
+                """SELECT lc.row_number, lc.column_number,
+                          lc.station_type_id, lc.os_windows, lc.os_linux, lc.os_other,
+                          st.name AS station_type_name, st.name AS station_type_label
+                   FROM lab_layout_cells lc
+                   LEFT JOIN station_types st ON lc.station_type_id = st.station_type_id
+                   WHERE lc.layout_id = %s""",
+                (layout_id,)
+            )
+            layout_cells = cursor.fetchall()
+            for cell in layout_cells:
+                if cell['station_type_id'] is None:
+                    continue
+                os_list = []
+                if cell['os_windows']:
+                    os_list.append("Windows")
+                if cell['os_linux']:
+                    os_list.append("Linux")
+                if cell['os_other']:
+                    os_list.append("Other")
+                layout_map[(cell['row_number'], cell['column_number'])] = {
+                    'stationTypeLabel': cell['station_type_label'] or cell['station_type_name'] or 'Empty',
+                    'os': os_list
+                }
+        
+        # Get station devices for each station
+        # Check if station_qr_value column exists
+        cursor.execute(
+            """SELECT 1 FROM information_schema.columns
+               WHERE table_name = 'lab_stations' AND column_name = 'station_qr_value'"""
+        )
+        has_station_qr_col = cursor.fetchone() is not None
+
+        station_qr_select = ", ls.station_qr_value" if has_station_qr_col else ""
+        cursor.execute(
+            f"""SELECT lsd.station_id, lsd.device_id, lsd.device_type, lsd.brand, lsd.model,
+                      lsd.specification, lsd.invoice_number, lsd.bill_id,
+                      lsd.is_linked, lsd.linked_group_id,
+                      ls.assigned_code,
+                      d.is_active,
+                      d.assigned_code AS device_assigned_code,
+                      d.type_id
+                      {station_qr_select}
+               FROM lab_station_devices lsd
+               JOIN lab_stations ls ON lsd.station_id = ls.station_id
+               LEFT JOIN devices d ON lsd.device_id = d.device_id
+               WHERE ls.lab_id = %s
+               ORDER BY lsd.station_id, lsd.device_type""",
+            (lab_id,)
+        )
+        station_devices = cursor.fetchall()
+        logger.debug("Station devices fetched: %d device assignments", len(station_devices))
+        if logger.isEnabledFor(logging.DEBUG):
+            for sd in station_devices:
+                logger.debug("  - Station %s: %s %s %s (device_id=%s)",
+                             sd['station_id'], sd['device_type'], sd['brand'], sd['model'], sd['device_id'])
+
+        # Existing station device ids
+        device_ids = [sd['device_id'] for sd in station_devices if sd.get('device_id')]
+
+        # Fallback: devices assigned to this lab by assigned_code but missing in lab_station_devices
+        # Only include devices that are currently assigned to this lab (lab_id matches)
+        cursor.execute(
+            """SELECT d.device_id, d.assigned_code, d.is_active, d.brand, d.model,
+                          d.bill_id, d.invoice_number, et.name AS device_type, ls.station_id
+                   FROM devices d
+                   JOIN lab_stations ls ON d.assigned_code = ls.assigned_code
+                   LEFT JOIN equipment_types et ON d.type_id = et.type_id
+                   WHERE ls.lab_id = %s 
+                     AND (d.lab_id = %s OR d.lab_id IS NULL)
+                     AND d.assigned_code IS NOT NULL
+                     AND d.assigned_code != ''""",
+            (lab_id, lab_id)
+        )
+        fallback_devices = cursor.fetchall()
+        fallback_device_ids = [fd['device_id'] for fd in fallback_devices]
+        # Merge device ids so we fetch issues for all
+        merged_device_ids = list({*device_ids, *fallback_device_ids})
+
+        # Fetch issues for all devices in this lab so UI can show counts/colors
+        # Only fetch issues for devices that are currently in this lab
+        issues_map = {}
+        if merged_device_ids:
+            cursor.execute(
+                """SELECT di.issue_id, di.device_id, di.issue_title, di.description,
+                          LOWER(di.status) AS status, di.reported_at, di.resolved_at,
+                          COALESCE(di.severity, 'medium') AS severity,
+                          COALESCE(di.reported_by, 'System') AS reported_by
+                   FROM device_issues di
+                   JOIN devices d ON di.device_id = d.device_id
+                   WHERE di.device_id = ANY(%s)
+                     AND (d.lab_id = %s OR d.assigned_code LIKE %s)
+                     AND LOWER(di.status) != 'resolved'
+                   ORDER BY di.reported_at DESC""",
+                (merged_device_ids, lab_id, f"{lab_id}/%")
+            )
+            issues = cursor.fetchall()
+            for issue in issues:
+                dev_id = issue['device_id']
+                if dev_id not in issues_map:
+                    issues_map[dev_id] = []
+                issues_map[dev_id].append({
+                    "id": issue['issue_id'],
+                    "title": issue['issue_title'],
+                    "description": issue['description'],
+                    "severity": issue['severity'],
+                    "status": issue['status'],
+                    "reportedDate": issue['reported_at'].isoformat() if issue['reported_at'] else None,
+                    "reportedBy": issue['reported_by'],
+                })
+        
+        # Build grid structure
+        rows = lab['rows']
+        columns = lab['columns']
+        grid = [[{"id": None, "equipmentType": "Empty", "os": []} 
+                 for _ in range(columns)] for _ in range(rows)]
+        
+        # Map station_id to devices
+        station_device_map = {}
+        for sd in station_devices:
+            station_id = sd['station_id']
+            if station_id not in station_device_map:
+                station_device_map[station_id] = {
+                    'devices': [],
+                    'assigned_code': sd['assigned_code'],
+                    'station_qr_value': sd.get('station_qr_value', '')
+                }
+            station_device_map[station_id]['devices'].append({
+                'deviceId': sd['device_id'],
+                'type': sd['device_type'],
+                'brand': sd['brand'],
+                'model': sd['model'],
+                'billId': sd['bill_id'],
+                'invoiceNumber': sd['invoice_number'],
+                'isActive': sd['is_active'] if sd['is_active'] is not None else True,
+                'assignedCode': sd['device_assigned_code'] or sd['assigned_code'],
+                'issues': issues_map.get(sd['device_id'], [])
+            })
+
+        # Use fallback devices for stations missing lab_station_devices rows
+        for fd in fallback_devices:
+            station_id = fd['station_id']
+            if station_id not in station_device_map:
+                station_device_map[station_id] = {
+                    'devices': [],
+                    'assigned_code': fd['assigned_code']
+                }
+            if not station_device_map[station_id]['devices']:
+                station_device_map[station_id]['devices'].append({
+                    'deviceId': fd['device_id'],
+                    'type': fd['device_type'],
+                    'brand': fd['brand'],
+                    'model': fd['model'],
+                    'billId': fd['bill_id'],
+                    'invoiceNumber': fd['invoice_number'],
+                    'isActive': fd['is_active'] if fd['is_active'] is not None else True,
+                    'assignedCode': fd['assigned_code'],
+                    'issues': issues_map.get(fd['device_id'], [])
+                })
+        
+        # Populate grid with cells
+        for cell in grid_cells:
+            row_idx = cell['row_number']
+            col_idx = cell['column_number']
+            
+            if row_idx < rows and col_idx < columns:
+                os_list = []
+                if cell['os_windows']:
+                    os_list.append("Windows")
+                if cell['os_linux']:
+                    os_list.append("Linux")
+                if cell['os_other']:
+                    os_list.append("Other")
+
+                layout_info = layout_map.get((row_idx, col_idx))
+                if not os_list and layout_info:
+                    os_list = layout_info['os']
+                
+                grid_cell = {
+                    "id": cell['assigned_code'],
+                    "equipmentType": cell['equipment_type'] or (layout_info['stationTypeLabel'] if layout_info else "Empty"),
+                    "os": os_list
+                }
+                
+                # Add device group if station has devices
+                station_id = cell['station_id']
+                if station_id and station_id in station_device_map:
+                    smap = station_device_map[station_id]
+                    # Build station QR on-the-fly if not stored in DB
+                    sqr = smap.get('station_qr_value') or ''
+                    if not sqr and smap['devices']:
+                        codes = [d.get('assignedCode', '') for d in smap['devices'] if d.get('assignedCode')]
+                        if codes:
+                            sqr = f"STATION|{smap['assigned_code']}|{','.join(codes)}"
+                    grid_cell['deviceGroup'] = {
+                        'assignedCode': smap['assigned_code'],
+                        'devices': smap['devices'],
+                        'stationQrValue': sqr
+                    }
+                
+                grid[row_idx][col_idx] = grid_cell
+
+        # Fill grid with layout station types where no lab_grid_cells row exists
+        for (row_idx, col_idx), layout_info in layout_map.items():
+            if row_idx < rows and col_idx < columns:
+                if grid[row_idx][col_idx].get("equipmentType") == "Empty":
+                    grid[row_idx][col_idx]["equipmentType"] = layout_info['stationTypeLabel']
+                if not grid[row_idx][col_idx].get("os"):
+                    grid[row_idx][col_idx]["os"] = layout_info['os']
+        
+        # Format equipment for frontend
+        equipment = []
+        for eq in equipment_pool:
+            equipment.append({
+                'type': eq['equipment_type'],
+                'quantity': eq['quantity'],
+                'quantityAssigned': eq['quantity_assigned'],
+                'brand': eq['brand'],
+                'model': eq['model'],
+                'specification': eq['specification'],
+                'invoiceNumber': eq['invoice_number'],
+                'billId': eq['bill_id'],
+                'unitPrice': float(eq['avg_unit_price']) if eq.get('avg_unit_price') else 0
+            })
+        
+        # Extract assigned code prefix from first assigned code (e.g., "apsit/it/309/1" -> "apsit/it/309")
+        assigned_code_prefix = ""
+        if grid_cells:
+            first_code = None
+            for cell in grid_cells:
+                if cell['assigned_code']:
+                    first_code = cell['assigned_code']
+                    break
+            
+            if first_code:
+                # Remove the trailing number (e.g., "apsit/it/309/1" -> "apsit/it/309")
+                parts = first_code.rsplit('/', 1)
+                if len(parts) == 2:
+                    assigned_code_prefix = parts[0]
+        
+        return jsonify({
+            "success": True,
+            "lab": {
+                "labNumber": lab['lab_id'],
+                "labName": lab['lab_name'],
+                "equipment": equipment,
+                "assignedCodePrefix": assigned_code_prefix,
+                "seatingArrangement": {
+                    "rows": rows,
+                    "columns": columns,
+                    "grid": grid
+                }
+            }
+        })
+    
+    except Exception as e:
+        logger.exception("Error fetching lab configuration: %s", e)
+        return jsonify({
+            "error": str(e),
+            "success": False
+        }), 500
+
+
+# -----------------------------
+# Get Lab Station List (for export)
+# -----------------------------
+@labs_bp.route("/get_lab_station_list/<lab_id>", methods=["GET"])
+def get_lab_station_list(lab_id):
+    """
+    Get lab stations with their devices in a flat format for table display and Excel export
+    """
+    try:
+        conn = db.get_connection()
+        cursor = conn.cursor()
+        
+        # Get lab info
+        cursor.execute(
+            """SELECT lab_id, lab_name FROM labs WHERE lab_id = %s""",
+            (lab_id,)
+        )
+        lab = cursor.fetchone()
+        
+        if not lab:
+            return jsonify({"success": False, "error": "Lab not found"}), 404
+
+        # Check if station_qr_value column exists
+        cursor.execute(
+            """SELECT 1 FROM information_schema.columns
+               WHERE table_name = 'lab_stations' AND column_name = 'station_qr_value'"""
+        )
+        has_station_qr = cursor.fetchone() is not None
+        sqr_col = ", ls.station_qr_value" if has_station_qr else ""
+
+        # Get all stations with their devices
+        cursor.execute(
+            f"""SELECT 
+                ls.station_id,
+                ls.assigned_code,
+                lgc.row_number,
+                lgc.column_number,
+                lgc.os_windows,
+                lgc.os_linux,
+                lgc.os_other,
+                lsd.device_id,
+                lsd.device_type,
+                lsd.brand,
+                lsd.model,
+                lsd.specification,
+                lsd.invoice_number,
+                lsd.is_linked,
+                lsd.linked_group_id,
+                d.asset_code,
+                d.unit_price,
+                d.warranty_years,
+                d.purchase_date,
+                d.is_active,
+                d.qr_value,
+                d.assigned_code AS device_assigned_code
+                {sqr_col}
+            FROM lab_stations ls
+            LEFT JOIN lab_grid_cells lgc ON ls.station_id = lgc.station_id
+            LEFT JOIN lab_station_devices lsd ON ls.station_id = lsd.station_id
+            LEFT JOIN devices d ON lsd.device_id = d.device_id
+            WHERE ls.lab_id = %s
+            ORDER BY ls.assigned_code, lsd.device_type""",
+            (lab_id,)
+        )
+        results = cursor.fetchall()
+        
+        # Get all device IDs for issue lookup
+        device_ids = [row['device_id'] for row in results if row['device_id']]
+        
+        # Fetch issues for all devices
+        issues_map = {}
+        if device_ids:
+            cursor.execute(
+                """SELECT di.issue_id, di.device_id, di.issue_title, di.description,
+                          LOWER(di.status) AS status, di.reported_at,
+                          COALESCE(di.severity, 'medium') AS severity,
+                          COALESCE(di.reported_by, 'System') AS reported_by
+                   FROM device_issues di
+                   WHERE di.device_id = ANY(%s)
+                     AND LOWER(di.status) != 'resolved'
+                   ORDER BY di.reported_at DESC""",
+                (device_ids,)
+            )
+            issues = cursor.fetchall()
+            for issue in issues:
+                dev_id = issue['device_id']
+                if dev_id not in issues_map:
+                    issues_map[dev_id] = []
+                issues_map[dev_id].append({
+                    'issueId': issue['issue_id'],
+                    'title': issue['issue_title'],
+                    'description': issue['description'],
+                    'severity': issue['severity'],
+                    'status': issue['status'],
+                    'reportedAt': issue['reported_at'].isoformat() if issue['reported_at'] else None,
+                    'reportedBy': issue['reported_by'],
+                })
+        
+        # Group by station
+        stations_map = {}
+        for row in results:
+            station_id = row['station_id']
+            assigned_code = row['assigned_code']
+            
+            if station_id not in stations_map:
+                # Build OS list
+                os_list = []
+                if row['os_windows']:
+                    os_list.append('Windows')
+                if row['os_linux']:
+                    os_list.append('Linux')
+                if row['os_other']:
+                    os_list.append('Other')
+                
+                stations_map[station_id] = {
+                    'stationId': station_id,
+                    'assignedCode': assigned_code,
+                    'row': row['row_number'],
+                    'column': row['column_number'],
+                    'os': ', '.join(os_list) if os_list else 'N/A',
+                    'stationQrValue': row.get('station_qr_value', ''),
+                    'devices': []
+                }
+            
+            # Add device if exists
+            if row['device_id']:
+                device_id = row['device_id']
+                device_data = {
+                    'deviceId': device_id,
+                    'type': row['device_type'],
+                    'brand': row['brand'],
+                    'model': row['model'],
+                    'specification': row['specification'],
+                    'assetCode': row['asset_code'],
+                    'prefixCode': row.get('device_assigned_code', ''),
+                    'unitPrice': float(row['unit_price']) if row['unit_price'] else 0,
+                    'warrantyYears': row['warranty_years'],
+                    'purchaseDate': row['purchase_date'].strftime('%Y-%m-%d') if row['purchase_date'] else None,
+                    'invoiceNumber': row['invoice_number'],
+                    'isLinked': row['is_linked'],
+                    'linkedGroupId': row['linked_group_id'],
+                    'isActive': row['is_active'],
+                    'qrValue': row['qr_value'],
+                    'issues': issues_map.get(device_id, [])
+                }
+                stations_map[station_id]['devices'].append(device_data)
+        
+        # Build station QR on-the-fly for stations missing stored value
+        for sid, sdata in stations_map.items():
+            if not sdata.get('stationQrValue') and sdata['devices']:
+                codes = [d.get('prefixCode') or d.get('assetCode', '') for d in sdata['devices'] if d.get('prefixCode') or d.get('assetCode')]
+                if codes:
+                    sdata['stationQrValue'] = f"STATION|{sdata['assignedCode']}|{','.join(codes)}"
+
+        # Convert to list
+        stations_list = list(stations_map.values())
+        
+        cursor.close()
+        conn.close()
+        
+        return jsonify({
+            "success": True,
+            "labName": lab['lab_name'],
+            "labId": lab['lab_id'],
+            "stations": stations_list
+        })
+    
+    except Exception as e:
+        print(f"Error fetching lab station list: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+# -----------------------------
+# Get or Create Lab Public QR
+# -----------------------------
+@labs_bp.route("/get_or_create_lab_public_qr/<lab_id>", methods=["GET"])
+def get_or_create_lab_public_qr(lab_id):
+    """
+    Ensure each lab has a stable public token used in student-facing QR URLs.
+    """
+    try:
+        conn = db.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            """
+            SELECT lab_id, lab_name, lab_public_token
+            FROM labs
+            WHERE lab_id = %s
+            """,
+            (lab_id,)
+        )
+        lab_row = cursor.fetchone()
+        if not lab_row:
+            cursor.close()
+            conn.close()
+            return jsonify({"success": False, "error": "Lab not found"}), 404
+
+        token = (lab_row.get("lab_public_token") or "").strip()
+        if not token:
+            token = uuid.uuid4().hex
+            cursor.execute(
+                "UPDATE labs SET lab_public_token = %s WHERE lab_id = %s",
+                (token, lab_id)
+            )
+            conn.commit()
+
+        cursor.close()
+        conn.close()
+
+        public_url = f"{FRONTEND_PUBLIC_BASE_URL}/student/lab/{token}"
+        return jsonify({
+            "success": True,
+            "labId": lab_row["lab_id"],
+            "labName": lab_row["lab_name"],
+            "labPublicToken": token,
+            "publicUrl": public_url,
+            "qrValue": public_url,
+        })
+    except Exception as e:
+        print(f"Error generating lab public QR: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+# -----------------------------
+# Public: Get Lab Station Data by Token
+# -----------------------------
+@labs_bp.route("/public/lab/<lab_token>", methods=["GET"])
+def get_public_lab_by_token(lab_token):
+    """
+    Public endpoint for students scanning a lab QR.
+    Returns lab station/device details needed to raise complaints.
+    """
+    try:
+        conn = db.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            """
+            SELECT lab_id, lab_name
+            FROM labs
+            WHERE lab_public_token = %s
+            """,
+            (lab_token,)
+        )
+        lab = cursor.fetchone()
+        if not lab:
+            cursor.close()
+            conn.close()
+            return jsonify({"success": False, "error": "Invalid or expired lab QR"}), 404
+
+        cursor.execute(
+            """
+            SELECT
+                ls.station_id,
+                ls.assigned_code,
+                lgc.row_number,
+                lgc.column_number,
+                COALESCE(lgc.equipment_type, '') AS station_type_label,
+                lsd.device_id,
+                lsd.device_type,
+                lsd.brand,
+                lsd.model,
+                lsd.specification,
+                d.asset_code,
+                d.assigned_code AS device_assigned_code,
+                d.is_active
+            FROM lab_stations ls
+            LEFT JOIN lab_grid_cells lgc ON ls.station_id = lgc.station_id
+            LEFT JOIN lab_station_devices lsd ON ls.station_id = lsd.station_id
+            LEFT JOIN devices d ON lsd.device_id = d.device_id
+            WHERE ls.lab_id = %s
+            ORDER BY ls.assigned_code, lsd.device_type
+            """,
+            (lab["lab_id"],)
+        )
+        rows = cursor.fetchall()
+
+        stations_map = {}
+        for row in rows:
+            sid = row["station_id"]
+            if sid not in stations_map:
+                stations_map[sid] = {
+                    "stationId": sid,
+                    "assignedCode": row["assigned_code"],
+                    "row": row.get("row_number"),
+                    "column": row.get("column_number"),
+                    "stationTypeLabel": row.get("station_type_label"),
+                    "devices": []
+                }
+
+            if row.get("device_id"):
+                stations_map[sid]["devices"].append({
+                    "deviceId": row["device_id"],
+                    "type": row.get("device_type"),
+                    "brand": row.get("brand"),
+                    "model": row.get("model"),
+                    "specification": row.get("specification"),
+                    "assetCode": row.get("asset_code"),
+                    "prefixCode": row.get("device_assigned_code"),
+                    "isActive": bool(row.get("is_active")),
+                })
+
+        cursor.close()
+        conn.close()
+
+        return jsonify({
+            "success": True,
+            "lab": {
+                "labId": lab["lab_id"],
+                "labName": lab["lab_name"],
+            },
+            "stations": list(stations_map.values()),
+        })
+    except Exception as e:
+        print(f"Error in public lab endpoint: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+# -----------------------------
+# Save Lab Configuration
+# -----------------------------
+@labs_bp.route("/save_lab", methods=["POST"])
+def save_lab():
+    """
+    Save lab configuration to all lab tables and update devices table
+    Tables updated:
+    - labs: Basic lab info
+    - lab_stations: Individual workstations
+    - lab_station_devices: Devices assigned to each station
+    - lab_grid_cells: Grid layout visualization
+    - lab_equipment_pool: Equipment availability tracking
+    - devices: Update lab_id, is_active, qr_value, assigned_code
+    """
+    try:
+        data = request.json
+        lab_number = data.get("labNumber", "").strip()
+        lab_name = data.get("labName", "").strip()
+        seating_arrangement = data.get("seatingArrangement", {})
+        equipment = data.get("equipment", [])
+        
+        if not lab_number:
+            return jsonify({"error": "Lab number is required"}), 400
+        
+        if not lab_name:
+            return jsonify({"error": "Lab name is required"}), 400
+        
+        rows = seating_arrangement.get("rows", 6)
+        columns = seating_arrangement.get("columns", 6)
+        grid = seating_arrangement.get("grid", [])
+        
+        # Get database connection
+        conn = db.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            # STEP 1: Insert/Update lab in labs table
+            cursor.execute(
+                "SELECT id FROM labs WHERE lab_id = %s",
+                (lab_number,)
+            )
+            existing_lab = cursor.fetchone()
+            
+            if existing_lab:
+                # Update existing lab
+                cursor.execute(
+                    """UPDATE labs 
+                       SET lab_name = %s, rows = %s, columns = %s 
+                       WHERE lab_id = %s""",
+                    (lab_name, rows, columns, lab_number)
+                )
+                lab_pk_id = existing_lab['id']
+                
+                # Reset all existing device assignments for this lab before re-assigning
+                # This includes devices with matching lab_id OR matching assigned_code pattern
+                cursor.execute(
+                    """UPDATE devices
+                       SET lab_id = NULL,
+                           assigned_code = NULL,
+                           qr_value = NULL,
+                           is_active = FALSE
+                       WHERE lab_id = %s 
+                          OR assigned_code LIKE %s""",
+                    (lab_number, f"{lab_number}/%")
+                )
+                print(f"🔄 Reset {cursor.rowcount} devices previously assigned to lab {lab_number}")
+                
+                # Clean up old data for this lab
+                cursor.execute("DELETE FROM lab_grid_cells WHERE lab_id = %s", (lab_number,))
+                cursor.execute("DELETE FROM lab_station_devices WHERE station_id IN (SELECT station_id FROM lab_stations WHERE lab_id = %s)", (lab_number,))
+                cursor.execute("DELETE FROM lab_stations WHERE lab_id = %s", (lab_number,))
+                cursor.execute("DELETE FROM lab_equipment_pool WHERE lab_id = %s", (lab_number,))
+            else:
+                # Insert new lab
+                cursor.execute(
+                    """INSERT INTO labs (lab_id, lab_name, rows, columns) 
+                       VALUES (%s, %s, %s, %s) RETURNING id""",
+                    (lab_number, lab_name, rows, columns)
+                )
+                lab_pk_id = cursor.fetchone()['id']
+            
+            # STEP 2: Insert equipment pool
+            for eq in equipment:
+                cursor.execute(
+                    """INSERT INTO lab_equipment_pool 
+                       (lab_id, equipment_type, brand, model, specification, quantity_added, 
+                        invoice_number, bill_id)
+                       VALUES (%s, %s, %s, %s, %s, %s, %s, %s)""",
+                    (lab_number, eq.get('type'), eq.get('brand'), eq.get('model'),
+                     eq.get('specification'), eq.get('quantity'), eq.get('invoiceNumber'),
+                     eq.get('billId'))
+                )
+            
+            # Track which device_ids we have already assigned in this save to avoid reusing the same row
+            used_device_ids = set()
+
+            # STEP 3: Process grid and create stations
+            station_counter = 0
+            devices_assigned = 0
+            
+            for row_idx, row in enumerate(grid):
+                for col_idx, cell in enumerate(row):
+                    device_group = cell.get("deviceGroup")
+                    
+                    if device_group:
+                        assigned_code = device_group.get("assignedCode", "")
+                        devices = device_group.get("devices", [])
+                        os_list = cell.get("os", [])
+                        equipment_type = cell.get("equipmentType", "PC")
+                        
+                        # Insert station
+                        cursor.execute(
+                            """INSERT INTO lab_stations 
+                               (lab_id, assigned_code, row_number, column_number)
+                               VALUES (%s, %s, %s, %s) RETURNING station_id""",
+                            (lab_number, assigned_code, row_idx, col_idx)
+                        )
+                        station_id = cursor.fetchone()['station_id']
+                        station_counter += 1
+                        
+                        # Insert grid cell
+                        cursor.execute(
+                            """INSERT INTO lab_grid_cells 
+                               (lab_id, row_number, column_number, assigned_code, equipment_type,
+                                os_windows, os_linux, os_other, is_empty, station_id)
+                               VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)""",
+                            (lab_number, row_idx, col_idx, assigned_code, equipment_type,
+                             "Windows" in os_list, "Linux" in os_list, "Other" in os_list,
+                             False, station_id)
+                        )
+                        
+                        # Process devices in this station
+                        # Determine if devices are linked (more than 1 device type in station)
+                        is_linked = len(devices) > 1
+                        # For linked_group_id, we'll use a simple counter based on order
+                        # You can enhance this to track actual group IDs from frontend
+                        linked_group_id = station_counter if is_linked else None
+                        
+                        for device in devices:
+                            device_type = device.get("type")
+                            brand = device.get("brand")
+                            model = device.get("model")
+                            bill_id = device.get("billId")
+                            invoice_number = device.get("invoiceNumber")
+                            
+                            # Find device from devices table:
+                            # - Either unassigned (assigned_code IS NULL or '')
+                            # - OR already assigned to this lab (lab_id matches)
+                            # Build dynamic NOT IN clause to avoid reusing the same device_id in this save
+                            not_in_clause = ""
+                            params = [device_type, brand, model, bill_id, invoice_number]
+                            if used_device_ids:
+                                placeholders = ','.join(['%s'] * len(used_device_ids))
+                                not_in_clause = f" AND device_id NOT IN ({placeholders})"
+                                params.extend(list(used_device_ids))
+
+                            cursor.execute(
+                                f"""SELECT device_id, specification FROM devices
+                                   WHERE type_id = (
+                                       SELECT type_id FROM equipment_types WHERE name = %s LIMIT 1
+                                   )
+                                   AND brand IS NOT DISTINCT FROM %s
+                                   AND model IS NOT DISTINCT FROM %s
+                                   AND bill_id IS NOT DISTINCT FROM %s
+                                   AND invoice_number IS NOT DISTINCT FROM %s
+                                   AND (assigned_code IS NULL OR assigned_code = '')
+                                   {not_in_clause}
+                                   ORDER BY device_id ASC
+                                   LIMIT 1""",
+                                params
+                            )
+                            device_record = cursor.fetchone()
+                            
+                            if device_record:
+                                device_id = device_record['device_id']
+                                specification = device_record['specification']
+                                
+                                # Update devices table: set lab_id, is_active=true, qr_value, assigned_code
+                                cursor.execute(
+                                    """UPDATE devices
+                                       SET lab_id = %s,
+                                           is_active = TRUE,
+                                           qr_value = %s,
+                                           assigned_code = %s
+                                       WHERE device_id = %s""",
+                                    (lab_number, assigned_code, assigned_code, device_id)
+                                )
+                                
+                                # Insert into lab_station_devices with specification, is_linked, linked_group_id
+                                cursor.execute(
+                                    """INSERT INTO lab_station_devices
+                                       (station_id, device_id, device_type, brand, model, specification,
+                                        invoice_number, bill_id, is_linked, linked_group_id)
+                                       VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)""",
+                                    (station_id, device_id, device_type, brand, model, specification,
+                                     invoice_number, bill_id, is_linked, linked_group_id)
+                                )
+                                
+                                devices_assigned += 1
+                                used_device_ids.add(device_id)
+                            else:
+                                print(f"Warning: No unassigned device found for {device_type} {brand} {model}")
+                    
+                    else:
+                        # Empty cell
+                        cursor.execute(
+                            """INSERT INTO lab_grid_cells 
+                               (lab_id, row_number, column_number, assigned_code, equipment_type,
+                                os_windows, os_linux, os_other, is_empty, station_id)
+                               VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)""",
+                            (lab_number, row_idx, col_idx, None, "Empty",
+                             False, False, False, True, None)
+                        )
+            
+            # STEP 4: Update quantity_assigned in lab_equipment_pool
+            cursor.execute(
+                """UPDATE lab_equipment_pool lep
+                   SET quantity_assigned = (
+                       SELECT COUNT(*)
+                       FROM lab_station_devices lsd
+                       JOIN lab_stations ls ON lsd.station_id = ls.station_id
+                       WHERE ls.lab_id = lep.lab_id
+                         AND lsd.device_type = lep.equipment_type
+                         AND lsd.brand = lep.brand
+                         AND lsd.model = lep.model
+                         AND lsd.bill_id = lep.bill_id
+                   )
+                   WHERE lab_id = %s""",
+                (lab_number,)
+            )
+            
+            conn.commit()
+            
+            return jsonify({
+                "success": True,
+                "message": f"Lab '{lab_name}' (Lab {lab_number}) saved successfully",
+                "stations_created": station_counter,
+                "devices_assigned": devices_assigned
+            })
+            
+        except Exception as db_error:
+            conn.rollback()
+            raise db_error
+            
+        finally:
+            cursor.close()
+            conn.close()
+    
+    except Exception as e:
+        print(f"Error saving lab: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+
+# =============================
+# LAB LAYOUT BLUEPRINT APIs
+# =============================
+
+# -----------------------------
+# Get Station Types
+# -----------------------------
+@labs_bp.route("/get_station_types", methods=["GET"])
+def get_station_types():
+    """Return all available station types for the layout designer."""
+    try:
+        conn = db.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            """SELECT station_type_id, name, name AS label, icon, color, description, allowed_device_types
+               FROM station_types ORDER BY station_type_id"""
+        )
+        rows = cursor.fetchall()
+        cursor.close()
+        conn.close()
+        return jsonify({"success": True, "stationTypes": rows})
+    except Exception as e:
+        print(f"Error fetching station types: {e}")
+        traceback.print_exc()
+        return jsonify({"error": str(e), "success": False}), 500
+
+
+# -----------------------------
+# Get Labs For Layout Editor
+# -----------------------------
+@labs_bp.route("/get_labs_for_layout", methods=["GET"])
+def get_labs_for_layout():
+    """Return list of labs with layout station counts."""
+    try:
+        conn = db.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            """SELECT l.lab_id, l.lab_name, l.rows, l.columns, l.layout_id,
+                      COALESCE((
+                          SELECT COUNT(*) FROM lab_layout_cells lc
+                          WHERE lc.layout_id = l.layout_id
+                            AND lc.station_type_id IS NOT NULL
+                      ), 0) AS station_count
+               FROM labs l
+               ORDER BY l.lab_id"""
+        )
+        labs = cursor.fetchall()
+        cursor.close()
+        conn.close()
+        return jsonify({"success": True, "labs": labs})
+    except Exception as e:
+        print(f"Error fetching labs for layout: {e}")
+        traceback.print_exc()
+        return jsonify({"error": str(e), "success": False}), 500
+
+
+# -----------------------------
+# Get Lab Layout (by lab_id)
+# -----------------------------
+@labs_bp.route("/get_lab_layout/<lab_id>", methods=["GET"])
+def get_lab_layout(lab_id):
+    """Return a lab with its layout grid cells."""
+    try:
+        conn = db.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            """SELECT lab_id, lab_name, rows, columns, layout_id
+               FROM labs WHERE lab_id = %s""",
+            (lab_id,)
+        )
+        lab = cursor.fetchone()
+        if not lab:
+            return jsonify({"error": "Lab not found", "success": False}), 404
+
+        layout_id = lab['layout_id']
+        rows_count = lab['rows'] or 6
+        cols_count = lab['columns'] or 6
+
+        # Build empty grid
+        grid = [[None for _ in range(cols_count)] for _ in range(rows_count)]
+
+        if layout_id:
+            cursor.execute(
+                """SELECT lc.cell_id, lc.row_number, lc.column_number,
+                          lc.station_type_id, lc.label AS station_label,
+                          lc.is_empty, lc.os_windows, lc.os_linux, lc.os_other, lc.notes,
+                          st.name AS station_type_name, st.name AS station_type_label,
+                          st.icon, st.color
+                   FROM lab_layout_cells lc
+                   LEFT JOIN station_types st ON lc.station_type_id = st.station_type_id
+                   WHERE lc.layout_id = %s
+                   ORDER BY lc.row_number, lc.column_number""",
+                (layout_id,)
+            )
+            cells = cursor.fetchall()
+
+            for cell in cells:
+                r, c = cell['row_number'], cell['column_number']
+                if 0 <= r < rows_count and 0 <= c < cols_count:
+                    os_list = []
+                    if cell['os_windows']:
+                        os_list.append("Windows")
+                    if cell['os_linux']:
+                        os_list.append("Linux")
+                    if cell['os_other']:
+                        os_list.append("Other")
+                    grid[r][c] = {
+                        "cellId": cell['cell_id'],
+                        "stationTypeId": cell['station_type_id'],
+                        "stationTypeName": cell['station_type_name'] or 'empty',
+                        "stationTypeLabel": cell['station_type_label'] or 'Empty',
+                        "icon": cell['icon'] or '⬜',
+                        "color": cell['color'] or '#6b7280',
+                        "stationLabel": cell['station_label'],
+                        "os": os_list,
+                        "notes": cell['notes']
+                    }
+
+        # Fill gaps with empty
+        for r in range(rows_count):
+            for c_idx in range(cols_count):
+                if grid[r][c_idx] is None:
+                    grid[r][c_idx] = {
+                        "cellId": None,
+                        "stationTypeId": None,
+                        "stationTypeName": "empty",
+                        "stationTypeLabel": "Empty",
+                        "icon": "⬜",
+                        "color": "#6b7280",
+                        "stationLabel": None,
+                        "os": [],
+                        "notes": None
+                    }
+
+        cursor.close()
+        conn.close()
+
+        return jsonify({
+            "success": True,
+            "layout": {
+                "labId": lab['lab_id'],
+                "labName": lab['lab_name'],
+                "rows": rows_count,
+                "columns": cols_count,
+                "layoutId": layout_id,
+                "grid": grid
+            }
+        })
+    except Exception as e:
+        print(f"Error fetching lab layout: {e}")
+        traceback.print_exc()
+        return jsonify({"error": str(e), "success": False}), 500
+
+
+# -----------------------------
+# Save Lab Layout
+# -----------------------------
+@labs_bp.route("/save_lab_layout", methods=["POST"])
+def save_lab_layout():
+    """Create or update a lab and its layout blueprint."""
+    try:
+        data = request.json
+        lab_number = data.get("labNumber", "").strip()
+        lab_name = data.get("labName", "").strip()
+        rows = data.get("rows", 6)
+        columns = data.get("columns", 6)
+        grid = data.get("grid", [])
+
+        if not lab_number:
+            return jsonify({"error": "Lab number is required"}), 400
+        if not lab_name:
+            return jsonify({"error": "Lab name is required"}), 400
+
+        conn = db.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            # Check if lab exists
+            cursor.execute("SELECT id, layout_id FROM labs WHERE lab_id = %s", (lab_number,))
+            existing_lab = cursor.fetchone()
+
+            if existing_lab:
+                layout_id = existing_lab['layout_id']
+                # Update lab dimensions and name
+                cursor.execute(
+                    "UPDATE labs SET lab_name = %s, rows = %s, columns = %s WHERE lab_id = %s",
+                    (lab_name, rows, columns, lab_number)
+                )
+
+                if layout_id:
+                    # Update existing layout template
+                    cursor.execute(
+                        """UPDATE lab_layout_templates
+                           SET layout_name = %s, rows = %s, columns = %s, updated_at = now()
+                           WHERE layout_id = %s""",
+                        (f"{lab_number} - {lab_name}", rows, columns, layout_id)
+                    )
+                    cursor.execute("DELETE FROM lab_layout_cells WHERE layout_id = %s", (layout_id,))
+                else:
+                    # Create new layout template for existing lab
+                    cursor.execute(
+                        """INSERT INTO lab_layout_templates (layout_name, rows, columns)
+                           VALUES (%s, %s, %s) RETURNING layout_id""",
+                        (f"{lab_number} - {lab_name}", rows, columns)
+                    )
+                    layout_id = cursor.fetchone()['layout_id']
+                    cursor.execute("UPDATE labs SET layout_id = %s WHERE lab_id = %s", (layout_id, lab_number))
+            else:
+                # Create new layout template
+                cursor.execute(
+                    """INSERT INTO lab_layout_templates (layout_name, rows, columns)
+                       VALUES (%s, %s, %s) RETURNING layout_id""",
+                    (f"{lab_number} - {lab_name}", rows, columns)
+                )
+                layout_id = cursor.fetchone()['layout_id']
+
+                # Create new lab
+                cursor.execute(
+                    """INSERT INTO labs (lab_id, lab_name, rows, columns, layout_id)
+                       VALUES (%s, %s, %s, %s, %s)""",
+                    (lab_number, lab_name, rows, columns, layout_id)
+                )
+
+            # Insert layout cells
+            station_count = 0
+            for row_idx, row_data in enumerate(grid):
+                for col_idx, cell in enumerate(row_data):
+                    if cell is None:
+                        continue
+                    station_type_id = cell.get("stationTypeId")
+                    station_label = cell.get("stationLabel")
+                    os_list = cell.get("os", [])
+                    notes = cell.get("notes")
+                    is_empty = station_type_id is None
+
+                    cursor.execute(
+                        """INSERT INTO lab_layout_cells
+                           (layout_id, row_number, column_number, station_type_id,
+                            label, is_empty, os_windows, os_linux, os_other, notes)
+                           VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)""",
+                        (layout_id, row_idx, col_idx, station_type_id,
+                         station_label, is_empty,
+                         "Windows" in os_list, "Linux" in os_list, "Other" in os_list,
+                         notes)
+                    )
+                    if station_type_id is not None:
+                        station_count += 1
+
+            conn.commit()
+            return jsonify({
+                "success": True,
+                "message": f"Lab '{lab_name}' (Lab {lab_number}) layout saved successfully",
+                "labId": lab_number,
+                "stationCount": station_count
+            })
+        except Exception as db_err:
+            conn.rollback()
+            raise db_err
+        finally:
+            cursor.close()
+            conn.close()
+
+    except Exception as e:
+        print(f"Error saving lab layout: {e}")
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+
+# -----------------------------
+# Delete Lab Layout (clears layout cells, keeps lab)
+# -----------------------------
+@labs_bp.route("/delete_lab_layout/<lab_id>", methods=["DELETE"])
+def delete_lab_layout(lab_id):
+    """Delete the layout cells for a lab (keeps the lab itself)."""
+    try:
+        conn = db.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT layout_id FROM labs WHERE lab_id = %s", (lab_id,))
+        lab = cursor.fetchone()
+        if not lab or not lab['layout_id']:
+            cursor.close()
+            conn.close()
+            return jsonify({"error": "No layout found for this lab", "success": False}), 404
+
+        layout_id = lab['layout_id']
+        cursor.execute("DELETE FROM lab_layout_cells WHERE layout_id = %s", (layout_id,))
+        cursor.execute("DELETE FROM lab_layout_templates WHERE layout_id = %s", (layout_id,))
+        cursor.execute("UPDATE labs SET layout_id = NULL WHERE lab_id = %s", (lab_id,))
+        conn.commit()
+        cursor.close()
+        conn.close()
+        return jsonify({"success": True, "message": "Layout cleared successfully"})
+    except Exception as e:
+        print(f"Error deleting lab layout: {e}")
+        traceback.print_exc()
+        return jsonify({"error": str(e), "success": False}), 500
+
+
+# -----------------------------
+# Auto-Assign Devices Based on Layout
+# -----------------------------
+@labs_bp.route("/auto_assign_devices", methods=["POST"])
+def auto_assign_devices():
+    """
+    Auto-assign devices to a lab based on its layout blueprint.
+    - Each station type defines which device types it accepts.
+    - One station may hold at most ONE device of each type.
+    - Each device gets a unique code: {prefix}/{number}.
+    - Numbers are per (lab, device_type) and NEVER go backwards.
+    - Assignment order: row-by-row, left to right (top-to-bottom).
+    """
+    try:
+        data = request.json
+        lab_number = data.get("labNumber", "").strip()
+        code_prefixes = data.get("codePrefixes", {})  # {device_type_name: prefix}
+        linked_groups = data.get("linkedDeviceGroups", [])
+        os_selection = data.get("osSelection", {})  # {device_type_name: {windows, linux, other}}
+
+        if not lab_number:
+            return jsonify({"error": "Lab number is required"}), 400
+
+        conn = db.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            # ── Validate lab & layout ───────────────────────────────
+            cursor.execute(
+                "SELECT lab_id, lab_name, rows, columns, layout_id FROM labs WHERE lab_id = %s",
+                (lab_number,)
+            )
+            lab = cursor.fetchone()
+            if not lab:
+                return jsonify({"error": "Lab not found"}), 404
+            if not lab['layout_id']:
+                return jsonify({"error": "Lab has no layout blueprint. Design one first."}), 400
+
+            layout_id = lab['layout_id']
+            lab_name = lab['lab_name']
+
+            # ── Equipment-type id ↔ name maps ──────────────────────
+            cursor.execute("SELECT type_id, name FROM equipment_types")
+            type_rows = cursor.fetchall()
+            type_id_to_name = {r['type_id']: r['name'] for r in type_rows}
+            type_name_to_id = {r['name']: r['type_id'] for r in type_rows}
+
+            # ── Fetch layout cells ordered L→R, T→B ────────────────
+            cursor.execute("""
+                SELECT lc.row_number, lc.column_number, lc.station_type_id,
+                       lc.is_empty,
+                       st.name AS station_type_name,
+                       st.allowed_device_types
+                FROM lab_layout_cells lc
+                LEFT JOIN station_types st
+                       ON lc.station_type_id = st.station_type_id
+                WHERE lc.layout_id = %s
+                ORDER BY lc.row_number, lc.column_number
+            """, (layout_id,))
+            layout_cells = cursor.fetchall()
+
+            if not layout_cells:
+                return jsonify({"error": "Layout has no cells. Design the layout first."}), 400
+
+            # ── Save existing device→code mapping ────────────────
+            cursor.execute(
+                """SELECT device_id, assigned_code FROM devices
+                   WHERE lab_id = %s AND assigned_code IS NOT NULL
+                         AND assigned_code != ''""",
+                (lab_number,)
+            )
+            previous_codes = {r['device_id']: r['assigned_code']
+                              for r in cursor.fetchall()}
+
+            # ── Load current grid + station occupancy ─────────────
+            cursor.execute(
+                """SELECT row_number, column_number, station_id, assigned_code,
+                          equipment_type, is_empty, os_windows, os_linux, os_other
+                   FROM lab_grid_cells
+                   WHERE lab_id = %s""",
+                (lab_number,)
+            )
+            grid_rows = cursor.fetchall()
+            grid_map = {(r['row_number'], r['column_number']): r for r in grid_rows}
+
+            cursor.execute(
+                """SELECT ls.station_id, ls.assigned_code, lsd.device_type
+                   FROM lab_stations ls
+                   LEFT JOIN lab_station_devices lsd ON lsd.station_id = ls.station_id
+                   WHERE ls.lab_id = %s""",
+                (lab_number,)
+            )
+            station_rows = cursor.fetchall()
+            station_device_types = {}
+            station_codes = {}
+            max_station_num = 0
+            for row in station_rows:
+                sid = row['station_id']
+                station_codes[sid] = row['assigned_code']
+                if sid not in station_device_types:
+                    station_device_types[sid] = set()
+                if row.get('device_type'):
+                    station_device_types[sid].add(row['device_type'])
+                code = row.get('assigned_code') or ''
+                if code.startswith(f"{lab_number}/ST-"):
+                    try:
+                        num = int(code.split("/ST-")[-1])
+                        if num > max_station_num:
+                            max_station_num = num
+                    except ValueError:
+                        pass
+
+            cursor.execute(
+                """SELECT lsd.station_id, d.assigned_code
+                   FROM lab_station_devices lsd
+                   JOIN devices d ON d.device_id = lsd.device_id
+                   JOIN lab_stations ls ON ls.station_id = lsd.station_id
+                   WHERE ls.lab_id = %s
+                     AND d.assigned_code IS NOT NULL AND d.assigned_code != ''""",
+                (lab_number,)
+            )
+            station_device_codes = {}
+            for row in cursor.fetchall():
+                station_device_codes.setdefault(row['station_id'], []).append(row['assigned_code'])
+
+            # ── Build equipment list from pooled devices in DB ──────
+            cursor.execute("""
+                SELECT et.name AS type, d.brand, d.model, d.bill_id,
+                       d.invoice_number, d.specification,
+                       COUNT(*) AS quantity
+                FROM devices d
+                JOIN equipment_types et ON d.type_id = et.type_id
+                WHERE d.lab_id = %s
+                  AND (d.assigned_code IS NULL OR d.assigned_code = '')
+                GROUP BY et.name, d.brand, d.model, d.bill_id,
+                         d.invoice_number, d.specification
+            """, (lab_number,))
+            pool_rows = cursor.fetchall()
+            equipment_list = [dict(r) for r in pool_rows]
+
+            if not equipment_list:
+                return jsonify({"error": "No devices pooled for this lab. Add equipment first."}), 400
+
+            # ── Sync lab_equipment_pool from actual device pool ──────
+            cursor.execute("DELETE FROM lab_equipment_pool WHERE lab_id = %s", (lab_number,))
+            for eq in equipment_list:
+                cursor.execute(
+                    """INSERT INTO lab_equipment_pool
+                       (lab_id, equipment_type, brand, model, specification,
+                        quantity_added, invoice_number, bill_id)
+                       VALUES (%s,%s,%s,%s,%s,%s,%s,%s)""",
+                    (lab_number, eq.get('type'), eq.get('brand'),
+                     eq.get('model'), eq.get('specification'),
+                     eq.get('quantity'), eq.get('invoice_number'),
+                     eq.get('bill_id'))
+                )
+
+            # ── Remaining-quantity tracker ───────────────────────────
+            remaining = {}
+            for eq in equipment_list:
+                key = (eq.get('type', ''), eq.get('brand', ''),
+                       eq.get('model', ''), eq.get('bill_id'))
+                remaining[key] = remaining.get(key, 0) + eq.get('quantity', 0)
+
+            used_device_ids = set()
+            station_counter = max_station_num
+            devices_assigned = 0
+
+            # ── Device code counters (persisted per lab + device type) ──
+            cursor.execute(
+                "SELECT device_type, last_number FROM device_code_counters WHERE lab_id = %s",
+                (lab_number,)
+            )
+            _type_counters = {r['device_type']: r['last_number'] for r in cursor.fetchall()}
+
+            # Ensure counters are at least the max suffix seen in previous codes
+            for dtype, prefix in code_prefixes.items():
+                max_seen = _type_counters.get(dtype, 0)
+                if prefix:
+                    for code in previous_codes.values():
+                        if code and code.startswith(prefix + "/"):
+                            try:
+                                suffix = int(code[len(prefix) + 1:])
+                                if suffix > max_seen:
+                                    max_seen = suffix
+                            except ValueError:
+                                continue
+                _type_counters[dtype] = max_seen
+
+            def get_next_number(device_type):
+                _type_counters[device_type] = _type_counters.get(device_type, 0) + 1
+                return _type_counters[device_type]
+
+            # ── Helper: find an unassigned device row from lab pool ──
+            def find_device(dtype, brand, model, bill_id, inv_no):
+                not_in_clause = ""
+                params = [lab_number, dtype, brand, model, bill_id, inv_no]
+                if used_device_ids:
+                    ph = ','.join(['%s'] * len(used_device_ids))
+                    not_in_clause = f" AND device_id NOT IN ({ph})"
+                    params.extend(list(used_device_ids))
+                cursor.execute(f"""
+                    SELECT device_id, specification FROM devices
+                    WHERE lab_id = %s
+                      AND type_id = (SELECT type_id FROM equipment_types
+                                     WHERE name = %s LIMIT 1)
+                      AND brand IS NOT DISTINCT FROM %s
+                      AND model IS NOT DISTINCT FROM %s
+                      AND bill_id IS NOT DISTINCT FROM %s
+                      AND invoice_number IS NOT DISTINCT FROM %s
+                      AND (assigned_code IS NULL OR assigned_code = '')
+                      {not_in_clause}
+                    ORDER BY device_id ASC LIMIT 1
+                """, params)
+                return cursor.fetchone()
+
+            # ── Helper: assign one device to a station ──────────────
+            def assign_device(device_rec, dtype, brand, model,
+                              inv_no, bill_id, station_id):
+                nonlocal devices_assigned
+                did = device_rec['device_id']
+
+                # Reuse old code if this exact device was already
+                # assigned in this lab — avoids bumping the counter
+                if did in previous_codes:
+                    device_code = previous_codes[did]
+                    prefix = code_prefixes.get(dtype, '')
+                    if prefix and device_code.startswith(prefix + "/"):
+                        try:
+                            suffix = int(device_code[len(prefix) + 1:])
+                            if suffix > _type_counters.get(dtype, 0):
+                                _type_counters[dtype] = suffix
+                        except ValueError:
+                            pass
+                else:
+                    next_num = get_next_number(dtype)
+                    prefix = code_prefixes.get(dtype, '')
+                    device_code = (f"{prefix}/{next_num}" if prefix
+                                   else f"{dtype}/{next_num}")
+
+                cursor.execute(
+                    """UPDATE devices
+                       SET lab_id=%s, is_active=TRUE,
+                           qr_value=%s, assigned_code=%s
+                       WHERE device_id=%s""",
+                    (lab_number, device_code, device_code, did)
+                )
+                cursor.execute(
+                    """INSERT INTO lab_station_devices
+                       (station_id, device_id, device_type, brand, model,
+                        specification, invoice_number, bill_id,
+                        is_linked, linked_group_id)
+                       VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)""",
+                    (station_id, did, dtype, brand, model,
+                     device_rec.get('specification'), inv_no, bill_id,
+                     False, None)
+                )
+                devices_assigned += 1
+                used_device_ids.add(did)
+                station_device_codes.setdefault(station_id, []).append(device_code)
+                return device_code
+
+            # ── Helper: try to place one device of a given type ─────
+            def try_assign_type(type_name, station_id):
+                """Pick the first available equipment row of *type_name*,
+                   find a matching DB device, and assign it."""
+                for eq in equipment_list:
+                    if eq.get('type') != type_name:
+                        continue
+                    ek = (eq.get('type', ''), eq.get('brand', ''),
+                          eq.get('model', ''), eq.get('bill_id'))
+                    if remaining.get(ek, 0) <= 0:
+                        continue
+                    rec = find_device(
+                        eq.get('type'), eq.get('brand'),
+                        eq.get('model'), eq.get('bill_id'),
+                        eq.get('invoice_number'))
+                    if rec:
+                        remaining[ek] -= 1
+                        assign_device(rec, type_name,
+                                      eq.get('brand'), eq.get('model'),
+                                      eq.get('invoice_number'),
+                                      eq.get('bill_id'), station_id)
+                        return True
+                return False
+
+            # ── Walk every layout cell ──────────────────────────────
+            for cell in layout_cells:
+                row_idx = cell['row_number']
+                col_idx = cell['column_number']
+                st_id   = cell['station_type_id']
+                is_empty = cell.get('is_empty', True)
+                station_name = cell.get('station_type_name') or ''
+
+                # Empty / passage → ensure grid cell exists and skip
+                if is_empty or st_id is None or station_name in ('passage', 'empty'):
+                    if (row_idx, col_idx) not in grid_map:
+                        cursor.execute(
+                            """INSERT INTO lab_grid_cells
+                               (lab_id, row_number, column_number,
+                                assigned_code, equipment_type,
+                                os_windows, os_linux, os_other,
+                                is_empty, station_id)
+                               VALUES (%s,%s,%s,NULL,%s,
+                                       FALSE,FALSE,FALSE,TRUE,NULL)""",
+                            (lab_number, row_idx, col_idx,
+                             station_name or 'Empty')
+                        )
+                    continue
+
+                # Resolve allowed device-type names for this station
+                raw_allowed = cell.get('allowed_device_types') or []
+                # allowed_device_types is already TEXT[] of type names
+                allowed_names = [t for t in raw_allowed if t]
+
+                # Get or create station row for this cell
+                station_id = None
+                station_code = None
+                grid_row = grid_map.get((row_idx, col_idx))
+                if grid_row and grid_row.get('station_id'):
+                    station_id = grid_row['station_id']
+                    station_code = grid_row.get('assigned_code')
+                else:
+                    station_counter += 1
+                    station_code = f"{lab_number}/ST-{station_counter}"
+                    cursor.execute(
+                        """INSERT INTO lab_stations
+                           (lab_id, assigned_code, row_number, column_number)
+                           VALUES (%s,%s,%s,%s) RETURNING station_id""",
+                        (lab_number, station_code, row_idx, col_idx)
+                    )
+                    station_id = cursor.fetchone()['station_id']
+                    if grid_row:
+                        cursor.execute(
+                            """UPDATE lab_grid_cells
+                               SET assigned_code = %s,
+                                   station_id = %s,
+                                   equipment_type = %s,
+                                   is_empty = FALSE
+                               WHERE lab_id = %s AND row_number = %s AND column_number = %s""",
+                            (station_code, station_id, station_name,
+                             lab_number, row_idx, col_idx)
+                        )
+                    else:
+                        cursor.execute(
+                            """INSERT INTO lab_grid_cells
+                               (lab_id, row_number, column_number,
+                                assigned_code, equipment_type,
+                                os_windows, os_linux, os_other,
+                                is_empty, station_id)
+                               VALUES (%s,%s,%s,%s,%s,
+                                       FALSE,FALSE,FALSE,TRUE,%s)""",
+                            (lab_number, row_idx, col_idx,
+                             station_code, station_name, station_id)
+                        )
+
+                # For each allowed device type → assign if missing
+                existing_types = station_device_types.get(station_id, set())
+                for type_name in allowed_names:
+                    if type_name in existing_types:
+                        continue
+                    if try_assign_type(type_name, station_id):
+                        existing_types.add(type_name)
+                        station_device_types[station_id] = existing_types
+                        print(f"  ✅ Assigned {type_name} to station {station_code}")
+
+                has_devices = len(existing_types) > 0
+
+                # Generate station-level QR value encoding all devices at this station
+                if station_id in station_device_codes:
+                    device_codes_str = ",".join(station_device_codes[station_id])
+                    station_qr_val = f"STATION|{station_code}|{device_codes_str}"
+                    try:
+                        cursor.execute(
+                            """UPDATE lab_stations
+                               SET station_qr_value = %s
+                               WHERE station_id = %s""",
+                            (station_qr_val, station_id)
+                        )
+                    except Exception:
+                        # station_qr_value column may not exist yet
+                        pass
+
+                # Update grid cell — resolve OS flags from osSelection for allowed types
+                primary_type = allowed_names[0] if allowed_names else station_name
+                os_win = False
+                os_lin = False
+                os_oth = False
+                for tn in allowed_names:
+                    os_data = os_selection.get(tn, {})
+                    if os_data.get('windows'):
+                        os_win = True
+                    if os_data.get('linux'):
+                        os_lin = True
+                    if os_data.get('other'):
+                        os_oth = True
+                cursor.execute(
+                    """UPDATE lab_grid_cells
+                       SET assigned_code = %s,
+                           equipment_type = %s,
+                           os_windows = %s,
+                           os_linux = %s,
+                           os_other = %s,
+                           is_empty = %s,
+                           station_id = %s
+                       WHERE lab_id = %s AND row_number = %s AND column_number = %s""",
+                    (station_code, primary_type,
+                     os_win, os_lin, os_oth,
+                     not has_devices, station_id,
+                     lab_number, row_idx, col_idx)
+                )
+
+            # ── Persist code counters ───────────────────────────────
+            for dtype, last_num in _type_counters.items():
+                cursor.execute(
+                    """INSERT INTO device_code_counters (lab_id, device_type, last_number)
+                       VALUES (%s, %s, %s)
+                       ON CONFLICT (lab_id, device_type)
+                       DO UPDATE SET last_number = GREATEST(device_code_counters.last_number, EXCLUDED.last_number),
+                                     updated_at = now()""",
+                    (lab_number, dtype, last_num)
+                )
+
+            # ── Update quantity_assigned in pool ────────────────────
+            cursor.execute("""
+                UPDATE lab_equipment_pool lep
+                SET quantity_assigned = (
+                    SELECT COUNT(*)
+                    FROM lab_station_devices lsd
+                    JOIN lab_stations ls ON lsd.station_id = ls.station_id
+                    WHERE ls.lab_id = lep.lab_id
+                      AND lsd.device_type = lep.equipment_type
+                      AND COALESCE(lsd.brand,'') = COALESCE(lep.brand,'')
+                      AND COALESCE(lsd.model,'') = COALESCE(lep.model,'')
+                      AND lsd.bill_id IS NOT DISTINCT FROM lep.bill_id
+                )
+                WHERE lab_id = %s
+            """, (lab_number,))
+
+            # ── Compute leftover (unassigned) devices ─────────────
+            unassigned_summary = []
+            for (dtype, brand, model, bill_id), qty_left in remaining.items():
+                if qty_left > 0:
+                    unassigned_summary.append({
+                        "type": dtype,
+                        "brand": brand,
+                        "model": model,
+                        "quantity": qty_left
+                    })
+            total_unassigned = sum(r["quantity"] for r in unassigned_summary)
+
+            conn.commit()
+            return jsonify({
+                "success": True,
+                "message": f"Devices assigned to lab '{lab_name}' ({lab_number})",
+                "stations_created": station_counter,
+                "devices_assigned": devices_assigned,
+                "devices_unassigned": total_unassigned,
+                "unassigned_summary": unassigned_summary
+            })
+
+        except Exception as db_err:
+            conn.rollback()
+            raise db_err
+        finally:
+            cursor.close()
+            conn.close()
+
+    except Exception as e:
+        print(f"Error auto-assigning devices: {e}")
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+
+# -----------------------------
+# Get Device Code Counters for a Lab
+# -----------------------------
+@labs_bp.route("/get_device_counters/<lab_id>", methods=["GET"])
+def get_device_counters(lab_id):
+    """Return the current numbering counters for each device type in a lab."""
+    try:
+        conn = db.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT device_type, last_number FROM device_code_counters WHERE lab_id = %s",
+            (lab_id,)
+        )
+        rows = cursor.fetchall()
+        counters = {r['device_type']: r['last_number'] for r in rows}
+        cursor.close()
+        conn.close()
+        return jsonify({"success": True, "counters": counters})
+    except Exception as e:
+        print(f"Error fetching counters: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+# -----------------------------
+# Reset Device Code Counters
+# -----------------------------
+@labs_bp.route("/reset_device_counters/<lab_id>", methods=["POST"])
+def reset_device_counters(lab_id):
+    """Reset device code counters for a lab."""
+    try:
+        conn = db.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "DELETE FROM device_code_counters WHERE lab_id = %s",
+                (lab_id,)
+            )
+            conn.commit()
+            return jsonify({"success": True, "message": f"Device code counters reset for lab {lab_id}"})
+        except Exception as db_err:
+            conn.rollback()
+            raise db_err
+        finally:
+            cursor.close()
+            conn.close()
+    except Exception as e:
+        print(f"Error resetting device code counters: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+# -----------------------------
+# Reset Lab Assignments
+# -----------------------------
+@labs_bp.route("/reset_lab_assignments/<lab_id>", methods=["POST"])
+def reset_lab_assignments(lab_id):
+    """Clear all device assignments from a lab without touching counters."""
+    try:
+        conn = db.get_connection()
+        cursor = conn.cursor()
+        try:
+            # Remove open issues for devices currently assigned to this lab
+            cursor.execute(
+                """DELETE FROM device_issues
+                   WHERE device_id IN (
+                       SELECT device_id FROM devices WHERE lab_id = %s
+                   )""",
+                (lab_id,)
+            )
+            cursor.execute(
+                """UPDATE devices
+                   SET lab_id = NULL, assigned_code = NULL,
+                       qr_value = NULL, is_active = FALSE
+                   WHERE lab_id = %s""",
+                (lab_id,)
+            )
+            cursor.execute("DELETE FROM lab_grid_cells WHERE lab_id = %s", (lab_id,))
+            cursor.execute(
+                """DELETE FROM lab_station_devices
+                   WHERE station_id IN
+                         (SELECT station_id FROM lab_stations WHERE lab_id = %s)""",
+                (lab_id,)
+            )
+            cursor.execute("DELETE FROM lab_stations WHERE lab_id = %s", (lab_id,))
+            cursor.execute("DELETE FROM lab_equipment_pool WHERE lab_id = %s", (lab_id,))
+            conn.commit()
+            return jsonify({"success": True, "message": f"All assignments cleared for lab {lab_id}"})
+        except Exception as db_err:
+            conn.rollback()
+            raise db_err
+        finally:
+            cursor.close()
+            conn.close()
+    except Exception as e:
+        print(f"Error resetting lab assignments: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+# -----------------------------
+# Save Lab Configuration (equipment pool, prefixes, linked groups — no auto-assign)
+# -----------------------------
+@labs_bp.route("/save_lab_config", methods=["POST"])
+def save_lab_config():
+    """Sync the lab_equipment_pool table from the actual device pool and persist settings."""
+    try:
+        data = request.json
+        lab_id = data.get("labNumber", "").strip()
+
+        if not lab_id:
+            return jsonify({"error": "Lab number is required"}), 400
+
+        conn = db.get_connection()
+        cursor = conn.cursor()
+        try:
+            # Sync lab_equipment_pool from actual devices table (source of truth)
+            cursor.execute("DELETE FROM lab_equipment_pool WHERE lab_id = %s", (lab_id,))
+            cursor.execute("""
+                INSERT INTO lab_equipment_pool
+                (lab_id, equipment_type, brand, model, specification,
+                 quantity_added, invoice_number, bill_id)
+                SELECT %s, et.name, d.brand, d.model, d.specification,
+                       COUNT(*), d.invoice_number, d.bill_id
+                FROM devices d
+                JOIN equipment_types et ON d.type_id = et.type_id
+                WHERE d.lab_id = %s
+                GROUP BY et.name, d.brand, d.model, d.specification,
+                         d.invoice_number, d.bill_id
+            """, (lab_id, lab_id))
+            conn.commit()
+            return jsonify({
+                "success": True,
+                "message": f"Configuration saved for lab {lab_id}"
+            })
+        except Exception as db_err:
+            conn.rollback()
+            raise db_err
+        finally:
+            cursor.close()
+            conn.close()
+    except Exception as e:
+        print(f"Error saving lab config: {e}")
+        return jsonify({"error": str(e)}), 500
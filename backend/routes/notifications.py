@@ -0,0 +1,282 @@
+"""
+Notification Routes
+Mail queue status and manually triggered maintenance alerts.
+"""
+
+import os
+import traceback
+from datetime import datetime
+
+from flask import Blueprint, jsonify, request
+
+from config.database import db
+from services.auth_service import get_current_user
+from services.mail_dispatcher import get_mail_dispatcher
+
+notifications_bp = Blueprint("notifications", __name__)
+
+
+@notifications_bp.route("/mail-status", methods=["GET"])
+def mail_status():
+    """Report notification mail queue depth, delivery counts and send latency (HOD only)."""
+    current_user = get_current_user()
+    if not current_user or current_user.role != "HOD":
+        return jsonify({"error": "Unauthorized"}), 403
+
+    return jsonify(get_mail_dispatcher().stats())
+
+
+@notifications_bp.route("/scheduler/runs", methods=["GET"])
+def scheduler_runs():
+    """Recent periodic job runs recorded by the scheduler (newest first, HOD only)."""
+    current_user = get_current_user()
+    if not current_user or current_user.role != "HOD":
+        return jsonify({"error": "Unauthorized"}), 403
+
+    from services.scheduler_service import JOBS, recent_runs
+    job_id = request.args.get("job")
+    limit = request.args.get("limit", default=50, type=int)
+    try:
+        return jsonify({"jobs": list(JOBS), "runs": recent_runs(job_id, limit)})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@notifications_bp.route("/get_alert_recipients", methods=["GET"])
+def get_alert_recipients():
+    """
+    Return lab incharge users (name + email + assigned_lab)
+    so the frontend can display who will receive lab-scoped maintenance alerts.
+    """
+    try:
+        conn = db.get_connection()
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT id, first_name, last_name, email, role, assigned_lab
+            FROM users
+                        WHERE role = 'Lab Incharge'
+                            AND assigned_lab IS NOT NULL
+                            AND assigned_lab != ''
+                        ORDER BY assigned_lab, first_name
+        """)
+        recipients = cursor.fetchall()
+        cursor.close()
+        conn.close()
+
+        return jsonify({
+            "success": True,
+            "recipients": [
+                {
+                    "id": r["id"],
+                    "name": f"{r['first_name']} {r['last_name']}",
+                    "email": r["email"],
+                    "role": r["role"],
+                    "assigned_lab": r.get("assigned_lab", None),
+                }
+                for r in recipients
+            ],
+        })
+    except Exception as e:
+        print(f"Error fetching alert recipients: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+
+@notifications_bp.route("/send_maintenance_alerts", methods=["POST"])
+def send_maintenance_alerts():
+    """
+    Automatically send proactive maintenance alerts to incharge(s) of each lab.
+    Expects: { alerts: [{asset_code, type_name, lab_name, risk_level, health_score, issue_summary}] }
+    """
+    try:
+        import smtplib
+        from email.mime.text import MIMEText
+        from email.mime.multipart import MIMEMultipart
+
+        data = request.get_json(force=True)
+        alerts = data.get("alerts", [])
+
+        if not alerts:
+            return jsonify({"error": "No alerts to send"}), 400
+
+        # Auto-fetch recipients: only lab incharges with assigned labs
+        conn = db.get_connection()
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT email, first_name, last_name, role, assigned_lab
+            FROM users
+            WHERE role = 'Lab Incharge'
+              AND assigned_lab IS NOT NULL
+              AND assigned_lab != ''
+        """)
+        recipients = cursor.fetchall()
+
+        cursor.execute("""
+            SELECT lab_id, lab_name
+            FROM labs
+        """)
+        labs = cursor.fetchall() or []
+        cursor.close()
+        conn.close()
+
+        if not recipients:
+            return jsonify({"success": False, "error": "No lab incharge users found in the system"}), 404
+
+        incharges_by_lab = {}
+        for r in recipients:
+            lab_id = str(r.get("assigned_lab") or "").strip()
+            if not lab_id:
+                continue
+            incharges_by_lab.setdefault(lab_id, []).append(r)
+
+        lab_id_by_name = {
+            (l.get("lab_name") or "").strip().lower(): str(l.get("lab_id") or "").strip()
+            for l in labs
+            if (l.get("lab_name") or "").strip() and (l.get("lab_id") or "").strip()
+        }
+
+        alerts_by_lab = {}
+        unresolved_alerts = []
+        for a in alerts:
+            lab_id = str(a.get("lab_id") or a.get("labId") or "").strip()
+            if not lab_id:
+                lab_name_key = str(a.get("lab_name") or a.get("labName") or "").strip().lower()
+                lab_id = lab_id_by_name.get(lab_name_key, "")
+
+            if not lab_id:
+                unresolved_alerts.append({"asset_code": a.get("asset_code"), "reason": "lab not resolved"})
+                continue
+
+            alerts_by_lab.setdefault(lab_id, []).append(a)
+
+        # Build HTML email
+        risk_colors = {
+            'critical': '#ef4444',
+            'high': '#f97316',
+            'medium': '#eab308',
+            'healthy': '#22c55e',
+        }
+
+        # Send via SMTP to incharge recipients grouped by lab
+        mail_server = os.getenv("MAIL_SERVER", "smtp.gmail.com")
+        mail_port = int(os.getenv("MAIL_PORT", 587))
+        mail_username = os.getenv("MAIL_USERNAME", "")
+        mail_password = os.getenv("MAIL_PASSWORD", "")
+
+        if not mail_username or mail_username == "your_email@gmail.com":
+            return jsonify({
+                "success": False,
+                "error": "Email not configured. Please update MAIL_USERNAME and MAIL_PASSWORD in your .env file with real Gmail App Password credentials."
+            }), 400
+
+        server = smtplib.SMTP(mail_server, mail_port)
+        server.starttls()
+        server.login(mail_username, mail_password)
+
+        sent_to = []
+        failed = []
+        labs_notified = 0
+        for lab_id, lab_alerts in alerts_by_lab.items():
+            lab_recipients = incharges_by_lab.get(lab_id, [])
+            if not lab_recipients:
+                failed.append({"lab_id": lab_id, "error": "No assigned lab incharge found"})
+                continue
+
+            rows_html = ""
+            for a in lab_alerts:
+                color = risk_colors.get(a.get('risk_level', 'medium'), '#6b7280')
+                rows_html += f"""
+                <tr style="border-bottom: 1px solid #e5e7eb;">
+                    <td style="padding: 12px; font-weight: 600;">{a.get('asset_code', 'N/A')}</td>
+                    <td style="padding: 12px;">{a.get('type_name', '')}</td>
+                    <td style="padding: 12px;">{a.get('lab_name') or a.get('labName') or lab_id}</td>
+                    <td style="padding: 12px; text-align: center;">
+                        <span style="background: {color}; color: white; padding: 4px 12px; border-radius: 12px; font-size: 12px; font-weight: 600;">
+                            {a.get('risk_level', 'unknown').upper()}
+                        </span>
+                    </td>
+                    <td style="padding: 12px; text-align: center; font-weight: 700;">{a.get('health_score', 'N/A')}</td>
+                    <td style="padding: 12px; font-size: 13px; color: #6b7280;">{a.get('issue_summary', '')}</td>
+                </tr>"""
+
+            lab_name = lab_alerts[0].get('lab_name') or lab_alerts[0].get('labName') or lab_id
+            html_body = f"""
+            <html>
+            <body style="font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; background: #f3f4f6; padding: 20px;">
+                <div style="max-width: 800px; margin: 0 auto; background: white; border-radius: 12px; overflow: hidden; box-shadow: 0 4px 6px rgba(0,0,0,0.1);">
+                    <div style="background: linear-gradient(135deg, #f59e0b, #d97706); padding: 24px 32px;">
+                        <h1 style="color: white; margin: 0; font-size: 22px;">⚠️ AssetIQ — Proactive Maintenance Alert</h1>
+                        <p style="color: rgba(255,255,255,0.85); margin: 8px 0 0 0; font-size: 14px;">
+                            Lab: {lab_name} • {len(lab_alerts)} asset(s) require your attention
+                        </p>
+                    </div>
+                    <div style="padding: 24px 32px;">
+                        <p style="color: #374151; font-size: 14px; line-height: 1.6;">
+                            You are receiving this notification because you are assigned as lab incharge for {lab_name}.
+                        </p>
+                        <table style="width: 100%; border-collapse: collapse; margin-top: 16px; font-size: 14px;">
+                            <thead>
+                                <tr style="background: #f9fafb; border-bottom: 2px solid #e5e7eb;">
+                                    <th style="padding: 12px; text-align: left; color: #6b7280; font-size: 12px; text-transform: uppercase;">Asset</th>
+                                    <th style="padding: 12px; text-align: left; color: #6b7280; font-size: 12px; text-transform: uppercase;">Type</th>
+                                    <th style="padding: 12px; text-align: left; color: #6b7280; font-size: 12px; text-transform: uppercase;">Lab</th>
+                                    <th style="padding: 12px; text-align: center; color: #6b7280; font-size: 12px; text-transform: uppercase;">Risk</th>
+                                    <th style="padding: 12px; text-align: center; color: #6b7280; font-size: 12px; text-transform: uppercase;">Health</th>
+                                    <th style="padding: 12px; text-align: left; color: #6b7280; font-size: 12px; text-transform: uppercase;">Details</th>
+                                </tr>
+                            </thead>
+                            <tbody>
+                                {rows_html}
+                            </tbody>
+                        </table>
+                    </div>
+                    <div style="background: #f9fafb; padding: 16px 32px; text-align: center;">
+                        <p style="color: #9ca3af; font-size: 12px; margin: 0;">
+                            Generated by AssetIQ Proactive Maintenance System • {datetime.now().strftime('%B %d, %Y at %I:%M %p')}
+                        </p>
+                    </div>
+                </div>
+            </body>
+            </html>
+            """
+
+            subject = f"⚠️ Proactive Maintenance Alert — {lab_name} ({len(lab_alerts)} Asset(s))"
+            for r in lab_recipients:
+                recipient_email = (r.get("email") or "").strip()
+                if not recipient_email:
+                    continue
+                try:
+                    msg = MIMEMultipart("alternative")
+                    msg["Subject"] = subject
+                    msg["From"] = mail_username
+                    msg["To"] = recipient_email
+                    msg.attach(MIMEText(html_body, "html"))
+                    server.sendmail(mail_username, recipient_email, msg.as_string())
+                    sent_to.append(recipient_email)
+                except Exception as send_err:
+                    failed.append({"email": recipient_email, "error": str(send_err), "lab_id": lab_id})
+
+            labs_notified += 1
+
+        server.quit()
+
+        return jsonify({
+            "success": True,
+            "message": f"Alerts sent to {len(set(sent_to))} recipient(s) across {labs_notified} lab(s)",
+            "sent_to": sorted(set(sent_to)),
+            "failed": failed,
+            "unresolved_alerts": unresolved_alerts,
+        })
+
+    except smtplib.SMTPAuthenticationError:
+        return jsonify({"success": False, "error": "SMTP authentication failed. Check your email credentials in .env"}), 401
+    except smtplib.SMTPException as smtp_err:
+        return jsonify({"success": False, "error": f"SMTP error: {str(smtp_err)}"}), 500
+    except Exception as e:
+        print(f"Error sending maintenance alerts: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,583 @@
+"""
+Scrap Routes
+Scrap requests, their approval, and the scrapped devices register.
+"""
+
+import json
+import traceback
+
+from flask import Blueprint, jsonify, request
+
+from config.database import db
+from services.auth_service import get_current_user
+from services.notification_service import send_notification_to_user
+from services.scrap_service import (
+    ensure_scrap_requests_table,
+    ensure_scrapped_devices_table,
+    scrap_devices_by_ids,
+)
+
+scrap_bp = Blueprint("scrap", __name__)
+
+
+@scrap_bp.route("/scrap_devices", methods=["POST"])
+def scrap_devices():
+    """
+    Scrap (dispose) a list of devices.
+    Expects JSON: { deviceIds: number[] }
+    - Stores a record in scrapped_devices
+    - Removes device mappings from lab_station_devices
+    - Marks devices inactive and clears lab_id
+    """
+    try:
+        user = get_current_user()
+        if not user or getattr(user, "role", None) != "HOD":
+            return jsonify({"success": False, "error": "Unauthorized"}), 403
+
+        data = request.get_json(force=True) or {}
+        device_ids = data.get("deviceIds") or []
+        remark = (data.get("remark") or "").strip()
+        if not isinstance(device_ids, list) or not device_ids:
+            return jsonify({"success": False, "error": "deviceIds must be a non-empty array"}), 400
+
+        # Normalize and keep only positive ints
+        normalized_ids = []
+        for x in device_ids:
+            try:
+                xi = int(x)
+                if xi > 0:
+                    normalized_ids.append(xi)
+            except Exception:
+                continue
+
+        if not normalized_ids:
+            return jsonify({"success": False, "error": "No valid device IDs provided"}), 400
+
+        conn = db.get_connection()
+        if not conn:
+            return jsonify({"success": False, "error": "Database connection failed"}), 500
+        cursor = conn.cursor()
+
+        try:
+            inserted = scrap_devices_by_ids(cursor, conn, normalized_ids, user, remark or None)
+            conn.commit()
+            return jsonify(
+                {
+                    "success": True,
+                    "message": f"Scrapped {inserted} device(s) successfully",
+                    "count": inserted,
+                }
+            )
+
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            cursor.close()
+            conn.close()
+
+    except Exception as e:
+        print(f"Error scrapping devices: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@scrap_bp.route("/create_scrap_request", methods=["POST"])
+def create_scrap_request():
+    """Create a scrap request (Lab Incharge/Lab Assistant)."""
+    try:
+        user = get_current_user()
+        if not user:
+            return jsonify({"success": False, "error": "Unauthorized"}), 401
+        if getattr(user, "role", None) not in ("Lab Incharge", "Lab Assistant", "HOD"):
+            return jsonify({"success": False, "error": "Forbidden"}), 403
+
+        data = request.get_json(force=True) or {}
+        device_ids = data.get("deviceIds") or []
+        remark = (data.get("remark") or "").strip()
+
+        if not isinstance(device_ids, list) or not device_ids:
+            return jsonify({"success": False, "error": "deviceIds must be a non-empty array"}), 400
+
+        normalized_ids = []
+        for x in device_ids:
+            try:
+                xi = int(x)
+                if xi > 0:
+                    normalized_ids.append(xi)
+            except Exception:
+                continue
+
+        if not normalized_ids:
+            return jsonify({"success": False, "error": "No valid device IDs provided"}), 400
+
+        conn = db.get_connection()
+        if not conn:
+            return jsonify({"success": False, "error": "Database connection failed"}), 500
+        cursor = conn.cursor()
+
+        try:
+            ensure_scrap_requests_table(cursor)
+            conn.commit()
+
+            cursor.execute(
+                """
+                SELECT device_id, lab_id, is_active
+                FROM devices
+                WHERE device_id = ANY(%s)
+                """,
+                (normalized_ids,),
+            )
+            rows = cursor.fetchall() or []
+            if len(rows) != len(set(normalized_ids)):
+                return jsonify({"success": False, "error": "One or more devices are invalid"}), 400
+
+            if getattr(user, "role", None) == "Lab Incharge" and getattr(user, "assigned_lab", None):
+                allowed_lab = user.assigned_lab
+                for r in rows:
+                    if r.get("lab_id") != allowed_lab:
+                        return jsonify({"success": False, "error": "Devices must belong to your assigned lab"}), 403
+
+            inactive = [r.get("device_id") for r in rows if r.get("is_active") is False]
+            if inactive:
+                return jsonify({"success": False, "error": "One or more devices are already inactive"}), 400
+
+            cursor.execute(
+                """
+                SELECT device_ids
+                FROM scrap_requests
+                WHERE status = 'pending'
+                """
+            )
+            pending_rows = cursor.fetchall() or []
+            pending_set = set()
+            for prow in pending_rows:
+                existing_ids = json.loads(prow["device_ids"]) if isinstance(prow["device_ids"], str) else (prow["device_ids"] or [])
+                pending_set.update(int(x) for x in existing_ids)
+            overlap = pending_set & set(normalized_ids)
+            if overlap:
+                return jsonify({"success": False, "error": "Some selected devices already have pending scrap requests"}), 400
+
+            lab_ids = list({r.get("lab_id") for r in rows})
+            lab_id = lab_ids[0] if len(lab_ids) == 1 else None
+
+            requested_by_text = (getattr(user, "email", None) or f"user:{getattr(user, 'id', None)}")
+            requested_by_user_id = None
+            try:
+                raw_uid = getattr(user, "id", None)
+                if raw_uid is not None and str(raw_uid).strip() != "":
+                    requested_by_user_id = int(raw_uid)
+            except Exception:
+                requested_by_user_id = None
+
+            cursor.execute(
+                """
+                INSERT INTO scrap_requests
+                (device_ids, lab_id, status, remark, requested_by, requested_by_user_id, requested_at)
+                VALUES (%s, %s, 'pending', %s, %s, %s, NOW())
+                RETURNING scrap_request_id
+                """,
+                (json.dumps(normalized_ids), lab_id, remark, requested_by_text, requested_by_user_id),
+            )
+            req_id = cursor.fetchone()["scrap_request_id"]
+            conn.commit()
+            return jsonify({"success": True, "request_id": req_id, "message": "Scrap request submitted"})
+
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            cursor.close()
+            conn.close()
+
+    except Exception as e:
+        print(f"Error creating scrap request: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@scrap_bp.route("/get_pending_scrap_requests", methods=["GET"])
+def get_pending_scrap_requests():
+    """Return pending scrap requests (HOD only)."""
+    try:
+        user = get_current_user()
+        if not user or getattr(user, "role", None) != "HOD":
+            return jsonify({"success": False, "error": "Unauthorized"}), 403
+
+        conn = db.get_connection()
+        if not conn:
+            return jsonify({"success": False, "error": "Database connection failed"}), 500
+        cursor = conn.cursor()
+
+        try:
+            ensure_scrap_requests_table(cursor)
+            conn.commit()
+
+            cursor.execute(
+                """
+                SELECT
+                    sr.scrap_request_id,
+                    sr.device_ids,
+                    sr.lab_id,
+                    l.lab_name,
+                    sr.status,
+                    sr.remark,
+                    sr.requested_by,
+                    TRIM(CONCAT_WS(' ', u_req.first_name, u_req.last_name)) AS requested_by_name,
+                    sr.requested_at
+                FROM scrap_requests sr
+                LEFT JOIN labs l ON sr.lab_id = l.lab_id
+                LEFT JOIN users u_req ON sr.requested_by = u_req.email
+                WHERE sr.status = 'pending'
+                ORDER BY sr.requested_at DESC
+                """
+            )
+            requests = []
+            for row in cursor.fetchall():
+                device_ids = json.loads(row["device_ids"]) if isinstance(row["device_ids"], str) else row["device_ids"]
+                cursor.execute(
+                    """
+                    SELECT d.device_id, et.name AS type_name, d.brand, d.model,
+                           d.asset_code AS asset_id, d.assigned_code,
+                           d.bill_id, d.invoice_number,
+                           b.vendor_name, b.bill_date
+                    FROM devices d
+                    LEFT JOIN equipment_types et ON d.type_id = et.type_id
+                    LEFT JOIN bills b ON d.bill_id = b.bill_id
+                    WHERE d.device_id = ANY(%s)
+                    """,
+                    (device_ids,),
+                )
+                devices = cursor.fetchall()
+                requests.append(
+                    {
+                        "scrap_request_id": row["scrap_request_id"],
+                        "device_ids": device_ids,
+                        "devices": devices,
+                        "lab_id": row["lab_id"],
+                        "lab_name": row.get("lab_name"),
+                        "status": row["status"],
+                        "remark": row.get("remark"),
+                        "requested_by": row.get("requested_by"),
+                        "requested_by_name": row.get("requested_by_name"),
+                        "requested_at": row["requested_at"].isoformat() if row["requested_at"] else None,
+                    }
+                )
+
+            return jsonify({"success": True, "requests": requests})
+        finally:
+            cursor.close()
+            conn.close()
+
+    except Exception as e:
+        print(f"Error fetching pending scrap requests: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@scrap_bp.route("/approve_scrap_request/<int:req_id>", methods=["POST"])
+def approve_scrap_request(req_id):
+    """Approve scrap request and scrap devices (HOD only)."""
+    conn = None
+    try:
+        user = get_current_user()
+        if not user or getattr(user, "role", None) != "HOD":
+            return jsonify({"success": False, "error": "Unauthorized"}), 403
+
+        conn = db.get_connection()
+        if not conn:
+            return jsonify({"success": False, "error": "Database connection failed"}), 500
+        cursor = conn.cursor()
+
+        ensure_scrap_requests_table(cursor)
+        conn.commit()
+
+        cursor.execute(
+            """
+            SELECT sr.device_ids, sr.remark, sr.requested_by, sr.lab_id,
+                   COALESCE(l.lab_name, sr.lab_id::text) AS lab_name
+            FROM scrap_requests sr
+            LEFT JOIN labs l ON sr.lab_id = l.lab_id
+            WHERE sr.scrap_request_id = %s AND sr.status = 'pending'
+            """,
+            (req_id,),
+        )
+        row = cursor.fetchone()
+        if not row:
+            return jsonify({"success": False, "error": "Scrap request not found or already processed"}), 404
+
+        device_ids = json.loads(row["device_ids"]) if isinstance(row["device_ids"], str) else row["device_ids"]
+        remark = (row.get("remark") or "").strip()
+        requested_by_email = row.get("requested_by")
+        lab_name = row.get("lab_name") or row.get("lab_id") or "Unknown"
+
+        inserted = scrap_devices_by_ids(cursor, conn, device_ids, user, remark or None)
+
+        approver = (getattr(user, "email", None) or f"user:{getattr(user, 'id', None)}")
+        cursor.execute(
+            """
+            UPDATE scrap_requests
+            SET status = 'approved', approved_by = %s, approved_at = NOW()
+            WHERE scrap_request_id = %s
+            """,
+            (approver, req_id),
+        )
+
+        conn.commit()
+        cursor.close()
+        conn.close()
+
+        scrap_html = f"""
+                <html><body style="font-family:-apple-system,BlinkMacSystemFont,'Segoe UI',Roboto,sans-serif;background:#f3f4f6;padding:20px;">
+                    <div style="max-width:620px;margin:0 auto;background:white;border-radius:12px;overflow:hidden;box-shadow:0 4px 6px rgba(0,0,0,0.1);">
+                        <div style="background:linear-gradient(135deg,#22c55e,#15803d);padding:20px 28px;">
+                            <h1 style="color:white;margin:0;font-size:18px;">✅ Scrap Request Approved</h1>
+                            <p style="color:rgba(255,255,255,0.85);margin:4px 0 0;font-size:13px;">Request #{req_id}</p>
+                        </div>
+                        <div style="padding:20px 28px;">
+                            <table style="width:100%;font-size:14px;border-collapse:collapse;">
+                                <tr><td style="padding:8px 0;color:#6b7280;width:140px;">Lab</td><td style="padding:8px 0;color:#111;">{lab_name}</td></tr>
+                                <tr><td style="padding:8px 0;color:#6b7280;">Devices Scrapped</td><td style="padding:8px 0;color:#111;">{inserted}</td></tr>
+                                <tr><td style="padding:8px 0;color:#6b7280;">Approved By</td><td style="padding:8px 0;color:#111;">{approver}</td></tr>
+                            </table>
+                        </div>
+                    </div>
+                </body></html>
+        """
+        send_notification_to_user(
+            subject=f"✅ Scrap Approved: Request #{req_id}",
+            html_body=scrap_html,
+            user_email=requested_by_email
+        )
+
+        return jsonify({"success": True, "message": f"Scrap request approved ({inserted} device(s) scrapped)"})
+
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        print(f"Error approving scrap request: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@scrap_bp.route("/reject_scrap_request/<int:req_id>", methods=["POST"])
+def reject_scrap_request(req_id):
+    """Reject scrap request (HOD only)."""
+    try:
+        user = get_current_user()
+        if not user or getattr(user, "role", None) != "HOD":
+            return jsonify({"success": False, "error": "Unauthorized"}), 403
+
+        conn = db.get_connection()
+        if not conn:
+            return jsonify({"success": False, "error": "Database connection failed"}), 500
+        cursor = conn.cursor()
+
+        ensure_scrap_requests_table(cursor)
+        conn.commit()
+
+        approver = (getattr(user, "email", None) or f"user:{getattr(user, 'id', None)}")
+        cursor.execute(
+            """
+            UPDATE scrap_requests
+            SET status = 'rejected', approved_by = %s, approved_at = NOW()
+            WHERE scrap_request_id = %s AND status = 'pending'
+            """,
+            (approver, req_id),
+        )
+
+        if cursor.rowcount == 0:
+            return jsonify({"success": False, "error": "Scrap request not found or already processed"}), 404
+
+        conn.commit()
+        cursor.close()
+        conn.close()
+
+        return jsonify({"success": True, "message": "Scrap request rejected"})
+
+    except Exception as e:
+        print(f"Error rejecting scrap request: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@scrap_bp.route("/get_scrap_request_history", methods=["GET"])
+def get_scrap_request_history():
+    """Return scrap request history."""
+    conn = None
+    cursor = None
+    try:
+        user = get_current_user()
+        if not user:
+            return jsonify({"success": False, "error": "Unauthorized"}), 401
+
+        conn = db.get_connection()
+        if not conn:
+            return jsonify({"success": False, "error": "Database connection failed"}), 500
+        cursor = conn.cursor()
+
+        ensure_scrap_requests_table(cursor)
+        conn.commit()
+
+        cursor.execute(
+            """
+            SELECT
+                sr.scrap_request_id,
+                sr.device_ids,
+                sr.lab_id,
+                l.lab_name,
+                sr.status,
+                sr.remark,
+                sr.requested_by,
+                TRIM(CONCAT_WS(' ', u_req.first_name, u_req.last_name)) AS requested_by_name,
+                sr.requested_at,
+                sr.approved_by,
+                TRIM(CONCAT_WS(' ', u_app.first_name, u_app.last_name)) AS approved_by_name,
+                sr.approved_at
+            FROM scrap_requests sr
+            LEFT JOIN labs l ON sr.lab_id = l.lab_id
+            LEFT JOIN users u_req ON sr.requested_by = u_req.email
+            LEFT JOIN users u_app ON sr.approved_by = u_app.email
+            ORDER BY COALESCE(sr.approved_at, sr.requested_at) DESC
+            """
+        )
+
+        history = []
+        for row in cursor.fetchall():
+            device_ids = json.loads(row["device_ids"]) if isinstance(row["device_ids"], str) else row["device_ids"]
+            cursor.execute(
+                """
+                SELECT d.device_id, et.name AS type_name, d.brand, d.model,
+                       d.asset_code AS asset_id, d.assigned_code,
+                       d.bill_id, d.invoice_number,
+                       b.vendor_name, b.bill_date
+                FROM devices d
+                LEFT JOIN equipment_types et ON d.type_id = et.type_id
+                LEFT JOIN bills b ON d.bill_id = b.bill_id
+                WHERE d.device_id = ANY(%s)
+                """,
+                (device_ids,),
+            )
+            devices = cursor.fetchall()
+            history.append(
+                {
+                    "scrap_request_id": row["scrap_request_id"],
+                    "device_ids": device_ids,
+                    "devices": devices,
+                    "lab_id": row["lab_id"],
+                    "lab_name": row.get("lab_name"),
+                    "status": row["status"],
+                    "remark": row.get("remark"),
+                    "requested_by": row.get("requested_by"),
+                    "requested_by_name": row.get("requested_by_name"),
+                    "requested_at": row["requested_at"].isoformat() if row["requested_at"] else None,
+                    "approved_by": row.get("approved_by"),
+                    "approved_by_name": row.get("approved_by_name"),
+                    "approved_at": row["approved_at"].isoformat() if row["approved_at"] else None,
+                }
+            )
+
+        return jsonify({"success": True, "requests": history})
+    except Exception as e:
+        print(f"Error fetching scrap request history: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"success": False, "error": str(e)}), 500
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+@scrap_bp.route("/get_scrapped_devices", methods=["GET"])
+def get_scrapped_devices():
+    """
+    Scrap register list.
+    Returns: { success: true, items: [...] }
+    """
+    try:
+        user = get_current_user()
+        if not user:
+            return jsonify({"success": False, "error": "Unauthorized"}), 401
+
+        conn = db.get_connection()
+        if not conn:
+            return jsonify({"success": False, "error": "Database connection failed"}), 500
+
+        cursor = conn.cursor()
+        try:
+            ensure_scrapped_devices_table(cursor)
+            conn.commit()
+            lab_id = request.args.get("lab_id")
+            year = request.args.get("year")
+            device_type = request.args.get("device_type")
+            limit = request.args.get("limit", "500")
+
+            where = []
+            params = []
+            if lab_id:
+                where.append("sd.lab_id = %s")
+                params.append(lab_id)
+            if year and str(year).isdigit():
+                where.append("EXTRACT(YEAR FROM sd.scrapped_at) = %s")
+                params.append(int(year))
+            if device_type:
+                where.append("sd.device_type = %s")
+                params.append(device_type)
+
+            limit_val = 500
+            try:
+                limit_val = max(1, min(2000, int(limit)))
+            except Exception:
+                limit_val = 500
+
+            where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+            cursor.execute(
+                f"""
+                  SELECT sd.scrap_id, sd.device_id, sd.asset_code, sd.device_type, sd.brand, sd.model, sd.specification,
+                      sd.lab_id, sd.lab_name, sd.station_code,
+                      sd.dead_stock_number, COALESCE(sd.cost, d.unit_price) AS cost,
+                      sd.justification_for_scrapping,
+                      COALESCE(sd.scrapped_by_text, sd.scrapped_by::text) AS scrapped_by,
+                      sd.scrapped_at,
+                      d.assigned_code
+                FROM scrapped_devices sd
+                LEFT JOIN devices d ON sd.device_id = d.device_id
+                {where_sql}
+                ORDER BY sd.scrapped_at DESC
+                LIMIT {limit_val}
+                """,
+                tuple(params),
+            )
+            rows = cursor.fetchall() or []
+            items = []
+            for r in rows:
+                items.append(
+                    {
+                        "scrap_id": str(r.get("scrap_id")) if r.get("scrap_id") is not None else None,
+                        "device_id": r.get("device_id"),
+                        "asset_code": r.get("asset_code"),
+                        "assigned_code": r.get("assigned_code"),
+                        "device_type": r.get("device_type"),
+                        "brand": r.get("brand"),
+                        "model": r.get("model"),
+                        "specification": r.get("specification"),
+                        "lab_id": r.get("lab_id"),
+                        "lab_name": r.get("lab_name"),
+                        "station_code": r.get("station_code"),
+                        "dead_stock_number": r.get("dead_stock_number"),
+                        "cost": float(r.get("cost")) if r.get("cost") is not None else None,
+                        "justification_for_scrapping": r.get("justification_for_scrapping"),
+                        "scrapped_by": r.get("scrapped_by"),
+                        "scrapped_at": r.get("scrapped_at").isoformat() if r.get("scrapped_at") else None,
+                    }
+                )
+            return jsonify({"success": True, "items": items})
+        finally:
+            cursor.close()
+            conn.close()
+
+    except Exception as e:
+        print(f"Error fetching scrapped devices: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"success": False, "error": str(e)}), 500
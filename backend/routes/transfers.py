@@ -0,0 +1,1292 @@
+"""
+Transfer Routes
+Device transfer requests between labs: capacity checks, approval flow and history.
+"""
+
+import json
+import traceback
+
+from flask import Blueprint, jsonify, request
+
+from config.database import db
+from services.auth_service import get_current_user
+from services.notification_service import send_notification_to_user
+from services.transfer_service import getDeviceEmojiPy
+
+transfers_bp = Blueprint("transfers", __name__)
+
+
+# -----------------------------
+# Transfer Management Endpoints
+# -----------------------------
+@transfers_bp.route('/get_lab_devices/<lab_id>', methods=['GET'])
+def get_lab_devices(lab_id):
+    """Get all devices assigned to a specific lab via lab_station_devices"""
+    try:
+        conn = db.get_connection()
+        cursor = conn.cursor()
+        
+        print(f"Fetching devices for lab_id: {lab_id}")
+        
+        # Query devices through lab_station_devices (same as Labplan.tsx)
+        # Include ALL devices in lab regardless of active status or issues - they can still be transferred
+        cursor.execute("""
+            SELECT DISTINCT
+                d.device_id,
+                lsd.device_type as type_name,
+                lsd.brand,
+                lsd.model,
+                lsd.specification,
+                d.asset_code as asset_id,
+                ls.assigned_code,
+                d.lab_id,
+                l.lab_name
+            FROM lab_station_devices lsd
+            INNER JOIN lab_stations ls ON lsd.station_id = ls.station_id
+            INNER JOIN devices d ON lsd.device_id = d.device_id
+            LEFT JOIN labs l ON ls.lab_id = l.lab_id
+            WHERE ls.lab_id = %s
+            ORDER BY lsd.device_type, lsd.brand, lsd.model
+        """, (lab_id,))
+        
+        devices = []
+        rows = cursor.fetchall()
+        print(f"Found {len(rows)} devices in lab {lab_id}")
+        
+        for row in rows:
+            devices.append({
+                'device_id': row['device_id'],
+                'type_name': row['type_name'],
+                'brand': row['brand'],
+                'model': row['model'],
+                'specification': row['specification'],
+                'asset_id': row['asset_id'],
+                'assigned_code': row['assigned_code'],
+                'lab_id': row['lab_id'],
+                'lab_name': row['lab_name']
+            })
+        
+        cursor.close()
+        conn.close()
+        
+        return jsonify({
+            'success': True,
+            'devices': devices
+        })
+        
+    except Exception as e:
+        print(f"Error fetching lab devices: {str(e)}")
+        traceback.print_exc()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@transfers_bp.route('/get_dest_lab_layout/<lab_id>', methods=['GET'])
+def get_dest_lab_layout(lab_id):
+    """Get destination lab's blueprint grid with station types, allowed device types, and current occupancy.
+    
+    Primary source: lab_layout_cells (blueprint template linked to the lab).
+    Fallback source: lab_grid_cells + lab_stations (runtime grid from lab configuration).
+    """
+    try:
+        conn = db.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT lab_id, lab_name, rows, columns, layout_id FROM labs WHERE lab_id = %s", (lab_id,))
+        lab = cursor.fetchone()
+        if not lab:
+            return jsonify({'success': False, 'error': 'Lab not found'}), 404
+
+        layout_id = lab['layout_id']
+
+        # ── PRIMARY: Query lab_layout_cells blueprint ──────────────────────
+        cells = []
+        use_blueprint = False
+        if layout_id:
+            cursor.execute("""
+                SELECT lc.cell_id, lc.row_number, lc.column_number,
+                       lc.station_type_id, lc.label AS station_label,
+                       lc.os_windows, lc.os_linux, lc.os_other,
+                       st.name AS station_type_name, st.name AS station_type_label,
+                       st.icon, st.color,
+                       st.allowed_device_types
+                FROM lab_layout_cells lc
+                LEFT JOIN station_types st ON lc.station_type_id = st.station_type_id
+                WHERE lc.layout_id = %s
+                ORDER BY lc.row_number, lc.column_number
+            """, (layout_id,))
+            cells = cursor.fetchall()
+            if cells:
+                use_blueprint = True
+
+        if use_blueprint:
+            # ── allowed_device_types is already TEXT[] of device type names ──
+            # No additional lookup needed
+
+            # ── Current device occupancy via lab_stations / lab_grid_cells ──
+            cursor.execute("""
+                SELECT lgc.row_number, lgc.column_number,
+                       lsd.device_type, lsd.device_id, lsd.brand, lsd.model,
+                       d.assigned_code AS device_prefix_code, d.asset_code
+                FROM lab_stations ls
+                JOIN lab_grid_cells lgc ON ls.station_id = lgc.station_id
+                JOIN lab_station_devices lsd ON ls.station_id = lsd.station_id
+                LEFT JOIN devices d ON lsd.device_id = d.device_id
+                WHERE ls.lab_id = %s
+            """, (lab_id,))
+            occupancy_map = {}
+            for orow in cursor.fetchall():
+                key = f"{orow['row_number']}-{orow['column_number']}"
+                occupancy_map.setdefault(key, []).append({
+                    'deviceType': orow['device_type'],
+                    'deviceId': orow['device_id'],
+                    'brand': orow['brand'],
+                    'model': orow['model'],
+                    'prefixCode': orow['device_prefix_code'] or '',
+                    'assetCode': orow['asset_code'] or '',
+                })
+
+            grid = []
+            for cell in cells:
+                r, c = cell['row_number'], cell['column_number']
+                allowed_names = cell['allowed_device_types'] or []
+                key = f"{r}-{c}"
+                current_devices = occupancy_map.get(key, [])
+                current_type_names = [d['deviceType'] for d in current_devices]
+
+                os_list = []
+                if cell.get('os_windows'): os_list.append('Windows')
+                if cell.get('os_linux'): os_list.append('Linux')
+                if cell.get('os_other'): os_list.append('Other')
+
+                grid.append({
+                    'row': r,
+                    'column': c,
+                    'cellId': cell['cell_id'],
+                    'stationTypeId': cell['station_type_id'],
+                    'stationTypeName': cell['station_type_name'] or 'empty',
+                    'stationTypeLabel': cell['station_type_label'] or 'Empty',
+                    'icon': cell['icon'] or '⬜',
+                    'color': cell['color'] or '#6b7280',
+                    'stationLabel': cell['station_label'],
+                    'os': os_list,
+                    'allowedDeviceTypes': allowed_names,
+                    'currentDevices': current_devices,
+                    'currentDeviceTypes': current_type_names,
+                    'freeForTypes': [t for t in allowed_names if t not in current_type_names],
+                })
+
+        else:
+            # ── FALLBACK: Query lab_grid_cells (runtime grid from lab config) ──
+            # Use cell_id = station_id as proxy (lab_layout_cells may not exist)
+            cursor.execute("""
+                SELECT lgc.cell_id AS grid_cell_id,
+                       lgc.station_id,
+                       lgc.row_number, lgc.column_number,
+                       lgc.assigned_code, lgc.equipment_type,
+                       lgc.os_windows, lgc.os_linux, lgc.os_other,
+                       lgc.is_empty,
+                       ls.station_id AS ls_station_id
+                FROM lab_grid_cells lgc
+                LEFT JOIN lab_stations ls ON lgc.station_id = ls.station_id
+                WHERE lgc.lab_id = %s
+                ORDER BY lgc.row_number, lgc.column_number
+            """, (lab_id,))
+            grid_cells = cursor.fetchall()
+
+            # Fetch all occupancy for this lab
+            cursor.execute("""
+                SELECT lgc.row_number, lgc.column_number,
+                       lsd.device_type, lsd.device_id, lsd.brand, lsd.model,
+                       d.assigned_code AS device_prefix_code, d.asset_code
+                FROM lab_stations ls
+                JOIN lab_grid_cells lgc ON ls.station_id = lgc.station_id
+                JOIN lab_station_devices lsd ON ls.station_id = lsd.station_id
+                LEFT JOIN devices d ON lsd.device_id = d.device_id
+                WHERE ls.lab_id = %s
+            """, (lab_id,))
+            occupancy_map = {}
+            for orow in cursor.fetchall():
+                key = f"{orow['row_number']}-{orow['column_number']}"
+                occupancy_map.setdefault(key, []).append({
+                    'deviceType': orow['device_type'],
+                    'deviceId': orow['device_id'],
+                    'brand': orow['brand'],
+                    'model': orow['model'],
+                    'prefixCode': orow['device_prefix_code'] or '',
+                    'assetCode': orow['asset_code'] or '',
+                })
+
+            # Map equipment_type text → allowed_device_types list
+            # equipment_type in lab_grid_cells is the primary type (e.g. "PC", "Laptop")
+            # We'll treat it as: this station allows devices of that type
+            def infer_allowed(eq_type: str):
+                if not eq_type:
+                    return []
+                t = eq_type.lower()
+                # Compound types (e.g. teacher station allows both PC and Laptop)
+                type_map = {
+                    'pc': ['PC'],
+                    'laptop': ['Laptop'],
+                    'ac': ['AC'],
+                    'projector': ['Projector', 'Smart Board'],
+                    'printer': ['Printer'],
+                    'scanner': ['Scanner'],
+                    'ups': ['UPS'],
+                    'server': ['Server'],
+                    'router': ['Router'],
+                    'switch': ['Network Switch'],
+                    'network': ['Router', 'Network Switch'],
+                    'teacher': ['PC', 'Laptop'],
+                }
+                for key, val in type_map.items():
+                    if key in t:
+                        return val
+                return [eq_type]  # return as-is if no match
+
+            grid = []
+            for gc in grid_cells:
+                r, c = gc['row_number'], gc['column_number']
+                eq_type = gc['equipment_type'] or ''
+                key = f"{r}-{c}"
+                current_devices = occupancy_map.get(key, [])
+                current_type_names = [d['deviceType'] for d in current_devices]
+                is_empty_type = not eq_type or gc['is_empty']
+                allowed_names = [] if is_empty_type else infer_allowed(eq_type)
+
+                os_list = []
+                if gc.get('os_windows'): os_list.append('Windows')
+                if gc.get('os_linux'): os_list.append('Linux')
+                if gc.get('os_other'): os_list.append('Other')
+
+                # Use station_id as a stand-in for cellId so the frontend can pass it back
+                # The approve endpoint will handle finding/creating the station
+                grid.append({
+                    'row': r,
+                    'column': c,
+                    'cellId': gc['station_id'] or gc['grid_cell_id'],  # used as dest_cell_id reference
+                    'stationTypeId': 0,
+                    'stationTypeName': eq_type.lower() if eq_type else 'empty',
+                    'stationTypeLabel': eq_type or 'Empty',
+                    'icon': getDeviceEmojiPy(eq_type),
+                    'color': '#6b7280',
+                    'stationLabel': gc['assigned_code'],
+                    'os': os_list,
+                    'allowedDeviceTypes': allowed_names,
+                    'currentDevices': current_devices,
+                    'currentDeviceTypes': current_type_names,
+                    'freeForTypes': [t for t in allowed_names if t not in current_type_names],
+                })
+
+        cursor.close()
+        conn.close()
+
+        return jsonify({
+            'success': True,
+            'lab': {
+                'labId': lab['lab_id'],
+                'labName': lab['lab_name'],
+                'rows': lab.get('rows') or 6,
+                'columns': lab.get('columns') or 6,
+            },
+            'grid': grid,
+            'source': 'blueprint' if use_blueprint else 'runtime'
+        })
+
+    except Exception as e:
+        print(f"Error fetching dest lab layout: {str(e)}")
+        traceback.print_exc()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@transfers_bp.route('/check_destination_capacity', methods=['POST'])
+def check_destination_capacity():
+    """Check if destination lab has free station slots for the device types being transferred."""
+    try:
+        data = request.json
+        to_lab_id = data.get('to_lab_id')
+        device_types = data.get('device_types', [])  # list of type names e.g. ['PC', 'Monitor']
+        transfer_type = data.get('transfer_type', 'individual')  # 'station' or 'individual'
+
+        if not to_lab_id or not device_types:
+            return jsonify({'success': False, 'error': 'Missing required fields'}), 400
+
+        conn = db.get_connection()
+        cursor = conn.cursor()
+
+        # Find all stations in the destination lab and their currently assigned device types
+        cursor.execute("""
+            SELECT ls.station_id, ls.assigned_code,
+                   lgc.equipment_type,
+                   COALESCE(
+                       (SELECT st.allowed_device_types
+                        FROM lab_layout_cells lc
+                        JOIN station_types st ON lc.station_type_id = st.station_type_id
+                        WHERE lc.layout_id = l.layout_id
+                          AND lc.row_number = lgc.row_number
+                          AND lc.column_number = lgc.column_number
+                        LIMIT 1),
+                       ARRAY[]::text[]
+                   ) AS allowed_device_types
+            FROM lab_stations ls
+            JOIN lab_grid_cells lgc ON ls.station_id = lgc.station_id
+            JOIN labs l ON ls.lab_id = l.lab_id
+            WHERE ls.lab_id = %s
+        """, (to_lab_id,))
+        dest_stations = cursor.fetchall()
+
+        # Get devices currently assigned to each station
+        for station in dest_stations:
+            cursor.execute("""
+                SELECT device_type FROM lab_station_devices
+                WHERE station_id = %s
+            """, (station['station_id'],))
+            station['current_devices'] = [r['device_type'] for r in cursor.fetchall()]
+
+        # Check capacity for each device type being transferred
+        type_counts_needed = {}
+        for dt in device_types:
+            type_counts_needed[dt] = type_counts_needed.get(dt, 0) + 1
+
+        capacity_result = {}
+        for dtype, count_needed in type_counts_needed.items():
+            # Find stations that allow this device type and don't already have one
+            free_slots = 0
+            for station in dest_stations:
+                allowed = station.get('allowed_device_types') or []
+                current = station.get('current_devices') or []
+                # Station accepts this type and doesn't already have one
+                if dtype in allowed and dtype not in current:
+                    free_slots += 1
+            capacity_result[dtype] = {
+                'needed': count_needed,
+                'available': free_slots,
+                'sufficient': free_slots >= count_needed
+            }
+
+        all_sufficient = all(v['sufficient'] for v in capacity_result.values())
+
+        cursor.close()
+        conn.close()
+
+        return jsonify({
+            'success': True,
+            'has_capacity': all_sufficient,
+            'details': capacity_result
+        })
+
+    except Exception as e:
+        print(f"Error checking destination capacity: {str(e)}")
+        traceback.print_exc()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@transfers_bp.route('/create_transfer_request', methods=['POST'])
+def create_transfer_request():
+    """Create a new transfer request"""
+    try:
+        data = request.json
+        from_lab_id = data.get('from_lab_id')
+        to_lab_id = data.get('to_lab_id')
+        device_ids = data.get('device_ids', [])
+        remark = data.get('remark', '')
+        transfer_type = data.get('transfer_type', 'individual')  # 'station' or 'individual'
+        station_ids = data.get('station_ids', [])  # source station_ids when transfer_type is 'station'
+        dest_cell_id = data.get('dest_cell_id')  # selected destination layout cell or station_id (legacy single-dest)
+        device_dest_map = data.get('device_dest_map') or {}  # { device_id: dest_cell_id }
+        
+        if not from_lab_id or not to_lab_id or not device_ids:
+            return jsonify({'success': False, 'error': 'Missing required fields'}), 400
+        
+        if not isinstance(device_dest_map, dict):
+            return jsonify({'success': False, 'error': 'device_dest_map must be an object'}), 400
+
+        # Backward compatibility: if frontend still sends only one destination, map all devices to it.
+        if not device_dest_map and dest_cell_id:
+            device_dest_map = {str(did): int(dest_cell_id) for did in device_ids}
+
+        if not device_dest_map:
+            return jsonify({'success': False, 'error': 'Please assign destination station for all selected devices'}), 400
+        
+        if from_lab_id == to_lab_id:
+            return jsonify({'success': False, 'error': 'Source and destination labs cannot be the same'}), 400
+        
+        # Get current user
+        user_info = get_current_user()
+        user_email = user_info.email if user_info else 'Unknown'
+        
+        conn = db.get_connection()
+        cursor = conn.cursor()
+
+        # Check for devices already in pending transfers
+        cursor.execute("""
+            SELECT device_ids FROM transfer_requests WHERE status = 'pending'
+        """)
+        pending_rows = cursor.fetchall()
+        for prow in pending_rows:
+            existing_ids = json.loads(prow['device_ids']) if isinstance(prow['device_ids'], str) else (prow['device_ids'] or [])
+            existing_set = set(int(x) for x in existing_ids)
+            incoming_set = set(int(x) for x in device_ids)
+            overlap = incoming_set & existing_set
+            if overlap:
+                cursor.close(); conn.close()
+                return jsonify({
+                    'success': False,
+                    'error': f'Some selected devices already have pending transfer requests. Please remove them and try again.'
+                }), 400
+
+        # Get device type names for the devices being transferred
+        cursor.execute("""
+            SELECT d.device_id, et.name AS device_type
+            FROM devices d
+            JOIN equipment_types et ON d.type_id = et.type_id
+            WHERE d.device_id = ANY(%s)
+        """, (device_ids,))
+        device_rows = cursor.fetchall()
+        if len(device_rows) != len(device_ids):
+            cursor.close(); conn.close()
+            return jsonify({'success': False, 'error': 'One or more selected devices are invalid'}), 400
+
+        device_type_by_id = {int(r['device_id']): (r['device_type'] or '') for r in device_rows}
+
+        # Normalize and validate destination map keys/values
+        normalized_map = {}
+        for did_raw, cell_raw in device_dest_map.items():
+            try:
+                did = int(did_raw)
+                dcid = int(cell_raw)
+            except Exception:
+                cursor.close(); conn.close()
+                return jsonify({'success': False, 'error': 'device_dest_map contains invalid ids'}), 400
+            normalized_map[did] = dcid
+
+        missing_dest = [did for did in device_ids if int(did) not in normalized_map]
+        if missing_dest:
+            cursor.close(); conn.close()
+            return jsonify({'success': False, 'error': 'Please assign destination station for all selected devices'}), 400
+
+        extra_dest = [did for did in normalized_map.keys() if did not in [int(x) for x in device_ids]]
+        if extra_dest:
+            cursor.close(); conn.close()
+            return jsonify({'success': False, 'error': 'device_dest_map contains devices not present in device_ids'}), 400
+
+        def infer_allowed_names(t):
+            tl = (t or '').lower()
+            if tl == 'pc': return ['PC']
+            if tl == 'laptop': return ['Laptop']
+            if 'teacher' in tl: return ['PC', 'Laptop']
+            if tl == 'ac': return ['AC']
+            if tl == 'projector': return ['Projector', 'Smart Board']
+            if tl == 'printer': return ['Printer']
+            if tl == 'scanner': return ['Scanner']
+            if tl == 'ups': return ['UPS']
+            if tl == 'server': return ['Server']
+            if 'router' in tl: return ['Router']
+            if 'switch' in tl: return ['Network Switch']
+            return [t] if t else []
+
+        # Group selected devices by destination cell and validate each target cell.
+        grouped_by_dest = {}
+        for did in device_ids:
+            grouped_by_dest.setdefault(normalized_map[int(did)], []).append(int(did))
+
+        validation_errors = []
+        for mapped_dest_cell_id, mapped_device_ids in grouped_by_dest.items():
+            cursor.execute("""
+                SELECT lc.cell_id, lc.row_number, lc.column_number,
+                       st.allowed_device_types, st.name AS station_type_name
+                FROM lab_layout_cells lc
+                JOIN station_types st ON lc.station_type_id = st.station_type_id
+                JOIN labs l ON lc.layout_id = l.layout_id
+                WHERE lc.cell_id = %s AND l.lab_id = %s
+            """, (mapped_dest_cell_id, to_lab_id))
+            dest_cell = cursor.fetchone()
+
+            allowed_names = []
+            current_device_types = []
+            station_name = 'station'
+
+            if dest_cell:
+                dest_row = dest_cell['row_number']
+                dest_col = dest_cell['column_number']
+                station_name = dest_cell['station_type_name'] or 'station'
+                allowed_names = dest_cell['allowed_device_types'] or []
+
+                cursor.execute("""
+                    SELECT lsd.device_type
+                    FROM lab_stations ls
+                    JOIN lab_grid_cells lgc ON ls.station_id = lgc.station_id
+                    JOIN lab_station_devices lsd ON ls.station_id = lsd.station_id
+                    WHERE ls.lab_id = %s AND lgc.row_number = %s AND lgc.column_number = %s
+                """, (to_lab_id, dest_row, dest_col))
+                current_device_types = [r['device_type'] for r in cursor.fetchall()]
+            else:
+                cursor.execute("""
+                    SELECT ls.station_id, lgc.equipment_type
+                    FROM lab_stations ls
+                    LEFT JOIN lab_grid_cells lgc ON ls.station_id = lgc.station_id
+                    WHERE ls.station_id = %s AND ls.lab_id = %s
+                """, (mapped_dest_cell_id, to_lab_id))
+                rt_station = cursor.fetchone()
+
+                if not rt_station:
+                    validation_errors.append(f"Destination station {mapped_dest_cell_id} is invalid")
+                    continue
+
+                eq_type = rt_station['equipment_type'] or ''
+                station_name = eq_type or 'station'
+                allowed_names = infer_allowed_names(eq_type)
+
+                cursor.execute("""
+                    SELECT lsd.device_type
+                    FROM lab_station_devices lsd
+                    WHERE lsd.station_id = %s
+                """, (mapped_dest_cell_id,))
+                current_device_types = [r['device_type'] for r in cursor.fetchall()]
+
+            # Prevent duplicate same-type placements into one station in a single request.
+            planned_types = set(current_device_types)
+            for did in mapped_device_ids:
+                dtype = device_type_by_id.get(int(did), '')
+                if dtype not in allowed_names:
+                    validation_errors.append(f"{dtype} is not allowed at {station_name} station")
+                    continue
+                if dtype in planned_types:
+                    validation_errors.append(f"{dtype} slot is already occupied at {station_name} station")
+                    continue
+                planned_types.add(dtype)
+
+        if validation_errors:
+            cursor.close(); conn.close()
+            return jsonify({'success': False, 'error': f"Cannot place devices: {', '.join(validation_errors)}"}), 400
+        
+        # Create transfer request
+        # Persist map when column exists; otherwise fall back to legacy insert.
+        cursor.execute("""
+            SELECT 1
+            FROM information_schema.columns
+            WHERE table_name = 'transfer_requests' AND column_name = 'device_dest_map'
+        """)
+        has_device_dest_map = cursor.fetchone() is not None
+
+        if not has_device_dest_map and len(grouped_by_dest.keys()) > 1:
+            cursor.close(); conn.close()
+            return jsonify({
+                'success': False,
+                'error': 'Multiple destination cells selected, but the transfer_requests.device_dest_map column is missing. Run backend/migrations/transfer_dest_cell.sql and retry.'
+            }), 400
+
+        primary_dest_cell = int(dest_cell_id) if dest_cell_id else next(iter(grouped_by_dest.keys()))
+
+        if has_device_dest_map:
+            cursor.execute("""
+                INSERT INTO transfer_requests 
+                (from_lab_id, to_lab_id, device_ids, remark, status, requested_by, requested_at,
+                 transfer_type, station_ids, dest_cell_id, device_dest_map)
+                VALUES (%s, %s, %s, %s, 'pending', %s, NOW(), %s, %s, %s, %s)
+                RETURNING transfer_id
+            """, (from_lab_id, to_lab_id, json.dumps(device_ids), remark, user_email,
+                  transfer_type, json.dumps(station_ids), primary_dest_cell, json.dumps(normalized_map)))
+        else:
+            cursor.execute("""
+                INSERT INTO transfer_requests 
+                (from_lab_id, to_lab_id, device_ids, remark, status, requested_by, requested_at,
+                 transfer_type, station_ids, dest_cell_id)
+                VALUES (%s, %s, %s, %s, 'pending', %s, NOW(), %s, %s, %s)
+                RETURNING transfer_id
+            """, (from_lab_id, to_lab_id, json.dumps(device_ids), remark, user_email,
+                  transfer_type, json.dumps(station_ids), primary_dest_cell))
+        
+        transfer_id = cursor.fetchone()['transfer_id']
+        conn.commit()
+        cursor.close()
+        conn.close()
+        
+        return jsonify({
+            'success': True,
+            'transfer_id': transfer_id,
+            'message': 'Transfer request created successfully'
+        })
+        
+    except Exception as e:
+        print(f"Error creating transfer request: {str(e)}")
+        traceback.print_exc()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@transfers_bp.route('/get_pending_transfers', methods=['GET'])
+def get_pending_transfers():
+    """Get all pending transfer requests (for HOD)"""
+    try:
+        conn = db.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT 1
+            FROM information_schema.columns
+            WHERE table_name = 'transfer_requests' AND column_name = 'device_dest_map'
+        """)
+        has_device_dest_map = cursor.fetchone() is not None
+
+        if has_device_dest_map:
+            cursor.execute("""
+                SELECT 
+                    tr.transfer_id,
+                    tr.from_lab_id,
+                    l1.lab_name as from_lab_name,
+                    tr.to_lab_id,
+                    l2.lab_name as to_lab_name,
+                    tr.device_ids,
+                    tr.remark,
+                    tr.status,
+                    tr.requested_by,
+                    TRIM(CONCAT_WS(' ', u_req.first_name, u_req.last_name)) as requested_by_name,
+                    tr.requested_at,
+                    tr.transfer_type,
+                    tr.station_ids,
+                    tr.device_dest_map
+                FROM transfer_requests tr
+                LEFT JOIN labs l1 ON tr.from_lab_id = l1.lab_id
+                LEFT JOIN labs l2 ON tr.to_lab_id = l2.lab_id
+                LEFT JOIN users u_req ON tr.requested_by = u_req.email
+                WHERE tr.status = 'pending'
+                ORDER BY tr.requested_at DESC
+            """)
+        else:
+            cursor.execute("""
+                SELECT 
+                    tr.transfer_id,
+                    tr.from_lab_id,
+                    l1.lab_name as from_lab_name,
+                    tr.to_lab_id,
+                    l2.lab_name as to_lab_name,
+                    tr.device_ids,
+                    tr.remark,
+                    tr.status,
+                    tr.requested_by,
+                    TRIM(CONCAT_WS(' ', u_req.first_name, u_req.last_name)) as requested_by_name,
+                    tr.requested_at,
+                    tr.transfer_type,
+                    tr.station_ids
+                FROM transfer_requests tr
+                LEFT JOIN labs l1 ON tr.from_lab_id = l1.lab_id
+                LEFT JOIN labs l2 ON tr.to_lab_id = l2.lab_id
+                LEFT JOIN users u_req ON tr.requested_by = u_req.email
+                WHERE tr.status = 'pending'
+                ORDER BY tr.requested_at DESC
+            """)
+        
+        transfers = []
+        for row in cursor.fetchall():
+            device_ids = json.loads(row['device_ids']) if isinstance(row['device_ids'], str) else row['device_ids']
+            
+            # Fetch device details with station info
+            cursor.execute("""
+                SELECT 
+                    d.device_id,
+                    et.name as type_name,
+                    d.brand,
+                    d.model,
+                    d.asset_code as asset_id,
+                    d.assigned_code,
+                    ls.assigned_code as station_code
+                FROM devices d
+                LEFT JOIN equipment_types et ON d.type_id = et.type_id
+                LEFT JOIN lab_station_devices lsd ON d.device_id = lsd.device_id
+                LEFT JOIN lab_stations ls ON lsd.station_id = ls.station_id
+                WHERE d.device_id = ANY(%s)
+            """, (device_ids,))
+            
+            devices = []
+            for dev_row in cursor.fetchall():
+                devices.append({
+                    'device_id': dev_row['device_id'],
+                    'type_name': dev_row['type_name'],
+                    'brand': dev_row['brand'],
+                    'model': dev_row['model'],
+                    'asset_id': dev_row['asset_id'],
+                    'assigned_code': dev_row['assigned_code'],
+                    'station_code': dev_row['station_code']
+                })
+            
+            station_ids_raw = row.get('station_ids')
+            station_ids = json.loads(station_ids_raw) if isinstance(station_ids_raw, str) and station_ids_raw else (station_ids_raw or [])
+            device_dest_map_raw = row.get('device_dest_map')
+            device_dest_map = json.loads(device_dest_map_raw) if isinstance(device_dest_map_raw, str) and device_dest_map_raw else (device_dest_map_raw or {})
+            
+            transfers.append({
+                'transfer_id': row['transfer_id'],
+                'from_lab_id': row['from_lab_id'],
+                'from_lab_name': row['from_lab_name'],
+                'to_lab_id': row['to_lab_id'],
+                'to_lab_name': row['to_lab_name'],
+                'device_ids': device_ids,
+                'devices': devices,
+                'remark': row['remark'],
+                'status': row['status'],
+                'requested_by': row['requested_by'],
+                'requested_by_name': row.get('requested_by_name'),
+                'requested_at': row['requested_at'].isoformat() if row['requested_at'] else None,
+                'transfer_type': row.get('transfer_type', 'individual'),
+                'station_ids': station_ids,
+                'device_dest_map': device_dest_map
+            })
+        
+        cursor.close()
+        conn.close()
+        
+        return jsonify({
+            'success': True,
+            'transfers': transfers
+        })
+        
+    except Exception as e:
+        print(f"Error fetching pending transfers: {str(e)}")
+        traceback.print_exc()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@transfers_bp.route('/get_transfer_history', methods=['GET'])
+def get_transfer_history():
+    """Get transfer history (approved/rejected) with device details."""
+    try:
+        conn = db.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            SELECT 1
+            FROM information_schema.columns
+            WHERE table_name = 'transfer_requests' AND column_name = 'device_dest_map'
+        """)
+        has_device_dest_map = cursor.fetchone() is not None
+
+        if has_device_dest_map:
+            cursor.execute("""
+                SELECT
+                    tr.transfer_id,
+                    tr.from_lab_id,
+                    l1.lab_name as from_lab_name,
+                    tr.to_lab_id,
+                    l2.lab_name as to_lab_name,
+                    tr.device_ids,
+                    tr.remark,
+                    tr.status,
+                    tr.requested_by,
+                    TRIM(CONCAT_WS(' ', u_req.first_name, u_req.last_name)) as requested_by_name,
+                    tr.requested_at,
+                    tr.approved_by,
+                    TRIM(CONCAT_WS(' ', u_app.first_name, u_app.last_name)) as approved_by_name,
+                    tr.approved_at,
+                    tr.transfer_type,
+                    tr.station_ids,
+                    tr.dest_cell_id,
+                    tr.device_dest_map
+                FROM transfer_requests tr
+                LEFT JOIN labs l1 ON tr.from_lab_id = l1.lab_id
+                LEFT JOIN labs l2 ON tr.to_lab_id = l2.lab_id
+                LEFT JOIN users u_req ON tr.requested_by = u_req.email
+                LEFT JOIN users u_app ON tr.approved_by = u_app.email
+                WHERE tr.status <> 'pending'
+                ORDER BY COALESCE(tr.approved_at, tr.requested_at) DESC
+            """)
+        else:
+            cursor.execute("""
+                SELECT
+                    tr.transfer_id,
+                    tr.from_lab_id,
+                    l1.lab_name as from_lab_name,
+                    tr.to_lab_id,
+                    l2.lab_name as to_lab_name,
+                    tr.device_ids,
+                    tr.remark,
+                    tr.status,
+                    tr.requested_by,
+                    TRIM(CONCAT_WS(' ', u_req.first_name, u_req.last_name)) as requested_by_name,
+                    tr.requested_at,
+                    tr.approved_by,
+                    TRIM(CONCAT_WS(' ', u_app.first_name, u_app.last_name)) as approved_by_name,
+                    tr.approved_at,
+                    tr.transfer_type,
+                    tr.station_ids,
+                    tr.dest_cell_id
+                FROM transfer_requests tr
+                LEFT JOIN labs l1 ON tr.from_lab_id = l1.lab_id
+                LEFT JOIN labs l2 ON tr.to_lab_id = l2.lab_id
+                LEFT JOIN users u_req ON tr.requested_by = u_req.email
+                LEFT JOIN users u_app ON tr.approved_by = u_app.email
+                WHERE tr.status <> 'pending'
+                ORDER BY COALESCE(tr.approved_at, tr.requested_at) DESC
+            """)
+
+        transfers = []
+        for row in cursor.fetchall():
+            device_ids = json.loads(row['device_ids']) if isinstance(row['device_ids'], str) else row['device_ids']
+
+            cursor.execute("""
+                SELECT
+                    d.device_id,
+                    et.name as type_name,
+                    d.brand,
+                    d.model,
+                    d.asset_code as asset_id,
+                    d.assigned_code,
+                    ls.assigned_code as station_code
+                FROM devices d
+                LEFT JOIN equipment_types et ON d.type_id = et.type_id
+                LEFT JOIN lab_station_devices lsd ON d.device_id = lsd.device_id
+                LEFT JOIN lab_stations ls ON lsd.station_id = ls.station_id
+                WHERE d.device_id = ANY(%s)
+            """, (device_ids,))
+
+            devices = []
+            for dev_row in cursor.fetchall():
+                devices.append({
+                    'device_id': dev_row['device_id'],
+                    'type_name': dev_row['type_name'],
+                    'brand': dev_row['brand'],
+                    'model': dev_row['model'],
+                    'asset_id': dev_row['asset_id'],
+                    'assigned_code': dev_row['assigned_code'],
+                    'station_code': dev_row['station_code']
+                })
+
+            station_ids_raw = row.get('station_ids')
+            station_ids = json.loads(station_ids_raw) if isinstance(station_ids_raw, str) and station_ids_raw else (station_ids_raw or [])
+            device_dest_map_raw = row.get('device_dest_map')
+            device_dest_map = json.loads(device_dest_map_raw) if isinstance(device_dest_map_raw, str) and device_dest_map_raw else (device_dest_map_raw or {})
+
+            if not device_dest_map and row.get('dest_cell_id'):
+                device_dest_map = {str(did): int(row['dest_cell_id']) for did in device_ids}
+
+            transfers.append({
+                'transfer_id': row['transfer_id'],
+                'from_lab_id': row['from_lab_id'],
+                'from_lab_name': row['from_lab_name'],
+                'to_lab_id': row['to_lab_id'],
+                'to_lab_name': row['to_lab_name'],
+                'device_ids': device_ids,
+                'devices': devices,
+                'remark': row['remark'],
+                'status': row['status'],
+                'requested_by': row['requested_by'],
+                'requested_by_name': row.get('requested_by_name'),
+                'requested_at': row['requested_at'].isoformat() if row['requested_at'] else None,
+                'approved_by': row['approved_by'],
+                'approved_by_name': row.get('approved_by_name'),
+                'approved_at': row['approved_at'].isoformat() if row['approved_at'] else None,
+                'transfer_type': row.get('transfer_type', 'individual'),
+                'station_ids': station_ids,
+                'device_dest_map': device_dest_map
+            })
+
+        cursor.close()
+        conn.close()
+
+        return jsonify({'success': True, 'transfers': transfers})
+
+    except Exception as e:
+        print(f"Error fetching transfer history: {str(e)}")
+        traceback.print_exc()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@transfers_bp.route('/approve_transfer/<int:transfer_id>', methods=['POST'])
+def approve_transfer(transfer_id):
+    """Approve transfer request and move devices between labs"""
+    conn = None
+    try:
+        # Get current user (should be HOD)
+        user_info = get_current_user()
+        user_email = user_info.email if user_info else 'Unknown'
+
+        conn = db.get_connection()
+        cursor = conn.cursor()
+
+        # Get transfer details (read device_dest_map if available)
+        cursor.execute("""
+            SELECT 1
+            FROM information_schema.columns
+            WHERE table_name = 'transfer_requests' AND column_name = 'device_dest_map'
+        """)
+        has_device_dest_map = cursor.fetchone() is not None
+
+        if has_device_dest_map:
+            cursor.execute("""
+                SELECT tr.from_lab_id, tr.to_lab_id, tr.device_ids, tr.transfer_type, tr.station_ids,
+                       tr.dest_cell_id, tr.device_dest_map, tr.requested_by,
+                       l1.lab_name AS from_lab_name, l2.lab_name AS to_lab_name
+                FROM transfer_requests tr
+                LEFT JOIN labs l1 ON tr.from_lab_id = l1.lab_id
+                LEFT JOIN labs l2 ON tr.to_lab_id = l2.lab_id
+                WHERE tr.transfer_id = %s AND tr.status = 'pending'
+            """, (transfer_id,))
+        else:
+            cursor.execute("""
+                SELECT tr.from_lab_id, tr.to_lab_id, tr.device_ids, tr.transfer_type, tr.station_ids,
+                       tr.dest_cell_id, tr.requested_by,
+                       l1.lab_name AS from_lab_name, l2.lab_name AS to_lab_name
+                FROM transfer_requests tr
+                LEFT JOIN labs l1 ON tr.from_lab_id = l1.lab_id
+                LEFT JOIN labs l2 ON tr.to_lab_id = l2.lab_id
+                WHERE tr.transfer_id = %s AND tr.status = 'pending'
+            """, (transfer_id,))
+
+        result = cursor.fetchone()
+        if not result:
+            return jsonify({'success': False, 'error': 'Transfer request not found or already processed'}), 404
+
+        from_lab_id = result['from_lab_id']
+        to_lab_id = result['to_lab_id']
+        device_ids_json = result['device_ids']
+        transfer_type = result.get('transfer_type', 'individual')
+        station_ids_json = result.get('station_ids')
+        dest_cell_id = result.get('dest_cell_id')
+        requested_by_email = result.get('requested_by')
+        from_lab_name = result.get('from_lab_name') or from_lab_id
+        to_lab_name = result.get('to_lab_name') or to_lab_id
+        device_dest_map_json = result.get('device_dest_map') if has_device_dest_map else None
+
+        device_ids = json.loads(device_ids_json) if isinstance(device_ids_json, str) else device_ids_json
+        station_ids = json.loads(station_ids_json) if isinstance(station_ids_json, str) and station_ids_json else (station_ids_json or [])
+        device_dest_map = json.loads(device_dest_map_json) if isinstance(device_dest_map_json, str) and device_dest_map_json else (device_dest_map_json or {})
+
+        # Build per-device destination map; if absent, use legacy single destination for all devices.
+        if not device_dest_map and dest_cell_id:
+            device_dest_map = {str(did): int(dest_cell_id) for did in device_ids}
+
+        normalized_dest_by_device = {}
+        for did in device_ids:
+            key = str(did)
+            if key not in device_dest_map:
+                cursor.close(); conn.close()
+                return jsonify({'success': False, 'error': 'Transfer request has missing destination assignments'}), 400
+            normalized_dest_by_device[int(did)] = int(device_dest_map[key])
+
+        # Resolve every destination cell/station to a concrete destination station_id.
+        dest_station_id_cache = {}
+
+        def resolve_dest_to_position(cell_id):
+            cursor.execute("""
+                SELECT lc.cell_id, lc.row_number, lc.column_number,
+                       st.name AS station_type_name
+                FROM lab_layout_cells lc
+                JOIN station_types st ON lc.station_type_id = st.station_type_id
+                JOIN labs l ON lc.layout_id = l.layout_id
+                WHERE lc.cell_id = %s AND l.lab_id = %s
+            """, (cell_id, to_lab_id))
+            dest_cell_bp = cursor.fetchone()
+
+            if dest_cell_bp:
+                return dest_cell_bp['row_number'], dest_cell_bp['column_number'], (dest_cell_bp['station_type_name'] or 'Unknown')
+
+            cursor.execute("""
+                SELECT ls.station_id, ls.row_number, ls.column_number,
+                       COALESCE(lgc.equipment_type, 'Unknown') AS station_type_name
+                FROM lab_stations ls
+                LEFT JOIN lab_grid_cells lgc ON ls.station_id = lgc.station_id
+                WHERE ls.station_id = %s AND ls.lab_id = %s
+            """, (cell_id, to_lab_id))
+            rt_station = cursor.fetchone()
+            if not rt_station:
+                return None, None, None
+            return rt_station['row_number'], rt_station['column_number'], (rt_station['station_type_name'] or 'Unknown')
+
+        def get_or_create_dest_station(row_num, col_num, station_type_name):
+            cursor.execute("""
+                SELECT lgc.station_id
+                FROM lab_grid_cells lgc
+                WHERE lgc.lab_id = %s AND lgc.row_number = %s AND lgc.column_number = %s
+                  AND lgc.station_id IS NOT NULL
+            """, (to_lab_id, row_num, col_num))
+            existing_cell = cursor.fetchone()
+            if existing_cell:
+                return existing_cell['station_id']
+
+            station_code = f"{to_lab_id}/T-{row_num}-{col_num}"
+            cursor.execute("""
+                INSERT INTO lab_stations (lab_id, assigned_code, row_number, column_number)
+                VALUES (%s, %s, %s, %s) RETURNING station_id
+            """, (to_lab_id, station_code, row_num, col_num))
+            new_station_id = cursor.fetchone()['station_id']
+
+            cursor.execute("""
+                SELECT cell_id FROM lab_grid_cells
+                WHERE lab_id = %s AND row_number = %s AND column_number = %s
+            """, (to_lab_id, row_num, col_num))
+            existing_grid = cursor.fetchone()
+
+            if existing_grid:
+                cursor.execute("""
+                    UPDATE lab_grid_cells
+                    SET station_id = %s, is_empty = FALSE
+                    WHERE lab_id = %s AND row_number = %s AND column_number = %s
+                """, (new_station_id, to_lab_id, row_num, col_num))
+            else:
+                cursor.execute("""
+                    INSERT INTO lab_grid_cells
+                    (lab_id, row_number, column_number, assigned_code, equipment_type, is_empty, station_id)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s)
+                """, (to_lab_id, row_num, col_num, station_code, station_type_name, False, new_station_id))
+
+            return new_station_id
+
+        for _, mapped_cell_id in normalized_dest_by_device.items():
+            if mapped_cell_id in dest_station_id_cache:
+                continue
+
+            dest_row, dest_col, dest_station_type_name = resolve_dest_to_position(mapped_cell_id)
+            if dest_row is None:
+                cursor.close(); conn.close()
+                return jsonify({'success': False, 'error': f'Destination station {mapped_cell_id} not found'}), 400
+
+            dest_station_id_cache[mapped_cell_id] = get_or_create_dest_station(dest_row, dest_col, dest_station_type_name)
+
+        # --- Execute the transfer ---
+        for device_id in device_ids:
+            mapped_cell_id = normalized_dest_by_device.get(int(device_id))
+            dest_station_id = dest_station_id_cache.get(mapped_cell_id)
+            if not dest_station_id:
+                cursor.close(); conn.close()
+                return jsonify({'success': False, 'error': f'Unable to resolve destination for device {device_id}'}), 400
+
+            # 1. Get the device's current station and details from source lab
+            cursor.execute("""
+                SELECT lsd.station_id, lsd.device_type, lsd.brand, lsd.model,
+                       lsd.specification, lsd.invoice_number, lsd.bill_id,
+                       lsd.is_linked, lsd.linked_group_id,
+                       d.assigned_code, d.asset_code
+                FROM lab_station_devices lsd
+                JOIN devices d ON lsd.device_id = d.device_id
+                WHERE lsd.device_id = %s
+            """, (device_id,))
+            src_record = cursor.fetchone()
+
+            if not src_record:
+                print(f"Warning: device {device_id} not found in lab_station_devices, skipping")
+                continue
+
+            # 2. Remove device from source lab station
+            cursor.execute("""
+                DELETE FROM lab_station_devices
+                WHERE device_id = %s AND station_id = %s
+            """, (device_id, src_record['station_id']))
+
+            # 3. Insert device into destination station
+            cursor.execute("""
+                INSERT INTO lab_station_devices
+                (station_id, device_id, device_type, brand, model, specification,
+                 invoice_number, bill_id, is_linked, linked_group_id)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """, (dest_station_id, device_id, src_record['device_type'],
+                  src_record['brand'], src_record['model'], src_record['specification'],
+                  src_record['invoice_number'], src_record['bill_id'],
+                  src_record['is_linked'], src_record['linked_group_id']))
+
+            # 4. Update devices table — keep assigned_code the same, update lab_id
+            cursor.execute("""
+                UPDATE devices SET lab_id = %s WHERE device_id = %s
+            """, (to_lab_id, device_id))
+
+        # Check if entire source stations are now empty and clean up
+        if station_ids:
+            for sid in station_ids:
+                cursor.execute("""
+                    SELECT COUNT(*) as cnt FROM lab_station_devices WHERE station_id = %s
+                """, (sid,))
+                remaining = cursor.fetchone()['cnt']
+                if remaining == 0:
+                    cursor.execute("""
+                        UPDATE lab_grid_cells
+                        SET is_empty = TRUE, assigned_code = NULL
+                        WHERE station_id = %s
+                    """, (sid,))
+        
+        # Update transfer request status
+        cursor.execute("""
+            UPDATE transfer_requests
+            SET status = 'approved',
+                approved_by = %s,
+                approved_at = NOW()
+            WHERE transfer_id = %s
+        """, (user_email, transfer_id))
+
+        conn.commit()
+        cursor.close()
+        conn.close()
+
+        approval_html = f"""
+        <html><body style="font-family:-apple-system,BlinkMacSystemFont,'Segoe UI',Roboto,sans-serif;background:#f3f4f6;padding:20px;">
+          <div style="max-width:620px;margin:0 auto;background:white;border-radius:12px;overflow:hidden;box-shadow:0 4px 6px rgba(0,0,0,0.1);">
+            <div style="background:linear-gradient(135deg,#22c55e,#15803d);padding:20px 28px;">
+              <h1 style="color:white;margin:0;font-size:18px;">✅ Transfer Request Approved</h1>
+              <p style="color:rgba(255,255,255,0.85);margin:4px 0 0;font-size:13px;">Transfer #{transfer_id}</p>
+            </div>
+            <div style="padding:20px 28px;">
+              <table style="width:100%;font-size:14px;border-collapse:collapse;">
+                <tr><td style="padding:8px 0;color:#6b7280;width:140px;">From Lab</td><td style="padding:8px 0;color:#111;">{from_lab_name}</td></tr>
+                <tr><td style="padding:8px 0;color:#6b7280;">To Lab</td><td style="padding:8px 0;color:#111;">{to_lab_name}</td></tr>
+                <tr><td style="padding:8px 0;color:#6b7280;">Devices Moved</td><td style="padding:8px 0;color:#111;">{len(device_ids)}</td></tr>
+                <tr><td style="padding:8px 0;color:#6b7280;">Approved By</td><td style="padding:8px 0;color:#111;">{user_email}</td></tr>
+              </table>
+            </div>
+          </div>
+        </body></html>
+        """
+        send_notification_to_user(
+            subject=f"✅ Transfer Approved: Request #{transfer_id}",
+            html_body=approval_html,
+            user_email=requested_by_email
+        )
+
+        return jsonify({
+            'success': True,
+            'message': f'Transfer approved and {len(device_ids)} devices moved successfully'
+        })
+
+    except Exception as e:
+        print(f"Error approving transfer: {str(e)}")
+        traceback.print_exc()
+        if conn:
+            conn.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@transfers_bp.route('/reject_transfer/<int:transfer_id>', methods=['POST'])
+def reject_transfer(transfer_id):
+    """Reject transfer request"""
+    try:
+        # Get current user (should be HOD)
+        user_info = get_current_user()
+        user_email = user_info.email if user_info else 'Unknown'
+        
+        conn = db.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            UPDATE transfer_requests
+            SET status = 'rejected',
+                approved_by = %s,
+                approved_at = NOW()
+            WHERE transfer_id = %s AND status = 'pending'
+        """, (user_email, transfer_id))
+        
+        if cursor.rowcount == 0:
+            return jsonify({'success': False, 'error': 'Transfer request not found or already processed'}), 404
+        
+        conn.commit()
+        cursor.close()
+        conn.close()
+        
+        return jsonify({
+            'success': True,
+            'message': 'Transfer request rejected'
+        })
+        
+    except Exception as e:
+        print(f"Error rejecting transfer: {str(e)}")
+        traceback.print_exc()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@transfers_bp.route('/get_lab_pending_transfer_info/<lab_id>', methods=['GET'])
+def get_lab_pending_transfer_info(lab_id):
+    """Get pending transfer information for a specific lab.
+    Returns:
+      - outgoing_device_ids: list of device_ids in this lab that have pending outgoing transfers
+      - incoming_cells: dict of dest_cell_id -> list of { device_id, device_type, transfer_id } for pending incoming transfers
+    """
+    try:
+        conn = db.get_connection()
+        cursor = conn.cursor()
+
+        # Check if device_dest_map column exists
+        cursor.execute("""
+            SELECT 1
+            FROM information_schema.columns
+            WHERE table_name = 'transfer_requests' AND column_name = 'device_dest_map'
+        """)
+        has_device_dest_map = cursor.fetchone() is not None
+
+        # --- Outgoing: devices in this lab that are part of pending transfers ---
+        cursor.execute("""
+            SELECT transfer_id, device_ids, to_lab_id
+            FROM transfer_requests
+            WHERE from_lab_id = %s AND status = 'pending'
+        """, (lab_id,))
+        outgoing_device_ids = set()
+        outgoing_details = []  # [{transfer_id, to_lab_id, device_ids}]
+        for row in cursor.fetchall():
+            dids = json.loads(row['device_ids']) if isinstance(row['device_ids'], str) else (row['device_ids'] or [])
+            int_dids = [int(x) for x in dids]
+            outgoing_device_ids.update(int_dids)
+            outgoing_details.append({
+                'transfer_id': row['transfer_id'],
+                'to_lab_id': row['to_lab_id'],
+                'device_ids': int_dids
+            })
+
+        # --- Incoming: pending transfers TO this lab with dest cell mapping ---
+        if has_device_dest_map:
+            cursor.execute("""
+                SELECT transfer_id, device_ids, device_dest_map, from_lab_id
+                FROM transfer_requests
+                WHERE to_lab_id = %s AND status = 'pending'
+            """, (lab_id,))
+        else:
+            cursor.execute("""
+                SELECT transfer_id, device_ids, dest_cell_id, from_lab_id
+                FROM transfer_requests
+                WHERE to_lab_id = %s AND status = 'pending'
+            """, (lab_id,))
+
+        incoming_cells = {}  # cell_id -> [{ device_id, device_type, transfer_id }]
+        incoming_device_ids_all = []
+        for row in cursor.fetchall():
+            tid = row['transfer_id']
+            dids = json.loads(row['device_ids']) if isinstance(row['device_ids'], str) else (row['device_ids'] or [])
+            int_dids = [int(x) for x in dids]
+            incoming_device_ids_all.extend(int_dids)
+
+            dest_map = {}
+            if has_device_dest_map and row.get('device_dest_map'):
+                raw = row['device_dest_map']
+                dest_map = json.loads(raw) if isinstance(raw, str) else (raw or {})
+            elif row.get('dest_cell_id'):
+                dest_map = {str(did): int(row['dest_cell_id']) for did in int_dids}
+
+            for did_str, cell_id in dest_map.items():
+                cell_key = str(cell_id)
+                if cell_key not in incoming_cells:
+                    incoming_cells[cell_key] = []
+                incoming_cells[cell_key].append({
+                    'device_id': int(did_str),
+                    'transfer_id': tid,
+                    'from_lab_id': row['from_lab_id']
+                })
+
+        # Lookup device types for incoming devices
+        if incoming_device_ids_all:
+            cursor.execute("""
+                SELECT d.device_id, et.name AS device_type
+                FROM devices d
+                JOIN equipment_types et ON d.type_id = et.type_id
+                WHERE d.device_id = ANY(%s)
+            """, (incoming_device_ids_all,))
+            type_map = {r['device_id']: r['device_type'] for r in cursor.fetchall()}
+            for cell_key, entries in incoming_cells.items():
+                for entry in entries:
+                    entry['device_type'] = type_map.get(entry['device_id'], 'Unknown')
+
+        cursor.close()
+        conn.close()
+
+        return jsonify({
+            'success': True,
+            'outgoing_device_ids': list(outgoing_device_ids),
+            'outgoing_details': outgoing_details,
+            'incoming_cells': incoming_cells
+        })
+
+    except Exception as e:
+        print(f"Error fetching lab pending transfer info: {str(e)}")
+        traceback.print_exc()
+        return jsonify({'success': False, 'error': str(e)}), 500
@@ -0,0 +1,81 @@
+"""
+Standalone scheduler process
+Owns every periodic job (see services/scheduler_service.JOBS) so web workers
+don't each run their own copy.
+
+Usage (from backend/):
+    python -m scheduler                          # run the scheduler in the foreground
+    python -m scheduler --list                   # registered jobs and their schedules
+    python -m scheduler --run daily_warranty_check   # run one job now
+    python -m scheduler --run classifier_retrain     # retrain the invoice classifier now
+    python -m scheduler --history [JOB_ID]       # recent runs with durations
+"""
+
+import argparse
+import sys
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from services.mail_dispatcher import MAIL_SHUTDOWN_TIMEOUT, get_mail_dispatcher
+from services.scheduler_service import JOBS, SCHEDULER_TIMEZONE, build_scheduler, recent_runs, run_job
+from utils.logging_config import configure_logging
+
+
+def _print_history(job_id=None, limit=20):
+    runs = recent_runs(job_id, limit)
+    if not runs:
+        print("No recorded runs")
+        return
+    for run in runs:
+        duration = f"{run['duration_ms']} ms" if run["duration_ms"] is not None else "-"
+        line = f"{run['started_at']}  {run['job_id']:<24} {run['status']:<8} {duration:>10}  {run['host'] or ''}"
+        if run["error"]:
+            line += f"  error: {run['error']}"
+        print(line)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="AssetIQ periodic job scheduler")
+    parser.add_argument("--list", action="store_true", help="list registered jobs and exit")
+    parser.add_argument("--run", metavar="JOB_ID", help="run a single job now and exit")
+    parser.add_argument("--history", nargs="?", const="", metavar="JOB_ID", help="show recent runs and exit")
+    parser.add_argument("--limit", type=int, default=20, help="rows for --history")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for job in JOBS.values():
+            schedule = " ".join(f"{k}={v}" for k, v in job.cron.items())
+            print(f"{job.job_id:<24} {schedule} ({SCHEDULER_TIMEZONE})  {job.description}")
+        return 0
+
+    if args.history is not None:
+        _print_history(args.history or None, args.limit)
+        return 0
+
+    if args.run:
+        if args.run not in JOBS:
+            print(f"Unknown job: {args.run} (known: {', '.join(JOBS)})")
+            return 2
+        status = run_job(args.run)
+        # Jobs only enqueue their emails; deliver them before the process exits
+        if not get_mail_dispatcher().flush(MAIL_SHUTDOWN_TIMEOUT):
+            print(f"[Scheduler] Emails still queued after {MAIL_SHUTDOWN_TIMEOUT:.0f}s — not all were delivered")
+            return 1
+        return 0 if status != "failed" else 1
+
+    configure_logging()
+    scheduler = build_scheduler(blocking=True)
+    for job in JOBS.values():
+        schedule = " ".join(f"{k}={v}" for k, v in job.cron.items())
+        print(f"[Scheduler] {job.job_id} scheduled ({schedule}, {SCHEDULER_TIMEZONE})")
+    try:
+        scheduler.start()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
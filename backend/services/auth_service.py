@@ -0,0 +1,181 @@
+"""
+Auth Service
+Current-user lookup from the JWT bearer token and the emailed verification
+codes used by signup and student complaints.
+"""
+
+import os
+import random
+from datetime import datetime
+
+import bcrypt
+from dotenv import load_dotenv
+from flask import request
+
+from config.database import db
+from models.user import User
+from services.notification_service import send_email_async
+from utils.jwt_utils import decode_token
+
+load_dotenv()
+SIGNUP_CODE_TTL_MINUTES = int(os.getenv("SIGNUP_CODE_TTL_MINUTES", 1))
+SIGNUP_CODE_COOLDOWN_SECONDS = int(os.getenv("SIGNUP_CODE_COOLDOWN_SECONDS", 30))
+STUDENT_COMPLAINT_CODE_TTL_MINUTES = int(os.getenv("STUDENT_COMPLAINT_CODE_TTL_MINUTES", 1))
+STUDENT_COMPLAINT_CODE_COOLDOWN_SECONDS = int(os.getenv("STUDENT_COMPLAINT_CODE_COOLDOWN_SECONDS", 30))
+
+
+# -----------------------------
+# Authentication Middleware
+# -----------------------------
+def get_current_user():
+    """Get current user from JWT token"""
+    auth_header = request.headers.get('Authorization')
+    if not auth_header or not auth_header.startswith('Bearer '):
+        return None
+    
+    token = auth_header.split(' ')[1]
+    try:
+        payload = decode_token(token)
+        return User.find_by_id(payload['user_id'])
+    except:
+        return None
+
+
+def generate_verification_code() -> str:
+    return f"{random.randint(0, 999999):06d}"
+
+
+def hash_verification_code(code: str) -> str:
+    return bcrypt.hashpw(code.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+
+
+def send_signup_verification_email(email: str, code: str) -> bool:
+    subject = "AssetIQ signup verification code"
+    html_body = f"""
+        <div style=\"font-family: Arial, sans-serif; line-height: 1.5;\">
+            <h2>Verify your email</h2>
+            <p>Your AssetIQ verification code is:</p>
+            <div style=\"font-size: 24px; font-weight: bold; letter-spacing: 2px;\">{code}</div>
+            <p>This code expires in {SIGNUP_CODE_TTL_MINUTES} minutes.</p>
+            <p>If you did not request this, you can ignore this email.</p>
+        </div>
+    """
+    return send_email_async(subject, html_body, [email])
+
+
+def verify_signup_code(email: str, code: str) -> (bool, str):
+    conn = db.get_connection()
+    if not conn:
+        return False, "Database connection failed"
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            """
+            SELECT id, code_hash, expires_at, attempts, used_at
+            FROM email_verification_codes
+            WHERE email = %s
+              AND used_at IS NULL
+            ORDER BY created_at DESC
+            LIMIT 1
+            """,
+            (email,)
+        )
+        row = cursor.fetchone()
+        if not row:
+            return False, "No active verification code found"
+
+        if row["expires_at"] < datetime.utcnow():
+            return False, "Verification code expired"
+
+        if row.get("attempts", 0) >= 5:
+            return False, "Too many failed attempts"
+
+        code_hash = row["code_hash"] or ""
+        if not bcrypt.checkpw(code.encode("utf-8"), code_hash.encode("utf-8")):
+            cursor.execute(
+                "UPDATE email_verification_codes SET attempts = attempts + 1 WHERE id = %s",
+                (row["id"],)
+            )
+            conn.commit()
+            return False, "Invalid verification code"
+
+        cursor.execute(
+            "UPDATE email_verification_codes SET used_at = %s WHERE id = %s",
+            (datetime.utcnow(), row["id"]),
+        )
+        conn.commit()
+        return True, ""
+    except Exception as e:
+        conn.rollback()
+        print(f"Verification code check failed: {e}")
+        return False, "Verification failed"
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def send_student_complaint_verification_email(email: str, code: str) -> bool:
+    subject = "AssetIQ complaint verification code"
+    html_body = f"""
+        <div style=\"font-family: Arial, sans-serif; line-height: 1.5;\">
+            <h2>Verify your complaint email</h2>
+            <p>Your verification code is:</p>
+            <div style=\"font-size: 24px; font-weight: bold; letter-spacing: 2px;\">{code}</div>
+            <p>This code expires in {STUDENT_COMPLAINT_CODE_TTL_MINUTES} minutes.</p>
+            <p>If you did not request this, you can ignore this email.</p>
+        </div>
+    """
+    return send_email_async(subject, html_body, [email])
+
+
+def verify_student_complaint_code(email: str, code: str) -> (bool, str):
+    conn = db.get_connection()
+    if not conn:
+        return False, "Database connection failed"
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            """
+            SELECT id, code_hash, expires_at, attempts, used_at
+            FROM student_email_verification_codes
+            WHERE email = %s
+              AND used_at IS NULL
+            ORDER BY created_at DESC
+            LIMIT 1
+            """,
+            (email,)
+        )
+        row = cursor.fetchone()
+        if not row:
+            return False, "No active verification code found"
+
+        if row["expires_at"] < datetime.utcnow():
+            return False, "Verification code expired"
+
+        if row.get("attempts", 0) >= 5:
+            return False, "Too many failed attempts"
+
+        code_hash = row["code_hash"] or ""
+        if not bcrypt.checkpw(code.encode("utf-8"), code_hash.encode("utf-8")):
+            cursor.execute(
+                "UPDATE student_email_verification_codes SET attempts = attempts + 1 WHERE id = %s",
+                (row["id"],)
+            )
+            conn.commit()
+            return False, "Invalid verification code"
+
+        cursor.execute(
+            "UPDATE student_email_verification_codes SET used_at = %s WHERE id = %s",
+            (datetime.utcnow(), row["id"]),
+        )
+        conn.commit()
+        return True, ""
+    except Exception as e:
+        conn.rollback()
+        print(f"Student verification check failed: {e}")
+        return False, "Verification failed"
+    finally:
+        cursor.close()
+        conn.close()
@@ -0,0 +1,133 @@
+"""
+Bill Service
+Uploaded bill file storage, text extraction (LLM Whisperer / tesseract) and
+the shared OCR regex extractor.
+"""
+
+import os
+import re
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Optional
+
+import requests
+from dotenv import load_dotenv
+from werkzeug.utils import secure_filename
+
+from utils.logging_config import get_logger
+
+load_dotenv()
+LLM_WHISPERER_API_KEY = os.getenv("LLM_WHISPERER_API_KEY")
+UPLOAD_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "uploads")
+ALLOWED_BILL_EXTENSIONS = {".pdf", ".jpg", ".jpeg", ".png"}
+tesseract_cmd = os.getenv("TESSERACT_CMD")
+
+logger = get_logger("assetiq.bills")
+
+_extractor = None
+_extractor_lock = threading.Lock()
+
+
+def get_extractor():
+    """OCR regex extractor (classifier + regex templates), created on first use."""
+    global _extractor
+    if _extractor is None:
+        with _extractor_lock:
+            if _extractor is None:
+                from ocr_bridge import OcrRegexExtractor
+                _extractor = OcrRegexExtractor()
+    return _extractor
+
+
+# ------------------------------
+# Heavy optional dependencies
+# ------------------------------
+# pytesseract (pulls in pandas), pdf2image/PIL, reportlab and the classifier
+# stack are only needed by the OCR fallback / PDF export routes, so they are
+# imported on first use instead of at startup.
+def get_pytesseract():
+    import pytesseract
+    if tesseract_cmd:
+        pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+    return pytesseract
+
+
+def warm_up():
+    """Import the OCR / PDF stacks, start the tesseract workers and load the classifier ahead of the first request."""
+    started = time.perf_counter()
+    try:
+        from services.ocr_pool import get_ocr_pool
+        get_ocr_pool().warm_up()
+        import pdf2image  # noqa: F401
+        import reportlab.platypus  # noqa: F401
+        get_extractor().warm_up()
+        logger.info("Warm-up finished in %.2fs", time.perf_counter() - started)
+    except Exception as e:
+        logger.warning("Warm-up failed: %s", e)
+
+
+def _slugify_filename(value: str, fallback: str = "bill") -> str:
+    value = (value or "").strip().lower()
+    if not value:
+        return fallback
+    value = re.sub(r"[^a-z0-9]+", "_", value).strip("_")
+    return value or fallback
+
+
+def store_bill_file(upload, invoice_number: str = "", vendor_name: str = "") -> str:
+    if not upload or not upload.filename:
+        raise ValueError("No file provided")
+
+    original_name = secure_filename(upload.filename)
+    _, ext = os.path.splitext(original_name)
+    ext = ext.lower()
+
+    if ext not in ALLOWED_BILL_EXTENSIONS:
+        raise ValueError("Only PDF, JPG, JPEG, and PNG files are supported")
+
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+
+    vendor_slug = _slugify_filename(vendor_name, "vendor")
+    invoice_slug = _slugify_filename(invoice_number, "invoice")
+    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+    unique_suffix = uuid.uuid4().hex[:8]
+    filename = f"{vendor_slug}_{invoice_slug}_{timestamp}_{unique_suffix}{ext}"
+
+    full_path = os.path.join(UPLOAD_DIR, filename)
+    upload.save(full_path)
+
+    return f"uploads/{filename}"
+
+
+def remove_bill_file(relative_path: str) -> None:
+    if not relative_path:
+        return
+
+    filename = os.path.basename(relative_path)
+    if not filename:
+        return
+
+    full_path = os.path.join(UPLOAD_DIR, filename)
+    if os.path.exists(full_path):
+        os.remove(full_path)
+
+
+# ============================================
+# LLM WHISPERER API INTEGRATION
+# ============================================
+def extract_text_with_llm_whisperer(file_content: bytes, api_key: str,
+                                    cancel: Optional[threading.Event] = None) -> str:
+    """
+    Extract text from a PDF or image with the shared LLM Whisperer client
+    (services/llm_whisperer.py). Setting ``cancel`` stops polling (raises
+    OcrCancelled).
+    """
+    from services.llm_whisperer import get_whisperer_client
+    try:
+        return get_whisperer_client(api_key).whisper(file_content, cancel=cancel)
+    except requests.exceptions.RequestException as e:
+        if getattr(e, "response", None) is not None:
+            logger.warning("LLM Whisperer response: %s", e.response.text[:300])
+        raise Exception(f"Failed to extract text from PDF: {str(e)}")
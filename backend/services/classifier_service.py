@@ -0,0 +1,291 @@
+"""
+Classifier Service
+Feedback store for scans whose invoice layout was classified wrong, and the
+scheduled retrain that learns from it.
+
+Every retrain:
+  - fits a candidate on training_data/invoices.csv plus all recorded
+    corrections (corrections win over a CSV row with the same text and are
+    weighted CLASSIFIER_FEEDBACK_WEIGHT), holding out a fixed 1-in-N slice
+    of texts
+  - refits the deployed model's recipe (the CSV plus the corrections it was
+    trained with) on the same split as the baseline, so both are scored on
+    texts neither has seen
+  - promotes only when the candidate is at least as accurate as the
+    baseline on the holdout and on held-out corrections; the promoted
+    version is then refitted on every text, holdout included, saved under
+    training_data/models/ and swapped in atomically (CURRENT pointer, picked
+    up by every worker within CLASSIFIER_RELOAD_INTERVAL)
+
+Retraining is skipped until CLASSIFIER_RETRAIN_MIN_FEEDBACK corrections have
+arrived since the last attempt.
+
+training_data/invoices.csv (columns text, label: the dataset the bundled
+classifier_model.pkl was trained on) is not shipped with the repo. Put it in
+"ocr regex new/training_data/" to enable retraining; without it the nightly
+job is recorded as skipped.
+"""
+
+import csv
+import hashlib
+import os
+import sys
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from config.database import db
+
+# The classifier lives in "ocr regex new/" next to the regex templates
+_OCR_REGEX_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ocr regex new")
+if _OCR_REGEX_DIR not in sys.path:
+    sys.path.insert(0, _OCR_REGEX_DIR)
+
+import classifier  # noqa: E402
+
+TEMPLATES_DIR = os.path.join(_OCR_REGEX_DIR, "regex_templates")
+CLASSIFIER_RETRAIN_MIN_FEEDBACK = int(os.getenv("CLASSIFIER_RETRAIN_MIN_FEEDBACK", "5"))
+CLASSIFIER_FEEDBACK_WEIGHT = float(os.getenv("CLASSIFIER_FEEDBACK_WEIGHT", "3"))
+# Texts whose hash falls in bucket 0 of N are held out while deciding on promotion
+CLASSIFIER_HOLDOUT_BUCKETS = int(os.getenv("CLASSIFIER_HOLDOUT_BUCKETS", "5"))
+
+
+def invoice_types() -> List[str]:
+    """Layouts a scan can be labelled with (one per regex template)."""
+    return sorted(
+        name[:-5] for name in os.listdir(TEMPLATES_DIR)
+        if name.endswith(".json") and not name.startswith("_")
+    )
+
+
+def _text_sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _in_holdout(text_sha256: str) -> bool:
+    return int(text_sha256[:8], 16) % CLASSIFIER_HOLDOUT_BUCKETS == 0
+
+
+# ------------------------------
+# Feedback store
+# ------------------------------
+def record_feedback(raw_text: str, correct_type: str, user_id: int, predicted_type: Optional[str] = None,
+                    bill_number: Optional[str] = None) -> int:
+    """
+    Store the correct layout for a scanned text, on behalf of the signed-in
+    user who corrected it (replacing an earlier correction of the same text),
+    and return its feedback_id. Raises ValueError for an empty text or
+    unknown layout.
+    """
+    if not raw_text or not raw_text.strip():
+        raise ValueError("raw_text is required")
+    if correct_type not in invoice_types():
+        raise ValueError(f"Unknown invoice type: {correct_type}")
+
+    conn = db.get_connection()
+    if not conn:
+        raise RuntimeError("DB connection failed")
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            INSERT INTO classifier_feedback
+                (raw_text, text_sha256, predicted_type, correct_type, bill_number, user_id)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            ON CONFLICT (text_sha256) DO UPDATE
+            SET predicted_type = EXCLUDED.predicted_type,
+                correct_type = EXCLUDED.correct_type,
+                bill_number = EXCLUDED.bill_number,
+                user_id = EXCLUDED.user_id,
+                recorded_at = now()
+            RETURNING feedback_id
+            """,
+            (raw_text, _text_sha256(raw_text), predicted_type, correct_type, bill_number, user_id),
+        )
+        feedback_id = cursor.fetchone()["feedback_id"]
+        conn.commit()
+        cursor.close()
+        return feedback_id
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def _load_feedback() -> List[Dict]:
+    conn = db.get_connection()
+    if not conn:
+        raise RuntimeError("DB connection failed")
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT raw_text, text_sha256, correct_type, recorded_at
+            FROM classifier_feedback
+            ORDER BY feedback_id
+            """
+        )
+        rows = cursor.fetchall()
+        cursor.close()
+        return rows
+    finally:
+        conn.close()
+
+
+class TrainingDataMissing(RuntimeError):
+    """training_data/invoices.csv isn't there, so there is nothing to retrain from."""
+
+
+def _load_training_csv() -> Dict[str, tuple]:
+    """text_sha256 -> (text, label) for every row of invoices.csv."""
+    if not os.path.exists(classifier.TRAINING_DATA_PATH):
+        raise TrainingDataMissing(
+            f"{classifier.TRAINING_DATA_PATH} is missing (not shipped with the repo) — "
+            f"cannot retrain the classifier"
+        )
+    rows = {}
+    with open(classifier.TRAINING_DATA_PATH, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            if row.get("text") and row.get("label"):
+                rows[_text_sha256(row["text"])] = (row["text"], row["label"])
+    return rows
+
+
+def _training_rows(csv_rows: Dict[str, tuple], feedback: List[Dict], through: Optional[str] = None) -> Dict:
+    """
+    text_sha256 -> (text, label, weight): the CSV with the corrections
+    recorded up to ``through`` (all of them when None) overriding its labels.
+    """
+    rows = {sha: (text, label, 1.0) for sha, (text, label) in csv_rows.items()}
+    for row in feedback:
+        if through is None or row["recorded_at"].isoformat() <= through:
+            rows[row["text_sha256"]] = (row["raw_text"], row["correct_type"], CLASSIFIER_FEEDBACK_WEIGHT)
+    return rows
+
+
+def _fit(rows: List[tuple]):
+    """Pipeline fitted on (sha, text, label, weight) rows."""
+    return classifier.build_pipeline(
+        [text for _, text, _, _ in rows],
+        [label for _, _, label, _ in rows],
+        sample_weight=[weight for _, _, _, weight in rows],
+    )
+
+
+def _split(rows: Dict) -> tuple:
+    train, holdout = [], []
+    for sha, (text, label, weight) in rows.items():
+        (holdout if _in_holdout(sha) else train).append((sha, text, label, weight))
+    return train, holdout
+
+
+# ------------------------------
+# Retrain job
+# ------------------------------
+def retrain_classifier(force: bool = False) -> Optional[str]:
+    """
+    Train, evaluate and (if it is no worse) promote a new classifier version.
+    Returns the saved version name, or None when there was nothing new to
+    learn from. Raises TrainingDataMissing without invoices.csv.
+    """
+    feedback = _load_feedback()
+    saved = classifier.saved_versions()
+    last_attempt = classifier.read_metrics(saved[-1]) if saved else {}
+    since = last_attempt.get("feedback_through")
+    new_rows = [row for row in feedback if not since or row["recorded_at"].isoformat() > since]
+    if not force and len(new_rows) < CLASSIFIER_RETRAIN_MIN_FEEDBACK:
+        print(f"[Classifier] {len(new_rows)} new correction(s) since the last retrain "
+              f"(need {CLASSIFIER_RETRAIN_MIN_FEEDBACK}) — skipping")
+        return None
+
+    csv_rows = _load_training_csv()
+    rows = _training_rows(csv_rows, feedback)
+    feedback_shas = {row["text_sha256"] for row in feedback}
+    train, holdout = _split(rows)
+    if not train or not holdout:
+        raise RuntimeError(f"Not enough data to retrain ({len(train)} train / {len(holdout)} holdout rows)")
+
+    print(f"[Classifier] Training on {len(train)} texts ({len(feedback)} correction(s) in total), "
+          f"holding out {len(holdout)}")
+    candidate = _fit(train)
+
+    # The deployed model was fitted on the holdout too (the bundled one on all
+    # of invoices.csv, promoted versions on everything), so scoring it there
+    # would compare training accuracy with held-out accuracy. Refit its recipe
+    # (the CSV plus the corrections it was trained with) on the same split.
+    current = classifier.current_version()
+    current_through = classifier.read_metrics(current).get("feedback_through") if current else ""
+    baseline_train, _ = _split(_training_rows(csv_rows, feedback, through=current_through or ""))
+    baseline_model = _fit(baseline_train)
+
+    holdout_texts = [text for _, text, _, _ in holdout]
+    holdout_labels = [label for _, _, label, _ in holdout]
+    corrected = [(text, label) for sha, text, label, _ in holdout if sha in feedback_shas]
+    corrected_texts = [text for text, _ in corrected]
+    corrected_labels = [label for _, label in corrected]
+
+    baseline = {
+        "holdout_accuracy": classifier.evaluate(baseline_model, holdout_texts, holdout_labels),
+        "feedback_holdout_accuracy": classifier.evaluate(baseline_model, corrected_texts, corrected_labels),
+        "feedback_through": current_through or None,
+    }
+    metrics = {
+        "trained_at": datetime.now().isoformat(timespec="seconds"),
+        "train_rows": len(train),
+        "holdout_rows": len(holdout),
+        "feedback_rows": len(feedback),
+        "feedback_holdout_rows": len(corrected),
+        "feedback_through": max(row["recorded_at"] for row in feedback).isoformat() if feedback else since,
+        "holdout_accuracy": classifier.evaluate(candidate, holdout_texts, holdout_labels),
+        "feedback_holdout_accuracy": classifier.evaluate(candidate, corrected_texts, corrected_labels),
+        "baseline_version": current,
+        "baseline": baseline,
+    }
+    promote = metrics["holdout_accuracy"] >= baseline["holdout_accuracy"] and (
+        not corrected or metrics["feedback_holdout_accuracy"] >= baseline["feedback_holdout_accuracy"]
+    )
+    metrics["promoted"] = promote
+
+    summary = (f"holdout {metrics['holdout_accuracy']:.2%} vs {baseline['holdout_accuracy']:.2%}"
+               + (f", corrections {metrics['feedback_holdout_accuracy']:.2%} vs "
+                  f"{baseline['feedback_holdout_accuracy']:.2%}" if corrected else ""))
+    if not promote:
+        # Kept for inspection; never deployed
+        version = classifier.save_version(candidate, metrics)
+        print(f"[Classifier] Kept {current or 'bundled model'}; {version} is less accurate ({summary})")
+        return version
+
+    # The split only decides; the deployed model learns every text, including
+    # the held-out corrections (otherwise those scans stay misclassified)
+    metrics["train_rows"] = len(rows)
+    version = classifier.save_version(_fit(train + holdout), metrics)
+    classifier.promote_version(version)
+    print(f"[Classifier] Promoted {version}, trained on all {len(rows)} texts ({summary})")
+    return version
+
+
+def classifier_retrain_job():
+    """
+    Scheduled nightly retrain. Run it through services.scheduler_service.run_job,
+    which holds the job's advisory lock and records the run; errors propagate
+    so the run is recorded as failed. Without invoices.csv the run is recorded
+    as skipped.
+    """
+    from services.scheduler_service import JobSkipped
+
+    print(f"[Classifier] Running classifier retrain at {datetime.now()}")
+    try:
+        retrain_classifier()
+    except TrainingDataMissing as e:
+        raise JobSkipped(str(e))
+
+
+def classifier_status() -> Dict:
+    """Model this process predicts with, the promoted version and its metrics."""
+    current = classifier.current_version()
+    return {
+        "loaded_version": classifier.loaded_version(),
+        "current_version": current,
+        "metrics": classifier.read_metrics(current),
+        "saved_versions": classifier.saved_versions(),
+    }
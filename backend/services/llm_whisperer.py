@@ -0,0 +1,231 @@
+"""
+LLM Whisperer Client
+The one LLM Whisperer API v2 client used by the /scan route (through
+services/bill_service.py) and "ocr regex new"/ocr_engine.py.
+
+  - one pooled requests.Session per client, so submit / status / retrieve
+    calls reuse connections instead of a TLS handshake per request
+  - adaptive polling: status checks start LLM_WHISPERER_POLL_INITIAL seconds
+    apart and back off by LLM_WHISPERER_POLL_BACKOFF up to
+    LLM_WHISPERER_POLL_MAX, within an overall LLM_WHISPERER_TIMEOUT
+    (replaces 15 polls at a fixed 2 s)
+  - whisper_async() / whisper_many() run documents concurrently, at most
+    LLM_WHISPERER_CONCURRENCY at a time
+  - a cancel event stops a document between polls (raises OcrCancelled);
+    futures that haven't started are simply cancelled
+
+API documentation: https://docs.unstract.com/llmwhisperer/
+Point LLM_WHISPERER_API_URL at benchmarks/whisperer_stub.py to exercise the
+client offline.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from services.ocr_pool import OcrCancelled
+from utils.logging_config import get_logger
+
+DEFAULT_BASE_URL = "https://llmwhisperer-api.us-central.unstract.com/api/v2"
+LLM_WHISPERER_API_URL = os.getenv("LLM_WHISPERER_API_URL") or os.getenv("LLMWHISPERER_API_URL") or DEFAULT_BASE_URL
+LLM_WHISPERER_CONCURRENCY = int(os.getenv("LLM_WHISPERER_CONCURRENCY", "4"))
+LLM_WHISPERER_TIMEOUT = float(os.getenv("LLM_WHISPERER_TIMEOUT", "90"))
+LLM_WHISPERER_SUBMIT_TIMEOUT = float(os.getenv("LLM_WHISPERER_SUBMIT_TIMEOUT", "120"))
+LLM_WHISPERER_POLL_INITIAL = float(os.getenv("LLM_WHISPERER_POLL_INITIAL", "0.5"))
+LLM_WHISPERER_POLL_BACKOFF = float(os.getenv("LLM_WHISPERER_POLL_BACKOFF", "1.5"))
+LLM_WHISPERER_POLL_MAX = float(os.getenv("LLM_WHISPERER_POLL_MAX", "5"))
+
+# Table mode + layout-preserving output is what the regex templates expect
+WHISPER_PARAMS = {
+    "mode": "table",
+    "output_mode": "layout_preserving",
+    "page_seperator": "<<<",
+}
+REQUEST_TIMEOUT = 30
+
+logger = get_logger("assetiq.whisperer")
+
+
+class LLMWhispererError(Exception):
+    """The API rejected the document, reported a failure or never finished it."""
+
+
+class LLMWhispererTimeout(LLMWhispererError):
+    """The document was still processing when the client's timeout ran out."""
+
+
+def normalize_base_url(url: str) -> str:
+    """API base URL without a trailing /whisper endpoint or slash."""
+    url = url.rstrip("/")
+    if url.endswith("/whisper"):
+        url = url[:-len("/whisper")]
+    return url
+
+
+def poll_intervals(initial: float = LLM_WHISPERER_POLL_INITIAL, backoff: float = LLM_WHISPERER_POLL_BACKOFF,
+                   maximum: float = LLM_WHISPERER_POLL_MAX):
+    """Seconds to wait before each status check: quick at first, then backing off."""
+    interval = initial
+    while True:
+        yield interval
+        interval = min(maximum, interval * backoff)
+
+
+def result_text(response: requests.Response) -> str:
+    """Extracted text of a retrieve (or synchronous whisper) response: JSON or plain text."""
+    content_type = response.headers.get("Content-Type", "")
+    text = response.text
+    if "json" in content_type or text.lstrip().startswith("{"):
+        try:
+            data = response.json()
+        except ValueError:
+            return text
+        if isinstance(data, dict):
+            return data.get("result_text") or data.get("extracted_text") or ""
+    return text
+
+
+class LLMWhispererClient:
+    """Pooled, concurrent LLM Whisperer v2 client; share one per API key."""
+
+    def __init__(self, api_key: str, base_url: str = LLM_WHISPERER_API_URL,
+                 concurrency: int = LLM_WHISPERER_CONCURRENCY, timeout: float = LLM_WHISPERER_TIMEOUT):
+        if not api_key:
+            raise ValueError("LLM_WHISPERER_API_KEY not found in environment variables")
+        self.base_url = normalize_base_url(base_url)
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers["unstract-key"] = api_key
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency * 2)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._pool = None
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {"documents": 0, "polls": 0, "failures": 0, "cancelled": 0}
+
+    def _count(self, key: str, n: int = 1):
+        with self._lock:
+            self.stats[key] += n
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="whisperer")
+            return self._pool
+
+    # ── API calls ────────────────────────────────────────────────────────
+
+    def submit(self, file_content: bytes) -> requests.Response:
+        """POST a document; 202 carries a whisper_hash, 200 the text itself."""
+        response = self.session.post(
+            f"{self.base_url}/whisper",
+            params=WHISPER_PARAMS,
+            data=file_content,
+            timeout=LLM_WHISPERER_SUBMIT_TIMEOUT,
+        )
+        if response.status_code not in (200, 202):
+            raise LLMWhispererError(f"LLM Whisperer API error {response.status_code}: {response.text[:300]}")
+        return response
+
+    def status(self, whisper_hash: str) -> Dict:
+        response = self.session.get(f"{self.base_url}/whisper-status",
+                                    params={"whisper_hash": whisper_hash}, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        self._count("polls")
+        return response.json()
+
+    def retrieve(self, whisper_hash: str) -> str:
+        response = self.session.get(f"{self.base_url}/whisper-retrieve",
+                                    params={"whisper_hash": whisper_hash}, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        return result_text(response)
+
+    def wait(self, whisper_hash: str, cancel: Optional[threading.Event] = None) -> str:
+        """Poll until the document is processed (adaptive intervals), then retrieve its text."""
+        deadline = time.monotonic() + self.timeout
+        last_error = None
+        for interval in poll_intervals():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise LLMWhispererTimeout(
+                    f"Processing timeout after {self.timeout:.0f}s ({whisper_hash})"
+                    + (f"; last status check failed: {last_error}" if last_error else "")
+                ) from last_error
+            if cancel is not None:
+                if cancel.wait(min(interval, remaining)):
+                    self._count("cancelled")
+                    raise OcrCancelled(f"LLM Whisperer polling cancelled ({whisper_hash})")
+            else:
+                time.sleep(min(interval, remaining))
+
+            try:
+                result = self.status(whisper_hash)
+            except requests.exceptions.RequestException as e:
+                # Transient: keep polling until the deadline
+                logger.warning("LLM Whisperer status check failed: %s", e)
+                last_error = e
+                continue
+            last_error = None
+            status = result.get("status")
+            if status == "processed":
+                return self.retrieve(whisper_hash)
+            if status == "failed":
+                raise LLMWhispererError(f"Processing failed: {result.get('error') or result.get('message') or result}")
+            if status not in ("processing", "accepted", None):
+                raise LLMWhispererError(f"Unknown status: {status}")
+
+    # ── Documents ────────────────────────────────────────────────────────
+
+    def whisper(self, file_content: bytes, cancel: Optional[threading.Event] = None) -> str:
+        """Extracted text of one document (blocking)."""
+        self._count("documents")
+        try:
+            response = self.submit(file_content)
+            if response.status_code == 200:
+                return result_text(response)
+            whisper_hash = response.json().get("whisper_hash")
+            if not whisper_hash:
+                raise LLMWhispererError("No whisper_hash returned from API")
+            logger.info("Document submitted to LLM Whisperer: %s", whisper_hash)
+            text = self.wait(whisper_hash, cancel)
+        except OcrCancelled:
+            raise
+        except Exception:
+            self._count("failures")
+            raise
+        if not text.strip():
+            logger.warning("LLM Whisperer returned empty text")
+        return text
+
+    def whisper_async(self, file_content: bytes, cancel: Optional[threading.Event] = None) -> Future:
+        """Queue a document; at most ``concurrency`` are in flight at once."""
+        return self._executor().submit(self.whisper, file_content, cancel)
+
+    def whisper_many(self, documents: Iterable[bytes], cancel: Optional[threading.Event] = None) -> List[str]:
+        """Texts of many documents, in order, processed concurrently. Setting ``cancel`` stops them all."""
+        futures = [self.whisper_async(document, cancel) for document in documents]
+        try:
+            return [future.result() for future in futures]
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+_clients: Dict[Tuple[str, str], LLMWhispererClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_whisperer_client(api_key: str, base_url: str = LLM_WHISPERER_API_URL) -> LLMWhispererClient:
+    """Shared client (and connection pool) for an API key and endpoint."""
+    key = (api_key, normalize_base_url(base_url))
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = LLMWhispererClient(api_key, base_url)
+        return client
@@ -0,0 +1,273 @@
+"""
+Mail Dispatcher
+Single background worker that delivers notification emails from a bounded
+queue over one reused SMTP connection.
+
+Replaces the old "one thread + one authenticated SMTP session per email"
+approach in app.py:
+  - enqueue() never blocks the request; it returns False when the queue is full
+  - the worker keeps the SMTP session open between messages and closes it
+    after MAIL_IDLE_TIMEOUT seconds without work
+  - recipients of one notification are sent in batches (one SMTP transaction
+    per MAIL_BATCH_SIZE recipients, envelope-only so they don't see each other)
+  - failed batches are retried with exponential backoff on a fresh connection
+  - stats() exposes queue depth, delivery counts and send latency
+  - at interpreter exit the queue is flushed for up to MAIL_SHUTDOWN_TIMEOUT
+    seconds, so a short-lived process (scheduler --run) doesn't drop mail
+
+For local testing point MAIL_SERVER/MAIL_PORT at a debugging SMTP server
+(e.g. ``python -m aiosmtpd -n -l localhost:1025``) with MAIL_USE_TLS=false.
+"""
+
+import atexit
+import os
+import queue
+import smtplib
+import threading
+import time
+import traceback
+from collections import deque
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Callable, Dict, List, Optional, Tuple
+
+MAIL_QUEUE_MAXSIZE = int(os.getenv("MAIL_QUEUE_MAXSIZE", "500"))
+MAIL_BATCH_SIZE = int(os.getenv("MAIL_BATCH_SIZE", "50"))
+MAIL_MAX_RETRIES = int(os.getenv("MAIL_MAX_RETRIES", "3"))
+MAIL_RETRY_BACKOFF_SECONDS = float(os.getenv("MAIL_RETRY_BACKOFF_SECONDS", "2"))
+MAIL_IDLE_TIMEOUT = float(os.getenv("MAIL_IDLE_TIMEOUT", "30"))
+MAIL_SHUTDOWN_TIMEOUT = float(os.getenv("MAIL_SHUTDOWN_TIMEOUT", "60"))
+MAIL_LATENCY_SAMPLES = 100
+
+
+def build_smtp_connection() -> Tuple[Optional[smtplib.SMTP], str]:
+    """Open and return an authenticated SMTP connection, or None if not configured."""
+    mail_server = os.getenv("MAIL_SERVER", "smtp.gmail.com")
+    mail_port = int(os.getenv("MAIL_PORT", 587))
+    mail_username = os.getenv("MAIL_USERNAME", "")
+    mail_password = os.getenv("MAIL_PASSWORD", "")
+    use_tls = os.getenv("MAIL_USE_TLS", "true").lower() in ("1", "true", "yes")
+    if not mail_username or mail_username == "your_email@gmail.com":
+        return None, mail_username
+    # A real relay needs credentials; a local debugging server does not
+    if use_tls and not mail_password:
+        return None, mail_username
+    server = smtplib.SMTP(mail_server, mail_port, timeout=30)
+    if use_tls:
+        server.starttls()
+    if mail_password:
+        server.login(mail_username, mail_password)
+    return server, mail_username
+
+
+def normalize_recipients(recipient_emails: List[str]) -> List[str]:
+    """Drop blanks/invalid addresses and case-insensitive duplicates, keeping order."""
+    normalized = []
+    seen = set()
+    for e in recipient_emails or []:
+        email = (e or "").strip()
+        if not email or "@" not in email:
+            continue
+        lower = email.lower()
+        if lower in seen:
+            continue
+        seen.add(lower)
+        normalized.append(email)
+    return normalized
+
+
+class MailDispatcher:
+    """Bounded-queue email sender with a single worker and a reused SMTP session."""
+
+    def __init__(self,
+                 connect: Callable[[], Tuple[Optional[smtplib.SMTP], str]] = build_smtp_connection,
+                 maxsize: int = MAIL_QUEUE_MAXSIZE,
+                 batch_size: int = MAIL_BATCH_SIZE,
+                 max_retries: int = MAIL_MAX_RETRIES,
+                 backoff_seconds: float = MAIL_RETRY_BACKOFF_SECONDS,
+                 idle_timeout: float = MAIL_IDLE_TIMEOUT):
+        self._connect = connect
+        self._queue = queue.Queue(maxsize=maxsize)
+        self.batch_size = max(1, batch_size)
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._thread = None
+        self._server = None
+        self._from_addr = ""
+        self._counters = {
+            "enqueued": 0,
+            "dropped": 0,
+            "sent": 0,
+            "failed": 0,
+            "retries": 0,
+            "connections": 0,
+        }
+        self._send_latencies_ms = deque(maxlen=MAIL_LATENCY_SAMPLES)
+        self._queue_waits_ms = deque(maxlen=MAIL_LATENCY_SAMPLES)
+
+    # ── Public API ───────────────────────────────────────────────────────
+
+    def enqueue(self, subject: str, html_body: str, recipient_emails: List[str]) -> bool:
+        """Queue an HTML email. Returns True when at least one valid recipient was queued."""
+        recipients = normalize_recipients(recipient_emails)
+        if not recipients:
+            return False
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((subject, html_body, recipients, time.time()))
+        except queue.Full:
+            self._bump("dropped")
+            print(f"[Notifier] Mail queue full ({self._queue.maxsize}) — dropping '{subject}'")
+            return False
+        self._bump("enqueued")
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until every queued message has been processed (used by tests/shutdown)."""
+        deadline = time.time() + timeout if timeout else None
+        while self._queue.unfinished_tasks:
+            if deadline and time.time() > deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def _flush_at_exit(self):
+        # Daemon worker: still alive while atexit handlers run, killed right after
+        pending = self._queue.unfinished_tasks
+        if not pending:
+            return
+        print(f"[Notifier] Delivering {pending} queued email(s) before exit")
+        if not self.flush(MAIL_SHUTDOWN_TIMEOUT):
+            print(f"[Notifier] {self._queue.unfinished_tasks} email(s) still queued after "
+                  f"{MAIL_SHUTDOWN_TIMEOUT:.0f}s — dropped at exit")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            latencies = list(self._send_latencies_ms)
+            waits = list(self._queue_waits_ms)
+            counters = dict(self._counters)
+        return {
+            "queue_depth": self._queue.qsize(),
+            "queue_capacity": self._queue.maxsize,
+            "connected": self._server is not None,
+            **counters,
+            "last_send_ms": round(latencies[-1], 1) if latencies else None,
+            "avg_send_ms": round(sum(latencies) / len(latencies), 1) if latencies else None,
+            "max_send_ms": round(max(latencies), 1) if latencies else None,
+            "avg_queue_wait_ms": round(sum(waits) / len(waits), 1) if waits else None,
+        }
+
+    # ── Worker ───────────────────────────────────────────────────────────
+
+    def _bump(self, counter: str, amount: int = 1):
+        with self._lock:
+            self._counters[counter] += amount
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            if self._thread is None:
+                atexit.register(self._flush_at_exit)
+            self._thread = threading.Thread(target=self._run, name="mail-dispatcher", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                job = self._queue.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                self._disconnect()
+                continue
+            try:
+                self._deliver(*job)
+            except Exception as e:
+                print(f"[Notifier] Unexpected error: {e}")
+                traceback.print_exc()
+            finally:
+                self._queue.task_done()
+
+    def _deliver(self, subject: str, html_body: str, recipients: List[str], enqueued_at: float):
+        with self._lock:
+            self._queue_waits_ms.append((time.time() - enqueued_at) * 1000)
+
+        try:
+            if self._connection() is None:
+                print("[Notifier] SMTP not configured — skipping email")
+                return
+        except Exception as exc:
+            # Transient connect failure — the batch retries below reconnect
+            print(f"[Notifier] SMTP connect failed: {exc}")
+
+        sent = 0
+        for start in range(0, len(recipients), self.batch_size):
+            batch = recipients[start:start + self.batch_size]
+            if self._send_batch(subject, html_body, batch):
+                sent += len(batch)
+        print(f"[Notifier] Sent '{subject}' to {sent}/{len(recipients)} recipients")
+
+    def _send_batch(self, subject: str, html_body: str, batch: List[str]) -> bool:
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self._bump("retries")
+                time.sleep(self.backoff_seconds * (2 ** (attempt - 1)))
+            started = time.perf_counter()
+            try:
+                server = self._connection()
+                if server is None:
+                    return False
+                msg = MIMEMultipart("alternative")
+                msg["Subject"] = subject
+                msg["From"] = self._from_addr
+                # Envelope-only recipients: one transaction, nobody sees the others
+                msg["To"] = batch[0] if len(batch) == 1 else "undisclosed-recipients:;"
+                msg.attach(MIMEText(html_body, "html"))
+                refused = server.sendmail(self._from_addr, batch, msg.as_string()) or {}
+                with self._lock:
+                    self._send_latencies_ms.append((time.perf_counter() - started) * 1000)
+                    self._counters["sent"] += len(batch) - len(refused)
+                    self._counters["failed"] += len(refused)
+                for email, err in refused.items():
+                    print(f"[Notifier] Failed to send to {email}: {err}")
+                return True
+            except smtplib.SMTPRecipientsRefused as exc:
+                # Every recipient rejected — retrying won't help
+                self._bump("failed", len(batch))
+                print(f"[Notifier] All recipients refused: {exc.recipients}")
+                return False
+            except Exception as exc:
+                print(f"[Notifier] Send attempt {attempt + 1}/{self.max_retries + 1} failed: {exc}")
+                self._disconnect()
+        self._bump("failed", len(batch))
+        return False
+
+    def _connection(self) -> Optional[smtplib.SMTP]:
+        if self._server is not None:
+            return self._server
+        server, from_addr = self._connect()
+        self._from_addr = from_addr if server else ""
+        if server is not None:
+            self._server = server
+            self._bump("connections")
+        return self._server
+
+    def _disconnect(self):
+        server, self._server = self._server, None
+        if server is None:
+            return
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+
+_dispatcher = MailDispatcher()
+
+
+def get_mail_dispatcher() -> MailDispatcher:
+    return _dispatcher
@@ -0,0 +1,266 @@
+"""
+Notification Service
+Email notifications to lab incharges / requesters (delivered through the mail
+dispatcher) and the scheduled warranty expiry check.
+"""
+
+import traceback
+from datetime import datetime
+from typing import List, Optional
+
+from config.database import db
+from services.mail_dispatcher import get_mail_dispatcher
+
+
+# =============================================
+# AUTOMATIC NOTIFICATION SYSTEM
+# =============================================
+def send_email_async(subject: str, html_body: str, recipient_emails: List[str]) -> bool:
+    """Queue an HTML email for the background mail dispatcher.
+    Returns True when at least one valid recipient exists and the message was queued.
+    """
+    return get_mail_dispatcher().enqueue(subject, html_body, recipient_emails)
+
+
+def _get_lab_incharge_emails(lab_id: Optional[str]) -> List[str]:
+    """Return email list for Lab Incharge users assigned to the given lab."""
+    if not lab_id:
+        return []
+
+    conn = None
+    cursor = None
+    try:
+        conn = db.get_connection()
+        if not conn:
+            return []
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT email
+            FROM users
+            WHERE role = 'Lab Incharge'
+              AND assigned_lab = %s
+              AND email IS NOT NULL
+              AND email != ''
+            """,
+            (str(lab_id),)
+        )
+        rows = cursor.fetchall() or []
+        return [r["email"] for r in rows if r.get("email")]
+    except Exception as e:
+        print(f"[Notifier] Failed to resolve incharge emails for lab {lab_id}: {e}")
+        return []
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+def send_notification_to_lab_incharge(subject: str, html_body: str, lab_id: Optional[str]) -> bool:
+    """Send email only to incharge(s) assigned to the provided lab."""
+    emails = _get_lab_incharge_emails(lab_id)
+    if not emails:
+        print(f"[Notifier] No lab incharge recipients found for lab {lab_id}")
+        return False
+    return send_email_async(subject, html_body, emails)
+
+
+def send_notification_to_user(subject: str, html_body: str, user_email: Optional[str]) -> bool:
+    """Send email to a single user (used for requester approval notifications)."""
+    email = (user_email or "").strip()
+    if not email or "@" not in email:
+        print("[Notifier] Requester email missing/invalid — skipping notification")
+        return False
+    return send_email_async(subject, html_body, [email])
+
+
+def send_notification_email(subject: str, html_body: str, role_filter: list):
+    """Backward-compatible role-based notifier."""
+    conn = None
+    cursor = None
+    try:
+        conn = db.get_connection()
+        if not conn:
+            print("[Notifier] DB connection failed — skipping email")
+            return
+        cursor = conn.cursor()
+        placeholders = ",".join(["%s"] * len(role_filter))
+        cursor.execute(
+            f"SELECT email FROM users WHERE role IN ({placeholders})",
+            role_filter
+        )
+        rows = cursor.fetchall() or []
+        emails = [r["email"] for r in rows if r.get("email")]
+        send_email_async(subject, html_body, emails)
+    except Exception as e:
+        print(f"[Notifier] Unexpected role-based email error: {e}")
+        traceback.print_exc()
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+def warranty_expiry_job():
+    """
+    Scheduled daily job — only notify about devices newly entering the 90-day expiry window.
+    Devices already notified are recorded in the warranty_notifications table and
+    excluded with an anti-join, so repeated emails are avoided across processes.
+    When a device's warranty actually expires it is removed from the ledger so a final
+    'expired' alert can be sent if it ever re-enters the window (edge case).
+    Run it through services.scheduler_service.run_job, which holds the job's
+    advisory lock and records the run; errors are re-raised so the run is
+    recorded as failed.
+    """
+    print(f"[Scheduler] Running daily warranty expiry check at {datetime.now()}")
+    conn = None
+    cursor = None
+    try:
+        conn = db.get_connection()
+        if not conn:
+            raise RuntimeError("DB connection failed")
+
+        cursor = conn.cursor()
+
+        # Expired warranties leave the ledger (touches only newly expired rows)
+        cursor.execute("DELETE FROM warranty_notifications WHERE warranty_expiry <= CURRENT_DATE")
+        conn.commit()
+
+        cursor.execute(
+            """
+            SELECT d.device_id, d.lab_id, d.asset_code, d.assigned_code, d.brand, d.model,
+                   COALESCE(et.name, 'Unknown') AS type_name,
+                   COALESCE(l.lab_name, 'Unassigned') AS lab_name,
+                   b.vendor_name, b.invoice_number,
+                   (d.purchase_date + (d.warranty_years * INTERVAL '1 year'))::date AS warranty_expiry,
+                   ((d.purchase_date + (d.warranty_years * INTERVAL '1 year'))::date - CURRENT_DATE) AS days_left
+            FROM devices d
+            LEFT JOIN equipment_types et ON d.type_id = et.type_id
+            LEFT JOIN labs l ON d.lab_id = l.lab_id
+            LEFT JOIN bills b ON d.bill_id = b.bill_id
+            WHERE d.is_active = TRUE
+              AND d.purchase_date IS NOT NULL
+              AND d.warranty_years IS NOT NULL
+              AND d.warranty_years > 0
+              AND (d.purchase_date + (d.warranty_years * INTERVAL '1 year'))::date
+                  BETWEEN CURRENT_DATE AND CURRENT_DATE + INTERVAL '90 days'
+              AND NOT EXISTS (
+                  SELECT 1 FROM warranty_notifications wn
+                  WHERE wn.device_id = d.device_id
+              )
+            ORDER BY days_left ASC
+            """
+        )
+        new_devices = cursor.fetchall()
+
+        if not new_devices:
+            print("[Scheduler] No devices newly entering the expiry window — skipping email")
+            return
+
+        print(f"[Scheduler] {len(new_devices)} new device(s) entering expiry window — sending lab-scoped alerts")
+
+        def urgency(days):
+            if days <= 30:
+                return "#ef4444", "Critical"
+            if days <= 60:
+                return "#f97316", "Warning"
+            return "#eab308", "Notice"
+
+        devices_by_lab = {}
+        for d in new_devices:
+            lab_key = str(d.get("lab_id") or "")
+            if not lab_key:
+                print(f"[Scheduler] Skipping device {d.get('device_id')} (no lab_id)")
+                continue
+            devices_by_lab.setdefault(lab_key, []).append(d)
+
+        dispatched_device_ids = []
+        for lab_id, lab_devices in devices_by_lab.items():
+            lab_name = lab_devices[0].get("lab_name") or lab_id
+
+            rows_html = ""
+            for d in lab_devices:
+                days_left = int(d["days_left"])
+                color, label = urgency(days_left)
+                rows_html += f"""
+                <tr style="border-bottom:1px solid #e5e7eb;">
+                    <td style="padding:10px 12px;font-weight:600;">{d.get('asset_code') or d.get('assigned_code') or f"#{d['device_id']}"}</td>
+                    <td style="padding:10px 12px;">{d['type_name']} — {d['brand']} {d['model']}</td>
+                    <td style="padding:10px 12px;">{d['lab_name']}</td>
+                    <td style="padding:10px 12px;">{d.get('vendor_name') or '—'}</td>
+                    <td style="padding:10px 12px;text-align:center;">{d['warranty_expiry']}</td>
+                    <td style="padding:10px 12px;text-align:center;font-weight:700;color:{color};">{days_left}d</td>
+                    <td style="padding:10px 12px;text-align:center;">
+                        <span style="background:{color};color:white;padding:3px 10px;border-radius:10px;font-size:12px;font-weight:600;">{label}</span>
+                    </td>
+                </tr>"""
+
+            html_body = f"""
+            <html>
+            <body style="font-family:-apple-system,BlinkMacSystemFont,'Segoe UI',Roboto,sans-serif;background:#f3f4f6;padding:20px;">
+              <div style="max-width:860px;margin:0 auto;background:white;border-radius:12px;overflow:hidden;box-shadow:0 4px 6px rgba(0,0,0,0.1);">
+                <div style="background:linear-gradient(135deg,#f59e0b,#d97706);padding:22px 32px;">
+                  <h1 style="color:white;margin:0;font-size:20px;">📅 AssetIQ — Warranty Expiry Alert</h1>
+                  <p style="color:rgba(255,255,255,0.85);margin:6px 0 0;font-size:13px;">
+                    Lab: {lab_name} &nbsp;•&nbsp; {len(lab_devices)} device(s) in the 90-day expiry window &nbsp;•&nbsp; {datetime.now().strftime('%B %d, %Y')}
+                  </p>
+                </div>
+                <div style="padding:24px 32px;">
+                  <p style="color:#374151;font-size:13px;margin:0 0 16px;">
+                    You are receiving this alert because you are assigned as the lab incharge for {lab_name}.
+                  </p>
+                  <table style="width:100%;border-collapse:collapse;font-size:13px;">
+                    <thead>
+                      <tr style="background:#f9fafb;border-bottom:2px solid #e5e7eb;">
+                        <th style="padding:10px 12px;text-align:left;color:#6b7280;font-size:11px;text-transform:uppercase;">Asset</th>
+                        <th style="padding:10px 12px;text-align:left;color:#6b7280;font-size:11px;text-transform:uppercase;">Device</th>
+                        <th style="padding:10px 12px;text-align:left;color:#6b7280;font-size:11px;text-transform:uppercase;">Lab</th>
+                        <th style="padding:10px 12px;text-align:left;color:#6b7280;font-size:11px;text-transform:uppercase;">Vendor</th>
+                        <th style="padding:10px 12px;text-align:center;color:#6b7280;font-size:11px;text-transform:uppercase;">Expiry</th>
+                        <th style="padding:10px 12px;text-align:center;color:#6b7280;font-size:11px;text-transform:uppercase;">Days Left</th>
+                        <th style="padding:10px 12px;text-align:center;color:#6b7280;font-size:11px;text-transform:uppercase;">Status</th>
+                      </tr>
+                    </thead>
+                    <tbody>{rows_html}</tbody>
+                  </table>
+                </div>
+                <div style="background:#f9fafb;padding:14px 32px;text-align:center;">
+                  <p style="color:#9ca3af;font-size:11px;margin:0;">
+                    AssetIQ Automatic Warranty Monitor • One-time alert per device
+                  </p>
+                </div>
+              </div>
+            </body></html>"""
+
+            subject = f"📅 Warranty Expiry Alert — {lab_name} ({len(lab_devices)} device(s))"
+            if send_notification_to_lab_incharge(subject, html_body, lab_id):
+                dispatched_device_ids.extend(int(d["device_id"]) for d in lab_devices)
+
+        if dispatched_device_ids:
+            cursor.execute(
+                """
+                INSERT INTO warranty_notifications (device_id, warranty_expiry)
+                SELECT d.device_id, (d.purchase_date + (d.warranty_years * INTERVAL '1 year'))::date
+                FROM devices d
+                WHERE d.device_id = ANY(%s)
+                ON CONFLICT (device_id) DO NOTHING
+                """,
+                (dispatched_device_ids,)
+            )
+            conn.commit()
+            print(f"[Scheduler] Warranty email dispatched for {len(dispatched_device_ids)} device(s)")
+        else:
+            print("[Scheduler] No lab-scoped warranty emails were dispatched")
+
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        print(f"[Scheduler] Error in warranty job: {e}")
+        raise
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
@@ -0,0 +1,262 @@
+"""
+OCR Hedge
+Text extraction for /scan: LLM Whisperer first, local tesseract OCR as the
+fallback, raced instead of chained.
+
+In hedged mode (OCR_MODE=hedged, the default) the Whisperer request starts
+immediately; if it has not produced text after the hedge delay, local OCR
+(services/ocr_pool.py) starts alongside it. The first result that passes
+text_acceptable() wins and the other side is cancelled: the Whisperer
+client stops polling, the OCR pool drops the pages it has not started.
+A Whisperer failure starts local OCR at once, like the old fallback.
+
+The hedge delay is the p90 of recently observed Whisperer latencies
+(clamped to OCR_HEDGE_MIN_DELAY..OCR_HEDGE_MAX_DELAY), so the local engine
+only doubles the work for the slowest ~10% of scans while bounding their
+latency by local OCR speed. Until OCR_HEDGE_MIN_SAMPLES latencies have been
+seen, OCR_HEDGE_DEFAULT_DELAY is used. Calls that were cancelled (local OCR
+won) or timed out never report their full latency; they are recorded as
+censored samples of max(elapsed, hedge delay), a lower bound, so the p90
+isn't computed from the fast survivors only and doesn't drift down. Other
+failures (rejected key, refused upload) say nothing about processing time
+and are left out.
+
+OCR_MODE=sequential keeps the old behaviour (local OCR only after the
+Whisperer call has failed).
+"""
+
+import contextvars
+import io
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Optional, Tuple
+
+from services.bill_service import LLM_WHISPERER_API_KEY, extract_text_with_llm_whisperer
+from services.llm_whisperer import LLMWhispererTimeout
+from services.ocr_pool import OcrCancelled, get_ocr_pool
+from utils import tracing
+from utils.logging_config import get_logger
+
+OCR_MODE = os.getenv("OCR_MODE", "hedged").lower()
+OCR_HEDGE_DEFAULT_DELAY = float(os.getenv("OCR_HEDGE_DEFAULT_DELAY", "15"))
+OCR_HEDGE_MIN_DELAY = float(os.getenv("OCR_HEDGE_MIN_DELAY", "3"))
+OCR_HEDGE_MAX_DELAY = float(os.getenv("OCR_HEDGE_MAX_DELAY", "60"))
+OCR_HEDGE_MIN_SAMPLES = int(os.getenv("OCR_HEDGE_MIN_SAMPLES", "5"))
+OCR_HEDGE_WINDOW = int(os.getenv("OCR_HEDGE_WINDOW", "100"))
+OCR_HEDGE_WORKERS = int(os.getenv("OCR_HEDGE_WORKERS", "16"))
+# Quality bar for a result to win the race
+OCR_MIN_CHARS = int(os.getenv("OCR_MIN_CHARS", "80"))
+OCR_MIN_ALNUM_RATIO = float(os.getenv("OCR_MIN_ALNUM_RATIO", "0.5"))
+
+# Table drawing characters in Whisperer's layout output don't count against the text
+_LAYOUT_CHARS = frozenset("|+-=_:.")
+
+logger = get_logger("assetiq.bills")
+
+
+class OcrFailed(Exception):
+    """Neither engine produced text; carries each engine's error."""
+
+    def __init__(self, remote_error: Optional[str], local_error: Optional[str]):
+        super().__init__(local_error or remote_error or "No text extracted")
+        self.remote_error = remote_error
+        self.local_error = local_error
+
+
+def text_acceptable(text: Optional[str]) -> bool:
+    """Enough characters, mostly letters and digits (not OCR noise)."""
+    if not text:
+        return False
+    visible = [ch for ch in text if not ch.isspace() and ch not in _LAYOUT_CHARS]
+    if len(visible) < OCR_MIN_CHARS:
+        return False
+    return sum(1 for ch in visible if ch.isalnum()) / len(visible) >= OCR_MIN_ALNUM_RATIO
+
+
+# ------------------------------
+# Whisperer latency
+# ------------------------------
+class _LatencyWindow:
+    def __init__(self, size: int = OCR_HEDGE_WINDOW):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self.wins: Dict[str, int] = {"llm_whisperer": 0, "tesseract": 0}
+        self.hedged = 0
+        self.censored = 0
+
+    def observe(self, seconds: float, censored: bool = False):
+        with self._lock:
+            self._samples.append(seconds)
+            self.censored += int(censored)
+
+    def quantile(self, q: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def hedge_delay(self) -> float:
+        with self._lock:
+            enough = len(self._samples) >= OCR_HEDGE_MIN_SAMPLES
+        if not enough:
+            return OCR_HEDGE_DEFAULT_DELAY
+        return min(OCR_HEDGE_MAX_DELAY, max(OCR_HEDGE_MIN_DELAY, self.quantile(0.9)))
+
+    def record(self, winner: str, hedged: bool):
+        with self._lock:
+            self.wins[winner] = self.wins.get(winner, 0) + 1
+            self.hedged += int(hedged)
+
+    def stats(self) -> Dict:
+        p50, p90 = self.quantile(0.5), self.quantile(0.9)
+        delay = self.hedge_delay()
+        with self._lock:
+            return {
+                "mode": OCR_MODE,
+                "whisperer_samples": len(self._samples),
+                "whisperer_censored_total": self.censored,
+                "whisperer_p50_s": round(p50, 2) if p50 is not None else None,
+                "whisperer_p90_s": round(p90, 2) if p90 is not None else None,
+                "hedge_delay_s": round(delay, 2),
+                "hedged_scans": self.hedged,
+                "wins": dict(self.wins),
+            }
+
+
+_latency = _LatencyWindow()
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=OCR_HEDGE_WORKERS, thread_name_prefix="ocr-hedge")
+        return _pool
+
+
+def hedge_stats() -> Dict:
+    return _latency.stats()
+
+
+# ------------------------------
+# Engines
+# ------------------------------
+def whisperer_text(file_content: bytes, cancel: Optional[threading.Event] = None) -> str:
+    """LLM Whisperer text; completed, cancelled and timed-out calls feed the hedge delay."""
+    started = time.perf_counter()
+    floor = _latency.hedge_delay()
+    try:
+        with tracing.span("ocr_llm_whisperer"):
+            text = extract_text_with_llm_whisperer(file_content, LLM_WHISPERER_API_KEY, cancel=cancel)
+    except (OcrCancelled, LLMWhispererTimeout):
+        # Still processing when dropped: it would have taken at least this long
+        _latency.observe(max(time.perf_counter() - started, floor), censored=True)
+        raise
+    _latency.observe(time.perf_counter() - started)
+    return text
+
+
+def local_ocr_text(file_content: bytes, is_pdf: bool, cancel: Optional[threading.Event] = None) -> str:
+    """Tesseract text of an uploaded image or PDF (pages marked "--- Page N ---")."""
+    pool = get_ocr_pool()
+    with tracing.span("ocr_tesseract"):
+        if not is_pdf:
+            from PIL import Image
+            return pool.ocr_image(Image.open(io.BytesIO(file_content)), source=file_content)
+        from services.pdf_raster import OCR_RASTER_DPI, iter_pdf_pages
+        texts = pool.ocr_pages(iter_pdf_pages(file_content), dpi=OCR_RASTER_DPI,
+                               source=file_content, cancel=cancel)
+        return "".join(f"\n--- Page {i + 1} ---\n{text}" for i, text in enumerate(texts))
+
+
+# ------------------------------
+# Extraction
+# ------------------------------
+def extract_scan_text(file_content: bytes, is_pdf: bool) -> Tuple[str, str]:
+    """
+    Text of an uploaded bill and the engine that produced it
+    ("llm_whisperer" or "tesseract"). Raises OcrFailed when neither
+    engine produced any text.
+    """
+    if not LLM_WHISPERER_API_KEY:
+        return _local_only(file_content, is_pdf, "LLM_WHISPERER_API_KEY not set")
+    if OCR_MODE != "hedged":
+        return _sequential(file_content, is_pdf)
+    return _hedged(file_content, is_pdf)
+
+
+def _local_only(file_content: bytes, is_pdf: bool, remote_error: Optional[str]) -> Tuple[str, str]:
+    try:
+        text = local_ocr_text(file_content, is_pdf)
+    except Exception as e:
+        raise OcrFailed(remote_error, str(e))
+    _latency.record("tesseract", hedged=False)
+    return text, "tesseract"
+
+
+def _sequential(file_content: bytes, is_pdf: bool) -> Tuple[str, str]:
+    try:
+        text = whisperer_text(file_content)
+        _latency.record("llm_whisperer", hedged=False)
+        return text, "llm_whisperer"
+    except Exception as e:
+        logger.warning("LLM Whisperer failed: %s — falling back to tesseract", e)
+        return _local_only(file_content, is_pdf, str(e))
+
+
+def _hedged(file_content: bytes, is_pdf: bool) -> Tuple[str, str]:
+    executor = _executor()
+    cancels = {"llm_whisperer": threading.Event(), "tesseract": threading.Event()}
+    futures = {
+        # copy_context: the engines' spans land in this request's trace
+        executor.submit(contextvars.copy_context().run, whisperer_text, file_content,
+                        cancels["llm_whisperer"]): "llm_whisperer",
+    }
+    started = time.perf_counter()
+    delay = _latency.hedge_delay()
+    errors: Dict[str, str] = {}
+    fallback: Optional[Tuple[str, str]] = None
+    hedged = False
+
+    while futures:
+        timeout = None if hedged else delay
+        done, _ = wait(list(futures), timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            engine = futures.pop(future)
+            try:
+                text = future.result()
+            except OcrCancelled:
+                continue
+            except Exception as e:
+                errors[engine] = str(e)
+                logger.warning("%s failed: %s", engine, e)
+                continue
+            if text_acceptable(text):
+                for other in futures.values():
+                    cancels[other].set()
+                _latency.record(engine, hedged)
+                logger.info("OCR race won by %s%s", engine, " (hedged)" if hedged else "")
+                return text, engine
+            # Keep the longest sub-par text in case nothing better arrives
+            if text and (fallback is None or len(text.strip()) > len(fallback[0].strip())):
+                fallback = (text, engine)
+
+        if not hedged and (not done or not futures):
+            # Whisperer is slower than its p90, failed, or returned poor text
+            hedged = True
+            tracing.count("ocr_hedged")
+            logger.info("Starting local OCR after %.1fs (hedge delay %.1fs)",
+                        time.perf_counter() - started, delay)
+            futures[executor.submit(contextvars.copy_context().run, local_ocr_text, file_content,
+                                    is_pdf, cancels["tesseract"])] = "tesseract"
+
+    if fallback:
+        _latency.record(fallback[1], hedged)
+        return fallback
+    raise OcrFailed(errors.get("llm_whisperer"), errors.get("tesseract"))
@@ -0,0 +1,289 @@
+"""
+OCR Pool
+Local tesseract OCR for the scan fallbacks: a pool of long-lived worker
+threads, adaptive page preprocessing and an LRU cache of preprocessed pages.
+
+Each worker thread keeps its own tesseract engine loaded (tesserocr's
+PyTessBaseAPI, fed PIL images in memory). Without tesserocr the workers use
+pytesseract, which still starts a tesseract process per page, but pages are
+recognized in parallel either way. tesserocr releases the GIL while
+recognizing and OpenCV while preprocessing, so throughput scales with
+OCR_WORKERS (default: one per core; tesseract's own OpenMP threading is
+capped at 1 so the workers don't oversubscribe the cores).
+
+Preprocessing (preprocess_page):
+  - grayscale
+  - downscale to OCR_TARGET_DPI when the page was scanned or rasterized above it
+  - denoise with a 3x3 median blur, only when the page looks noisy
+    (replaces the full-resolution fastNlMeansDenoising pass)
+  - Otsu binarisation, skipped for pages that are already black and white
+
+Preprocessed pages are cached by content hash and the preprocessing
+settings, so a re-uploaded or re-tried scan goes straight to recognition.
+Callers that have the uploaded file pass its bytes as ``source``: hashing the
+compressed upload is far cheaper than hashing every decoded page's pixels.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from utils.logging_config import get_logger
+
+# Must be set before tesseract is loaded; parallelism comes from the pool
+os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "0")) or (os.cpu_count() or 1)
+OCR_LANG = os.getenv("OCR_LANG", "eng")
+OCR_TARGET_DPI = int(os.getenv("OCR_TARGET_DPI", "300"))
+OCR_PAGE_CACHE_MB = int(os.getenv("OCR_PAGE_CACHE_MB", "256"))
+# Pages handed to the pool but not yet recognized (default: workers + 2);
+# bounds memory when pages are streamed in (services/pdf_raster.py)
+OCR_MAX_IN_FLIGHT = int(os.getenv("OCR_MAX_IN_FLIGHT", "0"))
+# Mean |page - median(page)| above which a page is treated as noisy
+OCR_NOISE_THRESHOLD = float(os.getenv("OCR_NOISE_THRESHOLD", "6"))
+# Resolution assumed for images without DPI metadata: the long side is taken
+# to span an A4 page (11.7 in)
+PAGE_LONG_SIDE_INCHES = 11.7
+
+logger = get_logger("assetiq.ocr")
+_local = threading.local()
+_tesserocr = None
+
+
+class OcrCancelled(Exception):
+    """Raised by an OCR call whose cancel event was set (the hedged race was lost)."""
+
+
+def _load_tesserocr():
+    """tesserocr module, or False when it isn't installed."""
+    global _tesserocr
+    if _tesserocr is None:
+        try:
+            import tesserocr
+            _tesserocr = tesserocr
+        except ImportError:
+            _tesserocr = False
+    return _tesserocr
+
+
+def source_dpi(image, dpi: Optional[int] = None) -> int:
+    """Resolution of a page image: the given one, its metadata, or estimated from its size."""
+    if dpi:
+        return int(dpi)
+    info_dpi = image.info.get("dpi")
+    if info_dpi and info_dpi[0] and info_dpi[0] > 1:
+        return int(round(info_dpi[0]))
+    return max(72, int(max(image.size) / PAGE_LONG_SIDE_INCHES))
+
+
+def preprocess_page(image, dpi: Optional[int] = None, target_dpi: int = OCR_TARGET_DPI):
+    """
+    Grayscale, downscale, (conditionally) denoise and binarise a page for
+    tesseract. Returns (PIL image, resolution of the returned image).
+    """
+    import cv2
+    import numpy as np
+    from PIL import Image
+
+    dpi = source_dpi(image, dpi)
+    gray = np.asarray(image.convert("L"))
+
+    if dpi > target_dpi * 1.1:
+        scale = target_dpi / dpi
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        dpi = target_dpi
+
+    # Already black and white (fax / bilevel scans): nothing to clean up
+    if np.count_nonzero((gray > 16) & (gray < 240)) < gray.size * 0.01:
+        return Image.fromarray(gray), dpi
+
+    blurred = cv2.medianBlur(gray, 3)
+    if cv2.absdiff(gray, blurred).mean() > OCR_NOISE_THRESHOLD:
+        gray = blurred
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return Image.fromarray(binary), dpi
+
+
+def source_digest(source: bytes) -> str:
+    return hashlib.blake2b(source, digest_size=16).hexdigest()
+
+
+def page_key(image, dpi: Optional[int], target_dpi: int, source: Optional[str] = None) -> str:
+    """
+    Content address of a page and the settings it is preprocessed with;
+    ``source`` (uploaded file digest + page number) stands in for the pixels.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{image.mode}:{image.size}:{dpi}:{target_dpi}:{OCR_NOISE_THRESHOLD}".encode())
+    digest.update(source.encode() if source else image.tobytes())
+    return digest.hexdigest()
+
+
+def _init_worker():
+    """Load this worker thread's tesseract engine once, up front."""
+    try:
+        _engine()
+    except Exception as e:
+        # A failing initializer breaks the whole executor; let the page fail instead
+        logger.warning("Could not load tesseract in %s: %s", threading.current_thread().name, e)
+
+
+def _engine():
+    api = getattr(_local, "api", None)
+    if api is None:
+        tesserocr = _load_tesserocr()
+        if tesserocr:
+            api = tesserocr.PyTessBaseAPI(lang=OCR_LANG)
+        else:
+            from services.bill_service import get_pytesseract
+            api = get_pytesseract()
+        _local.api = api
+    return api
+
+
+def _recognize(image, dpi: int) -> str:
+    api = _engine()
+    if _load_tesserocr():
+        api.SetImage(image)
+        api.SetSourceResolution(dpi)
+        return api.GetUTF8Text()
+    return api.image_to_string(image, lang=OCR_LANG, config=f"--dpi {dpi}")
+
+
+class OcrPool:
+    """Tesseract worker pool with a preprocessed-page cache, shared by every OCR fallback."""
+
+    def __init__(self, workers: int = OCR_WORKERS, cache_mb: int = OCR_PAGE_CACHE_MB,
+                 target_dpi: int = OCR_TARGET_DPI, max_in_flight: int = OCR_MAX_IN_FLIGHT):
+        self.workers = max(1, workers)
+        self.max_in_flight = max_in_flight or self.workers + 2
+        self.cache_bytes = cache_mb * 1024 * 1024
+        self.target_dpi = target_dpi
+        # key -> (preprocessed image, dpi)
+        self._cache: "OrderedDict[str, Tuple[object, int]]" = OrderedDict()
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+        self._pool = None
+        self.hits = 0
+        self.misses = 0
+        self.pages = 0
+
+    # ── Cache ────────────────────────────────────────────────────────────
+
+    def _get_cached(self, key: str):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return entry
+
+    def _put_cached(self, key: str, entry):
+        size = entry[0].width * entry[0].height
+        if size > self.cache_bytes:
+            return
+        with self._lock:
+            if key in self._cache:
+                return
+            self._cache[key] = entry
+            self._cached_bytes += size
+            while self._cached_bytes > self.cache_bytes:
+                _, (old, _) = self._cache.popitem(last=False)
+                self._cached_bytes -= old.width * old.height
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ocr",
+                                                initializer=_init_worker)
+            return self._pool
+
+    # ── OCR ──────────────────────────────────────────────────────────────
+
+    def preprocess(self, image, dpi: Optional[int] = None, source: Optional[str] = None):
+        """Preprocessed page and its resolution, from the cache when this page was seen before."""
+        key = page_key(image, dpi, self.target_dpi, source)
+        entry = self._get_cached(key)
+        if entry is None:
+            entry = preprocess_page(image, dpi, self.target_dpi)
+            self._put_cached(key, entry)
+        return entry
+
+    def _ocr_page(self, image, dpi: Optional[int], source: Optional[str]) -> str:
+        page, page_dpi = self.preprocess(image, dpi, source)
+        text = _recognize(page, page_dpi)
+        with self._lock:
+            self.pages += 1
+        return text
+
+    def submit(self, image, dpi: Optional[int] = None, source: Optional[str] = None) -> Future:
+        """
+        Queue one page (a PIL image); the future resolves to its text.
+        ``source`` identifies the page for the cache (see page_key).
+        """
+        return self._executor().submit(self._ocr_page, image, dpi, source)
+
+    def ocr_image(self, image, dpi: Optional[int] = None, source: Optional[bytes] = None) -> str:
+        """Text of one image; ``source`` is the uploaded file it was decoded from."""
+        return self.submit(image, dpi, f"{source_digest(source)}:1" if source else None).result()
+
+    def ocr_pages(self, images: Iterable, dpi: Optional[int] = None, source: Optional[bytes] = None,
+                  cancel: Optional[threading.Event] = None) -> List[str]:
+        """
+        Text of every page, in order; pages are recognized in parallel.
+        ``images`` may be a lazy iterator (iter_pdf_pages): it is only
+        advanced while fewer than max_in_flight pages are queued, so a long
+        document never sits in memory whole. ``source`` is the uploaded file
+        the pages were rasterized from. Setting ``cancel`` drops the queued
+        pages and raises OcrCancelled after the page being waited on.
+        """
+        digest = source_digest(source) if source else None
+        texts = []
+        pending = deque()
+        try:
+            for number, image in enumerate(images, start=1):
+                if len(pending) >= self.max_in_flight:
+                    texts.append(pending.popleft().result())
+                if cancel is not None and cancel.is_set():
+                    raise OcrCancelled()
+                pending.append(self.submit(image, dpi, f"{digest}:{number}" if digest else None))
+            while pending:
+                texts.append(pending.popleft().result())
+                if cancel is not None and cancel.is_set() and pending:
+                    raise OcrCancelled()
+        finally:
+            for future in pending:
+                future.cancel()
+        return texts
+
+    def warm_up(self):
+        """Start every worker thread so each loads its engine before the first scan."""
+        pool = self._executor()
+        for future in [pool.submit(_engine) for _ in range(self.workers)]:
+            future.result()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_in_flight": self.max_in_flight,
+                "engine": "tesserocr" if _load_tesserocr() else "pytesseract",
+                "pages": self.pages,
+                "cache_hits": self.hits,
+                "cache_misses": self.misses,
+                "cache_entries": len(self._cache),
+                "cache_mb": round(self._cached_bytes / (1024 * 1024), 1),
+            }
+
+
+_ocr_pool = OcrPool()
+
+
+def get_ocr_pool() -> OcrPool:
+    return _ocr_pool
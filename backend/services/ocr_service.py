@@ -1,18 +1,15 @@
 import re
-import pandas as pd
-import numpy as np
-import qrcode
 import io
 import base64
 import uuid
-from PIL import Image
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, List, Optional, Any, Tuple, TYPE_CHECKING
 from dataclasses import dataclass
-import pytesseract
-from pdf2image import convert_from_bytes
-import pdfplumber
-import tabula
-import cv2
+
+# OCR / table / imaging libraries are imported inside the methods that use
+# them so importing this module stays cheap.
+if TYPE_CHECKING:
+    import pandas as pd
+    from PIL import Image
 
 @dataclass
 class ExtractedAsset:
@@ -109,7 +106,7 @@ class EnhancedBillExtractor:
             'other': []
         }
 
-    def extract_with_multiple_methods(self, file_content: bytes) -> Tuple[str, List[pd.DataFrame]]:
+    def extract_with_multiple_methods(self, file_content: bytes) -> Tuple[str, List['pd.DataFrame']]:
         """Extract text and tables using multiple methods for better accuracy"""
         
         # Method 1: OCR with pytesseract
@@ -129,13 +126,14 @@ class EnhancedBillExtractor:
     def _extract_with_ocr(self, file_content: bytes) -> str:
         """Extract text using OCR"""
         try:
-            images = convert_from_bytes(file_content, poppler_path=r"C:\poppler\Library\bin")
+            from services.ocr_pool import get_ocr_pool
+            from services.pdf_raster import OCR_RASTER_DPI, iter_pdf_pages
+            pages = iter_pdf_pages(file_content)
             full_text = ""
             
-            for i, image in enumerate(images):
-                # Enhance image for better OCR
-                enhanced_image = self._enhance_image_for_ocr(image)
-                text = pytesseract.image_to_string(enhanced_image, lang="eng")
+            # Pages are rasterized one batch at a time while the pool
+            # preprocesses (preprocess_page) and recognizes earlier ones
+            for i, text in enumerate(get_ocr_pool().ocr_pages(pages, dpi=OCR_RASTER_DPI, source=file_content)):
                 full_text += f"\n--- Page {i+1} ---\n{text}"
                 
             return full_text
@@ -146,6 +144,7 @@ class EnhancedBillExtractor:
     def _extract_with_pdfplumber(self, file_content: bytes) -> str:
         """Extract text using pdfplumber"""
         try:
+            import pdfplumber
             with pdfplumber.open(io.BytesIO(file_content)) as pdf:
                 full_text = ""
                 for i, page in enumerate(pdf.pages):
@@ -157,9 +156,10 @@ class EnhancedBillExtractor:
             print(f"PDFPlumber extraction failed: {e}")
             return ""
 
-    def _extract_tables_with_tabula(self, file_content: bytes) -> List[pd.DataFrame]:
+    def _extract_tables_with_tabula(self, file_content: bytes) -> List['pd.DataFrame']:
         """Extract tables using tabula-py"""
         try:
+            import tabula
             # Save to temporary file for tabula
             temp_file = f"temp_{uuid.uuid4().hex}.pdf"
             with open(temp_file, 'wb') as f:
@@ -177,26 +177,11 @@ class EnhancedBillExtractor:
             print(f"Table extraction failed: {e}")
             return []
 
-    def _enhance_image_for_ocr(self, image: Image.Image) -> Image.Image:
+    def _enhance_image_for_ocr(self, image: 'Image.Image') -> 'Image.Image':
         """Enhance image quality for better OCR results"""
         try:
-            # Convert PIL to OpenCV
-            img_array = np.array(image)
-            
-            # Convert to grayscale
-            if len(img_array.shape) == 3:
-                gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
-            else:
-                gray = img_array
-            
-            # Apply denoising
-            denoised = cv2.fastNlMeansDenoising(gray)
-            
-            # Apply threshold to get binary image
-            _, thresh = cv2.threshold(denoised, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-            
-            # Convert back to PIL
-            enhanced_image = Image.fromarray(thresh)
+            from services.ocr_pool import preprocess_page
+            enhanced_image, _ = preprocess_page(image)
             return enhanced_image
         except:
             # If enhancement fails, return original
@@ -276,7 +261,7 @@ class EnhancedBillExtractor:
         
         return bill_details
 
-    def extract_assets_from_tables(self, tables: List[pd.DataFrame], text: str) -> List[ExtractedAsset]:
+    def extract_assets_from_tables(self, tables: List['pd.DataFrame'], text: str) -> List[ExtractedAsset]:
         """Extract assets from detected tables"""
         assets = []
         
@@ -294,7 +279,7 @@ class EnhancedBillExtractor:
         
         return assets
 
-    def _parse_table_for_assets(self, table: pd.DataFrame) -> List[ExtractedAsset]:
+    def _parse_table_for_assets(self, table: 'pd.DataFrame') -> List[ExtractedAsset]:
         """Parse a pandas DataFrame table for asset information"""
         assets = []
         
@@ -568,6 +553,7 @@ class EnhancedBillExtractor:
     def generate_qr_code(self, data: str) -> str:
         """Generate QR code and return as base64 string"""
         try:
+            import qrcode
             qr = qrcode.QRCode(
                 version=1,
                 error_correction=qrcode.constants.ERROR_CORRECT_L,
@@ -0,0 +1,67 @@
+"""
+PDF Raster
+Page-at-a-time rasterization of uploaded PDFs for the OCR fallbacks.
+
+convert_from_bytes() decodes every page of a document into a full-resolution
+PIL image before OCR can start; a 30-page scan at 300 dpi is gigabytes of
+RGB. iter_pdf_pages() instead writes the PDF to a temporary directory once,
+has poppler rasterize OCR_RASTER_BATCH pages at a time to files there
+(paths only, nothing decoded), and yields one loaded page at a time,
+deleting each file as it goes. Fed into OcrPool.ocr_pages(), which keeps at
+most a few pages in flight, peak memory stays at a handful of pages
+regardless of document length while poppler and tesseract overlap.
+"""
+
+import os
+import tempfile
+from typing import Iterator, Optional
+
+from services.ocr_pool import OCR_TARGET_DPI
+
+# Rasterize at the resolution the OCR preprocessing targets, so pages are never resampled twice
+OCR_RASTER_DPI = int(os.getenv("OCR_RASTER_DPI", str(OCR_TARGET_DPI)))
+OCR_RASTER_GRAYSCALE = os.getenv("OCR_RASTER_GRAYSCALE", "true").lower() in ("1", "true", "yes")
+# Pages per poppler invocation (one process start is amortised over the batch)
+OCR_RASTER_BATCH = int(os.getenv("OCR_RASTER_BATCH", "2"))
+POPPLER_PATH = os.getenv("POPPLER_PATH", r"C:\poppler\Library\bin" if os.name == "nt" else "") or None
+
+
+def pdf_page_count(pdf_path: str, poppler_path: Optional[str] = POPPLER_PATH) -> int:
+    from pdf2image import pdfinfo_from_path
+    return int(pdfinfo_from_path(pdf_path, poppler_path=poppler_path)["Pages"])
+
+
+def iter_pdf_pages(file_content: bytes, dpi: int = OCR_RASTER_DPI, grayscale: bool = OCR_RASTER_GRAYSCALE,
+                   batch: int = OCR_RASTER_BATCH, poppler_path: Optional[str] = POPPLER_PATH) -> Iterator:
+    """
+    Yield the pages of a PDF as PIL images, in order, rasterizing ``batch``
+    pages ahead at most. The temporary files are removed when the iterator
+    is exhausted or closed.
+    """
+    from pdf2image import convert_from_path
+    from PIL import Image
+
+    with tempfile.TemporaryDirectory(prefix="assetiq-raster-") as workdir:
+        pdf_path = os.path.join(workdir, "document.pdf")
+        with open(pdf_path, "wb") as f:
+            f.write(file_content)
+
+        pages = pdf_page_count(pdf_path, poppler_path)
+        for first in range(1, pages + 1, max(1, batch)):
+            last = min(pages, first + max(1, batch) - 1)
+            paths = convert_from_path(
+                pdf_path,
+                dpi=dpi,
+                output_folder=workdir,
+                first_page=first,
+                last_page=last,
+                grayscale=grayscale,
+                paths_only=True,
+                poppler_path=poppler_path,
+            )
+            for path in paths:
+                image = Image.open(path)
+                image.load()
+                os.remove(path)
+                image.info["dpi"] = (dpi, dpi)
+                yield image
@@ -0,0 +1,316 @@
+"""
+QR Service
+Renders asset QR codes (PNG or SVG) with an in-memory LRU cache, batch
+rendering, and content-addressed files served from /qr/<key>.<fmt>.
+
+Callers pick how the image is delivered:
+  - data_uris(): base64 data-URIs inline in the JSON (old behaviour)
+  - urls():      short URLs to cached files, so a 100-unit bill no longer
+                 embeds 100 images in one response
+  - register():  URLs only; nothing is rendered until the browser actually
+                 requests /qr/<key>.<fmt> (lazy scan previews)
+
+Keys are a hash of the payload + rendering parameters, so the same asset
+code always maps to the same file and cached bytes never go stale.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "qr_cache")
+QR_CACHE_DIR = os.getenv("QR_CACHE_DIR", DEFAULT_CACHE_DIR)
+QR_CACHE_MAX_ENTRIES = int(os.getenv("QR_CACHE_MAX_ENTRIES", "2048"))
+QR_DISK_MAX_FILES = int(os.getenv("QR_DISK_MAX_FILES", "20000"))
+QR_PENDING_MAX_ENTRIES = int(os.getenv("QR_PENDING_MAX_ENTRIES", "10000"))
+QR_RENDER_WORKERS = int(os.getenv("QR_RENDER_WORKERS", "4"))
+# Prefix for generated URLs, e.g. "/api" when the frontend reaches Flask through the dev proxy
+QR_URL_PREFIX = os.getenv("QR_URL_PREFIX", "").rstrip("/")
+
+FORMATS = {"png": "image/png", "svg": "image/svg+xml"}
+KEY_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+@dataclass(frozen=True)
+class QRParams:
+    box_size: int = 10
+    border: int = 4
+    error_correction: str = "L"   # L / M / Q / H
+    fmt: str = "png"
+
+
+def qr_key(payload: str, params: QRParams) -> str:
+    """Content address for a rendered QR image."""
+    raw = json.dumps(
+        [payload, params.box_size, params.border, params.error_correction, params.fmt],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+def _render(payload: str, params: QRParams) -> bytes:
+    import qrcode
+    from qrcode.constants import ERROR_CORRECT_H, ERROR_CORRECT_L, ERROR_CORRECT_M, ERROR_CORRECT_Q
+
+    levels = {"L": ERROR_CORRECT_L, "M": ERROR_CORRECT_M, "Q": ERROR_CORRECT_Q, "H": ERROR_CORRECT_H}
+    kwargs = {}
+    if params.fmt == "svg":
+        import qrcode.image.svg
+        kwargs["image_factory"] = qrcode.image.svg.SvgPathImage
+
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=levels.get(params.error_correction, ERROR_CORRECT_L),
+        box_size=params.box_size,
+        border=params.border,
+        **kwargs,
+    )
+    qr.add_data(payload)
+    qr.make(fit=True)
+    buffered = BytesIO()
+    if params.fmt == "svg":
+        qr.make_image().save(buffered)
+    else:
+        qr.make_image(fill_color="black", back_color="white").save(buffered, format="PNG")
+    return buffered.getvalue()
+
+
+class QRRenderer:
+    """LRU-cached QR renderer shared by the scan, manual entry and /generate_qr routes."""
+
+    def __init__(self, max_entries: int = QR_CACHE_MAX_ENTRIES,
+                 cache_dir: str = QR_CACHE_DIR,
+                 workers: int = QR_RENDER_WORKERS):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.workers = max(1, workers)
+        self._cache: "OrderedDict[str, bytes]" = OrderedDict()
+        # key -> (payload, params) registered for lazy rendering
+        self._pending: "OrderedDict[str, Tuple[str, QRParams]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = None
+        self._disk_writes = 0
+        self.hits = 0
+        self.misses = 0
+
+    # ── Cache ────────────────────────────────────────────────────────────
+
+    def _get_cached(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._cache.get(key)
+            if data is not None:
+                self._cache.move_to_end(key)
+            return data
+
+    def _put_cached(self, key: str, data: bytes):
+        with self._lock:
+            self._cache[key] = data
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="qr-render")
+            return self._pool
+
+    # ── Rendering ────────────────────────────────────────────────────────
+
+    def render(self, payload: str, params: QRParams = QRParams()) -> bytes:
+        return self.render_many([payload], params)[0]
+
+    def render_many(self, payloads: List[str], params: QRParams = QRParams()) -> List[bytes]:
+        """Render a batch: cache hits are reused, duplicate payloads render once, misses render in parallel."""
+        keys = [qr_key(p, params) for p in payloads]
+        results: Dict[str, bytes] = {}
+        missing: Dict[str, str] = {}
+        for key, payload in zip(keys, payloads):
+            if key in results or key in missing:
+                continue
+            data = self._get_cached(key)
+            if data is not None:
+                results[key] = data
+            else:
+                missing[key] = payload
+
+        with self._lock:
+            self.hits += len(results)
+            self.misses += len(missing)
+
+        if missing:
+            items = list(missing.items())
+            if len(items) == 1 or self.workers == 1:
+                rendered = [_render(payload, params) for _, payload in items]
+            else:
+                rendered = list(self._executor().map(lambda kv: _render(kv[1], params), items))
+            for (key, _), data in zip(items, rendered):
+                self._put_cached(key, data)
+                results[key] = data
+
+        return [results[key] for key in keys]
+
+    def data_uris(self, payloads: List[str], params: QRParams = QRParams()) -> List[str]:
+        mime = FORMATS[params.fmt]
+        return [
+            f"data:{mime};base64,{base64.b64encode(data).decode()}"
+            for data in self.render_many(payloads, params)
+        ]
+
+    def data_uri(self, payload: str, params: QRParams = QRParams()) -> str:
+        return self.data_uris([payload], params)[0]
+
+    def urls(self, payloads: List[str], params: QRParams = QRParams()) -> List[str]:
+        """Render (or reuse) each image, persist it for /qr/<key>.<fmt> and return its URL."""
+        urls = []
+        for payload, data in zip(payloads, self.render_many(payloads, params)):
+            key = qr_key(payload, params)
+            self._write_file(self._path(key, params.fmt), data)
+            urls.append(f"{QR_URL_PREFIX}/qr/{key}.{params.fmt}")
+        return urls
+
+    def register(self, payloads: List[str], params: QRParams = QRParams()) -> List[str]:
+        """Remember payloads for on-demand rendering and return their URLs (no rendering here)."""
+        urls = []
+        for payload in payloads:
+            key = qr_key(payload, params)
+            with self._lock:
+                self._pending[key] = (payload, params)
+                self._pending.move_to_end(key)
+                while len(self._pending) > QR_PENDING_MAX_ENTRIES:
+                    self._pending.popitem(last=False)
+            # Sidecar so a request landing on another worker can still render it
+            if not os.path.exists(self._path(key, params.fmt)):
+                sidecar = json.dumps({
+                    "payload": payload,
+                    "box_size": params.box_size,
+                    "border": params.border,
+                    "error_correction": params.error_correction,
+                    "fmt": params.fmt,
+                }, ensure_ascii=False)
+                self._write_file(self._path(key, "json"), sidecar.encode("utf-8"))
+            urls.append(f"{QR_URL_PREFIX}/qr/{key}.{params.fmt}")
+        return urls
+
+    def _registered(self, key: str) -> Optional[Tuple[str, QRParams]]:
+        with self._lock:
+            entry = self._pending.get(key)
+        if entry is not None:
+            return entry
+        try:
+            with open(self._path(key, "json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            return meta["payload"], QRParams(
+                box_size=int(meta["box_size"]),
+                border=int(meta["border"]),
+                error_correction=meta["error_correction"],
+                fmt=meta["fmt"],
+            )
+        except (OSError, ValueError, KeyError):
+            return None
+
+    # ── Disk store (shared by every worker on the host) ──────────────────
+
+    def _path(self, key: str, fmt: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.{fmt}")
+
+    def _write_file(self, path: str, data: bytes):
+        if os.path.exists(path):
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"[QR] Could not write {path}: {e}")
+            return
+        self._disk_writes += 1
+        if self._disk_writes % 256 == 0:
+            self.prune_disk()
+
+    def prune_disk(self, max_files: int = QR_DISK_MAX_FILES) -> int:
+        """Drop the oldest cached files once the directory holds more than max_files."""
+        try:
+            entries = [e for e in os.scandir(self.cache_dir) if e.is_file()]
+        except OSError:
+            return 0
+        excess = len(entries) - max_files
+        if excess <= 0:
+            return 0
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        removed = 0
+        for entry in entries[:excess]:
+            try:
+                os.remove(entry.path)
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def load(self, key: str, fmt: str) -> Optional[bytes]:
+        """
+        Image bytes for a key: memory cache, then disk, then an on-demand render
+        of a registered payload. None if the key is unknown.
+        """
+        if not KEY_RE.match(key or "") or fmt not in FORMATS:
+            return None
+        data = self._get_cached(key)
+        if data is not None:
+            return data
+        try:
+            with open(self._path(key, fmt), "rb") as f:
+                data = f.read()
+        except OSError:
+            entry = self._registered(key)
+            if entry is None or entry[1].fmt != fmt:
+                return None
+            payload, params = entry
+            data = self.render(payload, params)
+            self._write_file(self._path(key, fmt), data)
+            return data
+        self._put_cached(key, data)
+        return data
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "entries": len(self._cache),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "pending": len(self._pending),
+                "cache_dir": self.cache_dir,
+            }
+
+
+_renderer = QRRenderer()
+
+
+def get_qr_renderer() -> QRRenderer:
+    return _renderer
+
+
+def qr_images(payloads: List[str], mode: str = "inline", params: QRParams = QRParams()) -> List[str]:
+    """
+    Image references for a response: data-URIs ("inline"), URLs to files
+    rendered now ("url") or URLs rendered on first request ("lazy").
+    """
+    if params.fmt not in FORMATS:
+        params = QRParams(params.box_size, params.border, params.error_correction, "png")
+    renderer = get_qr_renderer()
+    mode = (mode or "inline").lower()
+    if mode == "lazy":
+        return renderer.register(payloads, params)
+    if mode == "url":
+        return renderer.urls(payloads, params)
+    return renderer.data_uris(payloads, params)
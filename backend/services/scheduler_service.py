@@ -0,0 +1,195 @@
+"""
+Scheduler Service
+Registry of periodic jobs and the runner that executes them.
+
+Every run:
+  - takes the job's Postgres advisory lock on its own connection, so a job
+    runs in exactly one process even if several schedulers are started
+    (runs that lose the race are recorded as 'skipped')
+  - is recorded in scheduler_job_runs with status, duration and error text
+    (a job that raises JobSkipped is recorded as 'skipped' with its reason)
+
+The jobs are driven by the standalone scheduler process (``python -m scheduler``
+from backend/); web workers only start an in-process scheduler when
+RUN_SCHEDULER_IN_WEB=true.
+"""
+
+import os
+import socket
+import time
+import traceback
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from config.database import db
+from services.classifier_service import classifier_retrain_job
+from services.notification_service import warranty_expiry_job
+
+SCHEDULER_TIMEZONE = os.getenv("SCHEDULER_TIMEZONE", "Asia/Kolkata")
+RUN_HISTORY_LIMIT = 50
+
+
+class JobSkipped(Exception):
+    """Raised by a job that had nothing it could do this time (the message says why)."""
+
+
+@dataclass
+class ScheduledJob:
+    job_id: str
+    func: Callable[[], None]
+    lock_id: int                              # pg advisory lock key
+    cron: Dict = field(default_factory=dict)  # CronTrigger kwargs
+    description: str = ""
+
+
+JOBS: Dict[str, ScheduledJob] = {
+    "daily_warranty_check": ScheduledJob(
+        job_id="daily_warranty_check",
+        func=warranty_expiry_job,
+        lock_id=72_410_001,
+        cron={"hour": 8, "minute": 0},
+        description="Warranty expiry emails for devices entering the 90-day window",
+    ),
+    "classifier_retrain": ScheduledJob(
+        job_id="classifier_retrain",
+        func=classifier_retrain_job,
+        lock_id=72_410_002,
+        cron={"hour": 2, "minute": 30},
+        description="Retrain the invoice classifier on scan corrections and promote it if no worse",
+    ),
+}
+
+
+# ------------------------------
+# Run history
+# ------------------------------
+def _record_run(cursor, job_id: str, status: str) -> Optional[int]:
+    try:
+        cursor.execute(
+            """
+            INSERT INTO scheduler_job_runs (job_id, status, host)
+            VALUES (%s, %s, %s)
+            RETURNING run_id
+            """,
+            (job_id, status, f"{socket.gethostname()}:{os.getpid()}"),
+        )
+        return cursor.fetchone()["run_id"]
+    except Exception as e:
+        print(f"[Scheduler] Could not record run of {job_id}: {e}")
+        return None
+
+
+def _finish_run(cursor, run_id: Optional[int], status: str, duration_ms: int, error: Optional[str]):
+    if run_id is None:
+        return
+    try:
+        cursor.execute(
+            """
+            UPDATE scheduler_job_runs
+            SET status = %s, finished_at = now(), duration_ms = %s, error = %s
+            WHERE run_id = %s
+            """,
+            (status, duration_ms, error, run_id),
+        )
+    except Exception as e:
+        print(f"[Scheduler] Could not finish run {run_id}: {e}")
+
+
+def recent_runs(job_id: Optional[str] = None, limit: int = RUN_HISTORY_LIMIT) -> List[Dict]:
+    """Most recent job runs (newest first), optionally for a single job."""
+    conn = db.get_connection()
+    if not conn:
+        return []
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT run_id, job_id, status, started_at, finished_at, duration_ms, host, error
+            FROM scheduler_job_runs
+            WHERE %s::text IS NULL OR job_id = %s
+            ORDER BY started_at DESC
+            LIMIT %s
+            """,
+            (job_id, job_id, limit),
+        )
+        rows = cursor.fetchall()
+        cursor.close()
+        return [
+            {
+                **row,
+                "started_at": row["started_at"].isoformat() if row["started_at"] else None,
+                "finished_at": row["finished_at"].isoformat() if row["finished_at"] else None,
+            }
+            for row in rows
+        ]
+    finally:
+        conn.close()
+
+
+# ------------------------------
+# Runner
+# ------------------------------
+def run_job(job_id: str) -> str:
+    """
+    Execute one job under its advisory lock and record the run.
+    Returns the run status: success, failed or skipped.
+    """
+    job = JOBS[job_id]
+    conn = db.get_connection()
+    if not conn:
+        print(f"[Scheduler] DB connection failed — {job_id} not run")
+        return "failed"
+
+    conn.autocommit = True
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT pg_try_advisory_lock(%s) AS locked", (job.lock_id,))
+        if not cursor.fetchone()["locked"]:
+            print(f"[Scheduler] {job_id} already running in another process — skipping")
+            run_id = _record_run(cursor, job_id, "skipped")
+            _finish_run(cursor, run_id, "skipped", 0, None)
+            return "skipped"
+
+        run_id = _record_run(cursor, job_id, "running")
+        started = time.perf_counter()
+        status, error = "success", None
+        try:
+            job.func()
+        except JobSkipped as e:
+            status, error = "skipped", str(e)
+            print(f"[Scheduler] {job_id} skipped: {e}")
+        except Exception as e:
+            status, error = "failed", str(e)
+            traceback.print_exc()
+        finally:
+            duration_ms = int((time.perf_counter() - started) * 1000)
+            _finish_run(cursor, run_id, status, duration_ms, error)
+            cursor.execute("SELECT pg_advisory_unlock(%s)", (job.lock_id,))
+        print(f"[Scheduler] {job_id} finished: {status} in {duration_ms} ms")
+        return status
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def build_scheduler(blocking: bool = False):
+    """APScheduler instance with every job in JOBS registered (not started)."""
+    from apscheduler.triggers.cron import CronTrigger
+    if blocking:
+        from apscheduler.schedulers.blocking import BlockingScheduler as Scheduler
+    else:
+        from apscheduler.schedulers.background import BackgroundScheduler as Scheduler
+
+    scheduler = Scheduler(timezone=SCHEDULER_TIMEZONE)
+    for job in JOBS.values():
+        scheduler.add_job(
+            run_job,
+            trigger=CronTrigger(**job.cron),
+            args=[job.job_id],
+            id=job.job_id,
+            name=job.description or job.job_id,
+            replace_existing=True,
+            coalesce=True,
+            max_instances=1,
+        )
+    return scheduler
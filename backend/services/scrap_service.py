@@ -0,0 +1,111 @@
+"""
+Scrap Service
+Moving devices into the scrapped devices register.
+"""
+
+
+# -----------------------------
+# Scrap Devices + Scrap Register
+# -----------------------------
+def ensure_scrapped_devices_table(cursor):
+    # Schema migrations removed from runtime (assumed already applied).
+    return None
+
+
+def ensure_scrap_requests_table(cursor):
+    # Schema migrations removed from runtime (assumed already applied).
+    return None
+
+
+def scrap_devices_by_ids(cursor, conn, device_ids, user, justification=None):
+    # Schema migrations removed from runtime (assumed already applied).
+
+    cursor.execute(
+        """
+        SELECT
+            d.device_id,
+            d.asset_code,
+            d.assigned_code AS device_assigned_code,
+            d.lab_id AS device_lab_id,
+            l.lab_name,
+            lsd.device_type,
+            lsd.brand,
+            lsd.model,
+            lsd.specification,
+            lsd.station_id,
+            ls.lab_id AS station_lab_id,
+            ls.assigned_code AS station_code,
+            d.unit_price
+        FROM devices d
+        LEFT JOIN lab_station_devices lsd ON d.device_id = lsd.device_id
+        LEFT JOIN lab_stations ls ON lsd.station_id = ls.station_id
+        LEFT JOIN labs l ON d.lab_id = l.lab_id
+        WHERE d.device_id = ANY(%s)
+        """,
+        (device_ids,),
+    )
+    rows = cursor.fetchall() or []
+    by_id = {r["device_id"]: r for r in rows}
+
+    scrapped_by_text = (getattr(user, "email", None) or f"user:{getattr(user, 'id', None)}")
+    scrapped_by_user_id = None
+    try:
+        raw_uid = getattr(user, "id", None)
+        if raw_uid is not None and str(raw_uid).strip() != "":
+            scrapped_by_user_id = int(raw_uid)
+    except Exception:
+        scrapped_by_user_id = None
+
+    inserted = 0
+    for did in device_ids:
+        info = by_id.get(did, {})
+        scrap_id_value = info.get("asset_code")
+        cost_value = info.get("unit_price") if info.get("unit_price") is not None else 0
+        cursor.execute(
+            """
+                        INSERT INTO scrapped_devices
+                            (scrap_id, device_id, asset_code, device_type, brand, model, specification,
+                             lab_id, lab_name, station_id, station_code,
+                             scrapped_by, scrapped_by_text, scrapped_by_user_id,
+                             dead_stock_number, cost, justification_for_scrapping, reason, notes)
+                        VALUES
+                            (%s, %s, %s, %s, %s, %s, %s,
+                             %s, %s, %s, %s,
+                             %s, %s, %s,
+                             %s, %s, %s, %s, %s)
+            """,
+            (
+                scrap_id_value,
+                did,
+                info.get("asset_code"),
+                info.get("device_type"),
+                info.get("brand"),
+                info.get("model"),
+                info.get("specification"),
+                info.get("station_lab_id") or info.get("device_lab_id"),
+                info.get("lab_name"),
+                                info.get("station_id"),
+                info.get("station_code"),
+                                scrapped_by_user_id,
+                scrapped_by_text,
+                scrapped_by_user_id,
+                info.get("asset_code"),
+                cost_value,
+                justification,
+                                justification,
+                                None,
+            ),
+        )
+        inserted += 1
+
+    cursor.execute(
+        "DELETE FROM lab_station_devices WHERE device_id = ANY(%s)",
+        (device_ids,),
+    )
+
+    cursor.execute(
+        "UPDATE devices SET is_active = FALSE, lab_id = NULL WHERE device_id = ANY(%s)",
+        (device_ids,),
+    )
+
+    return inserted
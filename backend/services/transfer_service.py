@@ -0,0 +1,57 @@
+"""
+Transfer Service
+Helpers shared by the transfer routes and the transfer history exports.
+"""
+
+
+def getDeviceEmojiPy(type_name: str) -> str:
+    t = (type_name or '').lower()
+    if t == 'laptop': return '💻'
+    if t in ('pc', 'monitor'): return '🖥️'
+    if t == 'ac': return '❄️'
+    if 'smart board' in t: return '📺'
+    if 'projector' in t: return '📽️'
+    if 'printer' in t: return '🖨️'
+    if 'scanner' in t: return '📠'
+    if 'ups' in t: return '🔋'
+    if 'router' in t: return '📡'
+    if 'switch' in t: return '🔌'
+    if 'server' in t: return '🗄️'
+    if 'passage' in t or 'walkway' in t: return '🚶'
+    if 'door' in t: return '🚪'
+    if 'network' in t: return '🌐'
+    if 'window' in t: return '🪟'
+    if 'wall' in t: return '🧱'
+    if not t or t == 'empty': return '⬜'
+    return '🔧'
+
+
+def resolve_transfer_dest_cell(cursor, lab_id, cell_id):
+    """Resolve destination cell to row/column and label."""
+    if not cell_id:
+        return None, None, None
+
+    cursor.execute("""
+        SELECT lc.row_number, lc.column_number,
+               COALESCE(lc.label, st.name, 'Station') AS label
+        FROM lab_layout_cells lc
+        JOIN station_types st ON lc.station_type_id = st.station_type_id
+        JOIN labs l ON lc.layout_id = l.layout_id
+        WHERE lc.cell_id = %s AND l.lab_id = %s
+    """, (cell_id, lab_id))
+    bp = cursor.fetchone()
+    if bp:
+        return bp['row_number'], bp['column_number'], bp['label']
+
+    cursor.execute("""
+        SELECT ls.row_number, ls.column_number,
+               COALESCE(lgc.equipment_type, 'Station') AS label
+        FROM lab_stations ls
+        LEFT JOIN lab_grid_cells lgc ON ls.station_id = lgc.station_id
+        WHERE ls.station_id = %s AND ls.lab_id = %s
+    """, (cell_id, lab_id))
+    rt = cursor.fetchone()
+    if rt:
+        return rt['row_number'], rt['column_number'], rt['label']
+
+    return None, None, None
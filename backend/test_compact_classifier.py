@@ -0,0 +1,76 @@
+"""
+Test: Compact Classifier Equivalence
+
+The NumPy export ("ocr regex new"/training_data/classifier_model.npz) must
+predict exactly what the pickled scikit-learn pipeline it was exported from
+predicts: the same label for every text and the same class probabilities
+(up to float rounding). Texts are the extraction corpus plus
+training_data/invoices.csv when it is present.
+
+Run (from backend/):
+    python -m pytest -q test_compact_classifier.py
+    python test_compact_classifier.py
+"""
+
+import os
+import sys
+
+import numpy as np
+
+OCR_REGEX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ocr regex new")
+if OCR_REGEX_DIR not in sys.path:
+    sys.path.insert(0, OCR_REGEX_DIR)
+
+import classifier  # noqa: E402
+import compact_classifier  # noqa: E402
+
+# Largest probability difference accepted between the two models
+PROBA_TOLERANCE = 1e-9
+
+_pipeline = compact_classifier._load_pipeline()
+_model = compact_classifier.load_compact()
+_texts = compact_classifier._load_texts([compact_classifier.CORPUS_DIR]) + compact_classifier._training_texts()
+_names = [name for name, _ in _texts]
+_bodies = [text for _, text in _texts]
+
+
+def test_export_is_current():
+    # load_compact() returns None for a missing or stale artifact
+    assert _model is not None, "run: python \"ocr regex new/compact_classifier.py\" export"
+    assert list(_model.classes_) == list(_pipeline.classes_)
+
+
+def test_corpus_is_not_empty():
+    assert len(_texts) >= 10
+
+
+def test_same_labels():
+    expected = _pipeline.predict(_bodies)
+    actual = _model.predict(_bodies)
+    mismatches = [(name, e, a) for name, e, a in zip(_names, expected, actual) if e != a]
+    assert not mismatches, mismatches
+
+
+def test_same_probabilities():
+    # classifier._predict_proba: what predict_invoice_types() serves from the
+    # pipeline (handles pickles from another scikit-learn version)
+    expected = np.array([classifier._predict_proba(_pipeline, text) for text in _bodies])
+    actual = _model.predict_proba(_bodies)
+    assert expected.shape == actual.shape
+    worst = np.abs(expected - actual).max(axis=1)
+    off = [(name, float(diff)) for name, diff in zip(_names, worst) if diff > PROBA_TOLERANCE]
+    assert not off, off
+
+
+def test_single_text_matches_batch():
+    # Workers classify one scan at a time
+    for text, row in zip(_bodies[:5], _model.predict_proba(_bodies[:5])):
+        assert np.allclose(_model.predict_proba([text])[0], row, rtol=0, atol=PROBA_TOLERANCE)
+
+
+if __name__ == "__main__":
+    for test in (test_export_is_current, test_corpus_is_not_empty, test_same_labels,
+                 test_same_probabilities, test_single_text_matches_batch):
+        test()
+        print(f"PASS {test.__name__}")
+    print(f"Compared {len(_texts)} text(s)")
@@ -0,0 +1,123 @@
+"""
+Test: OCR Hedge
+
+The /scan text race (services/ocr_hedge.py) with both engines replaced by
+fakes: a fast Whisperer wins alone, a slow one is hedged and cancelled, a
+failed one starts local OCR at once, poor text waits for something better,
+and two failures raise OcrFailed. Also checks which Whisperer calls feed
+the hedge delay.
+
+Run (from backend/):
+    python -m pytest -q test_ocr_hedge.py
+"""
+
+import time
+
+import pytest
+
+from services import ocr_hedge
+from services.llm_whisperer import LLMWhispererError, LLMWhispererTimeout
+from services.ocr_pool import OcrCancelled
+
+GOOD = "Tax Invoice No INV-2024-118 Dell Latitude 5420 Qty 2 Amount 110000 " * 3
+POOR = "|| -- ||"
+DELAY = 0.2
+
+
+@pytest.fixture
+def race(monkeypatch):
+    """Fake engines; returns the calls each one received."""
+    monkeypatch.setattr(ocr_hedge, "_latency", ocr_hedge._LatencyWindow())
+    monkeypatch.setattr(ocr_hedge, "OCR_HEDGE_DEFAULT_DELAY", DELAY)
+    calls = {"whisperer": [], "tesseract": []}
+
+    def install(whisperer, tesseract=lambda cancel: GOOD):
+        def whisperer_text(content, cancel=None):
+            calls["whisperer"].append((time.perf_counter(), cancel))
+            return whisperer(cancel)
+
+        def local_ocr_text(content, is_pdf, cancel=None):
+            calls["tesseract"].append((time.perf_counter(), cancel))
+            return tesseract(cancel)
+
+        monkeypatch.setattr(ocr_hedge, "whisperer_text", whisperer_text)
+        monkeypatch.setattr(ocr_hedge, "local_ocr_text", local_ocr_text)
+        return calls
+
+    return install
+
+
+def _until_cancelled(cancel):
+    assert cancel.wait(5), "never cancelled"
+    raise OcrCancelled("cancelled")
+
+
+def _fail(message):
+    def engine(cancel):
+        raise RuntimeError(message)
+    return engine
+
+
+def test_fast_whisperer_wins_without_hedging(race):
+    calls = race(lambda cancel: GOOD)
+    assert ocr_hedge._hedged(b"pdf", True) == (GOOD, "llm_whisperer")
+    assert not calls["tesseract"]
+    assert ocr_hedge.hedge_stats()["hedged_scans"] == 0
+
+
+def test_slow_whisperer_is_hedged_and_cancelled(race):
+    calls = race(_until_cancelled)
+    started = time.perf_counter()
+    assert ocr_hedge._hedged(b"pdf", True) == (GOOD, "tesseract")
+    assert calls["tesseract"][0][0] - started >= DELAY * 0.9
+    # The losing Whisperer poll is told to stop
+    assert calls["whisperer"][0][1].is_set()
+    assert ocr_hedge.hedge_stats()["hedged_scans"] == 1
+
+
+def test_failed_whisperer_starts_local_ocr_at_once(race):
+    calls = race(_fail("401 Unauthorized"))
+    started = time.perf_counter()
+    assert ocr_hedge._hedged(b"pdf", True) == (GOOD, "tesseract")
+    assert calls["tesseract"][0][0] - started < DELAY
+
+
+def test_poor_text_waits_for_better(race):
+    race(lambda cancel: POOR)
+    assert ocr_hedge._hedged(b"pdf", True) == (GOOD, "tesseract")
+
+
+def test_poor_text_is_kept_when_nothing_better_arrives(race):
+    race(lambda cancel: POOR + " total", tesseract=lambda cancel: POOR)
+    assert ocr_hedge._hedged(b"pdf", True) == (POOR + " total", "llm_whisperer")
+
+
+def test_both_fail(race):
+    race(_fail("submit rejected"), tesseract=_fail("tesseract missing"))
+    with pytest.raises(ocr_hedge.OcrFailed) as failed:
+        ocr_hedge._hedged(b"pdf", True)
+    assert failed.value.remote_error == "submit rejected"
+    assert failed.value.local_error == "tesseract missing"
+
+
+@pytest.mark.parametrize("error, recorded", [
+    (OcrCancelled("cancelled"), True),
+    (LLMWhispererTimeout("Processing timeout after 120s"), True),
+    (LLMWhispererError("LLM Whisperer API error 401"), False),
+    (RuntimeError("Failed to extract text from PDF"), False),
+])
+def test_only_unfinished_calls_feed_the_hedge_delay(monkeypatch, error, recorded):
+    window = ocr_hedge._LatencyWindow()
+    monkeypatch.setattr(ocr_hedge, "_latency", window)
+
+    def extract(content, api_key, cancel=None):
+        raise error
+
+    monkeypatch.setattr(ocr_hedge, "extract_text_with_llm_whisperer", extract)
+    with pytest.raises(type(error)):
+        ocr_hedge.whisperer_text(b"pdf")
+    stats = window.stats()
+    assert stats["whisperer_samples"] == stats["whisperer_censored_total"] == int(recorded)
+    if recorded:
+        # A lower bound of at least the hedge delay, not the fast failure time
+        assert stats["whisperer_p90_s"] >= ocr_hedge.OCR_HEDGE_DEFAULT_DELAY
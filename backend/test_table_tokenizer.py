@@ -0,0 +1,116 @@
+"""
+Test: Table Tokenizer
+
+Header column mapping, number parsing and line items from pipe tables,
+including rows split by wrapped descriptions and serial-number lines.
+
+Run (from backend/):
+    python -m pytest -q test_table_tokenizer.py
+    python test_table_tokenizer.py
+"""
+
+import os
+import sys
+
+OCR_REGEX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ocr regex new")
+if OCR_REGEX_DIR not in sys.path:
+    sys.path.insert(0, OCR_REGEX_DIR)
+
+from table_tokenizer import detect_header, parse_number, tokenize_tables  # noqa: E402
+
+
+def test_header_roles():
+    assert detect_header(["Sl No", "Description of Goods", "HSN/SAC", "Qty", "Rate", "Amount"]) == {
+        "description": 1, "hsn_code": 2, "quantity": 3, "rate": 4, "total": 5,
+    }
+    # "Taxable Amt" is the taxable value, not the amount
+    assert detect_header(["Product", "Qty", "Taxable Amt"]) == {"description": 0, "quantity": 1, "taxable": 2}
+
+
+def test_item_code_column_is_not_the_description():
+    assert detect_header(["Item Code", "Description", "Qty", "Amount"]) == {
+        "item_code": 0, "description": 1, "quantity": 2, "total": 3,
+    }
+    assert detect_header(["Item", "HSN Code", "Qty", "Amount"])["description"] == 0
+    items = tokenize_tables(
+        "| Item Code | Description      | Qty | Amount   |\n"
+        "| DL-5420   | Dell Latitude 5420 | 2 | 1,10,000 |\n"
+    )
+    assert [item["description"] for item in items] == ["Dell Latitude 5420"]
+
+
+def test_header_needs_description_or_quantity():
+    assert detect_header(["Rate", "Amount"]) is None
+    assert detect_header(["Description"]) is None
+
+
+def test_parse_number():
+    assert parse_number("1,250.00") == "1,250.00"
+    assert parse_number("Rs. 1,250.00") == "1,250.00"
+    assert parse_number("₹ 500") == "500"
+    assert parse_number("INR 75.5") == "75.5"
+    assert parse_number("2 Nos") == "2"
+    assert parse_number("10 Pcs.") == "10"
+    assert parse_number("18%") is None
+    assert parse_number("Laptop") is None
+    assert parse_number("") is None
+    assert parse_number("12A") is None
+
+
+def test_items_by_header():
+    items = tokenize_tables(
+        "+----+----------------+----------+-----+----------+-----------+\n"
+        "| Sl | Description    | HSN      | Qty | Rate     | Amount    |\n"
+        "|----|----------------|----------|-----|----------|-----------|\n"
+        "| 1  | HP Monitor 24in | 85285200 | 3  | 9,500.00 | 28,500.00 |\n"
+        "| 2  | Logitech Mouse | 84716060 | 10  | 450.00   | 4,500.00  |\n"
+        "|    | Total          |          |     |          | 33,000.00 |\n"
+    )
+    assert items == [
+        {"description": "HP Monitor 24in", "hsn_code": "85285200", "quantity": "3",
+         "rate": "9,500.00", "total": "28,500.00"},
+        {"description": "Logitech Mouse", "hsn_code": "84716060", "quantity": "10",
+         "rate": "450.00", "total": "4,500.00"},
+    ]
+
+
+def test_wrapped_and_continuation_rows():
+    # A wrapped description and a serial-number line are rows of their own
+    # with no quantity or amount; the header still applies after a break
+    items = tokenize_tables(
+        "| Description          | Qty | Rate      | Amount    |\n"
+        "| Lenovo ThinkPad E14  | 2   | 55,000.00 | 110,000.00 |\n"
+        "| (Black, 16GB RAM)    |     |           |           |\n"
+        "| S/N: PF3X1, PF3X2    |     |           |           |\n"
+        "Page 2\n"
+        "| Epson L3250 Printer  | 1   | 14,000.00 | 14,000.00 |\n"
+    )
+    assert [(item["description"], item["quantity"], item["total"]) for item in items] == [
+        ("Lenovo ThinkPad E14", "2", "110,000.00"),
+        ("Epson L3250 Printer", "1", "14,000.00"),
+    ]
+
+
+def test_items_by_content_without_header():
+    items = tokenize_tables("| 1 | Cisco Switch 24 Port | 85176990 | 2 | 18,000.00 | 36,000.00 |\n")
+    assert items == [{"description": "Cisco Switch 24 Port", "hsn_code": "85176990", "quantity": "2",
+                      "rate": "18,000.00", "total": "36,000.00"}]
+    assert tokenize_tables("| CGST 9% | 3,240.00 | 3,240.00 |\n") == []
+
+
+def test_eway_table_has_taxable_value_and_no_total():
+    items = tokenize_tables(
+        "| Product Name | HSN  | Qty | Taxable Value |\n"
+        "| UPS 1KVA     | 8504 | 4   | 24,000.00     |\n"
+    )
+    assert items == [{"description": "UPS 1KVA", "hsn_code": "8504", "quantity": "4",
+                      "rate": "", "total": None, "taxable_value": "24,000.00"}]
+
+
+if __name__ == "__main__":
+    for test in (test_header_roles, test_item_code_column_is_not_the_description,
+                 test_header_needs_description_or_quantity, test_parse_number, test_items_by_header,
+                 test_wrapped_and_continuation_rows, test_items_by_content_without_header,
+                 test_eway_table_has_taxable_value_and_no_total):
+        test()
+        print(f"PASS {test.__name__}")
@@ -0,0 +1,45 @@
+import atexit
+import logging
+import os
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "%(asctime)s %(levelname)s [%(name)s] %(message)s")
+
+_listener = None
+
+
+# ------------------------------
+# Configure root logging once
+# ------------------------------
+def configure_logging(level: str = LOG_LEVEL) -> None:
+    """
+    Route all log records through a QueueHandler so request threads only
+    enqueue the record; a single background QueueListener does the
+    formatting and the (blocking) write to stdout.
+    Debug-level calls are dropped at the logger before any formatting.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    log_queue = queue.Queue(-1)
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    root = logging.getLogger()
+    root.handlers = [QueueHandler(log_queue)]
+    root.setLevel(getattr(logging, level, logging.INFO))
+
+
+# ------------------------------
+# Per-module logger
+# ------------------------------
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(name)
@@ -0,0 +1,188 @@
+import re
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from flask import Response, g, request
+
+# ------------------------------
+# Histogram buckets (seconds)
+# ------------------------------
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SLOWEST_STATEMENT_CHARS = 160
+
+_lock = threading.Lock()
+_local = threading.local()
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.total += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+# (endpoint, method, status) -> request latency histogram
+_request_latency: Dict[Tuple[str, str, str], _Histogram] = {}
+# endpoint -> per-request SQL time histogram
+_request_sql_time: Dict[str, _Histogram] = {}
+# endpoint -> total SQL statements executed
+_sql_queries_total: Dict[str, int] = {}
+# endpoint -> (seconds, statement) of the slowest statement seen
+_slowest_statement: Dict[str, Tuple[float, str]] = {}
+# extra gauges registered by other modules: name -> (help, callback)
+_gauges: Dict[str, Tuple[str, Callable[[], Optional[float]]]] = {}
+
+
+# ------------------------------
+# Per-request SQL accounting
+# ------------------------------
+def _sql_stats() -> Optional[dict]:
+    return getattr(_local, "sql", None)
+
+
+def record_query(statement, seconds: float):
+    """Called by the timed DB cursor for every executed statement."""
+    stats = _sql_stats()
+    if stats is None:
+        return
+    stats["count"] += 1
+    stats["time"] += seconds
+    if seconds > stats["slowest_time"]:
+        stats["slowest_time"] = seconds
+        stats["slowest"] = statement
+
+
+def current_sql_stats() -> dict:
+    """Query count / SQL time / slowest statement for the request being served."""
+    stats = _sql_stats() or {"count": 0, "time": 0.0, "slowest_time": 0.0, "slowest": None}
+    return dict(stats)
+
+
+def register_gauge(name: str, help_text: str, callback: Callable[[], Optional[float]]):
+    """Publish an extra gauge on /metrics, read lazily at scrape time."""
+    _gauges[name] = (help_text, callback)
+
+
+def _normalize_statement(statement) -> str:
+    if isinstance(statement, bytes):
+        statement = statement.decode("utf-8", "replace")
+    text = re.sub(r"\s+", " ", str(statement or "")).strip()
+    return text[:SLOWEST_STATEMENT_CHARS]
+
+
+# ------------------------------
+# Flask hooks
+# ------------------------------
+def _before_request():
+    g._metrics_started = time.perf_counter()
+    _local.sql = {"count": 0, "time": 0.0, "slowest_time": 0.0, "slowest": None}
+
+
+def _after_request(response):
+    started = getattr(g, "_metrics_started", None)
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    endpoint = request.endpoint or "unmatched"
+    sql = current_sql_stats()
+    _local.sql = None
+
+    with _lock:
+        key = (endpoint, request.method, str(response.status_code))
+        _request_latency.setdefault(key, _Histogram()).observe(elapsed)
+        _request_sql_time.setdefault(endpoint, _Histogram()).observe(sql["time"])
+        _sql_queries_total[endpoint] = _sql_queries_total.get(endpoint, 0) + sql["count"]
+        if sql["slowest"] is not None and sql["slowest_time"] > _slowest_statement.get(endpoint, (0.0, ""))[0]:
+            _slowest_statement[endpoint] = (sql["slowest_time"], _normalize_statement(sql["slowest"]))
+
+    # Split of request time so a slow route shows whether SQL or app code dominates
+    app_ms = max(elapsed - sql["time"], 0.0) * 1000
+    response.headers["Server-Timing"] = (
+        f"sql;dur={sql['time'] * 1000:.1f};desc=\"{sql['count']} queries\", app;dur={app_ms:.1f}"
+    )
+    return response
+
+
+# ------------------------------
+# Prometheus exposition
+# ------------------------------
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items())
+
+
+def _histogram_lines(name: str, labels: dict, hist: _Histogram) -> List[str]:
+    lines = []
+    for bound, count in zip(hist.buckets, hist.counts):
+        lines.append(f"{name}_bucket{{{_labels(**labels, le=bound)}}} {count}")
+    lines.append(f"{name}_bucket{{{_labels(**labels, le='+Inf')}}} {hist.count}")
+    lines.append(f"{name}_sum{{{_labels(**labels)}}} {hist.total:.6f}")
+    lines.append(f"{name}_count{{{_labels(**labels)}}} {hist.count}")
+    return lines
+
+
+def render_metrics() -> str:
+    lines = []
+    with _lock:
+        lines.append("# HELP assetiq_http_request_duration_seconds Request latency by endpoint, method and status.")
+        lines.append("# TYPE assetiq_http_request_duration_seconds histogram")
+        for (endpoint, method, status), hist in sorted(_request_latency.items()):
+            lines.extend(_histogram_lines(
+                "assetiq_http_request_duration_seconds",
+                {"endpoint": endpoint, "method": method, "status": status},
+                hist,
+            ))
+
+        lines.append("# HELP assetiq_sql_request_duration_seconds Total SQL time per request by endpoint.")
+        lines.append("# TYPE assetiq_sql_request_duration_seconds histogram")
+        for endpoint, hist in sorted(_request_sql_time.items()):
+            lines.extend(_histogram_lines("assetiq_sql_request_duration_seconds", {"endpoint": endpoint}, hist))
+
+        lines.append("# HELP assetiq_sql_queries_total SQL statements executed by endpoint.")
+        lines.append("# TYPE assetiq_sql_queries_total counter")
+        for endpoint, count in sorted(_sql_queries_total.items()):
+            lines.append(f"assetiq_sql_queries_total{{{_labels(endpoint=endpoint)}}} {count}")
+
+        lines.append("# HELP assetiq_sql_slowest_statement_seconds Slowest single SQL statement seen per endpoint.")
+        lines.append("# TYPE assetiq_sql_slowest_statement_seconds gauge")
+        for endpoint, (seconds, statement) in sorted(_slowest_statement.items()):
+            lines.append(
+                f"assetiq_sql_slowest_statement_seconds{{{_labels(endpoint=endpoint, statement=statement)}}} {seconds:.6f}"
+            )
+
+    for name, (help_text, callback) in sorted(_gauges.items()):
+        try:
+            value = callback()
+        except Exception:
+            value = None
+        if value is None:
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {float(value)}")
+
+    return "\n".join(lines) + "\n"
+
+
+def init_app(app):
+    """Register the timing hooks and the /metrics endpoint on a Flask app."""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics():
+        return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
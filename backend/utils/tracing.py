@@ -0,0 +1,127 @@
+import contextvars
+import functools
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# How many finished traces to keep in memory for /scan/traces
+TRACE_HISTORY = 50
+
+_current = contextvars.ContextVar("assetiq_trace", default=None)
+_recent = deque(maxlen=TRACE_HISTORY)
+_recent_lock = threading.Lock()
+
+
+class Trace:
+    """Timing spans + counters for one pipeline run (e.g. one /scan request)."""
+
+    def __init__(self, name: str, **attrs):
+        self.trace_id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.attrs = dict(attrs)
+        self.started_at = datetime.now().isoformat(timespec="seconds")
+        self._t0 = time.perf_counter()
+        self._depth = 0
+        self.spans: List[Dict] = []
+        self.counts: Dict[str, int] = {}
+        self.status = None
+        self.duration_ms = None
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        start = time.perf_counter()
+        depth = self._depth
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            self.spans.append({
+                "name": name,
+                "start_ms": round((start - self._t0) * 1000, 2),
+                "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+                "depth": depth,
+                **attrs,
+            })
+
+    def count(self, key: str, n: int = 1):
+        self.counts[key] = self.counts.get(key, 0) + n
+
+    def set(self, key: str, value):
+        self.attrs[key] = value
+
+    def finish(self, status=None):
+        self.status = status
+        self.duration_ms = round((time.perf_counter() - self._t0) * 1000, 2)
+
+    def to_dict(self) -> Dict:
+        elapsed = self.duration_ms
+        if elapsed is None:
+            elapsed = round((time.perf_counter() - self._t0) * 1000, 2)
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "status": self.status,
+            "total_ms": elapsed,
+            "stages": sorted(self.spans, key=lambda s: s["start_ms"]),
+            "counts": dict(self.counts),
+            **self.attrs,
+        }
+
+
+@contextmanager
+def start_trace(name: str, **attrs):
+    """Make a new trace current for the enclosed block and keep it in the history."""
+    trace = Trace(name, **attrs)
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+        if trace.duration_ms is None:
+            trace.finish(trace.status)
+        with _recent_lock:
+            _recent.append(trace.to_dict())
+
+
+def traced(name: str):
+    """Decorator for Flask views: trace the whole call and record its HTTP status."""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            with start_trace(name) as trace:
+                rv = view(*args, **kwargs)
+                status = rv[1] if isinstance(rv, tuple) and len(rv) > 1 else getattr(rv, "status_code", 200)
+                trace.finish(status)
+                return rv
+        return wrapper
+    return decorator
+
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+
+def span(name: str, **attrs):
+    """Time a stage of the current trace (no-op when nothing is being traced)."""
+    trace = _current.get()
+    return trace.span(name, **attrs) if trace else nullcontext()
+
+
+def count(key: str, n: int = 1):
+    trace = _current.get()
+    if trace:
+        trace.count(key, n)
+
+
+def recent_traces(limit: Optional[int] = None) -> List[Dict]:
+    """Most recent finished traces, newest first."""
+    with _recent_lock:
+        items = list(_recent)
+    items.reverse()
+    return items[:limit] if limit else items